@@ -1,11 +1,52 @@
+import importlib
+import threading
+
 import streamlit as st
+import logging
+
+from services.anomalias import ativar_detector
+
+logger = logging.getLogger(__name__)
+
+# Páginas carregadas sob demanda (módulo, função): a tela de login não paga a
+# importação das DAOs, do pandas, do firebase_admin nem do matplotlib.
+PAGINAS = {
+    "dashboard": ("views.dashboard_page", "dashboard_page"),
+    "clientes": ("views.cliente_page", "cliente_page"),
+    "motoboys": ("views.motoboy_page", "motoboy_page"),
+    "avaliacoes": ("views.avaliacao_page", "avaliacao_page"),
+    "fidelidade": ("views.fidelidade_page", "fidelidade_page"),
+    "ranking": ("views.ranking_page", "ranking_page"),
+    "campanhas": ("views.campanha_page", "campanha_page")
+}
+
+
+def carregar_pagina(nome: str):
+    """
+    Importa o módulo da página na primeira vez em que ela é aberta (depois
+    fica em sys.modules) e retorna sua função de renderização.
+    """
+    modulo, funcao = PAGINAS[nome]
+    return getattr(importlib.import_module(modulo), funcao)
 
-from views.cliente_page import cliente_page
-from views.motoboy_page import motoboy_page
-from views.avaliacao_page import avaliacao_page
-from views.dashboard_page import dashboard_page
-from views.fidelidade_page import fidelidade_page
-from views.campanha_page import campanha_page
+
+@st.cache_resource
+def precarregar_paginas():
+    """
+    Uma vez por processo, importa as páginas numa thread em segundo plano
+    enquanto o usuário preenche o login, para que a primeira página após o
+    login normalmente já as encontre carregadas.
+    """
+    def _importar():
+        for modulo, _ in PAGINAS.values():
+            try:
+                importlib.import_module(modulo)
+            except Exception as e:
+                logger.error(f"Erro ao pré-carregar {modulo}: {e}")
+
+    thread = threading.Thread(target=_importar, name="precarregar-paginas", daemon=True)
+    thread.start()
+    return thread
 
 # ----------------------------------------
 # 1. Configuração inicial da página
@@ -103,6 +144,7 @@ def exibir_menu():
             "Motoboys",
             "Avaliações 360°",
             "Fidelidade",
+            "Ranking Fidelidade",
             "Campanhas",
             "Sair"
         ]
@@ -116,6 +158,7 @@ def exibir_menu():
         opcoes = [
             "Avaliar Pizzaria",
             "Avaliar Motoboy",
+            "Ranking Fidelidade",
             "Sair"
         ]
     else:
@@ -134,29 +177,50 @@ def exibir_menu():
 
     if perfil == "Funcionário":
         if escolha == "Dashboard Geral":
-            dashboard_page()
+            carregar_pagina("dashboard")()
         elif escolha == "Clientes":
-            cliente_page()
+            carregar_pagina("clientes")()
         elif escolha == "Motoboys":
-            motoboy_page()
+            carregar_pagina("motoboys")()
         elif escolha == "Avaliações 360°":
-            avaliacao_page(perfil=perfil, usuario=nome, modo="admin")
+            carregar_pagina("avaliacoes")(perfil=perfil, usuario=nome, modo="admin")
         elif escolha == "Fidelidade":
-            fidelidade_page()
+            carregar_pagina("fidelidade")()
+        elif escolha == "Ranking Fidelidade":
+            carregar_pagina("ranking")()
         elif escolha == "Campanhas":
-            campanha_page()
+            carregar_pagina("campanhas")()
 
     elif perfil == "Motoboy":
         if escolha == "Avaliar Cliente":
-            avaliacao_page(perfil=perfil, usuario=nome, modo="avaliar_cliente")
+            carregar_pagina("avaliacoes")(perfil=perfil, usuario=nome, modo="avaliar_cliente")
         elif escolha == "Minhas Avaliações":
-            avaliacao_page(perfil=perfil, usuario=nome, modo="minhas_avaliacoes")
+            carregar_pagina("avaliacoes")(perfil=perfil, usuario=nome, modo="minhas_avaliacoes")
 
     elif perfil == "Cliente":
         if escolha == "Avaliar Pizzaria":
-            avaliacao_page(perfil=perfil, usuario=nome, modo="avaliar_pizzaria")
+            carregar_pagina("avaliacoes")(perfil=perfil, usuario=nome, modo="avaliar_pizzaria")
         elif escolha == "Avaliar Motoboy":
-            avaliacao_page(perfil=perfil, usuario=nome, modo="avaliar_motoboy")
+            carregar_pagina("avaliacoes")(perfil=perfil, usuario=nome, modo="avaliar_motoboy")
+        elif escolha == "Ranking Fidelidade":
+            carregar_pagina("ranking")()
+
+def aviso_backend():
+    """
+    Avisa na sidebar quando o banco está instável: circuito aberto ou dados
+    servidos do cache nesta execução ou no último minuto. Chamado depois da
+    página, para refletir as leituras que ela acabou de fazer.
+    """
+    import time
+    from dao.resiliencia import obter_resiliencia
+
+    estado = obter_resiliencia().estado()
+    if estado["circuito"] != "fechado":
+        st.sidebar.error("⚠️ Banco de dados indisponível: exibindo os últimos dados "
+                         "carregados e alterações não estão sendo gravadas.")
+    elif estado["ultima_obsoleta_em"] and time.time() - estado["ultima_obsoleta_em"] < 60:
+        st.sidebar.warning("⚠️ Instabilidade no banco de dados: parte das informações "
+                           "pode estar desatualizada.")
 
 # ----------------------------------------
 # 5. Função principal
@@ -167,8 +231,17 @@ def main():
 
     if not st.session_state["logado"]:
         tela_login()
+        precarregar_paginas()
     else:
+        # Detector de anomalias nas novas avaliações (uma vez por processo).
+        # Avaliações só são gravadas após o login, então ele não atrasa a tela inicial.
+        ativar_detector()
+        # Fila de escrita iniciada já no login: avaliações que ficaram no disco
+        # numa execução anterior são enviadas sem esperar uma nova avaliação
+        from dao.fila_escrita import obter_fila
+        obter_fila()
         exibir_menu()
+        aviso_backend()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
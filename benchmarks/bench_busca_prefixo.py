@@ -0,0 +1,104 @@
+"""
+Benchmark da busca por prefixo (typeahead) de clientes.
+
+Gera uma base sintética, mede o tempo de carga do índice e a latência das
+consultas (p50/p99) para prefixos de nome, telefone e e-mail de tamanhos
+variados, comparando com a varredura linear que o índice substitui.
+
+Uso:
+    python -m benchmarks.bench_busca_prefixo --clientes 500000 --consultas 2000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from services.busca_prefixo import IndicePrefixo, tokens_consulta, tokens_registro
+
+NOMES = ["João", "Maria", "José", "Ana", "Antônio", "Francisca", "Carlos", "Paulo", "Lúcia",
+         "Marcos", "Luiz", "Fernanda", "Patrícia", "Rafael", "Juliana", "Márcio", "Conceição",
+         "Pedro", "Letícia", "Gabriel", "Beatriz", "Thiago", "Camila", "Débora", "Sérgio"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira",
+              "Lima", "Gomes", "Ribeiro", "Carvalho", "Araújo", "Melo", "Barbosa", "Cardoso",
+              "Conceição", "Magalhães", "Brandão", "Falcão", "Nogueira", "Assunção"]
+
+
+def gerar_clientes(quantidade: int, rnd: random.Random):
+    for i in range(quantidade):
+        nome = f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}"
+        usuario = nome.lower().replace(" ", ".")
+        yield {
+            "id": f"cli-{i}",
+            "nome": nome,
+            "telefone": f"({rnd.randint(11, 99)}) 9{rnd.randint(0, 99999999):08d}",
+            "email": f"{usuario}{i}@exemplo.com.br"
+        }
+
+
+def gerar_consultas(clientes, quantidade: int, rnd: random.Random):
+    consultas = []
+    for _ in range(quantidade):
+        c = rnd.choice(clientes)
+        tipo = rnd.random()
+        if tipo < 0.5:
+            partes = c["nome"].split()
+            consultas.append(f"{partes[0]} {partes[1][:rnd.randint(1, len(partes[1]))]}")
+        elif tipo < 0.8:
+            consultas.append(c["telefone"][:rnd.randint(6, len(c["telefone"]))])
+        else:
+            consultas.append(c["email"][:rnd.randint(3, 15)])
+    return consultas
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", type=int, default=500000)
+    parser.add_argument("--consultas", type=int, default=2000)
+    parser.add_argument("--limite", type=int, default=10)
+    parser.add_argument("--sem-linear", action="store_true", help="não mede a varredura linear")
+    args = parser.parse_args()
+
+    rnd = random.Random(42)
+    clientes = list(gerar_clientes(args.clientes, rnd))
+    consultas = gerar_consultas(clientes, args.consultas, rnd)
+
+    indice = IndicePrefixo()
+    inicio = time.perf_counter()
+    indice.carregar(clientes)
+    print(f"Carga: {len(indice)} clientes em {time.perf_counter() - inicio:.2f}s "
+          f"({len(indice._chaves)} tokens)")
+
+    inicio = time.perf_counter()
+    for i in range(1000):
+        indice.adicionar(f"novo-{i}", clientes[i])
+    print(f"Inserção incremental: {(time.perf_counter() - inicio) * 1000 / 1000:.3f} ms/registro")
+
+    tempos = []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        indice.buscar(consulta, args.limite)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    print(f"Índice:  p50={statistics.median(tempos):.3f} ms  p99={percentil(tempos, 0.99):.3f} ms  "
+          f"máx={max(tempos):.3f} ms")
+
+    if not args.sem_linear:
+        # Varredura equivalente sobre a lista (o que a busca faria sem índice)
+        tokens = [tokens_registro(c) for c in clientes]
+        tempos = []
+        for consulta in consultas[:50]:
+            prefixos = tokens_consulta(consulta)
+            inicio = time.perf_counter()
+            [c for c, toks in zip(clientes, tokens)
+             if all(any(t.startswith(p) for t in toks) for p in prefixos)][:args.limite]
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        print(f"Linear:  p50={statistics.median(tempos):.1f} ms  p99={percentil(tempos, 0.99):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark de acúmulo/resgate de pontos com vários caixas simultâneos.
+
+Compara a escrita ingênua (ler saldo, somar localmente e gravar o registro)
+com as operações transacionais da FidelidadeDAO, medindo vazão e conferindo
+se algum crédito se perdeu.
+
+Uso:
+    python -m benchmarks.bench_fidelidade_concorrente --escritores 16 --operacoes 500
+
+Sem CRM_BANCO_LOCAL definido, roda contra o banco local em memória.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("CRM_BANCO_LOCAL", ":memoria:")
+
+from dao.firebase_dao import FirebaseDAO  # noqa: E402
+from dao.fidelidade_dao import FidelidadeDAO  # noqa: E402
+from models.fidelidade import Fidelidade  # noqa: E402
+
+
+def preparar(dao: FidelidadeDAO, registros: int):
+    ids = []
+    for i in range(registros):
+        f = Fidelidade(
+            id=None,
+            cliente_id=f"bench-cliente-{i}",
+            cliente_nome=f"Cliente {i}",
+            pontos=0,
+            nivel="bronze",
+            validade="2099-12-31"
+        )
+        ids.append(dao.criar(f))
+    return ids
+
+
+def escritor_ingenuo(dao: FidelidadeDAO, ids, operacoes: int, semente: int) -> int:
+    rnd = random.Random(semente)
+    total = 0
+    for _ in range(operacoes):
+        id = rnd.choice(ids)
+        quantidade = rnd.randint(1, 10)
+        atual = FirebaseDAO.buscar_por_id(dao, id)
+        # Janela de corrida: outro caixa pode gravar entre a leitura e a escrita
+        FirebaseDAO.atualizar(dao, id, {"pontos": int(atual["pontos"]) + quantidade})
+        total += quantidade
+    return total
+
+
+def escritor_transacional(dao: FidelidadeDAO, ids, operacoes: int, semente: int) -> int:
+    rnd = random.Random(semente)
+    total = 0
+    for i in range(operacoes):
+        id = rnd.choice(ids)
+        quantidade = rnd.randint(1, 10)
+        if dao.creditar_pontos(id, quantidade, motivo="bench", pedido_id=f"p-{semente}-{i}") is not None:
+            total += quantidade
+    return total
+
+
+def executar(nome: str, funcao, dao: FidelidadeDAO, ids, escritores: int, operacoes: int):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=escritores) as executor:
+        futuros = [executor.submit(funcao, dao, ids, operacoes, semente) for semente in range(escritores)]
+        esperado = sum(f.result() for f in futuros)
+    duracao = time.perf_counter() - inicio
+
+    obtido = sum(f.pontos for f in dao.listar_todos() if f.id in set(ids))
+    total_ops = escritores * operacoes
+    print(f"{nome:<14} {total_ops / duracao:>10.0f} ops/s  "
+          f"esperado={esperado:<8} gravado={obtido:<8} perdidos={esperado - obtido}")
+    return esperado, obtido
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--registros", type=int, default=20)
+    parser.add_argument("--escritores", type=int, default=8)
+    parser.add_argument("--operacoes", type=int, default=300, help="operações por escritor")
+    args = parser.parse_args()
+
+    # Intervalo curto de troca de threads aumenta a chance de intercalar leituras e escritas
+    sys.setswitchinterval(1e-5)
+
+    dao = FidelidadeDAO()
+    print(f"{args.escritores} escritores x {args.operacoes} operações sobre {args.registros} registros\n")
+
+    ids = preparar(dao, args.registros)
+    executar("ingênuo", escritor_ingenuo, dao, ids, args.escritores, args.operacoes)
+
+    ids = preparar(dao, args.registros)
+    executar("transacional", escritor_transacional, dao, ids, args.escritores, args.operacoes)
+
+    divergentes = [id for id in ids if dao.extrato.calcular_saldo(id) != dao.buscar_por_id(id).pontos]
+    print(f"\nExtrato x saldo materializado: {len(divergentes)} registro(s) divergente(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark do tempo de importação (partida a frio) do app.
+
+Executa `python -X importtime` em processos novos para cada cenário, repete
+algumas vezes e mostra a mediana do tempo acumulado, os módulos mais caros
+e quais bibliotecas pesadas foram carregadas. Cenários:
+
+    login      -> import app (o que a tela de login paga)
+    paginas    -> import app + todas as páginas
+    dashboard  -> import app + painel + matplotlib (primeiro gráfico fora do cache)
+
+Uso:
+    python -m benchmarks.bench_importacao --repeticoes 5 --top 15
+    python -m benchmarks.bench_importacao --relatorio importtime.txt   # saída bruta do -X importtime
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+CENARIOS = {
+    "login": "import app",
+    "paginas": "import app; [app.carregar_pagina(p) for p in app.PAGINAS]",
+    "dashboard": ("import app; app.carregar_pagina('dashboard'); "
+                  "from services.graficos import grafico_barras; grafico_barras(['a'], [1])")
+}
+
+PESADOS = ("pandas", "matplotlib", "firebase_admin", "google.cloud", "dao.firebase_dao")
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def medir(codigo: str):
+    """
+    Roda o código num interpretador novo com -X importtime.
+
+    Returns:
+        (tempos, saída bruta, pesados carregados), com
+        tempos = {módulo: (próprio_us, acumulado_us, nível_superior)}.
+    """
+    sonda = f"{codigo}\nimport sys\nprint(','.join(m for m in {PESADOS!r} if m in sys.modules))"
+    processo = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", sonda],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    )
+    tempos = {}
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith("import time:") or "self [us]" in linha:
+            continue
+        proprio, acumulado, nome = linha[len("import time:"):].split("|")
+        # Importações aninhadas vêm indentadas com dois espaços por nível
+        tempos[nome.strip()] = (int(proprio), int(acumulado), not nome[1:].startswith(" "))
+    carregados = [m for m in processo.stdout.strip().splitlines()[-1].split(",") if m] if processo.stdout.strip() else []
+    return tempos, processo.stderr, carregados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cenarios", nargs="*", help=f"cenários a medir (padrão: todos; opções: {', '.join(CENARIOS)})")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="módulos mais caros a listar")
+    parser.add_argument("--relatorio", help="grava a saída bruta do -X importtime (última repetição) neste arquivo")
+    args = parser.parse_args()
+
+    desconhecidos = [c for c in args.cenarios if c not in CENARIOS]
+    if desconhecidos:
+        parser.error(f"cenário(s) desconhecido(s): {', '.join(desconhecidos)}")
+
+    relatorio = []
+    for cenario in args.cenarios or list(CENARIOS):
+        # Primeira execução só aquece o cache de bytecode e o do sistema de arquivos
+        medir(CENARIOS[cenario])
+        totais = []
+        for _ in range(args.repeticoes):
+            tempos, bruto, carregados = medir(CENARIOS[cenario])
+            totais.append(sum(acumulado for _, acumulado, superior in tempos.values() if superior) / 1000)
+        relatorio.append(f"# cenário {cenario}: {CENARIOS[cenario]}\n{bruto}")
+
+        print(f"\n== {cenario}: mediana {statistics.median(totais):.0f} ms "
+              f"(mín {min(totais):.0f} ms, máx {max(totais):.0f} ms)")
+        print(f"   pesados carregados: {', '.join(carregados) or 'nenhum'}")
+        for nome, (_, acumulado, _) in sorted(tempos.items(), key=lambda t: -t[1][1])[:args.top]:
+            print(f"   {acumulado / 1000:9.1f} ms  {nome}")
+
+    if args.relatorio:
+        with open(args.relatorio, "w", encoding="utf-8") as fp:
+            fp.write("\n".join(relatorio))
+        print(f"\nRelatório bruto em {args.relatorio}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+import atexit
+import copy
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class BancoLocal:
+    """
+    Banco em memória que imita o subconjunto da API de Reference do
+    firebase_admin usado pelas DAOs (get, set, update multi-path, delete,
+    push, transaction e consultas ordenadas).
+
+    Todas as operações são serializadas por um lock, o que torna as
+    transações naturalmente livres de contenção. Serve para execução
+    offline, benchmarks e verificação de restaurações.
+    """
+
+    def __init__(self, arquivo: Optional[str] = None):
+        self._dados: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        self._arquivo = arquivo
+        if arquivo and os.path.exists(arquivo):
+            with open(arquivo, "r", encoding="utf-8") as fp:
+                self._dados = json.load(fp) or {}
+            logger.info(f"Banco local carregado de '{arquivo}'")
+        if arquivo:
+            atexit.register(self.salvar)
+
+    @property
+    def lock(self) -> threading.RLock:
+        return self._lock
+
+    @property
+    def arquivo(self) -> Optional[str]:
+        """Arquivo JSON de persistência, ou None se só em memória."""
+        return self._arquivo
+
+    def referencia(self, caminho: str = "/") -> "ReferenciaLocal":
+        """Retorna uma referência para o caminho informado."""
+        return ReferenciaLocal(self, _partes(caminho))
+
+    def salvar(self) -> None:
+        """Persiste o conteúdo em JSON, se o banco foi criado com arquivo."""
+        if not self._arquivo:
+            return
+        with self._lock:
+            temporario = f"{self._arquivo}.tmp"
+            with open(temporario, "w", encoding="utf-8") as fp:
+                json.dump(self._dados, fp, ensure_ascii=False)
+            os.replace(temporario, self._arquivo)
+
+    # ------------------------------------------------------------------
+    # Acesso à árvore (chamados sempre com o lock adquirido)
+    # ------------------------------------------------------------------
+    def _ler(self, partes: List[str]) -> Any:
+        atual: Any = self._dados
+        for parte in partes:
+            if not isinstance(atual, dict) or parte not in atual:
+                return None
+            atual = atual[parte]
+        return atual
+
+    def _gravar(self, partes: List[str], valor: Any, instante: Optional[int] = None) -> None:
+        valor = self._resolver_valores_servidor(partes, valor, instante or int(time.time() * 1000))
+        if not partes:
+            self._dados = valor if isinstance(valor, dict) else {}
+            return
+        atual = self._dados
+        for parte in partes[:-1]:
+            proximo = atual.get(parte)
+            if not isinstance(proximo, dict):
+                if valor is None:
+                    return
+                proximo = {}
+                atual[parte] = proximo
+            atual = proximo
+        if valor is None:
+            atual.pop(partes[-1], None)
+            self._podar(partes[:-1])
+        else:
+            atual[partes[-1]] = valor
+
+    def _podar(self, partes: List[str]) -> None:
+        # O RTDB não guarda nós vazios: remove ancestrais que ficaram sem filhos
+        while partes:
+            no = self._ler(partes)
+            if no:
+                return
+            pai = self._ler(partes[:-1]) if len(partes) > 1 else self._dados
+            if isinstance(pai, dict):
+                pai.pop(partes[-1], None)
+            partes = partes[:-1]
+
+    def _resolver_valores_servidor(self, partes: List[str], valor: Any, instante: int) -> Any:
+        # Suporte aos server values do RTDB: {".sv": "timestamp"} e {".sv": {"increment": n}}
+        if isinstance(valor, dict):
+            if ".sv" in valor:
+                marcador = valor[".sv"]
+                if marcador == "timestamp":
+                    return instante
+                if isinstance(marcador, dict) and "increment" in marcador:
+                    atual = self._ler(partes)
+                    base = atual if isinstance(atual, (int, float)) and not isinstance(atual, bool) else 0
+                    return base + marcador["increment"]
+                raise ValueError(f"Server value não suportado: {marcador}")
+            resolvido = {
+                chave: self._resolver_valores_servidor(partes + [chave], filho, instante)
+                for chave, filho in valor.items()
+            }
+            resolvido = {chave: filho for chave, filho in resolvido.items() if filho is not None}
+            return resolvido or None
+        return valor
+
+
+class ReferenciaLocal:
+    """
+    Referência para um nó do BancoLocal, com a mesma interface usada do
+    firebase_admin.db.Reference.
+    """
+
+    def __init__(self, banco: BancoLocal, partes: List[str]):
+        self._banco = banco
+        self._partes = partes
+
+    @property
+    def key(self) -> Optional[str]:
+        return self._partes[-1] if self._partes else None
+
+    @property
+    def path(self) -> str:
+        return "/" + "/".join(self._partes)
+
+    @property
+    def parent(self) -> Optional["ReferenciaLocal"]:
+        if not self._partes:
+            return None
+        return ReferenciaLocal(self._banco, self._partes[:-1])
+
+    def child(self, caminho: str) -> "ReferenciaLocal":
+        if not caminho or not isinstance(caminho, str):
+            raise ValueError("Caminho do filho deve ser uma string não vazia")
+        return ReferenciaLocal(self._banco, self._partes + _partes(caminho))
+
+    def get(self, etag: bool = False, shallow: bool = False) -> Any:
+        if etag and shallow:
+            raise ValueError("etag e shallow não podem ser usados juntos")
+        with self._banco.lock:
+            valor = self._banco._ler(self._partes)
+            if shallow and isinstance(valor, dict):
+                return {chave: True if isinstance(filho, dict) else filho for chave, filho in valor.items()}
+            valor = copy.deepcopy(valor)
+        if etag:
+            return valor, _etag(valor)
+        return valor
+
+    def set(self, value: Any) -> None:
+        if value is None:
+            raise ValueError("Valor não pode ser None")
+        with self._banco.lock:
+            self._banco._gravar(self._partes, copy.deepcopy(value))
+
+    def set_if_unchanged(self, expected_etag: str, value: Any):
+        with self._banco.lock:
+            atual = self._banco._ler(self._partes)
+            if _etag(atual) != expected_etag:
+                return False, copy.deepcopy(atual), _etag(atual)
+            self._banco._gravar(self._partes, copy.deepcopy(value))
+            novo = self._banco._ler(self._partes)
+            return True, copy.deepcopy(novo), _etag(novo)
+
+    def push(self, value: Any = "") -> "ReferenciaLocal":
+        filho = self.child(f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}")
+        filho.set(value)
+        return filho
+
+    def update(self, value: Dict[str, Any]) -> None:
+        if not isinstance(value, dict) or not value:
+            raise ValueError("Update deve receber um dicionário não vazio")
+        with self._banco.lock:
+            # Multi-path update: todos os caminhos são aplicados sob o mesmo lock
+            # e, como no RTDB, com o mesmo instante do servidor
+            instante = int(time.time() * 1000)
+            for caminho, filho in value.items():
+                self._banco._gravar(self._partes + _partes(caminho), copy.deepcopy(filho), instante)
+
+    def delete(self) -> None:
+        with self._banco.lock:
+            self._banco._gravar(self._partes, None)
+
+    def transaction(self, transaction_update: Callable[[Any], Any]) -> Any:
+        if not callable(transaction_update):
+            raise ValueError("transaction_update deve ser uma função")
+        with self._banco.lock:
+            atual = copy.deepcopy(self._banco._ler(self._partes))
+            novo = transaction_update(atual)
+            self._banco._gravar(self._partes, copy.deepcopy(novo))
+            return novo
+
+    def order_by_child(self, caminho: str) -> "ConsultaLocal":
+        if not caminho or caminho.startswith("$"):
+            raise ValueError("Caminho de ordenação inválido")
+        return ConsultaLocal(self, ("child", _partes(caminho)))
+
+    def order_by_key(self) -> "ConsultaLocal":
+        return ConsultaLocal(self, ("key", None))
+
+    def order_by_value(self) -> "ConsultaLocal":
+        return ConsultaLocal(self, ("value", None))
+
+
+class ConsultaLocal:
+    """
+    Consulta ordenada sobre um nó do BancoLocal (start_at, end_at, equal_to,
+    limit_to_first e limit_to_last), com a ordenação de tipos do RTDB.
+    """
+
+    def __init__(self, referencia: ReferenciaLocal, ordem):
+        self._referencia = referencia
+        self._ordem = ordem
+        self._inicio = None
+        self._fim = None
+        self._primeiros: Optional[int] = None
+        self._ultimos: Optional[int] = None
+
+    def start_at(self, start: Any) -> "ConsultaLocal":
+        if start is None:
+            raise ValueError("start_at não pode ser None")
+        self._inicio = start
+        return self
+
+    def end_at(self, end: Any) -> "ConsultaLocal":
+        if end is None:
+            raise ValueError("end_at não pode ser None")
+        self._fim = end
+        return self
+
+    def equal_to(self, value: Any) -> "ConsultaLocal":
+        if value is None:
+            raise ValueError("equal_to não pode ser None")
+        self._inicio = value
+        self._fim = value
+        return self
+
+    def limit_to_first(self, limit: int) -> "ConsultaLocal":
+        if not isinstance(limit, int) or limit < 0 or self._ultimos is not None:
+            raise ValueError("Limite inválido")
+        self._primeiros = limit
+        return self
+
+    def limit_to_last(self, limit: int) -> "ConsultaLocal":
+        if not isinstance(limit, int) or limit < 0 or self._primeiros is not None:
+            raise ValueError("Limite inválido")
+        self._ultimos = limit
+        return self
+
+    def get(self) -> "OrderedDict[str, Any]":
+        # Ordena e recorta sobre o nó original e copia só o que é devolvido:
+        # paginar uma coleção grande não copia a coleção inteira a cada página
+        banco = self._referencia._banco
+        with banco.lock:
+            dados = banco._ler(self._referencia._partes)
+            if not isinstance(dados, dict):
+                return OrderedDict()
+            return OrderedDict(
+                (chave, copy.deepcopy(valor)) for chave, valor in self._filtrar(dados)
+            )
+
+    def _filtrar(self, dados: Dict[str, Any]):
+        tipo, caminho = self._ordem
+        entradas = []
+        for chave, valor in dados.items():
+            if tipo == "key":
+                indice = chave
+            elif tipo == "value":
+                indice = valor
+            else:
+                indice = valor
+                for parte in caminho:
+                    indice = indice.get(parte) if isinstance(indice, dict) else None
+            entradas.append((_ordem_rtdb(indice), chave, valor))
+        entradas.sort(key=lambda e: (e[0], e[1]))
+
+        if self._inicio is not None:
+            inicio = _ordem_rtdb(self._inicio)
+            entradas = [e for e in entradas if e[0] >= inicio]
+        if self._fim is not None:
+            fim = _ordem_rtdb(self._fim)
+            entradas = [e for e in entradas if e[0] <= fim]
+        if self._primeiros is not None:
+            entradas = entradas[:self._primeiros]
+        if self._ultimos is not None:
+            entradas = entradas[-self._ultimos:] if self._ultimos else []
+
+        return [(chave, valor) for _, chave, valor in entradas]
+
+
+def _partes(caminho: str) -> List[str]:
+    return [parte for parte in str(caminho).split("/") if parte]
+
+
+def _etag(valor: Any) -> str:
+    return json.dumps(valor, sort_keys=True, default=str)
+
+
+def _ordem_rtdb(valor: Any):
+    # Ordem de tipos do RTDB: null < false < true < números < strings < objetos
+    if valor is None:
+        return (0, 0)
+    if isinstance(valor, bool):
+        return (1, int(valor))
+    if isinstance(valor, (int, float)):
+        return (2, valor)
+    if isinstance(valor, str):
+        return (3, valor)
+    return (4, 0)
@@ -1,19 +1,50 @@
-import firebase_admin
-from firebase_admin import credentials, db
+import os
+import threading
 import streamlit as st
+from config.banco_local import BancoLocal
 import logging
 
 logger = logging.getLogger(__name__)
 
+# firebase_admin (e o cliente HTTP do Google por trás dele) só é importado
+# quando a primeira DAO pede o banco, e nunca no modo local.
+
+# Quando definida, usa o banco local em memória no lugar do Firebase.
+# Valor ":memoria:" mantém tudo em memória; qualquer outro valor é o arquivo JSON de persistência.
+BANCO_LOCAL_ENV = "CRM_BANCO_LOCAL"
+
+# Conexões HTTP mantidas abertas com o RTDB, compartilhadas por todas as
+# sessões do processo (o padrão do requests é 10, pouco para várias abas).
+POOL_HTTP_ENV = "CRM_POOL_HTTP"
+POOL_HTTP_PADRAO = 32
+
+# Segundos até o cliente HTTP do RTDB abandonar uma requisição
+HTTP_TIMEOUT = 30
+
+
 class FirebaseConfig:
     _instance = None
+    _lock = threading.Lock()
 
     def __init__(self):
-        if not firebase_admin._apps:
-            self._initialize_firebase()
+        self._banco_local = None
+        self._raiz = None
+        self._cliente_assincrono = None
+        destino_local = os.environ.get(BANCO_LOCAL_ENV)
+        if destino_local:
+            self._banco_local = BancoLocal(None if destino_local == ":memoria:" else destino_local)
+            logger.info("Usando banco local (offline) no lugar do Firebase")
+        else:
+            import firebase_admin
+            if not firebase_admin._apps:
+                self._initialize_firebase()
+            self._configurar_pool_http()
 
     def _initialize_firebase(self):
         try:
+            import firebase_admin
+            from firebase_admin import credentials
+
             # Verifica se todas as chaves necessárias estão presentes
             required_keys = ["PROJECT_ID", "DATABASE_SECRET", "CLIENT_EMAIL", "DATABASE_URL"]
             for key in required_keys:
@@ -32,7 +63,12 @@ class FirebaseConfig:
             cred = credentials.Certificate(cred_dict)
             firebase_admin.initialize_app(
                 cred,
-                { 'databaseURL': st.secrets["FIREBASE"]["DATABASE_URL"] }
+                {
+                    'databaseURL': st.secrets["FIREBASE"]["DATABASE_URL"],
+                    # Teto de cada requisição HTTP; a camada de resiliência
+                    # (dao/resiliencia.py) desiste antes, por operação
+                    'httpTimeout': HTTP_TIMEOUT
+                }
             )
             logger.info("Firebase configurado com sucesso (sem Storage)!")
             
@@ -40,13 +76,88 @@ class FirebaseConfig:
             logger.error(f"Falha na inicialização do Firebase: {str(e)}")
             raise RuntimeError(f"Erro no Firebase: {str(e)}")
     
+    def _configurar_pool_http(self):
+        """
+        Amplia o pool de conexões da sessão HTTP do cliente do RTDB. O
+        firebase_admin já reutiliza um único cliente por app; aqui só evitamos
+        que conexões excedentes sejam descartadas (e o TLS refeito) quando
+        várias sessões do Streamlit consultam ao mesmo tempo.
+        """
+        try:
+            import requests
+            from firebase_admin import db
+
+            tamanho = int(os.environ.get(POOL_HTTP_ENV, POOL_HTTP_PADRAO))
+            sessao = db.reference()._client.session
+            for prefixo in ("https://", "http://"):
+                tentativas = sessao.get_adapter(prefixo).max_retries
+                sessao.mount(prefixo, requests.adapters.HTTPAdapter(
+                    pool_connections=tamanho, pool_maxsize=tamanho, max_retries=tentativas
+                ))
+            logger.info(f"Pool HTTP do Firebase com até {tamanho} conexões")
+        except Exception as e:
+            # Sem o ajuste o cliente continua funcionando com o pool padrão
+            logger.warning(f"Não foi possível ajustar o pool HTTP do Firebase: {e}")
+
     @property
     def rtdb(self):
-        """Retorna a referência do Realtime Database"""
-        return db.reference()
+        """Retorna a referência raiz do Realtime Database (criada uma vez)"""
+        if self._banco_local is not None:
+            return self._banco_local.referencia()
+        if self._raiz is None:
+            from firebase_admin import db
+            self._raiz = db.reference()
+        return self._raiz
+
+    @property
+    def rtdb_assincrono(self):
+        """
+        Retorna o cliente assíncrono do RTDB (API REST via httpx, criado uma
+        vez), ou o equivalente sobre o banco local.
+        """
+        if self._cliente_assincrono is None:
+            with self._lock:
+                if self._cliente_assincrono is None:
+                    from config.rtdb_assincrono import ClienteLocalAssincrono, ClienteRTDBAssincrono
+                    if self._banco_local is not None:
+                        self._cliente_assincrono = ClienteLocalAssincrono(self._banco_local)
+                    else:
+                        self._cliente_assincrono = ClienteRTDBAssincrono(timeout=HTTP_TIMEOUT)
+        return self._cliente_assincrono
+
+    @property
+    def origem(self):
+        """
+        Identidade do banco em uso (URL do RTDB ou arquivo do banco local), para
+        caches em disco não misturarem bancos; None no banco local em memória.
+        """
+        if self._banco_local is not None:
+            arquivo = self._banco_local.arquivo
+            return f"local:{os.path.abspath(arquivo)}" if arquivo else None
+        import firebase_admin
+        return firebase_admin.get_app().options.get("databaseURL")
+
+    @property
+    def banco_local(self):
+        """Retorna o BancoLocal em uso, ou None quando conectado ao Firebase."""
+        return self._banco_local
+
+    def fechar(self):
+        """Fecha as conexões HTTP abertas com o Firebase (encerramento do processo)."""
+        if self._raiz is not None:
+            try:
+                self._raiz._client.close()
+            except Exception as e:
+                logger.warning(f"Erro ao fechar conexões do Firebase: {e}")
+            self._raiz = None
+        elif self._banco_local is not None:
+            self._banco_local.salvar()
 
     @classmethod
     def get_instance(cls):
         if cls._instance is None:
-            cls._instance = FirebaseConfig()
+            # Várias sessões do Streamlit podem pedir a instância ao mesmo tempo
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = FirebaseConfig()
         return cls._instance
\ No newline at end of file
@@ -0,0 +1,247 @@
+# config/rtdb_assincrono.py
+
+import asyncio
+import json
+import os
+import threading
+import time
+import weakref
+from datetime import timezone
+from typing import Any, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Requisições simultâneas ao RTDB por laço de eventos (e conexões mantidas abertas)
+LIMITE_ASSINCRONO_ENV = "CRM_LIMITE_ASSINCRONO"
+LIMITE_ASSINCRONO_PADRAO = 256
+
+# Renova o token de acesso este tanto antes de expirar
+_MARGEM_TOKEN = 300
+
+
+class ErroRTDB(Exception):
+    """O RTDB recusou a requisição (permissão, regra, pedido inválido)."""
+
+    def __init__(self, status: int, mensagem: str):
+        super().__init__(f"RTDB respondeu {status}: {mensagem}")
+        self.status = status
+
+
+class BackendIndisponivel(ErroRTDB):
+    """Erro do lado do servidor (5xx) ou limite de requisições (429)."""
+
+
+def _consulta(
+    shallow: bool = False,
+    ordem: Optional[str] = None,
+    inicio: Any = None,
+    fim: Any = None,
+    primeiros: Optional[int] = None,
+    ultimos: Optional[int] = None
+) -> Dict[str, str]:
+    # Parâmetros da API REST; orderBy/startAt/endAt vão codificados em JSON
+    parametros: Dict[str, str] = {}
+    if shallow:
+        parametros["shallow"] = "true"
+    if ordem is not None:
+        parametros["orderBy"] = json.dumps(ordem)
+        if inicio is not None:
+            parametros["startAt"] = json.dumps(inicio)
+        if fim is not None:
+            parametros["endAt"] = json.dumps(fim)
+        if primeiros is not None:
+            parametros["limitToFirst"] = str(primeiros)
+        if ultimos is not None:
+            parametros["limitToLast"] = str(ultimos)
+    return parametros
+
+
+def expiracao(expiry) -> float:
+    """
+    Instante (epoch) de expiração de um token do google-auth. O expiry vem
+    como datetime ingênuo em UTC: sem o fuso explícito, timestamp() o leria
+    como hora local.
+    """
+    if expiry is None:
+        return time.time() + 3600
+    if expiry.tzinfo is None:
+        expiry = expiry.replace(tzinfo=timezone.utc)
+    return expiry.timestamp()
+
+
+class ClienteRTDBAssincrono:
+    """
+    Cliente assíncrono da API REST do Realtime Database (httpx), para manter
+    centenas de leituras e escritas em andamento sem uma thread por requisição.
+
+    Usa a URL e a credencial do app do firebase_admin já inicializado. Cada
+    laço de eventos ganha seu próprio httpx.AsyncClient (com pool de conexões)
+    e semáforo, então o cliente serve tanto ao laço do processo
+    (dao/assincrono.py) quanto a um asyncio.run de uma rotina em lote.
+
+    Caminhos são relativos à raiz; ordem aceita "$key", "$value" ou um campo.
+    Consultas ordenadas voltam como dict sem ordem garantida (a API REST
+    devolve um objeto JSON): quem consome ordena.
+
+    url e credencial (com get_access_token, como as do firebase_admin) vêm do
+    app padrão quando não informadas.
+    """
+
+    def __init__(
+        self,
+        limite: Optional[int] = None,
+        timeout: float = 30.0,
+        url: Optional[str] = None,
+        credencial=None
+    ):
+        if url is None or credencial is None:
+            import firebase_admin
+
+            app = firebase_admin.get_app()
+            url = url or app.options.get("databaseURL")
+            credencial = credencial or app.credential
+        self._url = url.rstrip("/")
+        self._credencial = credencial
+        self._limite = limite or int(os.environ.get(LIMITE_ASSINCRONO_ENV, LIMITE_ASSINCRONO_PADRAO))
+        self._timeout = timeout
+        self._token: Optional[str] = None
+        self._token_expira_em = 0.0
+        self._lock_token = threading.Lock()
+        self._por_laco: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+
+    @property
+    def limite(self) -> int:
+        return self._limite
+
+    async def get(self, caminho: str, **consulta) -> Any:
+        """GET de um nó (com shallow ou consulta ordenada, ver _consulta)."""
+        return await self._requisitar("GET", caminho, parametros=_consulta(**consulta))
+
+    async def update(self, caminho: str, valores: Dict[str, Any]) -> None:
+        """Multi-path update (PATCH), atômico no servidor."""
+        await self._requisitar("PATCH", caminho, corpo=valores, parametros={"print": "silent"})
+
+    async def set(self, caminho: str, valor: Any) -> None:
+        await self._requisitar("PUT", caminho, corpo=valor, parametros={"print": "silent"})
+
+    async def delete(self, caminho: str) -> None:
+        await self._requisitar("DELETE", caminho)
+
+    async def fechar(self) -> None:
+        """Fecha o cliente HTTP do laço atual."""
+        atual = self._por_laco.pop(asyncio.get_running_loop(), None)
+        if atual is not None:
+            await atual[0].aclose()
+
+    async def _requisitar(
+        self,
+        metodo: str,
+        caminho: str,
+        corpo: Any = None,
+        parametros: Optional[Dict[str, str]] = None
+    ) -> Any:
+        cliente, semaforo = self._do_laco()
+        token = await self._token_valido()
+        url = f"{self._url}/{caminho.strip('/')}.json"
+        async with semaforo:
+            resposta = await cliente.request(
+                metodo, url,
+                params=parametros,
+                content=None if corpo is None else json.dumps(corpo, ensure_ascii=False).encode("utf-8"),
+                headers={"Authorization": f"Bearer {token}"}
+            )
+        if resposta.status_code >= 400:
+            try:
+                mensagem = resposta.json().get("error", resposta.text)
+            except ValueError:
+                mensagem = resposta.text
+            if resposta.status_code >= 500 or resposta.status_code == 429:
+                raise BackendIndisponivel(resposta.status_code, mensagem)
+            raise ErroRTDB(resposta.status_code, mensagem)
+        if resposta.status_code == 204 or not resposta.content:
+            return None
+        return resposta.json()
+
+    def _do_laco(self) -> tuple:
+        laco = asyncio.get_running_loop()
+        atual = self._por_laco.get(laco)
+        if atual is None:
+            import httpx
+
+            cliente = httpx.AsyncClient(
+                timeout=self._timeout,
+                limits=httpx.Limits(max_connections=self._limite, max_keepalive_connections=self._limite)
+            )
+            atual = (cliente, asyncio.Semaphore(self._limite))
+            self._por_laco[laco] = atual
+        return atual
+
+    async def _token_valido(self) -> str:
+        if self._token is None or time.time() >= self._token_expira_em:
+            # A renovação do google-auth é bloqueante: sai do laço
+            await asyncio.to_thread(self._renovar_token)
+        return self._token
+
+    def _renovar_token(self) -> None:
+        with self._lock_token:
+            if self._token is not None and time.time() < self._token_expira_em:
+                return
+            info = self._credencial.get_access_token()
+            self._token = info.access_token
+            self._token_expira_em = expiracao(info.expiry) - _MARGEM_TOKEN
+
+
+class ClienteLocalAssincrono:
+    """
+    Mesma interface do ClienteRTDBAssincrono sobre o BancoLocal. As operações
+    são em memória e rápidas, então rodam direto no laço.
+    """
+
+    def __init__(self, banco):
+        self._banco = banco
+
+    @property
+    def limite(self) -> int:
+        return LIMITE_ASSINCRONO_PADRAO
+
+    async def get(
+        self,
+        caminho: str,
+        shallow: bool = False,
+        ordem: Optional[str] = None,
+        inicio: Any = None,
+        fim: Any = None,
+        primeiros: Optional[int] = None,
+        ultimos: Optional[int] = None
+    ) -> Any:
+        referencia = self._banco.referencia(caminho or "/")
+        if ordem is None:
+            return referencia.get(shallow=shallow)
+        if ordem == "$key":
+            consulta = referencia.order_by_key()
+        elif ordem == "$value":
+            consulta = referencia.order_by_value()
+        else:
+            consulta = referencia.order_by_child(ordem)
+        if inicio is not None:
+            consulta = consulta.start_at(inicio)
+        if fim is not None:
+            consulta = consulta.end_at(fim)
+        if primeiros is not None:
+            consulta = consulta.limit_to_first(primeiros)
+        if ultimos is not None:
+            consulta = consulta.limit_to_last(ultimos)
+        return dict(consulta.get())
+
+    async def update(self, caminho: str, valores: Dict[str, Any]) -> None:
+        self._banco.referencia(caminho or "/").update(valores)
+
+    async def set(self, caminho: str, valor: Any) -> None:
+        self._banco.referencia(caminho or "/").set(valor)
+
+    async def delete(self, caminho: str) -> None:
+        self._banco.referencia(caminho or "/").delete()
+
+    async def fechar(self) -> None:
+        pass
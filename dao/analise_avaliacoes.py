@@ -0,0 +1,328 @@
+# dao/analise_avaliacoes.py
+
+import glob
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+import logging
+
+from dao.espelho import SOBREPOSICAO_MS, carimbo
+
+logger = logging.getLogger(__name__)
+
+# Diretório dos arquivos compactados das avaliações para análise
+ANALISE_ENV = "CRM_ANALISE_AVALIACOES"
+ANALISE_PADRAO = os.path.join("analise", "avaliacoes")
+
+# Colunas gravadas, na ordem (data_hora vira timestamp na compactação)
+COLUNAS = ("id", "avaliador", "avaliado", "nota", "comentario", "data_hora", "atualizado_em")
+_FORMATO_DATA = "%Y-%m-%d %H:%M:%S"
+_PREFIXO = "avaliacoes-"
+_EXTENSAO = ".feather"
+
+
+def _importar_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.feather as feather
+    except ImportError as e:
+        raise RuntimeError(f"análise colunar das avaliações requer pyarrow ({e})")
+    return pa, pc, feather
+
+
+def _esquema():
+    pa, _, _ = _importar_pyarrow()
+    return pa.schema([
+        ("id", pa.string()),
+        ("avaliador", pa.string()),
+        ("avaliado", pa.string()),
+        ("nota", pa.float64()),
+        ("comentario", pa.string()),
+        ("data_hora", pa.timestamp("s")),
+        ("atualizado_em", pa.int64())
+    ])
+
+
+def _nota(valor: Any) -> Optional[float]:
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _texto(valor: Any) -> str:
+    return "" if valor is None else str(valor)
+
+
+def para_tabela(registros: List[Dict[str, Any]]):
+    """Monta a tabela Arrow (COLUNAS) a partir dos dicionários do RTDB."""
+    pa, pc, _ = _importar_pyarrow()
+    datas = pa.array([r.get("data_hora") or None for r in registros], pa.string())
+    return pa.table({
+        "id": pa.array([_texto(r.get("id")) for r in registros], pa.string()),
+        "avaliador": pa.array([_texto(r.get("avaliador")) for r in registros], pa.string()),
+        "avaliado": pa.array([_texto(r.get("avaliado")) for r in registros], pa.string()),
+        "nota": pa.array([_nota(r.get("nota")) for r in registros], pa.float64()),
+        "comentario": pa.array([_texto(r.get("comentario")) for r in registros], pa.string()),
+        "data_hora": pc.strptime(datas, format=_FORMATO_DATA, unit="s", error_is_null=True),
+        "atualizado_em": pa.array([carimbo(r) for r in registros], pa.int64())
+    }, schema=_esquema())
+
+
+def estatisticas(tabela, avaliado: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Contagem, soma, média, positivas (nota >= 4), negativas (nota <= 2) e
+    histograma por nota inteira, calculados direto sobre as colunas.
+    """
+    pa, pc, _ = _importar_pyarrow()
+    if avaliado is not None:
+        tabela = tabela.filter(pc.equal(tabela["avaliado"], avaliado))
+    notas = pc.drop_null(tabela["nota"])
+    contagem = len(notas)
+    soma = pc.sum(notas).as_py() or 0.0
+    histograma = {str(i): 0 for i in range(1, 6)}
+    for item in pc.value_counts(pc.cast(pc.trunc(notas), pa.int64())).to_pylist():
+        if str(item["values"]) in histograma:
+            histograma[str(item["values"])] = item["counts"]
+    return {
+        "contagem": contagem,
+        "soma": soma,
+        "media": round(soma / contagem, 2) if contagem else 0.0,
+        "positivas": pc.sum(pc.greater_equal(notas, 4)).as_py() or 0,
+        "negativas": pc.sum(pc.less_equal(notas, 2)).as_py() or 0,
+        "notas": histograma
+    }
+
+
+class ArmazemAvaliacoes:
+    """
+    Avaliações em formato colunar para o painel e as análises, sem montar um
+    objeto (nem um dicionário) por avaliação a cada consulta.
+
+    A base é um arquivo Feather (Arrow IPC, sem compressão) gerado de tempos
+    em tempos por compactar (jobs/compactar_avaliacoes.py) e aberto mapeado em
+    memória: as colunas apontam direto para as páginas do arquivo, então todos
+    os processos do servidor dividem uma única cópia pelo cache de páginas do
+    sistema. O que mudou depois da compactação (a cauda) vem da sincronização
+    incremental a partir do marcador da base e fica em memória; tabela()
+    junta as duas, escondendo as linhas da base alteradas ou removidas.
+
+    Avaliações arquivadas (AvaliacaoDAO.arquivar) continuam na base: a remoção
+    por arquivamento não esconde a linha, e a compactação completa junta o
+    armazenamento frio ao que está no banco. A tabela cobre, como os agregados
+    de avaliacoes_resumo, o histórico inteiro.
+
+    Os arquivos são {diretorio}/avaliacoes-{marcador}.feather; leitores passam
+    sozinhos para a base mais nova quando uma compactação termina.
+    """
+
+    def __init__(self, dao, diretorio: Optional[str] = None, intervalo: float = 5.0):
+        self._dao = dao
+        self._diretorio = diretorio or os.environ.get(ANALISE_ENV) or ANALISE_PADRAO
+        self._intervalo = intervalo
+        self._lock = threading.Lock()
+        self._arquivo_base: Optional[str] = None
+        self._base = None
+        self._marcador_base: Optional[int] = None
+        self._alterados: Dict[str, Dict[str, Any]] = {}
+        self._removidos: Dict[str, int] = {}
+        self._marcador_cauda: Optional[int] = None
+        self._visao = None
+        self._atualizado_em = 0.0
+        self._desatualizada = False
+
+    @property
+    def diretorio(self) -> str:
+        return self._diretorio
+
+    def caminho(self, marcador: int) -> str:
+        return os.path.join(self._diretorio, f"{_PREFIXO}{marcador:013d}{_EXTENSAO}")
+
+    def tabela(self):
+        """
+        Avaliações atuais como pyarrow.Table (COLUNAS): base mapeada mais a
+        cauda em memória. A cauda é sincronizada no máximo a cada `intervalo`
+        segundos; se a sincronização falhar, serve a última visão.
+
+        Returns:
+            pyarrow.Table, ou None se não houver base compactada ou ela estiver
+            atrasada demais (marcas de exclusão já podadas) para ser completada.
+        """
+        with self._lock:
+            if self._visao is not None and time.monotonic() - self._atualizado_em < self._intervalo:
+                return self._visao
+            try:
+                self._abrir_mais_nova()
+                if self._base is None or self._desatualizada:
+                    return None
+                delta = self._dao.sincronizar_desde(self._marcador_cauda - SOBREPOSICAO_MS)
+                if delta is not None:
+                    if delta["recarregar"]:
+                        logger.warning("[avaliacoes] Base colunar mais antiga que as marcas de exclusão; compacte de novo")
+                        self._desatualizada = True
+                        return None
+                    if self._juntar(delta):
+                        self._visao = None
+                if self._visao is None:
+                    self._visao = self._combinar(self._base, self._alterados, self._removidos)
+                self._atualizado_em = time.monotonic()
+                return self._visao
+            except Exception as e:
+                logger.error(f"[avaliacoes] Erro ao montar a tabela colunar: {e}")
+                return self._visao
+
+    def compactar(self, completa: bool = False) -> Dict[str, Any]:
+        """
+        Grava uma nova base com tudo o que está no banco e no arquivo. Parte da
+        base atual mais as alterações desde o seu marcador; sem base (ou com
+        completa, ou se as marcas de exclusão necessárias foram podadas) lê a
+        coleção inteira e as avaliações arquivadas.
+        Bases anteriores à substituída são apagadas (quem as mapeou continua
+        lendo normalmente até soltá-las).
+
+        Returns:
+            Dict: arquivo, linhas, bytes, marcador e se foi incremental.
+
+        Raises:
+            Exception: Falha de leitura do banco ou de gravação.
+        """
+        _, _, feather = _importar_pyarrow()
+
+        atual = None if completa else self._mais_nova()
+        tabela = None
+        if atual is not None:
+            base = feather.read_table(atual, memory_map=True)
+            marcador_base = self._marcador_do_arquivo(atual)
+            delta = self._dao.sincronizar_desde(marcador_base - SOBREPOSICAO_MS)
+            if delta is None:
+                raise RuntimeError("sincronização das avaliações falhou")
+            if not delta["recarregar"]:
+                alterados, removidos = {}, {}
+                self._aplicar(alterados, removidos, delta)
+                tabela = self._combinar(base, alterados, removidos)
+                marcador = max(marcador_base, delta["marcador"])
+
+        incremental = tabela is not None
+        if tabela is None:
+            espelho = self._dao.espelho()
+            registros = {r["id"]: r for r in self._dao.arquivo.ler() if r.get("id")}
+            # Arquivada e ainda no banco (queda no meio do arquivamento): vale a do banco
+            registros.update((r["id"], r) for r in espelho.atualizar())
+            tabela = para_tabela(list(registros.values()))
+            marcador = espelho.marcador
+
+        os.makedirs(self._diretorio, exist_ok=True)
+        caminho = self.caminho(marcador)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        try:
+            # Sem compressão: só assim as colunas podem ser usadas direto do mapeamento
+            feather.write_feather(tabela.combine_chunks(), temporario, compression="uncompressed")
+            with open(temporario, "rb") as fp:
+                os.fsync(fp.fileno())
+            os.replace(temporario, caminho)
+        except Exception:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+        self._apagar_anteriores(atual, caminho)
+        return {
+            "arquivo": caminho,
+            "linhas": tabela.num_rows,
+            "bytes": os.path.getsize(caminho),
+            "marcador": marcador,
+            "incremental": incremental
+        }
+
+    def estado(self) -> Dict[str, Any]:
+        """Base em uso e tamanho da cauda em memória."""
+        with self._lock:
+            return {
+                "arquivo": self._arquivo_base,
+                "linhas_base": self._base.num_rows if self._base is not None else 0,
+                "marcador_base": self._marcador_base,
+                "alterados": len(self._alterados),
+                "removidos": len(self._removidos),
+                "desatualizada": self._desatualizada
+            }
+
+    def _mais_nova(self) -> Optional[str]:
+        arquivos = glob.glob(os.path.join(self._diretorio, f"{_PREFIXO}*{_EXTENSAO}"))
+        return max(arquivos) if arquivos else None
+
+    @staticmethod
+    def _marcador_do_arquivo(caminho: str) -> int:
+        return int(os.path.basename(caminho)[len(_PREFIXO):-len(_EXTENSAO)])
+
+    def _abrir_mais_nova(self) -> None:
+        # Chamado com o lock; troca de base quando uma compactação nova aparece
+        caminho = self._mais_nova()
+        if caminho is None or caminho == self._arquivo_base:
+            return
+        _, _, feather = _importar_pyarrow()
+        base = feather.read_table(caminho, memory_map=True)
+        self._arquivo_base, self._base = caminho, base
+        self._marcador_base = self._marcador_cauda = self._marcador_do_arquivo(caminho)
+        self._alterados, self._removidos = {}, {}
+        self._visao = None
+        self._desatualizada = False
+        logger.info(f"[avaliacoes] Base colunar '{caminho}' mapeada ({base.num_rows} linha(s))")
+
+    def _juntar(self, delta: Dict[str, Any]) -> bool:
+        mudou = self._aplicar(self._alterados, self._removidos, delta)
+        self._marcador_cauda = max(self._marcador_cauda, delta["marcador"])
+        return mudou
+
+    @staticmethod
+    def _aplicar(alterados: Dict[str, Dict[str, Any]], removidos: Dict[str, int], delta: Dict[str, Any]) -> bool:
+        # Mesmas regras do EspelhoColecao: vence o carimbo mais novo; uma
+        # remoção por arquivamento não esconde a avaliação
+        mudou = False
+        arquivados = delta.get("arquivados") or {}
+        for id, registro in delta["alterados"].items():
+            atual = alterados.get(id)
+            if atual is None or carimbo(registro) > carimbo(atual):
+                alterados[id] = registro
+                mudou = True
+        for id, removido_em in delta["removidos"].items():
+            if id in arquivados:
+                continue
+            if removidos.get(id, -1) < removido_em:
+                removidos[id] = removido_em
+                mudou = True
+            atual = alterados.get(id)
+            if atual is not None and carimbo(atual) <= removido_em:
+                del alterados[id]
+        return mudou
+
+    @staticmethod
+    def _combinar(base, alterados: Dict[str, Dict[str, Any]], removidos: Dict[str, int]):
+        pa, pc, _ = _importar_pyarrow()
+        escondidos = set(alterados) | set(removidos)
+        if not escondidos:
+            return base
+        # Fatias entre as linhas escondidas: continuam apontando para o arquivo
+        # mapeado (um filtro copiaria a base inteira)
+        posicoes = pc.indices_nonzero(
+            pc.is_in(base["id"], value_set=pa.array(list(escondidos), pa.string()))
+        ).to_pylist()
+        pedacos, inicio = [], 0
+        for posicao in posicoes:
+            if posicao > inicio:
+                pedacos.append(base.slice(inicio, posicao - inicio))
+            inicio = posicao + 1
+        if inicio < base.num_rows:
+            pedacos.append(base.slice(inicio))
+        pedacos.append(para_tabela(list(alterados.values())))
+        return pa.concat_tables(pedacos)
+
+    def _apagar_anteriores(self, substituida: Optional[str], nova: str) -> None:
+        # Mantém a nova e a que ela substituiu (leitores ainda podem estar trocando)
+        manter = {nova, substituida}
+        for arquivo in glob.glob(os.path.join(self._diretorio, f"{_PREFIXO}*{_EXTENSAO}")):
+            if arquivo not in manter and arquivo < nova:
+                try:
+                    os.remove(arquivo)
+                except OSError as e:
+                    logger.warning(f"[avaliacoes] Não foi possível apagar a base antiga '{arquivo}': {e}")
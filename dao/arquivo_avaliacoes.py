@@ -0,0 +1,108 @@
+# dao/arquivo_avaliacoes.py
+
+import glob
+import gzip
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Diretório do armazenamento frio das avaliações arquivadas
+ARQUIVO_ENV = "CRM_ARQUIVO_AVALIACOES"
+ARQUIVO_PADRAO = os.path.join("arquivo", "avaliacoes")
+
+
+class ArquivoAvaliacoes:
+    """
+    Armazenamento frio das avaliações antigas, fora do RTDB: um arquivo NDJSON
+    compactado por dia da avaliação, em {raiz}/{AAAA}/{MM}/{AAAA-MM-DD}.ndjson.gz.
+
+    Cada gravação acrescenta um novo membro gzip ao arquivo do dia (o formato
+    admite membros concatenados), então arquivar de novo um dia já arquivado
+    não reescreve o que existe. Se a mesma avaliação for gravada duas vezes
+    (queda entre a gravação e a remoção do banco), a leitura fica com a última.
+    """
+
+    def __init__(self, raiz: Optional[str] = None):
+        self._raiz = raiz or os.environ.get(ARQUIVO_ENV) or ARQUIVO_PADRAO
+        self._lock = threading.Lock()
+
+    @property
+    def raiz(self) -> str:
+        return self._raiz
+
+    def caminho_dia(self, dia: str) -> str:
+        """Arquivo do dia 'YYYY-MM-DD'."""
+        return os.path.join(self._raiz, dia[:4], dia[5:7], f"{dia}.ndjson.gz")
+
+    def gravar(self, registros: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Acrescenta avaliações às partições dos seus dias e força a gravação em
+        disco (fsync) antes de retornar.
+
+        Returns:
+            Dict[str, int]: Avaliações gravadas por dia.
+
+        Raises:
+            ValueError: Avaliação sem data_hora 'YYYY-MM-DD ...'.
+        """
+        por_dia: Dict[str, List[Dict[str, Any]]] = {}
+        for registro in registros:
+            dia = str(registro.get("data_hora") or "")[:10]
+            if len(dia) != 10 or dia[4] != "-" or dia[7] != "-":
+                raise ValueError(f"Avaliação '{registro.get('id')}' sem data válida para arquivar")
+            por_dia.setdefault(dia, []).append(registro)
+
+        with self._lock:
+            for dia, lista in por_dia.items():
+                caminho = self.caminho_dia(dia)
+                os.makedirs(os.path.dirname(caminho), exist_ok=True)
+                linhas = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in lista)
+                with open(caminho, "ab") as bruto:
+                    with gzip.GzipFile(fileobj=bruto, mode="wb") as saida:
+                        saida.write(linhas.encode("utf-8"))
+                    bruto.flush()
+                    os.fsync(bruto.fileno())
+        return {dia: len(lista) for dia, lista in por_dia.items()}
+
+    def dias(self, inicio: Optional[str] = None, fim: Optional[str] = None) -> List[str]:
+        """Dias arquivados ('YYYY-MM-DD'), em ordem, opcionalmente num intervalo inclusivo."""
+        arquivos = glob.glob(os.path.join(self._raiz, "*", "*", "*.ndjson.gz"))
+        dias = sorted(os.path.basename(a)[:10] for a in arquivos)
+        return [d for d in dias if (not inicio or d >= inicio[:10]) and (not fim or d <= fim[:10])]
+
+    def ler_dia(self, dia: str) -> List[Dict[str, Any]]:
+        """Avaliações de um dia arquivado, sem repetições (a última gravação vence)."""
+        caminho = self.caminho_dia(dia)
+        if not os.path.exists(caminho):
+            return []
+        registros: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        with gzip.open(caminho, "rt", encoding="utf-8") as fp:
+            for linha in fp:
+                if linha.strip():
+                    registro = json.loads(linha)
+                    registros[registro.get("id")] = registro
+        return list(registros.values())
+
+    def ler(self, inicio: Optional[str] = None, fim: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre as avaliações arquivadas em ordem de dia, um dia por vez.
+
+        Args:
+            inicio: 'YYYY-MM-DD' inclusivo (ou None).
+            fim: 'YYYY-MM-DD' inclusivo (ou None).
+        """
+        for dia in self.dias(inicio, fim):
+            yield from self.ler_dia(dia)
+
+    def buscar_por_id(self, id: str) -> Optional[Dict[str, Any]]:
+        """Procura uma avaliação em todos os dias arquivados (do mais recente ao mais antigo)."""
+        for dia in reversed(self.dias()):
+            for registro in self.ler_dia(dia):
+                if registro.get("id") == id:
+                    return registro
+        return None
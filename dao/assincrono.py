@@ -0,0 +1,85 @@
+# dao/assincrono.py
+
+import asyncio
+import atexit
+import threading
+from typing import Any, Awaitable, Coroutine, Iterable, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+_laco: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def laco() -> asyncio.AbstractEventLoop:
+    """
+    Laço de eventos do processo, numa thread própria (criado uma vez). É onde
+    rodam as operações assíncronas chamadas pela API síncrona das DAOs, de
+    qualquer thread (ex.: as sessões do Streamlit).
+    """
+    global _laco, _thread
+    if _laco is None:
+        with _lock:
+            if _laco is None:
+                novo = asyncio.new_event_loop()
+                _thread = threading.Thread(target=novo.run_forever, name="dao-assincrono", daemon=True)
+                _thread.start()
+                _laco = novo
+    return _laco
+
+
+def executar(corrotina: Coroutine[Any, Any, Any]) -> Any:
+    """
+    Executa uma corrotina no laço do processo e espera o resultado. É a ponte
+    da API síncrona das DAOs para a assíncrona.
+
+    Raises:
+        RuntimeError: Chamada de dentro do próprio laço (travaria); código
+            assíncrono deve usar as versões _async diretamente.
+    """
+    destino = laco()
+    try:
+        atual = asyncio.get_running_loop()
+    except RuntimeError:
+        atual = None
+    if atual is destino:
+        corrotina.close()
+        raise RuntimeError("API síncrona da DAO chamada dentro do laço assíncrono; use a versão _async")
+    return asyncio.run_coroutine_threadsafe(corrotina, destino).result()
+
+
+async def reunir(aguardaveis: Iterable[Awaitable[Any]], limite: Optional[int] = None) -> List[Any]:
+    """
+    asyncio.gather com no máximo `limite` operações em andamento (None: sem
+    limite além do semáforo do cliente HTTP). Resultados na ordem da entrada.
+    """
+    if limite is None:
+        return list(await asyncio.gather(*aguardaveis))
+    semaforo = asyncio.Semaphore(limite)
+
+    async def limitado(aguardavel: Awaitable[Any]) -> Any:
+        async with semaforo:
+            return await aguardavel
+
+    return list(await asyncio.gather(*(limitado(a) for a in aguardaveis)))
+
+
+def _encerrar() -> None:
+    # Fecha as conexões do cliente assíncrono e para o laço na saída do processo
+    if _laco is None or not _laco.is_running():
+        return
+    try:
+        from config.firebase_config import FirebaseConfig
+
+        config = FirebaseConfig._instance
+        cliente = getattr(config, "_cliente_assincrono", None)
+        if cliente is not None:
+            asyncio.run_coroutine_threadsafe(cliente.fechar(), _laco).result(timeout=5)
+    except Exception as e:
+        logger.warning(f"Erro ao fechar o cliente assíncrono do banco: {e}")
+    _laco.call_soon_threadsafe(_laco.stop)
+
+
+atexit.register(_encerrar)
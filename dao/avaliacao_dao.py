@@ -1,22 +1,65 @@
 # dao/avaliacao_dao.py
 
+import time
 import uuid
-from typing import List, Optional
-from dao.firebase_dao import FirebaseDAO
+from typing import Any, Dict, List, Optional
+import pandas as pd
+from dao.analise_avaliacoes import ArmazemAvaliacoes, estatisticas
+from dao.arquivo_avaliacoes import ArquivoAvaliacoes
+from dao.fila_escrita import obter_fila
+from dao.firebase_dao import CARIMBO_SERVIDOR, REVERIFICAR_MARCADOR, FirebaseDAO, incremento, preencher_textos
+from dao.indices import codificar_chave
+from dao.resiliencia import indisponivel
 from models.avaliacao import Avaliacao
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Agregados de avaliações: avaliacoes_resumo/{global|avaliados/<avaliado>}/{total|dia/<D>|hora/<D>T<HH>}
+_COLECAO_RESUMO = "avaliacoes_resumo"
+_GRANULARIDADES = ("dia", "hora")
+
 
 class AvaliacaoDAO(FirebaseDAO):
     """
     DAO para operações CRUD sobre avaliações no Firebase Realtime Database.
     Collection padrão: "avaliacoes".
+
+    Cada escrita também atualiza, na mesma operação atômica, os agregados em
+    avaliacoes_resumo (contagem, soma das notas, histograma e positivas/negativas)
+    por hora, por dia e no total, globais e por avaliado. Estatísticas e séries
+    por período leem esses agregados em vez de percorrer todas as avaliações.
+
+    Avaliações antigas podem ser arquivadas (arquivar) em arquivos por dia fora
+    do banco, sem retirar sua contribuição dos agregados; a remoção leva uma
+    marca de arquivamento, para que espelhos e assinantes não a tratem como
+    exclusão. As listagens comuns
+    veem só as avaliações no banco; consultas históricas (listar_historico,
+    buscar_por_id com incluir_arquivo) juntam as duas origens.
+
+    Para análises, as avaliações (no banco e arquivadas) também são compactadas
+    em arquivos Arrow mapeados em memória (analise); listar_dataframe e as
+    estatísticas sem agregados usam essa base quando ela existe.
     """
 
-    def __init__(self):
+    _arquivavel = True
+
+    def __init__(self, arquivo: Optional[ArquivoAvaliacoes] = None, analise: Optional[ArmazemAvaliacoes] = None):
         super().__init__(collection="avaliacoes")
+        self._resumos_construidos: Optional[bool] = None
+        self._reverificar_resumos_em = 0.0
+        self._arquivo = arquivo or ArquivoAvaliacoes()
+        self._analise = analise or ArmazemAvaliacoes(self)
+
+    @property
+    def arquivo(self) -> ArquivoAvaliacoes:
+        """Armazenamento frio das avaliações arquivadas."""
+        return self._arquivo
+
+    @property
+    def analise(self) -> ArmazemAvaliacoes:
+        """Base colunar (Arrow) das avaliações para o painel e as análises."""
+        return self._analise
 
     def criar(self, avaliacao: Avaliacao) -> Optional[str]:
         """
@@ -45,24 +88,55 @@ class AvaliacaoDAO(FirebaseDAO):
             logger.error(f"[avaliacoes] Erro ao criar avaliação: {e}")
             return None
 
-    def buscar_por_id(self, id: str) -> Optional[Avaliacao]:
+    def enfileirar(self, avaliacao: Avaliacao) -> Optional[str]:
+        """
+        Registra a avaliação na fila de escrita local e retorna sem esperar o
+        banco; a gravação (com índices e agregados) é feita em segundo plano.
+
+        Args:
+            avaliacao: Instância de Avaliacao.
+
+        Returns:
+            str: ID gerado da avaliação ou None se nem a fila local aceitou.
+        """
+        try:
+            if not isinstance(avaliacao, Avaliacao):
+                raise ValueError("Parâmetro deve ser uma instância de Avaliacao")
+
+            if not avaliacao.id:
+                avaliacao.id = str(uuid.uuid4())
+
+            obter_fila().enfileirar(self, avaliacao.id, avaliacao.to_dict())
+            return avaliacao.id
+
+        except Exception as e:
+            logger.error(f"[avaliacoes] Erro ao enfileirar avaliação: {e}")
+            return None
+
+    def buscar_por_id(self, id: str, incluir_arquivo: bool = False) -> Optional[Avaliacao]:
         """
         Busca avaliação pelo ID.
 
         Args:
             id: ID da avaliação.
+            incluir_arquivo: Se não estiver no banco, procura também nas
+                avaliações arquivadas (percorre o arquivo; uso eventual).
 
         Returns:
             Avaliacao: Instância ou None se não encontrado.
         """
         try:
             data = super().buscar_por_id(id)
+            if not data and incluir_arquivo:
+                data = self._arquivo.buscar_por_id(id)
             if data:
                 return Avaliacao.from_dict(data)
             return None
 
         except Exception as e:
             logger.error(f"[avaliacoes] Erro ao buscar avaliação por ID '{id}': {e}")
+            if indisponivel(e):
+                raise
             return None
 
     def listar_todos(self) -> List[Avaliacao]:
@@ -79,6 +153,38 @@ class AvaliacaoDAO(FirebaseDAO):
             logger.error(f"[avaliacoes] Erro ao listar avaliações: {e}")
             return []
 
+    def listar_dataframe(self) -> pd.DataFrame:
+        """
+        Lista avaliações em DataFrame, com data/hora como datetime e a categoria
+        (Ruim, Regular, Boa, Excelente) calculada de uma vez sobre a coluna de notas.
+        Lê da base colunar (analise) quando compactada; senão, do espelho da coleção.
+
+        Returns:
+            pd.DataFrame: id, avaliador, avaliado, nota, categoria, comentario, data_hora.
+        """
+        try:
+            colunas = ["id", "avaliador", "avaliado", "nota", "comentario", "data_hora"]
+            tabela = self._analise.tabela()
+            if tabela is not None:
+                # Notas e datas saem das colunas mapeadas, já tipadas
+                df = tabela.select(colunas).to_pandas(coerce_temporal_nanoseconds=True)
+            else:
+                df = super().listar_dataframe(colunas)
+                df["data_hora"] = pd.to_datetime(df["data_hora"], format="%Y-%m-%d %H:%M:%S", errors="coerce")
+            df["nota"] = pd.to_numeric(df["nota"], errors="coerce")
+            # Mesmos limites de Avaliacao.get_categoria_avaliacao
+            df.insert(4, "categoria", pd.cut(
+                df["nota"],
+                bins=[float("-inf"), 2.5, 3.5, 4.5, float("inf")],
+                labels=["Ruim", "Regular", "Boa", "Excelente"],
+                right=False
+            ))
+            preencher_textos(df, ["avaliador", "avaliado", "comentario"])
+            return df
+        except Exception as e:
+            logger.error(f"[avaliacoes] Erro ao listar avaliações em DataFrame: {e}")
+            return pd.DataFrame()
+
     def listar_por_avaliador(self, avaliador: str) -> List[Avaliacao]:
         """
         Lista avaliações feitas por determinado avaliador.
@@ -179,6 +285,96 @@ class AvaliacaoDAO(FirebaseDAO):
             logger.error(f"[avaliacoes] Erro ao listar avaliações recentes: {e}")
             return []
 
+    def listar_historico(self, inicio: str, fim: str, avaliado: Optional[str] = None) -> List[Avaliacao]:
+        """
+        Avaliações de um intervalo de datas, juntando as que estão no banco e as
+        arquivadas, em ordem cronológica.
+
+        Args:
+            inicio: 'YYYY-MM-DD' inclusivo.
+            fim: 'YYYY-MM-DD' inclusivo.
+            avaliado: Restringe a um avaliado; None para todos.
+
+        Returns:
+            List[Avaliacao]: Avaliações do intervalo.
+        """
+        try:
+            encontradas: Dict[str, Dict[str, Any]] = {}
+            for registro in self._arquivo.ler(inicio, fim):
+                encontradas[registro.get("id")] = registro
+            # Consulta ordenada por data_hora (".indexOn" em database.rules.json)
+            consulta = self._db.order_by_child("data_hora").start_at(inicio[:10]).end_at(f"{fim[:10]} 23:59:59")
+            quentes = self._ler(f"avaliacoes?historico={inicio[:10]}..{fim[:10]}", consulta.get) or {}
+            for id, registro in quentes.items():
+                if isinstance(registro, dict):
+                    encontradas[id] = registro
+
+            avaliacoes = [
+                Avaliacao.from_dict(r) for r in encontradas.values()
+                if not avaliado or r.get("avaliado") == avaliado
+            ]
+            return sorted(avaliacoes, key=lambda a: a.data_hora)
+        except Exception as e:
+            logger.error(f"[avaliacoes] Erro ao listar histórico de {inicio} a {fim}: {e}")
+            return []
+
+    def listar_antigas(self, corte: str, limite: int = 500) -> List[Dict[str, Any]]:
+        """
+        As avaliações mais antigas no banco com data_hora até o corte (inclusivo),
+        em ordem cronológica. Erros são registrados e propagados, para que a
+        rotina de arquivamento não confunda uma falha com "nada a arquivar".
+
+        Args:
+            corte: 'YYYY-MM-DD HH:MM:SS'.
+            limite: Máximo de avaliações retornadas.
+
+        Returns:
+            List[dict]: Registros brutos.
+        """
+        try:
+            dados = self._resiliencia.consultar(
+                self._db.order_by_child("data_hora").end_at(corte).limit_to_first(limite).get
+            ) or {}
+            return [r for r in dados.values() if isinstance(r, dict)]
+        except Exception as e:
+            logger.error(f"[avaliacoes] Erro ao listar avaliações anteriores a {corte}: {e}")
+            raise
+
+    def arquivar(self, registros: List[Dict[str, Any]]) -> bool:
+        """
+        Move avaliações para o armazenamento frio: grava no arquivo do dia e só
+        então as retira do banco, numa única escrita pela resiliência. Os
+        agregados não mudam (a avaliação continua contando nas estatísticas) e
+        os observadores não são avisados, pois não é uma exclusão; cada remoção
+        leva, além da marca de exclusão, uma marca de arquivamento com o mesmo
+        instante, e os espelhos a retiram sem avisar os assinantes.
+
+        Args:
+            registros: Registros brutos (como os de listar_antigas).
+
+        Returns:
+            bool: True se todas foram arquivadas, False caso contrário.
+        """
+        try:
+            if not registros:
+                return True
+            self._arquivo.gravar(registros)
+
+            caminhos: Dict[str, Any] = {}
+            for registro in registros:
+                id = registro["id"]
+                caminhos[f"{self._collection}/{id}"] = None
+                caminhos[f"{self._RAIZ_ARQUIVADOS}/{self._collection}/{id}"] = CARIMBO_SERVIDOR
+                # Só os derivados da base (índices); os agregados ficam como estão
+                caminhos.update(FirebaseDAO._caminhos_derivados(self, id, registro, None))
+            # Sem incrementos: pode ser repetida em falha transitória
+            self._gravar(caminhos)
+            logger.info(f"[avaliacoes] {len(registros)} avaliação(ões) arquivada(s)")
+            return True
+        except Exception as e:
+            logger.error(f"[avaliacoes] Erro ao arquivar avaliações: {e}")
+            return False
+
     def atualizar(self, avaliacao: Avaliacao) -> bool:
         """
         Atualiza uma avaliação existente.
@@ -228,6 +424,14 @@ class AvaliacaoDAO(FirebaseDAO):
             float: Média arredondada para duas casas ou 0.0 se não houver avaliações.
         """
         try:
+            resumo = self.obter_resumo_total(avaliado) if avaliado else None
+            if resumo is not None:
+                return resumo["media"]
+
+            tabela = self._analise.tabela()
+            if tabela is not None:
+                return estatisticas(tabela, avaliado)["media"]
+
             lista = self.listar_por_avaliado(avaliado)
             if not lista:
                 return 0.0
@@ -250,6 +454,26 @@ class AvaliacaoDAO(FirebaseDAO):
             dict: Estatísticas calculadas.
         """
         try:
+            resumo = self.obter_resumo_total()
+            if resumo is None:
+                tabela = self._analise.tabela()
+                if tabela is not None:
+                    resumo = estatisticas(tabela)
+            if resumo is not None:
+                total = resumo["contagem"]
+                if total == 0:
+                    return {}
+                return {
+                    "total": total,
+                    "positivas": resumo["positivas"],
+                    "negativas": resumo["negativas"],
+                    "neutras": total - resumo["positivas"] - resumo["negativas"],
+                    "media_geral": resumo["media"],
+                    "distribuicao_notas": resumo["notas"],
+                    "percentual_positivas": round((resumo["positivas"] / total) * 100, 1),
+                    "percentual_negativas": round((resumo["negativas"] / total) * 100, 1)
+                }
+
             todas = self.listar_todos()
             total = len(todas)
             if total == 0:
@@ -289,3 +513,201 @@ class AvaliacaoDAO(FirebaseDAO):
         except Exception as e:
             logger.error(f"[avaliacoes] Erro ao buscar avaliações com comentários: {e}")
             return []
+
+    def obter_resumo(
+        self,
+        inicio: str,
+        fim: str,
+        granularidade: str = "dia",
+        avaliado: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Série de agregados por período (dias ou horas), em ordem cronológica.
+        Períodos sem avaliações não aparecem.
+
+        Args:
+            inicio: 'YYYY-MM-DD' (dia) ou 'YYYY-MM-DDTHH' (hora), inclusivo.
+            fim: Mesmo formato de inicio, inclusivo.
+            granularidade: "dia" ou "hora".
+            avaliado: Restringe a um avaliado; None para o global.
+
+        Returns:
+            List[Dict]: {"periodo", "contagem", "soma", "media", "notas", "positivas", "negativas"}.
+        """
+        try:
+            if granularidade not in _GRANULARIDADES:
+                raise ValueError(f"Granularidade deve ser uma de {_GRANULARIDADES}")
+            if granularidade == "hora":
+                # Aceita datas simples como limites do dia inteiro
+                inicio = inicio if "T" in inicio else f"{inicio}T00"
+                fim = fim if "T" in fim else f"{fim}T23"
+
+            ref = self._raiz.child(f"{self._base_resumo(avaliado)}/{granularidade}")
+            consulta = ref.order_by_key().start_at(inicio).end_at(fim)
+            dados = self._ler(f"{ref.path}?{inicio}..{fim}", consulta.get) or {}
+            return [
+                {"periodo": periodo, **self._normalizar_resumo(valores)}
+                for periodo, valores in dados.items()
+                if valores and valores.get("contagem")
+            ]
+        except Exception as e:
+            logger.error(f"[avaliacoes] Erro ao obter resumo de {inicio} a {fim}: {e}")
+            return []
+
+    def resumir_periodo(self, inicio: str, fim: str, avaliado: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Soma os agregados diários de um intervalo de datas ('YYYY-MM-DD', inclusivo).
+
+        Returns:
+            Dict: {"contagem", "soma", "media", "notas", "positivas", "negativas"}.
+        """
+        total = self._normalizar_resumo({})
+        for dia in self.obter_resumo(inicio, fim, "dia", avaliado):
+            total["contagem"] += dia["contagem"]
+            total["soma"] += dia["soma"]
+            total["positivas"] += dia["positivas"]
+            total["negativas"] += dia["negativas"]
+            for nota, quantidade in dia["notas"].items():
+                total["notas"][nota] += quantidade
+        total["media"] = round(total["soma"] / total["contagem"], 2) if total["contagem"] else 0.0
+        return total
+
+    def obter_resumo_total(self, avaliado: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Agregado total (global ou de um avaliado), lido de um único nó.
+        Retorna None se os agregados ainda não foram construídos.
+        """
+        try:
+            if not self._resumos_prontos():
+                return None
+            caminho = f"{self._base_resumo(avaliado)}/total"
+            valores = self._ler(caminho, self._raiz.child(caminho).get) or {}
+            return self._normalizar_resumo(valores)
+        except Exception as e:
+            logger.error(f"[avaliacoes] Erro ao obter resumo total: {e}")
+            return None
+
+    def reconstruir_resumos(self) -> int:
+        """
+        Recalcula todos os agregados a partir das avaliações, no banco e
+        arquivadas (migração única ou correção). Não deve concorrer com novas
+        avaliações nem com o arquivamento.
+
+        Returns:
+            int: Quantidade de avaliações consideradas.
+        """
+        try:
+            # Sem o cache de obsoletos: uma leitura antiga gravaria agregados errados
+            dados = self._resiliencia.consultar(self._db.get) or {}
+            acumulado: Dict[str, float] = {}
+
+            def somar(registro: Dict[str, Any]) -> None:
+                for caminho, delta in self._contribuicoes(registro, 1).items():
+                    acumulado[caminho] = acumulado.get(caminho, 0) + delta
+
+            for registro in dados.values():
+                if isinstance(registro, dict):
+                    somar(registro)
+            arquivadas = 0
+            for registro in self._arquivo.ler():
+                # Arquivada e ainda no banco (queda no meio do arquivamento): conta uma vez
+                if registro.get("id") not in dados:
+                    somar(registro)
+                    arquivadas += 1
+
+            self._gravar({_COLECAO_RESUMO: None})
+            caminhos: Dict[str, Any] = {}
+            for caminho, valor in acumulado.items():
+                caminhos[caminho] = valor
+                if len(caminhos) >= 1000:
+                    self._gravar(caminhos)
+                    caminhos = {}
+            caminhos[f"{_COLECAO_RESUMO}/_construido"] = True
+            self._gravar(caminhos)
+            self._resumos_construidos = True
+            logger.info(f"[avaliacoes] Agregados reconstruídos a partir de {len(dados)} avaliação(ões) "
+                        f"no banco e {arquivadas} arquivada(s)")
+            return len(dados) + arquivadas
+        except Exception as e:
+            logger.error(f"[avaliacoes] Erro ao reconstruir agregados: {e}")
+            return 0
+
+    def _caminhos_derivados(
+        self,
+        id: str,
+        antigo: Optional[Dict[str, Any]],
+        novo: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        caminhos = super()._caminhos_derivados(id, antigo, novo)
+
+        # Retira a contribuição antiga e soma a nova (deltas do mesmo caminho se compensam)
+        deltas: Dict[str, float] = {}
+        for registro, sinal in ((antigo, -1), (novo, 1)):
+            if registro:
+                for caminho, delta in self._contribuicoes(registro, sinal).items():
+                    deltas[caminho] = deltas.get(caminho, 0) + delta
+        for caminho, delta in deltas.items():
+            if delta:
+                caminhos[caminho] = incremento(delta)
+        return caminhos
+
+    @staticmethod
+    def _base_resumo(avaliado: Optional[str]) -> str:
+        if avaliado:
+            return f"{_COLECAO_RESUMO}/avaliados/{codificar_chave(avaliado)}"
+        return f"{_COLECAO_RESUMO}/global"
+
+    def _contribuicoes(self, registro: Dict[str, Any], sinal: int) -> Dict[str, float]:
+        """
+        Deltas que uma avaliação soma (sinal=1) ou retira (sinal=-1) de cada agregado.
+        """
+        data_hora = str(registro.get("data_hora") or "")
+        nota = registro.get("nota")
+        if len(data_hora) < 13 or not isinstance(nota, (int, float)):
+            return {}
+
+        dia, hora = data_hora[:10], f"{data_hora[:10]}T{data_hora[11:13]}"
+        campos = {
+            "contagem": sinal,
+            "soma": sinal * nota,
+            f"notas/{min(5, max(1, int(nota)))}": sinal,
+        }
+        if nota >= 4:
+            campos["positivas"] = sinal
+        elif nota <= 2:
+            campos["negativas"] = sinal
+
+        deltas: Dict[str, float] = {}
+        for base in (self._base_resumo(None), self._base_resumo(registro.get("avaliado"))):
+            for balde in ("total", f"dia/{dia}", f"hora/{hora}"):
+                for campo, delta in campos.items():
+                    deltas[f"{base}/{balde}/{campo}"] = delta
+        return deltas
+
+    @staticmethod
+    def _normalizar_resumo(valores: Dict[str, Any]) -> Dict[str, Any]:
+        contagem = int(valores.get("contagem", 0) or 0)
+        soma = float(valores.get("soma", 0) or 0)
+        notas_salvas = valores.get("notas") or {}
+        if isinstance(notas_salvas, list):
+            # O RTDB devolve chaves numéricas sequenciais como lista
+            notas_salvas = {str(i): v for i, v in enumerate(notas_salvas) if v is not None}
+        return {
+            "contagem": contagem,
+            "soma": round(soma, 2),
+            "media": round(soma / contagem, 2) if contagem else 0.0,
+            "notas": {str(i): int(notas_salvas.get(str(i), 0) or 0) for i in range(1, 6)},
+            "positivas": int(valores.get("positivas", 0) or 0),
+            "negativas": int(valores.get("negativas", 0) or 0)
+        }
+
+    def _resumos_prontos(self) -> bool:
+        # Mesma regra de _indices_prontos: marcador ausente é reconsultado periodicamente
+        if not self._resumos_construidos and time.monotonic() >= self._reverificar_resumos_em:
+            caminho = f"{_COLECAO_RESUMO}/_construido"
+            self._resumos_construidos = bool(self._resiliencia.consultar(self._raiz.child(caminho).get))
+            if not self._resumos_construidos:
+                self._reverificar_resumos_em = time.monotonic() + REVERIFICAR_MARCADOR
+                logger.warning("[avaliacoes] Agregados ainda não construídos; estatísticas farão varredura. "
+                               "Execute reconstruir_resumos().")
+        return bool(self._resumos_construidos)
@@ -0,0 +1,142 @@
+# dao/cache_disco.py
+
+import mmap
+import os
+import struct
+import time
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Diretório dos espelhos gravados em disco ("0" desliga)
+CACHE_ENV = "CRM_CACHE_COLECOES"
+CACHE_PADRAO = "cache_colecoes"
+
+# Muda quando o layout do arquivo muda: arquivos de outro formato são ignorados
+FORMATO = 1
+_ASSINATURA = b"CRMC"
+_CABECALHO = struct.Struct("<4sI")
+
+
+class CacheDisco:
+    """
+    Espelhos das coleções gravados em disco em msgpack, um arquivo por
+    coleção, para que um processo novo não precise baixar e decodificar as
+    coleções inteiras: carrega o arquivo (mapeado em memória) e só sincroniza
+    o que mudou desde o marcador gravado junto.
+
+    Layout: "CRMC" + tamanho do cabeçalho (uint32) + cabeçalho msgpack
+    (formato, coleção, origem, marcador, gravado_em, registros) + corpo msgpack
+    {id: registro}. O arquivo só é usado se formato, coleção e origem (o banco
+    de onde veio) baterem; a validade dos dados vem da sincronização
+    incremental a partir do marcador.
+
+    Gravações vão para um temporário e são renomeadas, então vários processos
+    podem compartilhar o diretório.
+    """
+
+    def __init__(self, diretorio: str, origem: str):
+        self._diretorio = diretorio
+        self._origem = origem
+
+    @property
+    def diretorio(self) -> str:
+        return self._diretorio
+
+    def caminho(self, colecao: str) -> str:
+        return os.path.join(self._diretorio, f"{colecao}.msgpack")
+
+    def ler(self, colecao: str) -> Optional[Tuple[Dict[str, Dict[str, Any]], int]]:
+        """
+        Registros e marcador gravados para a coleção, ou None se não houver
+        arquivo utilizável (ausente, de outro formato/banco ou corrompido).
+        """
+        import msgpack
+
+        caminho = self.caminho(colecao)
+        try:
+            with open(caminho, "rb") as fp:
+                if os.fstat(fp.fileno()).st_size < _CABECALHO.size:
+                    return None
+                with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as mapa:
+                    visao = memoryview(mapa)
+                    try:
+                        assinatura, tamanho = _CABECALHO.unpack_from(visao)
+                        if assinatura != _ASSINATURA:
+                            return None
+                        inicio = _CABECALHO.size
+                        cabecalho = msgpack.unpackb(visao[inicio:inicio + tamanho], raw=False)
+                        if (cabecalho.get("formato") != FORMATO or cabecalho.get("colecao") != colecao
+                                or cabecalho.get("origem") != self._origem):
+                            logger.info(f"[{colecao}] Cache em disco de outro formato ou banco; ignorado")
+                            return None
+                        # O corpo é decodificado direto das páginas mapeadas, sem ler o arquivo para um buffer
+                        registros = msgpack.unpackb(visao[inicio + tamanho:], raw=False, strict_map_key=False)
+                    finally:
+                        visao.release()
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"[{colecao}] Cache em disco ilegível ({e}); ignorado")
+            return None
+        if not isinstance(registros, dict):
+            return None
+        return registros, int(cabecalho["marcador"])
+
+    def gravar(self, colecao: str, registros: Dict[str, Dict[str, Any]], marcador: int) -> int:
+        """
+        Grava o espelho da coleção (substitui o anterior de forma atômica).
+
+        Returns:
+            int: Bytes gravados.
+        """
+        import msgpack
+
+        os.makedirs(self._diretorio, exist_ok=True)
+        cabecalho = msgpack.packb({
+            "formato": FORMATO,
+            "colecao": colecao,
+            "origem": self._origem,
+            "marcador": marcador,
+            "gravado_em": int(time.time() * 1000),
+            "registros": len(registros)
+        })
+        corpo = msgpack.packb(registros)
+        caminho = self.caminho(colecao)
+        temporario = f"{caminho}.{os.getpid()}.tmp"
+        try:
+            with open(temporario, "wb") as fp:
+                fp.write(_CABECALHO.pack(_ASSINATURA, len(cabecalho)))
+                fp.write(cabecalho)
+                fp.write(corpo)
+                fp.flush()
+                os.fsync(fp.fileno())
+            os.replace(temporario, caminho)
+        except Exception:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+        return _CABECALHO.size + len(cabecalho) + len(corpo)
+
+    def remover(self, colecao: str) -> None:
+        try:
+            os.remove(self.caminho(colecao))
+        except FileNotFoundError:
+            pass
+
+
+def obter_cache_disco() -> Optional[CacheDisco]:
+    """
+    Cache em disco do processo, ou None se desligado (CRM_CACHE_COLECOES=0)
+    ou se o banco não tem identidade estável (banco local só em memória).
+    """
+    diretorio = os.environ.get(CACHE_ENV, CACHE_PADRAO)
+    if not diretorio or diretorio == "0":
+        return None
+    from config.firebase_config import FirebaseConfig
+
+    origem = FirebaseConfig.get_instance().origem
+    if origem is None:
+        return None
+    return CacheDisco(diretorio, origem)
@@ -1,6 +1,8 @@
 import uuid
 from typing import List, Optional
-from dao.firebase_dao import FirebaseDAO
+import pandas as pd
+from dao.firebase_dao import FirebaseDAO, categorizar, juntar_listas, preencher_textos
+from dao.resiliencia import indisponivel
 from models.campanha import Campanha
 import logging
 
@@ -58,6 +60,8 @@ class CampanhaDAO(FirebaseDAO):
             return None
         except Exception as e:
             logger.error(f"[campanhas] Erro ao buscar campanha por ID '{id}': {e}")
+            if indisponivel(e):
+                raise
             return None
 
     def listar_todos(self) -> List[Campanha]:
@@ -74,6 +78,48 @@ class CampanhaDAO(FirebaseDAO):
             logger.error(f"[campanhas] Erro ao listar campanhas: {e}")
             return []
 
+    def listar_dataframe(self) -> pd.DataFrame:
+        """
+        Lista campanhas em DataFrame, com canais e públicos em texto e métricas numéricas.
+
+        Returns:
+            pd.DataFrame: id, nome, objetivo, data_inicio, data_fim, canais, publicos_segmentados,
+            clientes_atingidos, taxa_resposta, conversao, roi, data_criacao.
+        """
+        try:
+            df = super().listar_dataframe([
+                "id", "nome", "objetivo", "data_inicio", "data_fim", "canais", "publicos_segmentados",
+                "clientes_atingidos", "taxa_resposta", "conversao", "roi", "data_criacao"
+            ])
+            df["canais"] = juntar_listas(df["canais"])
+            df["publicos_segmentados"] = juntar_listas(df["publicos_segmentados"])
+            preencher_textos(df, ["objetivo", "data_inicio", "data_fim", "data_criacao"])
+            for coluna in ("clientes_atingidos", "taxa_resposta", "conversao", "roi"):
+                df[coluna] = pd.to_numeric(df[coluna], errors="coerce").fillna(0)
+            return df
+        except Exception as e:
+            logger.error(f"[campanhas] Erro ao listar campanhas em DataFrame: {e}")
+            return pd.DataFrame()
+
+    def listar_canais_dataframe(self) -> pd.DataFrame:
+        """
+        Uma linha por campanha e canal, com o canal categórico, para agregações por canal.
+
+        Returns:
+            pd.DataFrame: id, nome, canal, clientes_atingidos, taxa_resposta, conversao.
+        """
+        try:
+            df = super().listar_dataframe(
+                ["id", "nome", "canais", "clientes_atingidos", "taxa_resposta", "conversao"]
+            ).explode("canais").rename(columns={"canais": "canal"})
+            df["canal"] = categorizar(df["canal"], sorted(Campanha._CANAL_VALIDOS))
+            for coluna in ("clientes_atingidos", "taxa_resposta", "conversao"):
+                df[coluna] = pd.to_numeric(df[coluna], errors="coerce").fillna(0)
+            return df.dropna(subset=["canal"]).reset_index(drop=True)
+        except Exception as e:
+            logger.error(f"[campanhas] Erro ao listar canais das campanhas: {e}")
+            return pd.DataFrame()
+
     def atualizar(self, campanha: Campanha) -> bool:
         """
         Atualiza dados de uma campanha existente.
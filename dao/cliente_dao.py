@@ -1,13 +1,18 @@
 # dao/cliente_dao.py
 
 import uuid
-from typing import List, Optional, Dict
-from dao.firebase_dao import FirebaseDAO
+from typing import Any, List, Optional, Dict
+import pandas as pd
+from dao.firebase_dao import FirebaseDAO, juntar_listas, preencher_textos
+from dao.indices import normalizar_digitos, normalizar_texto
+from dao.resiliencia import indisponivel
 from models.cliente import Cliente
 import logging
 
 logger = logging.getLogger(__name__)
 
+_CANAIS_OPT_IN = ("sms", "email", "whatsapp")
+
 
 class ClienteDAO(FirebaseDAO):
     """
@@ -17,6 +22,11 @@ class ClienteDAO(FirebaseDAO):
 
     def __init__(self):
         super().__init__(collection="clientes")
+        # Índices de busca exata: CPF/telefone por dígitos, nome/e-mail sem caixa
+        self.registrar_indice("cpf", "cpf", normalizar_digitos)
+        self.registrar_indice("telefone", "telefone", normalizar_digitos)
+        self.registrar_indice("nome", "nome", normalizar_texto)
+        self.registrar_indice("email", "email", normalizar_texto)
 
     def criar(self, cliente: Cliente) -> Optional[str]:
         """
@@ -65,6 +75,8 @@ class ClienteDAO(FirebaseDAO):
             return None
         except Exception as e:
             logger.error(f"[clientes] Erro ao buscar cliente por ID '{id}': {e}")
+            if indisponivel(e):
+                raise
             return None
 
     def buscar_por_nome(self, nome: str) -> Optional[Cliente]:
@@ -81,13 +93,12 @@ class ClienteDAO(FirebaseDAO):
             if not nome or not isinstance(nome, str):
                 return None
 
-            todos = self.listar_todos()
-            for c in todos:
-                if c.nome.lower() == nome.lower():
-                    return c
-            return None
+            encontrados = self.buscar_por_indice("nome", nome)
+            return encontrados[0] if encontrados else None
         except Exception as e:
             logger.error(f"[clientes] Erro ao buscar cliente por nome '{nome}': {e}")
+            if indisponivel(e):
+                raise
             return None
 
     def buscar_por_email(self, email: str) -> Optional[Cliente]:
@@ -104,13 +115,12 @@ class ClienteDAO(FirebaseDAO):
             if not email or not isinstance(email, str):
                 return None
 
-            todos = self.listar_todos()
-            for c in todos:
-                if c.email.lower() == email.lower():
-                    return c
-            return None
+            encontrados = self.buscar_por_indice("email", email)
+            return encontrados[0] if encontrados else None
         except Exception as e:
             logger.error(f"[clientes] Erro ao buscar cliente por e-mail '{email}': {e}")
+            if indisponivel(e):
+                raise
             return None
 
     def buscar_por_cpf(self, cpf: str) -> Optional[Cliente]:
@@ -127,17 +137,33 @@ class ClienteDAO(FirebaseDAO):
             if not cpf or not isinstance(cpf, str):
                 return None
 
-            cpf_limpo = ''.join(filter(str.isdigit, cpf))
-            todos = self.listar_todos()
-            for c in todos:
-                c_cpf_limpo = ''.join(filter(str.isdigit, c.cpf))
-                if c_cpf_limpo == cpf_limpo:
-                    return c
-            return None
+            encontrados = self.buscar_por_indice("cpf", cpf)
+            return encontrados[0] if encontrados else None
         except Exception as e:
             logger.error(f"[clientes] Erro ao buscar cliente por CPF '{cpf}': {e}")
+            if indisponivel(e):
+                raise
             return None
 
+    def buscar_por_indice(self, nome: str, valor: Any) -> List[Cliente]:
+        """
+        Busca clientes pelo valor exato de um índice (cpf, telefone, nome, email).
+
+        Args:
+            nome: Nome do índice.
+            valor: Valor procurado (normalizado como na gravação).
+
+        Returns:
+            List[Cliente]: Registros encontrados.
+        """
+        try:
+            return [Cliente.from_dict(item) for item in super().buscar_por_indice(nome, valor)]
+        except Exception as e:
+            logger.error(f"[clientes] Erro ao buscar pelo índice '{nome}': {e}")
+            if indisponivel(e):
+                raise
+            return []
+
     def listar_todos(self) -> List[Cliente]:
         """
         Lista todos os clientes.
@@ -152,6 +178,33 @@ class ClienteDAO(FirebaseDAO):
             logger.error(f"[clientes] Erro ao listar clientes: {e}")
             return []
 
+    def listar_dataframe(self) -> pd.DataFrame:
+        """
+        Lista clientes em DataFrame, com o opt-in aberto em uma coluna booleana
+        por canal e as preferências em texto.
+
+        Returns:
+            pd.DataFrame: id, nome, cpf, email, telefone, endereco, preferencias,
+            opt_in_sms, opt_in_email, opt_in_whatsapp, data_criacao.
+        """
+        try:
+            df = super().listar_dataframe(
+                ["id", "nome", "cpf", "email", "telefone", "endereco", "preferencias", "opt_in", "data_criacao"]
+            )
+            opt_in = pd.DataFrame(
+                [v if isinstance(v, dict) else {} for v in df["opt_in"]],
+                index=df.index,
+                columns=list(_CANAIS_OPT_IN)
+            )
+            for canal in _CANAIS_OPT_IN:
+                df[f"opt_in_{canal}"] = opt_in[canal].eq(True)
+            df["preferencias"] = juntar_listas(df["preferencias"])
+            preencher_textos(df, ["email", "telefone", "endereco", "data_criacao"])
+            return df.drop(columns="opt_in")
+        except Exception as e:
+            logger.error(f"[clientes] Erro ao listar clientes em DataFrame: {e}")
+            return pd.DataFrame()
+
     def listar_por_cidade(self, cidade: str) -> List[Cliente]:
         """
         Lista clientes cujo campo 'endereco' contém a cidade informada (case-insensitive).
@@ -250,7 +303,10 @@ class ClienteDAO(FirebaseDAO):
         """
         try:
             return (self.buscar_por_cpf(cpf) is not None) or (self.buscar_por_email(email) is not None)
-        except Exception:
+        except Exception as e:
+            # Com o banco fora não dá para afirmar que não existe: a criação falha
+            if indisponivel(e):
+                raise
             return False
 
     def contar_por_cidade(self) -> Dict[str, int]:
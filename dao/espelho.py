@@ -0,0 +1,306 @@
+# dao/espelho.py
+
+import atexit
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Campo com o instante (ms, relógio do servidor) da última escrita de cada registro
+CAMPO_ATUALIZADO_EM = "atualizado_em"
+
+# Cada sincronização volta este tanto antes do marcador: escritas confirmadas
+# quase ao mesmo tempo podem ficar visíveis fora de ordem
+SOBREPOSICAO_MS = 5_000
+
+# A carga completa usa o relógio local, que pode divergir do servidor
+MARGEM_RELOGIO_MS = 60_000
+
+# Segundos entre gravações do espelho em disco após sincronizações com mudanças
+INTERVALO_GRAVACAO = 300.0
+
+# Alteração vista pelo espelho: (id, antigo, novo); antigo None na criação, novo None na remoção
+Alteracao = Tuple[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]]
+
+# Espelhos do processo, gravados em disco na saída se tiverem mudanças pendentes
+_espelhos: "weakref.WeakSet[EspelhoColecao]" = weakref.WeakSet()
+
+
+def carimbo(registro: Optional[Dict[str, Any]]) -> int:
+    """atualizado_em do registro (0 para registros antigos, sem o campo)."""
+    valor = registro.get(CAMPO_ATUALIZADO_EM) if isinstance(registro, dict) else None
+    return valor if isinstance(valor, int) and not isinstance(valor, bool) else 0
+
+
+class EspelhoColecao:
+    """
+    Cópia local de uma coleção, mantida por sincronização incremental: a
+    primeira leitura traz a coleção inteira, as seguintes só o que mudou desde
+    o marcador (FirebaseDAO.sincronizar_desde), então o custo de atualizar é
+    proporcional às alterações, não ao tamanho da coleção.
+
+    Uma alteração só substitui o registro local se for mais nova (atualizado_em);
+    uma exclusão só o remove se for posterior à última escrita conhecida. Se a
+    sincronização falhar, o espelho continua servindo o que já tem.
+
+    Com um CacheDisco, o espelho é gravado em disco (após a carga completa, a
+    cada INTERVALO_GRAVACAO segundos com mudanças e na saída) e um processo
+    novo parte dele, sincronizando só o que mudou desde o marcador gravado.
+
+    Índices e agregados em memória assinam o espelho (assinar) e recebem as
+    alterações de cada sincronização, venham elas deste processo, de outro
+    servidor, de uma rotina em lote ou de uma transação direta no banco. Um
+    registro arquivado (delta["arquivados"]) sai do espelho, que reflete o
+    banco, mas não é uma exclusão: os assinantes não são avisados.
+
+    Os dicionários devolvidos são compartilhados: não devem ser alterados.
+    """
+
+    def __init__(self, dao, cache=None, intervalo_gravacao: float = INTERVALO_GRAVACAO):
+        self._dao = dao
+        self._cache = cache
+        self._intervalo_gravacao = intervalo_gravacao
+        self._registros: Dict[str, Dict[str, Any]] = {}
+        self._marcador: Optional[int] = None
+        self._pendente = False
+        self._gravado_em = 0.0
+        self._sincronizado_em = 0.0
+        self._invalidado_em = 0.0
+        # Limite de poda que já causou uma carga completa neste processo
+        self._recarregado_por: Optional[int] = None
+        self._assinantes: List[Callable[[List[Alteracao]], None]] = []
+        self._lock = threading.Lock()
+        # Uma sincronização por vez: chamadas simultâneas esperam e reaproveitam o resultado
+        self._lock_sincronizacao = threading.Lock()
+        self._lock_disco = threading.Lock()
+        self._estatisticas = {
+            "cargas": 0, "do_disco": 0, "gravacoes": 0, "sincronizacoes": 0, "alterados": 0, "removidos": 0, "falhas": 0
+        }
+        _espelhos.add(self)
+
+    @property
+    def marcador(self) -> Optional[int]:
+        """Instante (ms) até o qual o espelho está em dia, ou None antes da carga."""
+        return self._marcador
+
+    def registros(self) -> List[Dict[str, Any]]:
+        """Registros do espelho, sem sincronizar."""
+        with self._lock:
+            return list(self._registros.values())
+
+    def carregar(self, registros: Dict[str, Dict[str, Any]], marcador: int) -> None:
+        """
+        Substitui o conteúdo por uma carga completa feita a partir de `marcador`.
+        Os assinantes recebem a diferença para o conteúdo anterior.
+        """
+        with self._lock:
+            anteriores = self._registros
+            self._registros = {id: r for id, r in registros.items() if isinstance(r, dict)}
+            self._marcador = marcador
+            self._estatisticas["cargas"] += 1
+            alteracoes: List[Alteracao] = []
+            if self._assinantes:
+                for id, antigo in anteriores.items():
+                    novo = self._registros.get(id)
+                    if novo != antigo:
+                        alteracoes.append((id, antigo, novo))
+                alteracoes.extend((id, None, novo) for id, novo in self._registros.items() if id not in anteriores)
+        self._notificar(alteracoes)
+
+    def aplicar(self, delta: Dict[str, Any]) -> None:
+        """Junta o resultado de sincronizar_desde ao espelho e avisa os assinantes."""
+        alteracoes: List[Alteracao] = []
+        with self._lock:
+            for id, registro in delta["alterados"].items():
+                atual = self._registros.get(id)
+                if atual is None or carimbo(registro) >= carimbo(atual):
+                    self._registros[id] = registro
+                    if registro != atual:
+                        alteracoes.append((id, atual, registro))
+            arquivados = delta.get("arquivados") or {}
+            for id, removido_em in delta["removidos"].items():
+                atual = self._registros.get(id)
+                if atual is not None and carimbo(atual) <= removido_em:
+                    del self._registros[id]
+                    if id not in arquivados:
+                        alteracoes.append((id, atual, None))
+            self._marcador = max(self._marcador or 0, delta["marcador"])
+            self._pendente = self._pendente or bool(delta["alterados"] or delta["removidos"])
+            self._estatisticas["sincronizacoes"] += 1
+            self._estatisticas["alterados"] += len(delta["alterados"])
+            self._estatisticas["removidos"] += len(delta["removidos"])
+        self._notificar(alteracoes)
+
+    def atualizar(self) -> List[Dict[str, Any]]:
+        """
+        Traz o espelho em dia (ver sincronizar) e devolve os registros.
+
+        Raises:
+            Exception: Falha da carga completa, quando ainda não há o que servir.
+        """
+        self.sincronizar()
+        return self.registros()
+
+    def sincronizar(self, idade_maxima: float = 0.0) -> None:
+        """
+        Traz o espelho em dia: carga completa na primeira vez ou quando as
+        marcas de exclusão necessárias já foram podadas, senão só o delta.
+
+        Args:
+            idade_maxima: Segundos em que uma sincronização recente é
+                reaproveitada (0 = sempre consulta o banco). Escritas deste
+                processo invalidam o intervalo (ver invalidar).
+
+        Raises:
+            Exception: Falha da carga completa, quando ainda não há o que servir.
+        """
+        if self._recente(idade_maxima):
+            return
+        with self._lock_sincronizacao:
+            # Quem esperava o lock reaproveita a sincronização que acabou de terminar
+            if self._recente(idade_maxima):
+                return
+            iniciada_em = time.monotonic()
+            if self._marcador is None and not self._restaurar():
+                self._carregar()
+                self._sincronizado_em = iniciada_em
+                return
+
+            delta = self._dao.sincronizar_desde(self._marcador - SOBREPOSICAO_MS)
+            # Uma falha também conta: com o banco fora, as buscas não insistem a cada chamada
+            self._sincronizado_em = iniciada_em
+            if delta is None:
+                with self._lock:
+                    self._estatisticas["falhas"] += 1
+                logger.warning(f"[{self._dao.collection}] Sincronização falhou; servindo o espelho local")
+                return
+
+            # A carga parte do relógio local menos a margem, então o marcador fica
+            # antes de um limite recente (ex.: o de uma restauração) por até um
+            # minuto: o mesmo limite só recarrega uma vez, pois a carga já é posterior a ele
+            if delta["recarregar"] and delta.get("podado_ate") != self._recarregado_por:
+                logger.info(f"[{self._dao.collection}] Marcas de exclusão podadas após o marcador; recarregando a coleção")
+                self._carregar()
+                self._recarregado_por = delta.get("podado_ate")
+            else:
+                self.aplicar(delta)
+                if self._pendente and time.monotonic() - self._gravado_em >= self._intervalo_gravacao:
+                    self.gravar()
+
+    def invalidar(self) -> None:
+        """Faz a próxima sincronização ir ao banco, mesmo com idade_maxima (após escritas)."""
+        self._invalidado_em = time.monotonic()
+
+    def assinar(self, callback: Callable[[List[Alteracao]], None]) -> List[Dict[str, Any]]:
+        """
+        Registra uma função chamada com as alterações [(id, antigo, novo), ...]
+        de cada sincronização e devolve o conteúdo atual do espelho (carregado
+        se preciso). O registro e a cópia são atômicos: toda alteração
+        posterior à cópia chega ao callback, e nenhuma anterior.
+
+        O callback roda na thread que sincronizou, uma sincronização por vez;
+        não deve ler do banco. Falhas nele são só registradas.
+
+        Raises:
+            Exception: Falha da carga completa.
+        """
+        if not callable(callback):
+            raise ValueError("Callback deve ser chamável")
+        with self._lock_sincronizacao:
+            if self._marcador is None and not self._restaurar():
+                self._carregar()
+            with self._lock:
+                if callback not in self._assinantes:
+                    self._assinantes.append(callback)
+                return list(self._registros.values())
+
+    def cancelar_assinatura(self, callback) -> None:
+        """Remove um callback registrado com assinar()."""
+        with self._lock:
+            if callback in self._assinantes:
+                self._assinantes.remove(callback)
+
+    def gravar(self) -> bool:
+        """Grava o espelho no cache em disco (se houver). Falhas só são registradas."""
+        if self._cache is None or self._marcador is None:
+            return False
+        with self._lock_disco:
+            with self._lock:
+                registros, marcador = dict(self._registros), self._marcador
+                self._pendente = False
+            try:
+                tamanho = self._cache.gravar(self._dao.collection, registros, marcador)
+            except Exception as e:
+                with self._lock:
+                    self._pendente = True
+                logger.warning(f"[{self._dao.collection}] Não foi possível gravar o espelho em disco: {e}")
+                return False
+            self._gravado_em = time.monotonic()
+            with self._lock:
+                self._estatisticas["gravacoes"] += 1
+        logger.info(f"[{self._dao.collection}] Espelho gravado em disco: {len(registros)} registro(s), {tamanho} bytes")
+        return True
+
+    def estado(self) -> Dict[str, Any]:
+        """Tamanho, marcador e contadores do espelho."""
+        with self._lock:
+            return {"registros": len(self._registros), "marcador": self._marcador, **self._estatisticas}
+
+    def _recente(self, idade_maxima: float) -> bool:
+        # Só vale uma sincronização iniciada depois da última escrita local
+        return (
+            idade_maxima > 0 and self._marcador is not None
+            and self._sincronizado_em > self._invalidado_em
+            and time.monotonic() - self._sincronizado_em < idade_maxima
+        )
+
+    def _notificar(self, alteracoes: List[Alteracao]) -> None:
+        # Chamado fora do lock do conteúdo e dentro do de sincronização: os
+        # assinantes recebem as alterações em ordem, uma sincronização por vez
+        if not alteracoes:
+            return
+        with self._lock:
+            assinantes = list(self._assinantes)
+        for callback in assinantes:
+            try:
+                callback(alteracoes)
+            except Exception as e:
+                logger.error(f"[{self._dao.collection}] Erro no assinante do espelho: {e}")
+
+    def _restaurar(self) -> bool:
+        # Parte do arquivo em disco; a sincronização seguinte o valida e completa
+        if self._cache is None:
+            return False
+        gravado = self._cache.ler(self._dao.collection)
+        if gravado is None:
+            return False
+        registros, marcador = gravado
+        with self._lock:
+            if self._marcador is not None:
+                return True
+            self._registros = registros
+            self._marcador = marcador
+            self._gravado_em = time.monotonic()
+            self._estatisticas["do_disco"] += 1
+        logger.info(f"[{self._dao.collection}] Espelho restaurado do disco: {len(registros)} registro(s)")
+        return True
+
+    def _carregar(self) -> None:
+        # O marcador é tomado antes da leitura: o que mudar durante a carga
+        # entra na próxima sincronização
+        marcador = int(time.time() * 1000) - MARGEM_RELOGIO_MS
+        dados = self._dao._ler(self._dao.collection, self._dao.db.get)
+        self.carregar(dados if isinstance(dados, dict) else {}, marcador)
+        self.gravar()
+
+
+def _gravar_pendentes() -> None:
+    for espelho in list(_espelhos):
+        if espelho._pendente:
+            espelho.gravar()
+
+
+atexit.register(_gravar_pendentes)
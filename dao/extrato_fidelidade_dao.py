@@ -0,0 +1,132 @@
+# dao/extrato_fidelidade_dao.py
+
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from dao.firebase_dao import FirebaseDAO
+from models.movimentacao_pontos import MovimentacaoPontos
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def gerar_chave_ordenada() -> str:
+    """
+    Gera uma chave que ordena cronologicamente (como os push IDs do Firebase),
+    permitindo paginar o extrato com order_by_key sem índice adicional.
+    """
+    return f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}"
+
+
+class ExtratoFidelidadeDAO(FirebaseDAO):
+    """
+    DAO do extrato append-only de pontos de fidelidade.
+    Collection padrão: "fidelidade_extrato", organizada como
+    fidelidade_extrato/{fidelidade_id}/{chave_ordenada} -> lançamento.
+    O extrato fica fora do registro de fidelidade para que a leitura do cartão
+    tenha tamanho constante, independente do histórico acumulado.
+    """
+
+    # Os lançamentos ficam um nível abaixo do ID (fidelidade_id/chave): sem
+    # atualizado_em nem marcas de exclusão por registro
+    _sincronizavel = False
+
+    def __init__(self):
+        super().__init__(collection="fidelidade_extrato")
+
+    def caminhos_registro(self, movimentacao: MovimentacaoPontos) -> Dict[str, Any]:
+        """
+        Retorna os caminhos (relativos à raiz) para gravar o lançamento,
+        para compor uma escrita atômica junto com o saldo da fidelidade.
+
+        Args:
+            movimentacao: Lançamento a ser gravado.
+
+        Returns:
+            Dict[caminho, valor]: Caminhos prontos para atualizar_caminhos.
+        """
+        if not isinstance(movimentacao, MovimentacaoPontos):
+            raise ValueError("Parâmetro deve ser uma instância de MovimentacaoPontos")
+        if not movimentacao.id:
+            movimentacao.id = gerar_chave_ordenada()
+        caminho = f"{self._collection}/{movimentacao.fidelidade_id}/{movimentacao.id}"
+        return {caminho: movimentacao.to_dict()}
+
+    def registrar(self, movimentacao: MovimentacaoPontos) -> Optional[str]:
+        """
+        Grava um lançamento avulso no extrato.
+
+        Args:
+            movimentacao: Lançamento a ser gravado.
+
+        Returns:
+            str: Chave do lançamento ou None se falhou.
+        """
+        try:
+            if self.atualizar_caminhos(self.caminhos_registro(movimentacao)):
+                return movimentacao.id
+            return None
+        except Exception as e:
+            logger.error(f"[fidelidade_extrato] Erro ao registrar lançamento: {e}")
+            return None
+
+    def listar_pagina(
+        self,
+        fidelidade_id: str,
+        limite: int = 20,
+        antes_de: Optional[str] = None
+    ) -> Tuple[List[MovimentacaoPontos], Optional[str]]:
+        """
+        Lista uma página do extrato, do lançamento mais recente para o mais antigo.
+
+        Args:
+            fidelidade_id: ID do programa de fidelidade.
+            limite: Quantidade máxima de lançamentos na página.
+            antes_de: Cursor retornado pela página anterior (exclusivo).
+
+        Returns:
+            Tuple[lançamentos, cursor]: cursor é None quando não há mais páginas.
+        """
+        try:
+            if not fidelidade_id or not isinstance(fidelidade_id, str):
+                return [], None
+            if not isinstance(limite, int) or limite <= 0:
+                raise ValueError("Limite deve ser inteiro positivo")
+
+            consulta = self._db.child(fidelidade_id).order_by_key()
+            if antes_de:
+                consulta = consulta.end_at(antes_de)
+            # Busca um item extra: o próprio cursor (end_at é inclusivo) e o indicador de próxima página
+            consulta = consulta.limit_to_last(limite + 2)
+            dados = self._ler(f"{self._collection}/{fidelidade_id}?antes_de={antes_de or ''}&limite={limite}", consulta.get) or {}
+            chaves = [k for k in sorted(dados.keys(), reverse=True) if k != antes_de]
+
+            pagina = chaves[:limite]
+            cursor = pagina[-1] if len(chaves) > limite else None
+            return [MovimentacaoPontos.from_dict(dados[k]) for k in pagina], cursor
+        except Exception as e:
+            logger.error(f"[fidelidade_extrato] Erro ao listar extrato de '{fidelidade_id}': {e}")
+            return [], None
+
+    def calcular_saldo(self, fidelidade_id: str) -> int:
+        """
+        Soma todos os lançamentos do extrato (usado para conferir o saldo materializado).
+
+        Args:
+            fidelidade_id: ID do programa de fidelidade.
+
+        Returns:
+            int: Soma dos deltas do extrato.
+        """
+        try:
+            dados = self._resiliencia.consultar(self._db.child(fidelidade_id).get) or {}
+            return sum(int(item.get("delta", 0)) for item in dados.values() if item)
+        except Exception as e:
+            logger.error(f"[fidelidade_extrato] Erro ao calcular saldo de '{fidelidade_id}': {e}")
+            return 0
+
+    def caminhos_remocao(self, fidelidade_id: str) -> Dict[str, Any]:
+        """
+        Retorna o caminho para remover todo o extrato de uma fidelidade.
+        """
+        return {f"{self._collection}/{fidelidade_id}": None}
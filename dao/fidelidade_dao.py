@@ -1,22 +1,136 @@
 # dao/fidelidade_dao.py
 
+import threading
+import time
 import uuid
-from typing import List, Optional
-from dao.firebase_dao import FirebaseDAO
+import weakref
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import pandas as pd
+from dao.espelho import EspelhoColecao
+from dao.firebase_dao import FirebaseDAO, _somar_caminhos, categorizar, incremento, preencher_textos
+from dao.extrato_fidelidade_dao import ExtratoFidelidadeDAO, gerar_chave_ordenada
+from dao.registro import obter_dao
+from dao.resiliencia import indisponivel
 from models.fidelidade import Fidelidade
+from models.movimentacao_pontos import MovimentacaoPontos
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Segundos em que obter_posicao reaproveita a última sincronização do espelho
+# (escritas deste processo aparecem já na consulta seguinte)
+IDADE_MAXIMA_RANKING = 5.0
+
+
+def _saldo(registro: Optional[Dict[str, Any]]) -> Optional[int]:
+    try:
+        return int(registro["pontos"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class RankingPontos:
+    """
+    Saldos de todos os programas em ordem, em memória, para a posição no
+    ranking por busca binária. Mantido pelas alterações do espelho da coleção
+    (ver EspelhoColecao.assinar), então só o que mudou trafega do banco.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._saldos: List[int] = []
+        self._por_id: Dict[str, int] = {}
+        # Alterações do espelho recebidas antes da carga, aplicadas por cima dela
+        self._pendentes: Optional[List[Tuple[str, Any, Any]]] = []
+
+    def carregar(self, registros: Iterable[Dict[str, Any]]) -> int:
+        """Substitui o conteúdo por uma listagem completa; retorna a quantidade de programas."""
+        with self._lock:
+            self._por_id = {}
+            for registro in registros:
+                saldo = _saldo(registro)
+                if saldo is not None and registro.get("id"):
+                    self._por_id[registro["id"]] = saldo
+            self._saldos = sorted(self._por_id.values())
+            pendentes, self._pendentes = self._pendentes or [], None
+            for id, _, novo in pendentes:
+                self._aplicar(id, novo)
+            return len(self._por_id)
+
+    def aplicar_alteracoes(self, alteracoes: List[Tuple[str, Any, Any]]) -> None:
+        """Assinante do espelho da fidelidade."""
+        with self._lock:
+            if self._pendentes is not None:
+                self._pendentes.extend(alteracoes)
+                return
+            for id, _, novo in alteracoes:
+                self._aplicar(id, novo)
+
+    def posicao(self, id: str) -> Optional[int]:
+        """Posição (1 = maior saldo, empates dividem a posição) ou None se o programa não existe."""
+        with self._lock:
+            saldo = self._por_id.get(id)
+            if saldo is None:
+                return None
+            return len(self._saldos) - bisect_right(self._saldos, saldo) + 1
+
+    def _aplicar(self, id: str, novo: Optional[Dict[str, Any]]) -> None:
+        anterior = self._por_id.pop(id, None)
+        if anterior is not None:
+            self._saldos.pop(bisect_left(self._saldos, anterior))
+        saldo = _saldo(novo)
+        if saldo is not None:
+            self._por_id[id] = saldo
+            insort(self._saldos, saldo)
+
+
+# Um ranking por espelho (o espelho é único por coleção no processo)
+_rankings: "weakref.WeakKeyDictionary[EspelhoColecao, RankingPontos]" = weakref.WeakKeyDictionary()
+_lock_rankings = threading.Lock()
+
 
 class FidelidadeDAO(FirebaseDAO):
     """
     DAO responsável por operações de CRUD em programas de fidelidade.
     Collection padrão: "fidelidade".
+    O nível é sempre derivado do saldo (Fidelidade.nivel_por_pontos), dentro
+    da transação que muda o saldo; nenhuma outra escrita grava o nível.
+    As movimentações de pontos mudam o saldo numa transação que grava, no
+    próprio programa, os lançamentos como operação pendente: saldo e
+    lançamentos mudam juntos ou não mudam. Logo depois, uma escrita atômica
+    copia a operação para o extrato (ExtratoFidelidadeDAO) e o histograma de
+    níveis e a retira do programa; se ela falhar, concluir_pendentes termina
+    o serviço, e até lá listar_extrato já mostra os lançamentos pendentes.
     """
 
+    # Marcadores de idempotência dos lotes de pontos processados
+    _COLECAO_LOTES = "fidelidade_lotes"
+    # Índice por data de validade: fidelidade_vencimentos/{YYYY-MM-DD}/{id} -> True | "avisado"
+    _COLECAO_VENCIMENTOS = "fidelidade_vencimentos"
+    # Histograma materializado de programas por nível: fidelidade_resumo/niveis/{nivel} -> contagem
+    _CAMINHO_NIVEIS = "fidelidade_resumo/niveis"
+    # Operações de pontos já no saldo e ainda não copiadas para o extrato/histograma:
+    # fidelidade/{id}/pendentes/{operacao} -> {movimentacoes, nivel_anterior, nivel_novo, desde}
+    _CAMPO_PENDENTES = "pendentes"
+    # Lotes de pontos já creditados no programa: fidelidade/{id}/lotes/{lote_id} -> True
+    _CAMPO_LOTES = "lotes"
+    # Transações simultâneas de creditar_em_lote
+    _TRANSACOES_PARALELAS = 16
+    # Segundos até a varredura concluir uma operação pendente (a conclusão
+    # normal acontece logo após a transação, bem antes disso)
+    PRAZO_PENDENTES = 600
+
     def __init__(self):
         super().__init__(collection="fidelidade")
+        self._extrato = obter_dao(ExtratoFidelidadeDAO)
+
+    @property
+    def extrato(self) -> ExtratoFidelidadeDAO:
+        """Retorna a DAO do extrato de pontos."""
+        return self._extrato
 
     def criar(self, fidelidade: Fidelidade) -> Optional[str]:
         """
@@ -34,9 +148,24 @@ class FidelidadeDAO(FirebaseDAO):
 
             if not fidelidade.id:
                 fidelidade.id = str(uuid.uuid4())
+            fidelidade.nivel = Fidelidade.nivel_por_pontos(fidelidade.pontos)
 
-            sucesso = super().criar(fidelidade.id, fidelidade.to_dict())
-            if sucesso:
+            movimentacoes = fidelidade.consumir_movimentacoes_pendentes()
+            saldo_movimentado = sum(m.delta for m in movimentacoes)
+            if fidelidade.pontos != saldo_movimentado:
+                # Lançamento de abertura mantém o extrato coerente com o saldo
+                movimentacoes.insert(0, MovimentacaoPontos(
+                    id=None,
+                    fidelidade_id=fidelidade.id,
+                    delta=fidelidade.pontos - saldo_movimentado,
+                    motivo="Saldo inicial"
+                ))
+
+            caminhos: Dict[str, Any] = {f"{self._collection}/{fidelidade.id}": fidelidade.to_dict()}
+            caminhos.update(self._caminhos_extrato(movimentacoes))
+            caminhos.update(self._caminhos_vencimento(fidelidade.id, None, fidelidade.validade))
+            caminhos.update(self._caminhos_nivel(None, fidelidade.nivel))
+            if self.atualizar_caminhos(caminhos):
                 return fidelidade.id
             return None
         except Exception as e:
@@ -60,8 +189,28 @@ class FidelidadeDAO(FirebaseDAO):
             return None
         except Exception as e:
             logger.error(f"[fidelidade] Erro ao buscar por ID '{id}': {e}")
+            if indisponivel(e):
+                raise
             return None
 
+    def buscar_varios(self, ids: Iterable[str]) -> Dict[str, Fidelidade]:
+        """
+        Busca vários programas pelo ID, com as leituras em paralelo.
+
+        Args:
+            ids: IDs dos programas.
+
+        Returns:
+            Dict {id: Fidelidade} só com os encontrados.
+        """
+        try:
+            return {id: Fidelidade.from_dict(data) for id, data in super().buscar_varios(ids).items()}
+        except Exception as e:
+            logger.error(f"[fidelidade] Erro ao buscar programas em lote: {e}")
+            if indisponivel(e):
+                raise
+            return {}
+
     def listar_todos(self) -> List[Fidelidade]:
         """
         Lista todos os programas de fidelidade.
@@ -76,9 +225,36 @@ class FidelidadeDAO(FirebaseDAO):
             logger.error(f"[fidelidade] Erro ao listar programas: {e}")
             return []
 
+    def listar_dataframe(self) -> pd.DataFrame:
+        """
+        Lista programas em DataFrame, com nível categórico ordenado
+        (bronze < prata < ouro) e status Ativo/Expirado calculado pela validade.
+
+        Returns:
+            pd.DataFrame: id, cliente_id, cliente_nome, pontos, nivel, validade, status.
+        """
+        try:
+            df = super().listar_dataframe(["id", "cliente_id", "cliente_nome", "pontos", "nivel", "validade"])
+            preencher_textos(df, ["cliente_id", "cliente_nome", "nivel", "validade"])
+            df["pontos"] = pd.to_numeric(df["pontos"], errors="coerce").fillna(0).astype("int64")
+            df["nivel"] = categorizar(df["nivel"].str.lower(), ("bronze", "prata", "ouro"), ordenada=True)
+            vigente = pd.to_datetime(df["validade"], format="%Y-%m-%d", errors="coerce") >= pd.Timestamp(date.today())
+            df["status"] = categorizar(
+                pd.Series(vigente, index=df.index).map({True: "Ativo", False: "Expirado"}),
+                ("Ativo", "Expirado")
+            )
+            return df
+        except Exception as e:
+            logger.error(f"[fidelidade] Erro ao listar programas em DataFrame: {e}")
+            return pd.DataFrame()
+
     def atualizar(self, fidelidade: Fidelidade) -> bool:
         """
         Atualiza um registro de fidelidade existente.
+        O saldo nunca é sobrescrito com o valor local: movimentações pendentes
+        (adicionar_pontos/resgatar_pontos) são aplicadas por transação, para não
+        perder créditos feitos por outro caixa ao mesmo tempo. O nível não é
+        gravado daqui: a instância volta com o nível derivado do saldo gravado.
 
         Args:
             fidelidade: Instância com ID preenchido.
@@ -92,11 +268,144 @@ class FidelidadeDAO(FirebaseDAO):
             if not fidelidade.id:
                 raise ValueError("ID da fidelidade não informado para atualização")
 
-            return super().atualizar(fidelidade.id, fidelidade.to_dict())
+            atual = super().buscar_por_id(fidelidade.id)
+            if not atual:
+                logger.warning(f"[fidelidade] Tentativa de atualizar registro inexistente: {fidelidade.id}")
+                return False
+
+            legado = fidelidade.consumir_historico_legado()
+            movimentacoes = fidelidade.consumir_movimentacoes_pendentes()
+            fidelidade.pontos = int(atual.get("pontos", 0))
+            if movimentacoes:
+                # A transação recalcula o nível (e o histograma) a partir do novo saldo
+                saldo = self.movimentar_pontos(fidelidade.id, movimentacoes)
+                if saldo is None:
+                    return False
+                fidelidade.pontos = saldo
+            fidelidade.nivel = Fidelidade.nivel_por_pontos(fidelidade.pontos)
+
+            base = f"{self._collection}/{fidelidade.id}"
+            caminhos: Dict[str, Any] = {
+                f"{base}/{campo}": valor
+                for campo, valor in fidelidade.to_dict().items()
+                if campo not in ("pontos", "nivel")
+            }
+            caminhos.update(self._caminhos_vencimento(fidelidade.id, atual.get("validade"), fidelidade.validade))
+            if legado:
+                # Migra o antigo histórico embutido para o extrato e remove o campo
+                caminhos[f"{base}/historico"] = None
+                caminhos.update(self._caminhos_extrato(legado))
+            return self.atualizar_caminhos(caminhos)
         except Exception as e:
             logger.error(f"[fidelidade] Erro ao atualizar registro '{getattr(fidelidade, 'id', None)}': {e}")
             return False
 
+    def creditar_pontos(self, id: str, quantidade: int, motivo: str = "", pedido_id: Optional[str] = None) -> Optional[int]:
+        """
+        Credita pontos de forma atômica e registra o lançamento no extrato.
+
+        Args:
+            id: ID do programa de fidelidade.
+            quantidade: Pontos a creditar (inteiro positivo).
+            motivo: Descrição do lançamento.
+            pedido_id: Pedido que originou os pontos (opcional).
+
+        Returns:
+            int: Novo saldo, ou None se falhou.
+        """
+        try:
+            if not isinstance(quantidade, int) or quantidade <= 0:
+                raise ValueError("Quantidade de pontos deve ser inteiro positivo")
+            movimentacao = MovimentacaoPontos(id=None, fidelidade_id=id, delta=quantidade, motivo=motivo, pedido_id=pedido_id)
+            return self.movimentar_pontos(id, [movimentacao])
+        except Exception as e:
+            logger.error(f"[fidelidade] Erro ao creditar pontos em '{id}': {e}")
+            return None
+
+    def debitar_pontos(self, id: str, quantidade: int, motivo: str = "", pedido_id: Optional[str] = None) -> Optional[int]:
+        """
+        Resgata pontos de forma atômica; falha se o saldo for insuficiente.
+
+        Args:
+            id: ID do programa de fidelidade.
+            quantidade: Pontos a resgatar (inteiro positivo).
+            motivo: Descrição do lançamento.
+            pedido_id: Pedido associado ao resgate (opcional).
+
+        Returns:
+            int: Novo saldo, ou None se saldo insuficiente ou falha.
+        """
+        try:
+            if not isinstance(quantidade, int) or quantidade <= 0:
+                raise ValueError("Quantidade de pontos deve ser inteiro positivo")
+            movimentacao = MovimentacaoPontos(id=None, fidelidade_id=id, delta=-quantidade, motivo=motivo, pedido_id=pedido_id)
+            return self.movimentar_pontos(id, [movimentacao])
+        except Exception as e:
+            logger.error(f"[fidelidade] Erro ao debitar pontos de '{id}': {e}")
+            return None
+
+    def movimentar_pontos(self, id: str, movimentacoes: List[MovimentacaoPontos]) -> Optional[int]:
+        """
+        Aplica a soma das movimentações ao saldo (recalculando o nível) e grava
+        os lançamentos como operação pendente, na mesma transação; em seguida
+        conclui a operação (extrato e histograma de níveis).
+
+        Args:
+            id: ID do programa de fidelidade.
+            movimentacoes: Lançamentos a aplicar.
+
+        Returns:
+            int: Novo saldo, ou None se a transação foi abortada.
+        """
+        delta = sum(m.delta for m in movimentacoes)
+
+        def aplicar(atual):
+            saldo = int(atual.get("pontos", 0)) + delta
+            if saldo < 0:
+                raise ValueError("Saldo de pontos insuficiente")
+            atual["pontos"] = saldo
+            return list(movimentacoes)
+
+        operacao = self._operacao(id, aplicar)
+        if operacao is None:
+            return None
+        self._concluir([operacao])
+        return operacao["pontos"]
+
+    def concluir_pendentes(self, prazo: Optional[float] = None) -> int:
+        """
+        Conclui as operações de pontos pendentes há mais de `prazo` segundos
+        (a escrita do extrato falhou ou o processo caiu logo após a transação).
+        Roda na varredura diária (jobs.expirar_fidelidade); não deve rodar em
+        paralelo consigo mesma.
+
+        Args:
+            prazo: Idade mínima da operação (padrão: PRAZO_PENDENTES).
+
+        Returns:
+            int: Operações concluídas.
+        """
+        limite = time.time() - (self.PRAZO_PENDENTES if prazo is None else prazo)
+        concluidas = 0
+        # O espelho acha os programas com pendências sem ler a coleção inteira a cada varredura
+        for registro in FirebaseDAO.listar_todos(self):
+            id = registro.get("id")
+            if not id or not registro.get(self._CAMPO_PENDENTES):
+                continue
+            # Relê do banco: a operação pode ter sido concluída depois da última sincronização
+            pendentes = self._ler(f"{self._collection}/{id}/{self._CAMPO_PENDENTES}",
+                                  self._db.child(f"{id}/{self._CAMPO_PENDENTES}").get) or {}
+            antigas = [
+                {"fidelidade_id": id, "id": operacao_id, **operacao}
+                for operacao_id, operacao in pendentes.items()
+                if isinstance(operacao, dict) and operacao.get("desde", 0) <= limite
+            ]
+            if antigas and self._concluir(antigas):
+                concluidas += len(antigas)
+        if concluidas:
+            logger.warning(f"[fidelidade] {concluidas} operação(ões) de pontos pendente(s) concluída(s) pela varredura")
+        return concluidas
+
     def deletar(self, id: str) -> bool:
         """
         Deleta um registro de fidelidade pelo ID.
@@ -108,7 +417,439 @@ class FidelidadeDAO(FirebaseDAO):
             bool: True se excluído com sucesso.
         """
         try:
-            return super().deletar(id)
+            atual = super().buscar_por_id(id)
+            if not atual:
+                logger.warning(f"[fidelidade] Tentativa de deletar registro inexistente: {id}")
+                return False
+
+            caminhos: Dict[str, Any] = {f"{self._collection}/{id}": None}
+            caminhos.update(self._extrato.caminhos_remocao(id))
+            caminhos.update(self._caminhos_vencimento(id, atual.get("validade"), None))
+            # Trocas de nível ainda pendentes não chegaram ao histograma: entram na mesma escrita
+            for operacao in (atual.get(self._CAMPO_PENDENTES) or {}).values():
+                if isinstance(operacao, dict):
+                    _somar_caminhos(caminhos, self._caminhos_nivel(operacao.get("nivel_anterior"), operacao.get("nivel_novo")))
+            _somar_caminhos(caminhos, self._caminhos_nivel(atual.get("nivel", "bronze"), None))
+            return self.atualizar_caminhos(caminhos)
         except Exception as e:
             logger.error(f"[fidelidade] Erro ao deletar registro '{id}': {e}")
             return False
+
+    def creditar_em_lote(
+        self,
+        creditos: Dict[str, int],
+        motivo: str,
+        caminhos_extras: Optional[Dict[str, Any]] = None,
+        lote_id: Optional[str] = None
+    ) -> bool:
+        """
+        Credita pontos em vários programas, com uma transação por programa
+        (em paralelo): o nível e a troca de nível no histograma saem do saldo
+        do momento do crédito, não de uma leitura anterior ao lote. Em seguida,
+        uma única escrita atômica grava os lançamentos, o histograma e
+        `caminhos_extras`.
+
+        Com lote_id, cada programa guarda a marca do lote na mesma transação
+        do crédito: repetir o lote (ex.: retomada após falha no meio) não
+        credita duas vezes os programas que já receberam.
+
+        Args:
+            creditos: {fidelidade_id: pontos a creditar}.
+            motivo: Descrição dos lançamentos.
+            caminhos_extras: Caminhos gravados junto com a conclusão
+                (ex.: marcador de idempotência da parte do lote).
+            lote_id: Identificador do lote, para a marca por programa.
+
+        Returns:
+            bool: True se todos os créditos e a conclusão foram gravados.
+        """
+        try:
+            validos = {id: pontos for id, pontos in creditos.items() if isinstance(pontos, int) and pontos > 0}
+
+            def creditar(item):
+                fidelidade_id, pontos = item
+
+                def aplicar(atual):
+                    atual["pontos"] = int(atual.get("pontos", 0)) + pontos
+                    if lote_id:
+                        atual.setdefault(self._CAMPO_LOTES, {})[lote_id] = True
+                    return [MovimentacaoPontos(id=None, fidelidade_id=fidelidade_id, delta=pontos, motivo=motivo)]
+
+                return self._operacao(fidelidade_id, aplicar, lote_id=lote_id)
+
+            resultados: List[Optional[Dict[str, Any]]] = []
+            if validos:
+                with ThreadPoolExecutor(max_workers=min(len(validos), self._TRANSACOES_PARALELAS)) as executor:
+                    resultados = list(executor.map(creditar, validos.items()))
+
+            falhas = sum(1 for r in resultados if r is None)
+            operacoes = [r for r in resultados if r is not None and not r.get("ja_aplicado")]
+            if falhas:
+                # Sem os extras (marcador da parte): a próxima rodada refaz só o que faltou
+                self._concluir(operacoes)
+                logger.error(f"[fidelidade] {falhas} de {len(validos)} crédito(s) do lote não aplicado(s)")
+                return False
+            return self._concluir(operacoes, caminhos_extras)
+        except Exception as e:
+            logger.error(f"[fidelidade] Erro ao creditar lote de {len(creditos)} programa(s): {e}")
+            return False
+
+    def limpar_marcas_lote(self, lote_id: str, ids: Iterable[str], tamanho: int = 500) -> bool:
+        """
+        Remove dos programas a marca de um lote já concluído (o marcador do
+        lote em fidelidade_lotes passa a bastar para não repeti-lo).
+        """
+        ids = list(ids)
+        ok = True
+        for i in range(0, len(ids), tamanho):
+            caminhos = {f"{self._collection}/{id}/{self._CAMPO_LOTES}/{lote_id}": None for id in ids[i:i + tamanho]}
+            ok = self.atualizar_caminhos(caminhos) and ok
+        return ok
+
+    def obter_lote(self, lote_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna o marcador de processamento de um lote de pontos, se existir.
+
+        Args:
+            lote_id: Identificador do lote (hash do arquivo de pedidos).
+
+        Returns:
+            Dict com o marcador ou None se o lote nunca foi iniciado.
+
+        Raises:
+            Exception: Falha ao ler o banco; o marcador decide o que já foi
+                creditado, então uma falha não pode passar por "lote novo".
+        """
+        try:
+            caminho = f"{self._COLECAO_LOTES}/{lote_id}"
+            # Sem o cache de obsoletos: um marcador antigo repetiria partes já gravadas
+            return self._resiliencia.consultar(self.raiz.child(caminho).get)
+        except Exception as e:
+            logger.error(f"[fidelidade] Erro ao buscar lote '{lote_id}': {e}")
+            raise
+
+    def caminho_lote(self, lote_id: str) -> str:
+        """Retorna o caminho do marcador de um lote de pontos."""
+        return f"{self._COLECAO_LOTES}/{lote_id}"
+
+    def listar_vencimentos(self, dia: str, limite: int = 200, apos: Optional[str] = None) -> List[Tuple[str, Any]]:
+        """
+        Lista, em ordem de ID, os programas com validade em um dia específico,
+        sem ler a coleção inteira.
+
+        Args:
+            dia: Data no formato 'YYYY-MM-DD'.
+            limite: Tamanho máximo da página.
+            apos: Último ID da página anterior (exclusivo).
+
+        Returns:
+            List[(fidelidade_id, estado)]: estado é True ou "avisado".
+        """
+        try:
+            consulta = self.raiz.child(f"{self._COLECAO_VENCIMENTOS}/{dia}").order_by_key()
+            if apos:
+                consulta = consulta.start_at(apos)
+            consulta = consulta.limit_to_first(limite + (1 if apos else 0))
+            dados = self._resiliencia.consultar(consulta.get) or {}
+            return [(id, estado) for id, estado in dados.items() if id != apos][:limite]
+        except Exception as e:
+            logger.error(f"[fidelidade] Erro ao listar vencimentos de {dia}: {e}")
+            return []
+
+    def marcar_aviso_vencimento(self, dia: str, ids: List[str]) -> bool:
+        """
+        Marca programas do índice de validade como já avisados do vencimento.
+        """
+        return self.atualizar_caminhos({f"{self._COLECAO_VENCIMENTOS}/{dia}/{id}": "avisado" for id in ids})
+
+    def expirar(self, id: str, referencia: Optional[date] = None) -> Optional[Dict[str, Any]]:
+        """
+        Zera os pontos e rebaixa para bronze um programa vencido, de forma
+        atômica, registrando o lançamento no extrato e retirando o programa do
+        índice de validade. Programas renovados nesse meio tempo não são alterados.
+
+        Args:
+            id: ID do programa.
+            referencia: Data de referência (padrão: hoje).
+
+        Returns:
+            Dict com pontos zerados e níveis anterior/novo, ou None se não expirou.
+        """
+        hoje = (referencia or date.today()).strftime("%Y-%m-%d")
+        resultado: Dict[str, Any] = {}
+
+        def aplicar(atual):
+            if atual.get("validade", "") >= hoje:
+                raise ValueError("Programa renovado; validade ainda não passou")
+            resultado["validade"] = atual.get("validade")
+            resultado["pontos_zerados"] = int(atual.get("pontos", 0))
+            resultado["nivel_anterior"] = atual.get("nivel", "bronze")
+            atual["pontos"] = 0
+            atual["expirado_em"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            if resultado["pontos_zerados"] <= 0:
+                return []
+            return [MovimentacaoPontos(
+                id=None,
+                fidelidade_id=id,
+                delta=-resultado["pontos_zerados"],
+                motivo=f"Expiração da validade {resultado['validade']}"
+            )]
+
+        operacao = self._operacao(id, aplicar)
+        if operacao is None:
+            return None
+
+        # A saída do índice de validade vai na mesma escrita que conclui a operação
+        if not self._concluir([operacao], self._caminhos_vencimento(id, resultado["validade"], None)):
+            logger.error(f"[fidelidade] Programa '{id}' expirado; extrato/resumo ficam para concluir_pendentes")
+        resultado["nivel_novo"] = operacao["nivel_novo"]
+        return resultado
+
+    def remover_vencimento(self, dia: str, id: str) -> bool:
+        """
+        Remove uma entrada do índice de validade (ex.: entrada obsoleta).
+        """
+        return self.atualizar_caminhos({f"{self._COLECAO_VENCIMENTOS}/{dia}/{id}": None})
+
+    def reconstruir_indice_vencimentos(self) -> int:
+        """
+        Recria o índice de validade a partir da coleção (migração única).
+
+        Returns:
+            int: Quantidade de programas indexados.
+        """
+        try:
+            self._gravar({self._COLECAO_VENCIMENTOS: None})
+            caminhos: Dict[str, Any] = {}
+            total = 0
+            for f in self.listar_todos():
+                # Vencidos já zerados não têm o que processar na varredura
+                if f.esta_expirado() and f.pontos == 0 and f.nivel == "bronze":
+                    continue
+                caminhos.update(self._caminhos_vencimento(f.id, None, f.validade))
+                total += 1
+                if len(caminhos) >= 1000:
+                    self.atualizar_caminhos(caminhos)
+                    caminhos = {}
+            self.atualizar_caminhos(caminhos)
+            return total
+        except Exception as e:
+            logger.error(f"[fidelidade] Erro ao reconstruir índice de vencimentos: {e}")
+            return 0
+
+    def listar_top(self, limite: int = 10) -> List[Fidelidade]:
+        """
+        Lista os programas com mais pontos, em ordem decrescente, usando a
+        consulta ordenada do RTDB (índice 'pontos'), sem ler a coleção inteira.
+
+        Args:
+            limite: Quantidade de programas.
+
+        Returns:
+            List[Fidelidade]: Programas do maior para o menor saldo.
+        """
+        try:
+            consulta = self._db.order_by_child("pontos").limit_to_last(limite)
+            dados = self._ler(f"fidelidade?ranking={limite}", consulta.get) or {}
+            return [Fidelidade.from_dict(item) for item in reversed(list(dados.values())) if item]
+        except Exception as e:
+            logger.error(f"[fidelidade] Erro ao listar ranking: {e}")
+            return []
+
+    def obter_posicao(self, id: str) -> Optional[int]:
+        """
+        Retorna a posição de um programa no ranking de pontos (empates dividem a posição).
+        Responde do ranking em memória (RankingPontos), com o espelho da coleção
+        sincronizado no máximo a cada IDADE_MAXIMA_RANKING segundos: o custo
+        não depende da posição.
+
+        Args:
+            id: ID do programa.
+
+        Returns:
+            int: Posição (1 = maior saldo) ou None se não encontrado.
+        """
+        try:
+            return self._ranking().posicao(id)
+        except Exception as e:
+            logger.error(f"[fidelidade] Erro ao obter posição de '{id}': {e}")
+            return None
+
+    def obter_distribuicao_niveis(self) -> Dict[str, int]:
+        """
+        Retorna a quantidade de programas por nível, lida do histograma materializado.
+
+        Returns:
+            Dict[nivel, quantidade] com todos os níveis.
+        """
+        try:
+            dados = self._ler(self._CAMINHO_NIVEIS, self.raiz.child(self._CAMINHO_NIVEIS).get) or {}
+            return {nivel: max(int(dados.get(nivel, 0)), 0) for nivel in ("bronze", "prata", "ouro")}
+        except Exception as e:
+            logger.error(f"[fidelidade] Erro ao obter distribuição por nível: {e}")
+            return {"bronze": 0, "prata": 0, "ouro": 0}
+
+    def recalcular_distribuicao_niveis(self) -> Dict[str, int]:
+        """
+        Recria o histograma de níveis a partir da coleção (migração/correção).
+
+        Returns:
+            Dict[nivel, quantidade] gravado.
+        """
+        contagem = {"bronze": 0, "prata": 0, "ouro": 0}
+        for f in self.listar_todos():
+            contagem[f.nivel] = contagem.get(f.nivel, 0) + 1
+        self.atualizar_caminhos({f"{self._CAMINHO_NIVEIS}/{nivel}": total for nivel, total in contagem.items()})
+        return contagem
+
+    def listar_extrato(self, id: str, limite: int = 20, antes_de: Optional[str] = None):
+        """
+        Lista uma página do extrato de pontos (mais recentes primeiro).
+
+        Args:
+            id: ID do programa de fidelidade.
+            limite: Tamanho da página.
+            antes_de: Cursor da página anterior.
+
+        Returns:
+            Tuple[List[MovimentacaoPontos], Optional[str]]: Lançamentos e cursor da próxima página.
+            A primeira página inclui os lançamentos de operações ainda pendentes.
+        """
+        if antes_de:
+            return self._extrato.listar_pagina(id, limite=limite, antes_de=antes_de)
+        try:
+            # Pendentes antes do extrato: uma operação concluída no meio aparece nos dois e é deduplicada
+            caminho = f"{self._collection}/{id}/{self._CAMPO_PENDENTES}"
+            pendentes = self._ler(caminho, self.raiz.child(caminho).get) or {} if id else {}
+        except Exception as e:
+            logger.error(f"[fidelidade] Erro ao ler operações pendentes de '{id}': {e}")
+            pendentes = {}
+        lancamentos, cursor = self._extrato.listar_pagina(id, limite=limite)
+        gravados = {m.id for m in lancamentos}
+        for operacao in pendentes.values():
+            for dados in (operacao or {}).get("movimentacoes") or []:
+                if dados.get("id") not in gravados:
+                    lancamentos.append(MovimentacaoPontos.from_dict(dados))
+        lancamentos.sort(key=lambda m: m.id or "", reverse=True)
+        return lancamentos, cursor
+
+    def _caminhos_vencimento(self, id: str, validade_antiga: Optional[str], validade_nova: Optional[str]) -> Dict[str, Any]:
+        """
+        Monta os caminhos que mantêm o índice de validade coerente com o registro.
+        """
+        caminhos: Dict[str, Any] = {}
+        if validade_antiga and validade_antiga != validade_nova:
+            caminhos[f"{self._COLECAO_VENCIMENTOS}/{validade_antiga}/{id}"] = None
+        if validade_nova and validade_nova != validade_antiga:
+            caminhos[f"{self._COLECAO_VENCIMENTOS}/{validade_nova}/{id}"] = True
+        return caminhos
+
+    def _caminhos_nivel(self, nivel_antigo: Optional[str], nivel_novo: Optional[str]) -> Dict[str, Any]:
+        """
+        Monta os incrementos do histograma de níveis para uma troca de nível.
+        """
+        if nivel_antigo == nivel_novo:
+            return {}
+        caminhos: Dict[str, Any] = {}
+        if nivel_antigo:
+            caminhos[f"{self._CAMINHO_NIVEIS}/{nivel_antigo}"] = incremento(-1)
+        if nivel_novo:
+            caminhos[f"{self._CAMINHO_NIVEIS}/{nivel_novo}"] = incremento(1)
+        return caminhos
+
+    def _operacao(
+        self,
+        id: str,
+        aplicar: Callable[[Dict[str, Any]], List[MovimentacaoPontos]],
+        lote_id: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Transação de pontos sobre um programa: `aplicar` altera o registro
+        (saldo e outros campos) e devolve os lançamentos; o nível é recalculado
+        a partir do saldo e a operação (lançamentos e troca de nível) fica
+        pendente no próprio registro, para _concluir.
+
+        Returns:
+            Dict com id, fidelidade_id, pontos, movimentacoes, nivel_anterior e
+            nivel_novo; {"ja_aplicado": True} se o programa já tem a marca de
+            lote_id; None se abortada/falhou.
+        """
+        operacao_id = gerar_chave_ordenada()
+        resultado: Dict[str, Any] = {}
+
+        def transacao(atual):
+            resultado.clear()
+            if not atual:
+                raise ValueError("Programa de fidelidade inexistente")
+            if lote_id and lote_id in (atual.get(self._CAMPO_LOTES) or {}):
+                resultado["ja_aplicado"] = True
+                raise ValueError(f"Lote '{lote_id}' já creditado")
+            nivel_anterior = atual.get("nivel", "bronze")
+            movimentacoes = aplicar(atual)
+            atual["nivel"] = Fidelidade.nivel_por_pontos(int(atual.get("pontos", 0)))
+            for m in movimentacoes:
+                m.fidelidade_id = id
+                if not m.id:
+                    m.id = gerar_chave_ordenada()
+            operacao = {
+                "movimentacoes": [m.to_dict() for m in movimentacoes],
+                "nivel_anterior": nivel_anterior,
+                "nivel_novo": atual["nivel"],
+                "desde": int(time.time())
+            }
+            if movimentacoes or nivel_anterior != atual["nivel"]:
+                atual.setdefault(self._CAMPO_PENDENTES, {})[operacao_id] = operacao
+            resultado.update(operacao, id=operacao_id, fidelidade_id=id, pontos=atual["pontos"])
+            return atual
+
+        if self.transacao(id, transacao) is None:
+            return resultado if resultado.get("ja_aplicado") else None
+        return resultado
+
+    def _concluir(self, operacoes: List[Dict[str, Any]], extras: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Copia operações pendentes para o extrato e o histograma de níveis e as
+        retira dos programas, numa única escrita atômica (com `extras`).
+        Os lançamentos têm chave fixa: gravá-los de novo não os duplica.
+        """
+        caminhos: Dict[str, Any] = dict(extras or {})
+        for operacao in operacoes:
+            movimentacoes = [MovimentacaoPontos.from_dict(m) for m in operacao.get("movimentacoes") or []]
+            caminhos.update(self._caminhos_extrato(movimentacoes))
+            _somar_caminhos(caminhos, self._caminhos_nivel(operacao.get("nivel_anterior"), operacao.get("nivel_novo")))
+            caminhos[f"{self._collection}/{operacao['fidelidade_id']}/{self._CAMPO_PENDENTES}/{operacao['id']}"] = None
+        if not caminhos:
+            return True
+        if not self.atualizar_caminhos(caminhos):
+            logger.error(f"[fidelidade] {len(operacoes)} operação(ões) de pontos pendente(s) para concluir_pendentes")
+            return False
+        return True
+
+    def _caminhos_extrato(self, movimentacoes: List[MovimentacaoPontos]) -> Dict[str, Any]:
+        """
+        Monta os caminhos de gravação de uma lista de lançamentos do extrato.
+        """
+        caminhos: Dict[str, Any] = {}
+        for movimentacao in movimentacoes:
+            caminhos.update(self._extrato.caminhos_registro(movimentacao))
+        return caminhos
+
+    def _ranking(self) -> RankingPontos:
+        """
+        Ranking em memória do processo, montado na primeira chamada a partir do
+        espelho e trazido em dia a cada chamada (ver obter_posicao).
+        """
+        espelho = self.espelho()
+        with _lock_rankings:
+            ranking = _rankings.get(espelho)
+            if ranking is None:
+                ranking = RankingPontos()
+                # A cópia vem com a assinatura; o que sincronizar até a carga fica no buffer
+                total = ranking.carregar(espelho.assinar(ranking.aplicar_alteracoes))
+                logger.info(f"[fidelidade] Ranking de pontos carregado com {total} programa(s)")
+                _rankings[espelho] = ranking
+        try:
+            espelho.sincronizar(IDADE_MAXIMA_RANKING)
+        except Exception as e:
+            logger.warning(f"[fidelidade] Ranking servido sem sincronizar: {e}")
+        return ranking
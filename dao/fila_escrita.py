@@ -0,0 +1,427 @@
+# dao/fila_escrita.py
+
+import atexit
+import importlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from dao.firebase_dao import FirebaseDAO
+from dao.resiliencia import indisponivel
+
+logger = logging.getLogger(__name__)
+
+# Arquivo SQLite da fila (um por servidor; pode ser compartilhado por processos)
+FILA_ENV = "CRM_FILA_ESCRITA"
+FILA_PADRAO = "fila_escrita.sqlite3"
+
+# Marcadores dos lotes gravados: fila_lotes/{lote} entra na mesma escrita
+# atômica dos registros e é o que diz, numa reexecução, se o lote já chegou
+_RAIZ_LOTES = "fila_lotes"
+
+# DAOs (módulo, classe) de cada coleção que usa a fila, importadas sob demanda:
+# pendências de uma execução anterior são enviadas sem esperar a DAO se registrar
+DAOS = {
+    "avaliacoes": ("dao.avaliacao_dao", "AvaliacaoDAO")
+}
+
+# Rejeições (erros que não são de indisponibilidade) até o lote ir para a tabela rejeitados
+MAX_TENTATIVAS = 5
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS pendentes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    colecao TEXT NOT NULL,
+    id TEXT NOT NULL,
+    dados TEXT NOT NULL,
+    criado_em REAL NOT NULL,
+    lote TEXT,
+    reivindicado_em REAL,
+    tentativas INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS pendentes_livres ON pendentes (colecao, id) WHERE lote IS NULL;
+CREATE INDEX IF NOT EXISTS pendentes_lote ON pendentes (lote);
+CREATE TABLE IF NOT EXISTS rejeitados (
+    seq INTEGER PRIMARY KEY,
+    colecao TEXT NOT NULL,
+    id TEXT NOT NULL,
+    dados TEXT NOT NULL,
+    criado_em REAL NOT NULL,
+    lote TEXT,
+    erro TEXT,
+    rejeitado_em REAL NOT NULL
+);
+"""
+
+
+class FilaEscrita:
+    """
+    Fila local e durável (SQLite em modo WAL) de criações não críticas, gravadas
+    no banco em segundo plano (write-behind).
+
+    enfileirar() confirma assim que a linha está no disco. Uma thread junta as
+    pendências em lotes (por coleção) e grava cada lote com
+    FirebaseDAO.criar_em_lote, numa única escrita atômica que inclui os
+    caminhos derivados (índices, agregados) e um marcador fila_lotes/{lote}.
+    Registros com o mesmo ID ainda não enviados são fundidos (vale o último).
+
+    O lote é reservado no SQLite antes do envio e apagado depois. Após uma
+    queda, ou uma falha em que não se sabe se a escrita chegou (timeout), a
+    reserva expira e o lote é reenviado só se o marcador não existir no banco,
+    então os incrementos dos agregados não são aplicados duas vezes.
+
+    Falhas de indisponibilidade (rede, timeout, circuito aberto) são tentadas
+    de novo indefinidamente. Um lote recusado pelo banco (dados inválidos,
+    permissão) é tentado até max_tentativas vezes e depois movido para a
+    tabela rejeitados, para não travar as pendências seguintes da coleção;
+    reprocessar_rejeitados() o devolve à fila depois de corrigida a causa.
+
+    Serve para criações: os registros são gravados sem ler o valor anterior.
+    """
+
+    def __init__(
+        self,
+        arquivo: Optional[str] = None,
+        tamanho_lote: int = 200,
+        intervalo: float = 1.0,
+        expiracao_reserva: float = 60.0,
+        max_tentativas: int = MAX_TENTATIVAS
+    ):
+        self._arquivo = arquivo or os.environ.get(FILA_ENV) or FILA_PADRAO
+        self._tamanho_lote = tamanho_lote
+        self._intervalo = intervalo
+        self._expiracao = expiracao_reserva
+        self._max_tentativas = max_tentativas
+        self._daos: Dict[str, FirebaseDAO] = {}
+        self._local = threading.local()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._desde_envio = 0
+        self._confirmados: List[str] = []
+        self._falhas_seguidas = 0
+        self._estatisticas = {
+            "enfileirados": 0, "enviados": 0, "lotes": 0, "reenvios_evitados": 0, "falhas": 0, "rejeitados": 0
+        }
+        self._ultimo_erro: Optional[str] = None
+        conexao = self._conexao()
+        conexao.executescript(_ESQUEMA)
+        # Arquivos criados antes da contagem de tentativas
+        colunas = {linha[1] for linha in conexao.execute("PRAGMA table_info(pendentes)")}
+        if "tentativas" not in colunas:
+            conexao.execute("ALTER TABLE pendentes ADD COLUMN tentativas INTEGER NOT NULL DEFAULT 0")
+
+    @property
+    def arquivo(self) -> str:
+        return self._arquivo
+
+    def _conexao(self) -> sqlite3.Connection:
+        # Uma conexão por thread; transações explícitas (BEGIN IMMEDIATE)
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = sqlite3.connect(self._arquivo, timeout=30, isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            # FULL: a confirmação ao usuário sobrevive também a queda de energia
+            conexao.execute("PRAGMA synchronous=FULL")
+            self._local.conexao = conexao
+        return conexao
+
+    def registrar(self, dao: FirebaseDAO) -> None:
+        """Informa a DAO que grava as pendências da coleção dela (as de DAOS são obtidas sozinhas)."""
+        self._daos[dao.collection] = dao
+
+    def _dao(self, colecao: str) -> FirebaseDAO:
+        # A registrada ou, para coleções de DAOS, a instância compartilhada
+        dao = self._daos.get(colecao)
+        if dao is None:
+            from dao.registro import obter_dao
+            modulo, classe = DAOS[colecao]
+            dao = obter_dao(getattr(importlib.import_module(modulo), classe))
+            self._daos[colecao] = dao
+        return dao
+
+    def _colecoes(self) -> List[str]:
+        return sorted(set(self._daos) | set(DAOS))
+
+    def enfileirar(self, dao: FirebaseDAO, id: str, dados: Dict[str, Any]) -> None:
+        """
+        Guarda a criação no disco e retorna; a gravação no banco fica para a
+        thread de envio.
+
+        Raises:
+            ValueError: ID ou dados inválidos.
+            sqlite3.Error: Falha ao gravar a fila local.
+        """
+        if not id or not isinstance(id, str):
+            raise ValueError("ID deve ser uma string não vazia")
+        if not isinstance(dados, dict):
+            raise ValueError("Dados devem ser um dicionário")
+        self.registrar(dao)
+        self._conexao().execute(
+            "INSERT INTO pendentes (colecao, id, dados, criado_em) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (colecao, id) WHERE lote IS NULL DO UPDATE SET dados = excluded.dados",
+            (dao.collection, id, json.dumps(dados, ensure_ascii=False), time.time())
+        )
+        with self._lock:
+            self._estatisticas["enfileirados"] += 1
+            self._desde_envio += 1
+            cheio = self._desde_envio >= self._tamanho_lote
+        if cheio:
+            self._acordar.set()
+
+    def iniciar(self) -> None:
+        """Inicia a thread de envio (uma vez); pendências de uma execução anterior são enviadas."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name="fila-escrita", daemon=True)
+            self._thread.start()
+
+    def parar(self, timeout: float = 10.0) -> None:
+        """Para a thread de envio após uma última tentativa de esvaziar a fila."""
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def esvaziar(self) -> int:
+        """
+        Envia tudo o que estiver pendente e livre, na thread atual.
+
+        Returns:
+            int: Registros gravados no banco.
+        """
+        enviados = 0
+        while True:
+            reserva = self._reservar()
+            if reserva is None:
+                return enviados
+            gravados = self._enviar(*reserva)
+            if gravados is None:
+                return enviados
+            enviados += gravados
+
+    def pendentes(self, colecao: Optional[str] = None) -> int:
+        """Quantidade de registros ainda não gravados no banco."""
+        if colecao:
+            linha = self._conexao().execute("SELECT COUNT(*) FROM pendentes WHERE colecao = ?", (colecao,)).fetchone()
+        else:
+            linha = self._conexao().execute("SELECT COUNT(*) FROM pendentes").fetchone()
+        return linha[0]
+
+    def rejeitados(self, colecao: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Registros recusados pelo banco após max_tentativas, mais antigos primeiro."""
+        consulta = "SELECT colecao, id, dados, criado_em, lote, erro, rejeitado_em FROM rejeitados"
+        parametros: Tuple = ()
+        if colecao:
+            consulta += " WHERE colecao = ?"
+            parametros = (colecao,)
+        return [
+            {
+                "colecao": c, "id": id, "dados": json.loads(dados), "criado_em": criado_em,
+                "lote": lote, "erro": erro, "rejeitado_em": rejeitado_em
+            }
+            for c, id, dados, criado_em, lote, erro, rejeitado_em
+            in self._conexao().execute(consulta + " ORDER BY seq", parametros).fetchall()
+        ]
+
+    def reprocessar_rejeitados(self, colecao: Optional[str] = None) -> int:
+        """
+        Devolve os rejeitados à fila, com as tentativas zeradas. Um registro
+        que já tenha uma pendência mais nova com o mesmo ID é descartado.
+
+        Returns:
+            int: Registros devolvidos à fila.
+        """
+        filtro, parametros = ("WHERE colecao = ?", (colecao,)) if colecao else ("", ())
+        conexao = self._conexao()
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            devolvidos = conexao.execute(
+                "INSERT INTO pendentes (colecao, id, dados, criado_em) "
+                f"SELECT colecao, id, dados, criado_em FROM rejeitados {filtro} ORDER BY seq "
+                "ON CONFLICT (colecao, id) WHERE lote IS NULL DO NOTHING",
+                parametros
+            ).rowcount
+            conexao.execute(f"DELETE FROM rejeitados {filtro}", parametros)
+            conexao.execute("COMMIT")
+        except Exception:
+            conexao.execute("ROLLBACK")
+            raise
+        if devolvidos:
+            logger.info(f"[fila] {devolvidos} registro(s) rejeitado(s) devolvido(s) à fila")
+            self._acordar.set()
+        return devolvidos
+
+    def estado(self) -> Dict[str, Any]:
+        """Pendências, rejeitados, contadores e último erro da fila."""
+        with self._lock:
+            return {
+                "pendentes": self.pendentes(),
+                "rejeitados_guardados": self._conexao().execute("SELECT COUNT(*) FROM rejeitados").fetchone()[0],
+                **self._estatisticas,
+                "falhas_seguidas": self._falhas_seguidas,
+                "ultimo_erro": self._ultimo_erro
+            }
+
+    def _executar(self) -> None:
+        while not self._parar.is_set():
+            # Espera o intervalo (ou um lote cheio); após falhas, espera mais
+            espera = min(self._intervalo * (2 ** self._falhas_seguidas), 30.0)
+            self._acordar.wait(espera)
+            self._acordar.clear()
+            with self._lock:
+                self._desde_envio = 0
+            try:
+                self.esvaziar()
+            except Exception as e:
+                self._registrar_falha(f"{type(e).__name__}: {e}")
+        try:
+            self.esvaziar()
+        except Exception as e:
+            logger.error(f"[fila] Pendências não enviadas no encerramento (serão reenviadas): {e}")
+
+    def _reservar(self) -> Optional[Tuple[str, str, Dict[str, Dict[str, Any]], bool]]:
+        # Reserva um lote numa transação, para que dois processos com o mesmo
+        # arquivo nunca enviem as mesmas linhas ao mesmo tempo
+        conexao = self._conexao()
+        agora = time.time()
+        colecoes = self._colecoes()
+        marcas = ",".join("?" * len(colecoes))
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            expirado = conexao.execute(
+                "SELECT lote, colecao FROM pendentes WHERE lote IS NOT NULL AND reivindicado_em < ? "
+                "AND colecao IN (%s) LIMIT 1" % marcas,
+                (agora - self._expiracao, *colecoes)
+            ).fetchone() if colecoes else None
+            if expirado:
+                lote, colecao = expirado
+                conexao.execute("UPDATE pendentes SET reivindicado_em = ? WHERE lote = ?", (agora, lote))
+                reenvio = True
+            else:
+                livre = conexao.execute(
+                    "SELECT colecao FROM pendentes WHERE lote IS NULL AND colecao IN (%s) ORDER BY seq LIMIT 1"
+                    % marcas,
+                    tuple(colecoes)
+                ).fetchone() if colecoes else None
+                if not livre:
+                    conexao.execute("COMMIT")
+                    return None
+                colecao = livre[0]
+                lote = uuid.uuid4().hex
+                conexao.execute(
+                    "UPDATE pendentes SET lote = ?, reivindicado_em = ? WHERE seq IN "
+                    "(SELECT seq FROM pendentes WHERE lote IS NULL AND colecao = ? ORDER BY seq LIMIT ?)",
+                    (lote, agora, colecao, self._tamanho_lote)
+                )
+                reenvio = False
+            linhas = conexao.execute("SELECT id, dados FROM pendentes WHERE lote = ? ORDER BY seq", (lote,)).fetchall()
+            conexao.execute("COMMIT")
+        except Exception:
+            conexao.execute("ROLLBACK")
+            raise
+        return lote, colecao, {id: json.loads(dados) for id, dados in linhas}, reenvio
+
+    def _enviar(self, lote: str, colecao: str, registros: Dict[str, Dict[str, Any]], reenvio: bool) -> Optional[int]:
+        dao = self._dao(colecao)
+        if reenvio:
+            # Pode ter chegado ao banco antes da queda/timeout: o marcador decide
+            marcador = dao._resiliencia.consultar(dao._raiz.child(f"{_RAIZ_LOTES}/{lote}").get)
+            if marcador is not None:
+                with self._lock:
+                    self._estatisticas["reenvios_evitados"] += 1
+                logger.info(f"[fila] Lote {lote} já estava gravado; só confirmando")
+                self._confirmar(lote)
+                return 0
+
+        extras = {f"{_RAIZ_LOTES}/{lote}": int(time.time() * 1000)}
+        with self._lock:
+            # Marcadores de lotes já confirmados localmente saem nesta escrita
+            anteriores, self._confirmados = self._confirmados, []
+        extras.update({f"{_RAIZ_LOTES}/{anterior}": None for anterior in anteriores})
+
+        try:
+            dao._criar_em_lote(registros, extras)
+        except Exception as e:
+            with self._lock:
+                self._confirmados = anteriores + self._confirmados
+            erro = f"{type(e).__name__}: {e}"
+            if not indisponivel(e) and self._rejeitar(lote, colecao, erro):
+                # Lote fora da fila: as pendências seguintes seguem na próxima rodada
+                self._registrar_falha(f"lote {lote} de {colecao} rejeitado após {self._max_tentativas} tentativa(s): {erro}")
+                return 0
+            # Resultado incerto: expira a reserva para a próxima rodada conferir o marcador
+            self._conexao().execute("UPDATE pendentes SET reivindicado_em = 0 WHERE lote = ?", (lote,))
+            self._registrar_falha(f"lote {lote} de {colecao} não gravado ({erro})")
+            return None
+
+        self._confirmar(lote)
+        with self._lock:
+            self._estatisticas["enviados"] += len(registros)
+            self._estatisticas["lotes"] += 1
+            self._falhas_seguidas = 0
+        return len(registros)
+
+    def _rejeitar(self, lote: str, colecao: str, erro: str) -> bool:
+        # Conta a recusa; na última, move o lote para rejeitados (True)
+        conexao = self._conexao()
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            conexao.execute("UPDATE pendentes SET tentativas = tentativas + 1 WHERE lote = ?", (lote,))
+            tentativas = conexao.execute("SELECT MAX(tentativas) FROM pendentes WHERE lote = ?", (lote,)).fetchone()[0]
+            esgotado = tentativas is not None and tentativas >= self._max_tentativas
+            if esgotado:
+                movidos = conexao.execute(
+                    "INSERT INTO rejeitados (seq, colecao, id, dados, criado_em, lote, erro, rejeitado_em) "
+                    "SELECT seq, colecao, id, dados, criado_em, lote, ?, ? FROM pendentes WHERE lote = ?",
+                    (erro, time.time(), lote)
+                ).rowcount
+                conexao.execute("DELETE FROM pendentes WHERE lote = ?", (lote,))
+            conexao.execute("COMMIT")
+        except Exception:
+            conexao.execute("ROLLBACK")
+            raise
+        if esgotado:
+            with self._lock:
+                self._estatisticas["rejeitados"] += movidos
+        return esgotado
+
+    def _confirmar(self, lote: str) -> None:
+        self._conexao().execute("DELETE FROM pendentes WHERE lote = ?", (lote,))
+        with self._lock:
+            self._confirmados.append(lote)
+
+    def _registrar_falha(self, mensagem: str) -> None:
+        with self._lock:
+            self._falhas_seguidas += 1
+            self._estatisticas["falhas"] += 1
+            self._ultimo_erro = mensagem
+        logger.error(f"[fila] {mensagem}; nova tentativa em segundo plano")
+
+
+_fila: Optional[FilaEscrita] = None
+_lock_fila = threading.Lock()
+
+
+def obter_fila() -> FilaEscrita:
+    """
+    Fila única do processo, com a thread de envio já iniciada: pendências de
+    uma execução anterior são reenviadas na primeira rodada (DAOS).
+    """
+    global _fila
+    if _fila is None:
+        with _lock_fila:
+            if _fila is None:
+                fila = FilaEscrita()
+                fila.iniciar()
+                atexit.register(fila.parar)
+                _fila = fila
+    return _fila
@@ -1,24 +1,205 @@
 # dao/firebase_dao.py
 
+import asyncio
+import random
+import threading
+import time
 from abc import ABC
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import pandas as pd
 from config.firebase_config import FirebaseConfig
+from dao.assincrono import reunir
+from dao.cache_disco import obter_cache_disco
+from dao.espelho import CAMPO_ATUALIZADO_EM, EspelhoColecao, carimbo
+from dao.indices import codificar_chave
+from dao.resiliencia import indisponivel, obter_resiliencia
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def incremento(delta) -> Dict[str, Any]:
+    """
+    Retorna o server value de incremento atômico do RTDB, para uso em
+    atualizar_caminhos sem precisar ler o valor atual.
+    """
+    return {".sv": {"increment": delta}}
+
+
+# Server value com o instante da escrita, resolvido pelo RTDB
+CARIMBO_SERVIDOR = {".sv": "timestamp"}
+
+# Segundos até reconsultar um marcador de migração (_construido) ausente
+REVERIFICAR_MARCADOR = 60.0
+
+# Leituras simultâneas de buscar_varios (threads do cliente síncrono)
+_LEITURAS_PARALELAS = 16
+
+
+def _tem_incremento(valor: Any) -> bool:
+    # Repetir um carimbo de tempo não muda nada de importante; repetir um incremento muda
+    if isinstance(valor, dict):
+        return _incremento_de(valor) is not None or any(_tem_incremento(v) for v in valor.values())
+    return False
+
+
+def _instante(valor: Any) -> int:
+    # Valor de uma marca de exclusão (instante em ms)
+    return valor if isinstance(valor, int) and not isinstance(valor, bool) else 0
+
+
+def _incremento_de(valor: Any) -> Optional[Any]:
+    if isinstance(valor, dict) and isinstance(valor.get(".sv"), dict) and "increment" in valor[".sv"]:
+        return valor[".sv"]["increment"]
+    return None
+
+
+def _somar_caminhos(caminhos: Dict[str, Any], novos: Dict[str, Any]) -> None:
+    # Num lote, vários registros incrementam o mesmo agregado: os incrementos
+    # do mesmo caminho são somados em vez de o último sobrescrever os outros
+    for caminho, valor in novos.items():
+        anterior, atual = _incremento_de(caminhos.get(caminho)), _incremento_de(valor)
+        if anterior is not None and atual is not None:
+            valor = incremento(anterior + atual)
+        caminhos[caminho] = valor
+
+
+def paginar(
+    referencia,
+    tamanho: int = 1000,
+    apos: Optional[str] = None,
+    executar: Optional[Callable[[Callable[[], Any]], Any]] = None
+) -> Iterator[List[Tuple[str, Any]]]:
+    """
+    Percorre os filhos de uma referência em ordem de chave, uma página por
+    consulta (order_by_key + start_at + limit_to_first), sem trazer o nó
+    inteiro numa única resposta.
+
+    Args:
+        referencia: Referência do RTDB (ou do banco local).
+        tamanho: Filhos por página.
+        apos: Última chave já lida (exclusiva), para retomar.
+        executar: Executa a leitura de cada página (ex.: Resiliencia.consultar);
+            None lê direto.
+
+    Yields:
+        List[(chave, valor)] na ordem de chave do banco.
+    """
+    if not isinstance(tamanho, int) or tamanho <= 0:
+        raise ValueError("Tamanho da página deve ser inteiro positivo")
+    while True:
+        consulta = referencia.order_by_key()
+        if apos is not None:
+            # start_at é inclusivo: pede um a mais e descarta a própria chave
+            consulta = consulta.start_at(apos)
+        consulta = consulta.limit_to_first(tamanho + (1 if apos is not None else 0))
+        dados = (executar(consulta.get) if executar else consulta.get()) or {}
+        itens = [(chave, valor) for chave, valor in dados.items() if chave != apos]
+        if not itens:
+            return
+        yield itens
+        if len(itens) < tamanho:
+            return
+        apos = itens[-1][0]
+
+
+def categorizar(serie: pd.Series, categorias: Iterable[str], ordenada: bool = False) -> pd.Series:
+    """
+    Converte uma coluna de texto em categórica com domínio fixo (valores fora
+    do domínio viram NaN). Ocupa um código inteiro por linha em vez de uma string.
+    """
+    return pd.Series(
+        pd.Categorical(serie, categories=list(categorias), ordered=ordenada),
+        index=serie.index,
+        name=serie.name
+    )
+
+
+def juntar_listas(serie: pd.Series, separador: str = ", ") -> pd.Series:
+    """
+    Junta colunas de listas (ex.: zonas, canais) em texto; ausentes viram "".
+    """
+    if not serie.notna().any():
+        return pd.Series("", index=serie.index, name=serie.name)
+    return serie.str.join(separador).fillna("")
+
+
+def preencher_textos(df: pd.DataFrame, colunas: Iterable[str]) -> pd.DataFrame:
+    """
+    Troca os ausentes das colunas de texto por "" (campos opcionais do RTDB).
+    """
+    colunas = list(colunas)
+    df[colunas] = df[colunas].astype(object).fillna("")
+    return df
+
+
 class FirebaseDAO(ABC):
     """
     Classe abstrata base para operações CRUD com Firebase Realtime Database.
     Todas as DAOs específicas herdam desta classe e fornecem o nome da coleção.
+
+    As DAOs podem registrar índices de busca exata (registrar_indice), mantidos
+    em indices/{colecao}/{indice}/{valor_normalizado}/{id} na mesma escrita
+    atômica do registro, para que buscas por CPF, telefone etc. não dependam
+    do tamanho da coleção.
+
+    Leituras e escritas passam pela camada de resiliência (dao/resiliencia.py):
+    tempo limite, novas tentativas com backoff e disjuntor. Com o backend fora,
+    as leituras devolvem o último valor lido em vez de uma lista vazia.
+
+    As operações básicas (criar, buscar, atualizar, deletar...) têm versões
+    asyncio (sufixo _async) sobre a API REST do RTDB, para rotinas que precisam
+    de muitas leituras/escritas simultâneas (asyncio.gather, ver
+    dao/assincrono.reunir). As versões síncronas, usadas pelas telas, seguem
+    no cliente do firebase_admin; as duas passam pela mesma resiliência.
+
+    Toda escrita num registro grava também atualizado_em com o instante do
+    servidor, e cada exclusão deixa uma marca em excluidos/{colecao}/{id}
+    (e, nas coleções arquiváveis, cada arquivamento outra em arquivados/{colecao}/{id}).
+    sincronizar_desde traz só o que mudou desde um instante, e listar_todos
+    serve a coleção de um espelho local mantido assim (dao/espelho.py).
     """
 
+    # Raiz dos índices de busca exata
+    _RAIZ_INDICES = "indices"
+
+    # Marcas de exclusão (excluidos/{colecao}/{id} -> instante) e o limite até
+    # onde foram podadas (sincronizacao/{colecao}/exclusoes_podadas_ate)
+    _RAIZ_EXCLUIDOS = "excluidos"
+    _RAIZ_SINCRONIZACAO = "sincronizacao"
+
+    # Marcas de arquivamento (arquivados/{colecao}/{id} -> instante): a remoção
+    # com o mesmo instante da marca de exclusão foi para o armazenamento frio
+    _RAIZ_ARQUIVADOS = "arquivados"
+
+    # Coleções com um registro plano por ID recebem atualizado_em e marcas de
+    # exclusão; coleções aninhadas (ex.: extrato por programa) desligam
+    _sincronizavel = True
+
+    # Coleções cujos registros podem sair do banco por arquivamento (não é
+    # exclusão); só elas consultam as marcas de arquivamento ao sincronizar
+    _arquivavel = False
+
+    # Espelhos locais por coleção, compartilhados por todas as instâncias do processo
+    _espelhos: Dict[str, EspelhoColecao] = {}
+    _lock_espelhos = threading.Lock()
+
+    # Observadores de escrita por coleção, compartilhados por todas as instâncias
+    # do processo (as páginas criam uma DAO nova a cada execução)
+    _observadores: Dict[str, List[Callable[[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]], None]]] = {}
+
     def __init__(self, collection: str):
         if not collection or not isinstance(collection, str):
             raise ValueError("Nome da coleção deve ser uma string não vazia")
         self._collection = collection
-        self._db = FirebaseConfig.get_instance().rtdb.child(collection)
+        self._raiz = FirebaseConfig.get_instance().rtdb
+        self._db = self._raiz.child(collection)
+        self._indices: Dict[str, tuple] = {}
+        self._indices_construidos: Optional[bool] = None
+        self._reverificar_indices_em = 0.0
+        self._resiliencia = obter_resiliencia()
+        self._cliente_assincrono = None
 
     @property
     def collection(self) -> str:
@@ -30,6 +211,18 @@ class FirebaseDAO(ABC):
         """Retorna a referência ao nó da coleção no RTDB."""
         return self._db
 
+    @property
+    def raiz(self):
+        """Retorna a referência à raiz do RTDB (para escritas em múltiplos caminhos)."""
+        return self._raiz
+
+    @property
+    def cliente_assincrono(self):
+        """Cliente assíncrono do RTDB (caminhos relativos à raiz), compartilhado pelo processo."""
+        if self._cliente_assincrono is None:
+            self._cliente_assincrono = FirebaseConfig.get_instance().rtdb_assincrono
+        return self._cliente_assincrono
+
     def criar(self, id: str, data: Dict[str, Any]) -> bool:
         """
         Cria um novo registro no Firebase.
@@ -48,7 +241,10 @@ class FirebaseDAO(ABC):
             if not isinstance(data, dict):
                 raise ValueError("Data deve ser um dicionário")
 
-            self._db.child(id).set(data)
+            caminhos = {f"{self._collection}/{id}": data}
+            caminhos.update(self._caminhos_derivados(id, None, data))
+            self._gravar(caminhos)
+            self._notificar(id, None, data)
             logger.info(f"[{self._collection}] Registro criado com sucesso: {id}")
             return True
 
@@ -56,6 +252,79 @@ class FirebaseDAO(ABC):
             logger.error(f"[{self._collection}] Erro ao criar registro '{id}': {e}")
             return False
 
+    async def criar_async(self, id: str, data: Dict[str, Any]) -> bool:
+        """Versão assíncrona de criar."""
+        try:
+            if not id or not isinstance(id, str):
+                raise ValueError("ID deve ser uma string não vazia")
+
+            if not isinstance(data, dict):
+                raise ValueError("Data deve ser um dicionário")
+
+            caminhos = {f"{self._collection}/{id}": data}
+            caminhos.update(self._caminhos_derivados(id, None, data))
+            await self._gravar_async(caminhos)
+            await self._notificar_async(id, None, data)
+            logger.info(f"[{self._collection}] Registro criado com sucesso: {id}")
+            return True
+
+        except Exception as e:
+            logger.error(f"[{self._collection}] Erro ao criar registro '{id}': {e}")
+            return False
+
+    def criar_em_lote(self, registros: Dict[str, Dict[str, Any]], extras: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Cria vários registros novos em uma única escrita atômica, incluindo os
+        caminhos derivados (índices etc.) de cada um. Para cargas em massa:
+        não verifica existência prévia, o que fica a cargo de quem chama.
+
+        Args:
+            registros: Dicionário {id: dados}.
+            extras: Caminhos adicionais (relativos à raiz) gravados na mesma
+                escrita, ex.: o marcador de um lote da fila de escrita.
+
+        Returns:
+            bool: True se todos foram gravados, False caso contrário (nenhum é).
+        """
+        try:
+            self._criar_em_lote(registros, extras)
+            return True
+
+        except Exception as e:
+            logger.error(f"[{self._collection}] Erro ao criar registros em lote: {e}")
+            return False
+
+    def _criar_em_lote(self, registros: Dict[str, Dict[str, Any]], extras: Optional[Dict[str, Any]] = None) -> None:
+        # criar_em_lote sem tratar a falha: a fila de escrita precisa do erro
+        # para separar indisponibilidade (tenta de novo) de rejeição do lote
+        caminhos = self._caminhos_lote(registros, extras)
+        if not caminhos:
+            return
+        self._gravar(caminhos)
+        for id, data in registros.items():
+            self._notificar(id, None, data)
+        logger.info(f"[{self._collection}] {len(registros)} registro(s) criado(s) em lote")
+
+    async def criar_em_lote_async(
+        self,
+        registros: Dict[str, Dict[str, Any]],
+        extras: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """Versão assíncrona de criar_em_lote."""
+        try:
+            caminhos = self._caminhos_lote(registros, extras)
+            if not caminhos:
+                return True
+            await self._gravar_async(caminhos)
+            for id, data in registros.items():
+                await self._notificar_async(id, None, data)
+            logger.info(f"[{self._collection}] {len(registros)} registro(s) criado(s) em lote")
+            return True
+
+        except Exception as e:
+            logger.error(f"[{self._collection}] Erro ao criar registros em lote: {e}")
+            return False
+
     def buscar_por_id(self, id: str) -> Optional[Dict[str, Any]]:
         """
         Busca um registro pelo ID.
@@ -65,20 +334,76 @@ class FirebaseDAO(ABC):
 
         Returns:
             Dict com os dados do registro, ou None se não encontrado.
+
+        Raises:
+            CircuitoAberto, TempoEsgotado ou erro transitório: banco
+            indisponível e sem cópia em cache; não vira "não encontrado".
         """
         try:
             if not id or not isinstance(id, str):
                 raise ValueError("ID deve ser uma string não vazia")
 
-            snapshot = self._db.child(id).get()
-            if snapshot and snapshot.val():
-                return snapshot.val()
+            dados = self._ler(f"{self._collection}/{id}", self._db.child(id).get)
+            if dados:
+                return dados
+            return None
+
+        except Exception as e:
+            logger.error(f"[{self._collection}] Erro ao buscar registro '{id}': {e}")
+            if indisponivel(e):
+                raise
+            return None
+
+    async def buscar_por_id_async(self, id: str) -> Optional[Dict[str, Any]]:
+        """Versão assíncrona de buscar_por_id."""
+        try:
+            if not id or not isinstance(id, str):
+                raise ValueError("ID deve ser uma string não vazia")
+
+            dados = await self._ler_async(f"{self._collection}/{id}")
+            if dados:
+                return dados
             return None
 
         except Exception as e:
             logger.error(f"[{self._collection}] Erro ao buscar registro '{id}': {e}")
+            if indisponivel(e):
+                raise
             return None
 
+    def buscar_varios(self, ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Busca vários registros pelo ID, com as leituras em paralelo.
+
+        Args:
+            ids: Identificadores dos registros.
+
+        Returns:
+            Dict {id: dados} só com os encontrados.
+
+        Raises:
+            Os de buscar_por_id, se o banco estiver indisponível.
+        """
+        ids = list(dict.fromkeys(ids))
+        if len(ids) <= 1:
+            registros = [FirebaseDAO.buscar_por_id(self, id) for id in ids]
+        else:
+            with ThreadPoolExecutor(max_workers=min(len(ids), _LEITURAS_PARALELAS)) as executor:
+                registros = list(executor.map(lambda id: FirebaseDAO.buscar_por_id(self, id), ids))
+        return {id: registro for id, registro in zip(ids, registros) if registro}
+
+    async def buscar_varios_async(self, ids: Iterable[str], limite: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Versão assíncrona de buscar_varios.
+
+        Args:
+            ids: Identificadores dos registros.
+            limite: Máximo de leituras em andamento (None: o do cliente HTTP).
+        """
+        ids = list(dict.fromkeys(ids))
+        registros = await reunir((FirebaseDAO.buscar_por_id_async(self, id) for id in ids), limite)
+        return {id: registro for id, registro in zip(ids, registros) if registro}
+
     def listar_todos(self) -> List[Dict[str, Any]]:
         """
         Lista todos os registros da coleção.
@@ -87,18 +412,83 @@ class FirebaseDAO(ABC):
             Lista de dicionários com os dados de cada registro.
         """
         try:
-            snapshot = self._db.get()
-            if snapshot and snapshot.val():
-                dados = snapshot.val()
-                if isinstance(dados, dict):
-                    # Os valores do dicionário representam cada registro
-                    return list(dados.values())
+            return self._listar()
+
+        except Exception as e:
+            logger.error(f"[{self._collection}] Erro ao listar registros: {e}")
+            return []
+
+    def _listar(self) -> List[Dict[str, Any]]:
+        # listar_todos sem tratar a falha (a varredura das buscas exatas precisa do erro)
+        if self._sincronizavel:
+            # Só o que mudou desde a última leitura vem do banco
+            return self.espelho().atualizar()
+        dados = self._ler(self._collection, self._db.get)
+        if isinstance(dados, dict):
+            # Os valores do dicionário representam cada registro
+            return list(dados.values())
+        return []
+
+    async def listar_todos_async(self) -> List[Dict[str, Any]]:
+        """Versão assíncrona de listar_todos (o espelho é atualizado fora do laço)."""
+        try:
+            if self._sincronizavel:
+                return await asyncio.to_thread(self.espelho().atualizar)
+            dados = await self._ler_async(self._collection)
+            if isinstance(dados, dict):
+                # Os valores do dicionário representam cada registro
+                return list(dados.values())
             return []
 
         except Exception as e:
             logger.error(f"[{self._collection}] Erro ao listar registros: {e}")
             return []
 
+    def listar_paginas(self, tamanho: int = 1000, apos: Optional[str] = None) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Percorre a coleção em páginas ordenadas por ID (ver paginar), para
+        exportações e rotinas que não devem carregar tudo de uma vez.
+
+        Diferente de listar_todos, erros do banco são registrados e propagados:
+        quem consome não pode confundir uma falha com o fim da coleção.
+
+        Args:
+            tamanho: Registros por página.
+            apos: Último ID já lido (exclusivo), para retomar.
+
+        Yields:
+            List[dict] com os registros da página.
+        """
+        try:
+            for itens in paginar(self._db, tamanho, apos, self._resiliencia.consultar):
+                yield [valor for _, valor in itens if isinstance(valor, dict)]
+        except Exception as e:
+            logger.error(f"[{self._collection}] Erro ao paginar registros: {e}")
+            raise
+
+    def listar_dataframe(self, colunas: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Lista a coleção como DataFrame, montado direto dos dicionários do RTDB
+        (sem instanciar um modelo por registro). Subclasses acrescentam colunas
+        derivadas e tipos categóricos.
+
+        Args:
+            colunas: Colunas desejadas, nesta ordem (ausentes ficam vazias).
+
+        Returns:
+            pd.DataFrame: Um registro por linha.
+        """
+        try:
+            registros = [r for r in FirebaseDAO.listar_todos(self) if isinstance(r, dict)]
+            df = pd.DataFrame.from_records(registros)
+            if colunas is not None:
+                df = df.reindex(columns=colunas)
+            return df
+
+        except Exception as e:
+            logger.error(f"[{self._collection}] Erro ao listar registros em DataFrame: {e}")
+            return pd.DataFrame(columns=colunas or [])
+
     def atualizar(self, id: str, data: Dict[str, Any]) -> bool:
         """
         Atualiza um registro existente.
@@ -117,12 +507,44 @@ class FirebaseDAO(ABC):
             if not isinstance(data, dict):
                 raise ValueError("Data deve ser um dicionário")
 
-            # Verifica se o registro existe antes de atualizar
-            if not self.buscar_por_id(id):
+            # Verifica se o registro existe antes de atualizar (e guarda o valor antigo para os índices)
+            antigo = FirebaseDAO.buscar_por_id(self, id)
+            if not antigo:
                 logger.warning(f"[{self._collection}] Tentativa de atualizar registro inexistente: {id}")
                 return False
 
-            self._db.child(id).update(data)
+            caminhos = {f"{self._collection}/{id}/{campo}": valor for campo, valor in data.items()}
+            novo = {**antigo, **data}
+            caminhos.update(self._caminhos_derivados(id, antigo, novo))
+            self._gravar(caminhos)
+            self._notificar(id, antigo, novo)
+            logger.info(f"[{self._collection}] Registro atualizado com sucesso: {id}")
+            return True
+
+        except Exception as e:
+            logger.error(f"[{self._collection}] Erro ao atualizar registro '{id}': {e}")
+            return False
+
+    async def atualizar_async(self, id: str, data: Dict[str, Any]) -> bool:
+        """Versão assíncrona de atualizar."""
+        try:
+            if not id or not isinstance(id, str):
+                raise ValueError("ID deve ser uma string não vazia")
+
+            if not isinstance(data, dict):
+                raise ValueError("Data deve ser um dicionário")
+
+            # Verifica se o registro existe antes de atualizar (e guarda o valor antigo para os índices)
+            antigo = await FirebaseDAO.buscar_por_id_async(self, id)
+            if not antigo:
+                logger.warning(f"[{self._collection}] Tentativa de atualizar registro inexistente: {id}")
+                return False
+
+            caminhos = {f"{self._collection}/{id}/{campo}": valor for campo, valor in data.items()}
+            novo = {**antigo, **data}
+            caminhos.update(self._caminhos_derivados(id, antigo, novo))
+            await self._gravar_async(caminhos)
+            await self._notificar_async(id, antigo, novo)
             logger.info(f"[{self._collection}] Registro atualizado com sucesso: {id}")
             return True
 
@@ -145,11 +567,38 @@ class FirebaseDAO(ABC):
                 raise ValueError("ID deve ser uma string não vazia")
 
             # Verifica se o registro existe antes de deletar
-            if not self.buscar_por_id(id):
+            antigo = FirebaseDAO.buscar_por_id(self, id)
+            if not antigo:
+                logger.warning(f"[{self._collection}] Tentativa de deletar registro inexistente: {id}")
+                return False
+
+            caminhos = {f"{self._collection}/{id}": None}
+            caminhos.update(self._caminhos_derivados(id, antigo, None))
+            self._gravar(caminhos)
+            self._notificar(id, antigo, None)
+            logger.info(f"[{self._collection}] Registro deletado com sucesso: {id}")
+            return True
+
+        except Exception as e:
+            logger.error(f"[{self._collection}] Erro ao deletar registro '{id}': {e}")
+            return False
+
+    async def deletar_async(self, id: str) -> bool:
+        """Versão assíncrona de deletar."""
+        try:
+            if not id or not isinstance(id, str):
+                raise ValueError("ID deve ser uma string não vazia")
+
+            # Verifica se o registro existe antes de deletar
+            antigo = await FirebaseDAO.buscar_por_id_async(self, id)
+            if not antigo:
                 logger.warning(f"[{self._collection}] Tentativa de deletar registro inexistente: {id}")
                 return False
 
-            self._db.child(id).delete()
+            caminhos = {f"{self._collection}/{id}": None}
+            caminhos.update(self._caminhos_derivados(id, antigo, None))
+            await self._gravar_async(caminhos)
+            await self._notificar_async(id, antigo, None)
             logger.info(f"[{self._collection}] Registro deletado com sucesso: {id}")
             return True
 
@@ -166,9 +615,16 @@ class FirebaseDAO(ABC):
 
         Returns:
             bool: True se existe, False caso contrário.
+
+        Raises:
+            Os de buscar_por_id, se o banco estiver indisponível.
         """
         return self.buscar_por_id(id) is not None
 
+    async def existe_async(self, id: str) -> bool:
+        """Versão assíncrona de existe."""
+        return await FirebaseDAO.buscar_por_id_async(self, id) is not None
+
     def contar_registros(self) -> int:
         """
         Conta o número total de registros na coleção.
@@ -177,13 +633,619 @@ class FirebaseDAO(ABC):
             int: Quantidade de registros.
         """
         try:
-            snapshot = self._db.get()
-            if snapshot and snapshot.val():
-                dados = snapshot.val()
-                if isinstance(dados, dict):
-                    return len(dados)
+            # Leitura rasa: traz apenas as chaves, sem o conteúdo dos registros
+            dados = self._ler(f"{self._collection}?shallow", lambda: self._db.get(shallow=True))
+            if isinstance(dados, dict):
+                return len(dados)
+            return 0
+
+        except Exception as e:
+            logger.error(f"[{self._collection}] Erro ao contar registros: {e}")
+            return 0
+
+    async def contar_registros_async(self) -> int:
+        """Versão assíncrona de contar_registros."""
+        try:
+            # Leitura rasa: traz apenas as chaves, sem o conteúdo dos registros
+            dados = await self._ler_async(self._collection, shallow=True)
+            if isinstance(dados, dict):
+                return len(dados)
             return 0
 
         except Exception as e:
             logger.error(f"[{self._collection}] Erro ao contar registros: {e}")
             return 0
+
+    def atualizar_caminhos(self, caminhos: Dict[str, Any]) -> bool:
+        """
+        Grava vários caminhos do RTDB em uma única escrita atômica (multi-path update).
+        Os caminhos são relativos à raiz do banco; valor None remove o nó.
+
+        Args:
+            caminhos: Dicionário {"colecao/id/campo": valor}.
+
+        Returns:
+            bool: True se gravado com sucesso, False caso contrário.
+        """
+        try:
+            if not isinstance(caminhos, dict):
+                raise ValueError("Caminhos devem ser um dicionário")
+            if not caminhos:
+                return True
+
+            self._gravar(caminhos)
+            logger.info(f"[{self._collection}] {len(caminhos)} caminho(s) gravado(s) em escrita atômica")
+            return True
+
+        except Exception as e:
+            logger.error(f"[{self._collection}] Erro ao gravar caminhos em lote: {e}")
+            return False
+
+    async def atualizar_caminhos_async(self, caminhos: Dict[str, Any]) -> bool:
+        """Versão assíncrona de atualizar_caminhos."""
+        try:
+            if not isinstance(caminhos, dict):
+                raise ValueError("Caminhos devem ser um dicionário")
+            if not caminhos:
+                return True
+
+            await self._gravar_async(caminhos)
+            logger.info(f"[{self._collection}] {len(caminhos)} caminho(s) gravado(s) em escrita atômica")
+            return True
+
+        except Exception as e:
+            logger.error(f"[{self._collection}] Erro ao gravar caminhos em lote: {e}")
+            return False
+
+    def transacao(
+        self,
+        id: str,
+        funcao: Callable[[Optional[Dict[str, Any]]], Dict[str, Any]],
+        tentativas: int = 3
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Aplica uma alteração atômica (compare-and-set) sobre um registro.
+        A função recebe o valor atual e devolve o novo; o cliente do RTDB a
+        reexecuta quando outro escritor altera o registro no meio do caminho.
+        Se ainda assim houver contenção, tenta de novo com backoff exponencial.
+
+        Args:
+            id: Identificador do registro.
+            funcao: Função pura valor_atual -> novo_valor. Pode lançar
+                ValueError para abortar (ex.: saldo insuficiente).
+            tentativas: Quantidade de rodadas em caso de contenção.
+
+        Returns:
+            Dict com o valor gravado, ou None se abortada/falhou.
+        """
+        try:
+            if not id or not isinstance(id, str):
+                raise ValueError("ID deve ser uma string não vazia")
+            if not callable(funcao):
+                raise ValueError("Função da transação deve ser chamável")
+
+            from firebase_admin.db import TransactionAbortedError
+
+            def carimbada(atual):
+                novo = funcao(atual)
+                if self._sincronizavel and isinstance(novo, dict):
+                    novo = {**novo, CAMPO_ATUALIZADO_EM: CARIMBO_SERVIDOR}
+                return novo
+
+            for tentativa in range(1, tentativas + 1):
+                try:
+                    resultado = self._db.child(id).transaction(carimbada)
+                    self._invalidar_espelhos((self._collection,))
+                    return resultado
+                except TransactionAbortedError:
+                    if tentativa == tentativas:
+                        raise
+                    espera = (2 ** tentativa) * 0.05 + random.uniform(0, 0.05)
+                    logger.warning(f"[{self._collection}] Contenção na transação de '{id}', nova tentativa em {espera:.2f}s")
+                    time.sleep(espera)
+
+        except ValueError as e:
+            logger.warning(f"[{self._collection}] Transação abortada em '{id}': {e}")
+            return None
+        except Exception as e:
+            logger.error(f"[{self._collection}] Erro na transação do registro '{id}': {e}")
+            return None
+
+    def _ler(self, chave: str, funcao: Callable[[], Any]) -> Any:
+        """
+        Leitura pela camada de resiliência (timeout, novas tentativas, disjuntor);
+        se o backend falhar, devolve a última leitura da mesma chave.
+        """
+        return self._resiliencia.ler(chave, funcao)
+
+    def _gravar(self, caminhos: Dict[str, Any]) -> None:
+        """
+        Multi-path update pela camada de resiliência. Só é repetido em falha
+        transitória se não tiver server values (incrementos): gravar os mesmos
+        valores de novo não muda nada, somar de novo muda.
+        """
+        caminhos = self._carimbar(caminhos)
+        self._resiliencia.escrever(
+            lambda: self._raiz.update(caminhos),
+            idempotente=not any(_tem_incremento(v) for v in caminhos.values())
+        )
+        self._invalidar_espelhos(caminhos)
+
+    async def _ler_async(self, caminho: str, shallow: bool = False) -> Any:
+        """Versão assíncrona de _ler, pelo cliente REST; a chave do cache é o caminho."""
+        chave = f"{caminho}?shallow" if shallow else caminho
+        return await self._resiliencia.ler_async(chave, lambda: self.cliente_assincrono.get(caminho, shallow=shallow))
+
+    async def _gravar_async(self, caminhos: Dict[str, Any]) -> None:
+        """Versão assíncrona de _gravar."""
+        caminhos = self._carimbar(caminhos)
+        await self._resiliencia.escrever_async(
+            lambda: self.cliente_assincrono.update("", caminhos),
+            idempotente=not any(_tem_incremento(v) for v in caminhos.values())
+        )
+        self._invalidar_espelhos(caminhos)
+
+    @staticmethod
+    def _invalidar_espelhos(caminhos: Iterable[str]) -> None:
+        # Escrita deste processo: a próxima sincronização com idade máxima
+        # (buscas em memória) vai ao banco em vez de reaproveitar a anterior
+        for colecao in {caminho.partition("/")[0] for caminho in caminhos}:
+            espelho = FirebaseDAO._espelhos.get(colecao)
+            if espelho is not None:
+                espelho.invalidar()
+
+    def _carimbar(self, caminhos: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Acrescenta à escrita o atualizado_em dos registros da coleção que ela
+        toca e as marcas de exclusão dos que ela remove (uma nova gravação do
+        registro inteiro apaga a marca).
+        """
+        if not self._sincronizavel:
+            return caminhos
+        prefixo = f"{self._collection}/"
+        carimbados = dict(caminhos)
+        for caminho, valor in caminhos.items():
+            if not caminho.startswith(prefixo):
+                continue
+            id, _, campo = caminho[len(prefixo):].partition("/")
+            if not id:
+                continue
+            registro = f"{prefixo}{id}"
+            exclusao = f"{self._RAIZ_EXCLUIDOS}/{self._collection}/{id}"
+            if not campo:
+                if valor is None:
+                    carimbados[exclusao] = CARIMBO_SERVIDOR
+                elif isinstance(valor, dict):
+                    carimbados[caminho] = {**valor, CAMPO_ATUALIZADO_EM: CARIMBO_SERVIDOR}
+                    carimbados[exclusao] = None
+            elif registro not in caminhos:
+                carimbados[f"{registro}/{CAMPO_ATUALIZADO_EM}"] = CARIMBO_SERVIDOR
+        return carimbados
+
+    def sincronizar_desde(self, desde: int, tamanho: int = 1000) -> Optional[Dict[str, Any]]:
+        """
+        Registros alterados e removidos a partir de um instante, por consultas
+        ordenadas em atualizado_em e nas marcas de exclusão (custo proporcional
+        ao que mudou, não ao tamanho da coleção).
+
+        Args:
+            desde: Instante inicial em ms (inclusivo), do relógio do servidor.
+            tamanho: Registros por consulta.
+
+        Returns:
+            Dict com alterados ({id: dados}), removidos ({id: instante}),
+            arquivados (os removidos que foram arquivados, {id: instante}), marcador (maior instante visto, para a próxima chamada),
+            recarregar (True se as marcas após `desde` já foram podadas e só
+            uma leitura completa é confiável) e podado_ate (o limite da poda,
+            ou None); None se falhou.
+        """
+        try:
+            if not self._sincronizavel:
+                raise ValueError(f"Coleção '{self._collection}' não tem sincronização incremental")
+            caminho_podado = f"{self._RAIZ_SINCRONIZACAO}/{self._collection}/exclusoes_podadas_ate"
+            podado_ate = self._resiliencia.consultar(self._raiz.child(caminho_podado).get)
+            alterados = self._consultar_desde(
+                lambda inicio, n: self._db.order_by_child(CAMPO_ATUALIZADO_EM).start_at(inicio).limit_to_first(n).get(),
+                carimbo, desde, tamanho
+            )
+            removidos = self._consultar_desde(
+                lambda inicio, n: self._raiz.child(f"{self._RAIZ_EXCLUIDOS}/{self._collection}")
+                .order_by_value().start_at(inicio).limit_to_first(n).get(),
+                _instante, desde, tamanho
+            )
+            # Depois das exclusões: a marca de arquivamento é gravada junto com a
+            # de exclusão, então toda remoção vista acima tem a sua marca aqui
+            arquivados = self._consultar_desde(
+                lambda inicio, n: self._raiz.child(f"{self._RAIZ_ARQUIVADOS}/{self._collection}")
+                .order_by_value().start_at(inicio).limit_to_first(n).get(),
+                _instante, desde, tamanho
+            ) if self._arquivavel else {}
+            return self._delta(desde, alterados, removidos, podado_ate, arquivados)
+        except Exception as e:
+            logger.error(f"[{self._collection}] Erro ao sincronizar desde {desde}: {e}")
+            return None
+
+    async def sincronizar_desde_async(self, desde: int, tamanho: int = 1000) -> Dict[str, Any]:
+        """
+        Versão assíncrona de sincronizar_desde; as três leituras correm em
+        paralelo (as marcas de arquivamento vêm depois delas). Erros do banco
+        são propagados.
+        """
+        if not self._sincronizavel:
+            raise ValueError(f"Coleção '{self._collection}' não tem sincronização incremental")
+        caminho_podado = f"{self._RAIZ_SINCRONIZACAO}/{self._collection}/exclusoes_podadas_ate"
+        alterados, removidos, podado_ate = await asyncio.gather(
+            self._consultar_desde_async(self._collection, CAMPO_ATUALIZADO_EM, carimbo, desde, tamanho),
+            self._consultar_desde_async(f"{self._RAIZ_EXCLUIDOS}/{self._collection}", "$value", _instante, desde, tamanho),
+            self._resiliencia.consultar_async(lambda: self.cliente_assincrono.get(caminho_podado))
+        )
+        arquivados = await self._consultar_desde_async(
+            f"{self._RAIZ_ARQUIVADOS}/{self._collection}", "$value", _instante, desde, tamanho
+        ) if self._arquivavel else {}
+        return self._delta(desde, alterados, removidos, podado_ate, arquivados)
+
+    @staticmethod
+    def _delta(
+        desde: int,
+        alterados: Dict[str, Any],
+        removidos: Dict[str, Any],
+        podado_ate: Any,
+        arquivados: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        alterados = {id: r for id, r in alterados.items() if isinstance(r, dict)}
+        removidos = {id: v for id, v in removidos.items() if isinstance(v, int)}
+        # Uma marca de arquivamento antiga não vale para uma exclusão posterior
+        arquivados = {id: v for id, v in (arquivados or {}).items() if removidos.get(id) == v}
+        instantes = [carimbo(r) for r in alterados.values()] + list(removidos.values())
+        return {
+            "alterados": alterados,
+            "removidos": removidos,
+            "arquivados": arquivados,
+            "marcador": max(instantes + [desde]),
+            "recarregar": isinstance(podado_ate, int) and desde < podado_ate,
+            "podado_ate": podado_ate if isinstance(podado_ate, int) else None
+        }
+
+    def _consultar_desde(
+        self,
+        consulta: Callable[[int, int], Any],
+        instante: Callable[[Any], int],
+        desde: int,
+        tamanho: int
+    ) -> Dict[str, Any]:
+        # Pagina pela própria ordenação: a próxima página começa no maior
+        # instante da anterior (inclusivo, repetidos são descartados); uma
+        # página toda com o mesmo instante dobra o tamanho para avançar
+        resultado: Dict[str, Any] = {}
+        inicio = desde
+        while True:
+            pagina = self._resiliencia.consultar(lambda: consulta(inicio, tamanho)) or {}
+            resultado.update(pagina)
+            if len(pagina) < tamanho:
+                return resultado
+            maior = max(instante(v) for v in pagina.values())
+            if maior <= inicio:
+                tamanho *= 2
+            inicio = max(maior, inicio)
+
+    async def _consultar_desde_async(
+        self,
+        caminho: str,
+        ordem: str,
+        instante: Callable[[Any], int],
+        desde: int,
+        tamanho: int
+    ) -> Dict[str, Any]:
+        # Mesma paginação de _consultar_desde, pelo cliente REST
+        resultado: Dict[str, Any] = {}
+        inicio = desde
+        while True:
+            pagina = await self._resiliencia.consultar_async(
+                lambda: self.cliente_assincrono.get(caminho, ordem=ordem, inicio=inicio, primeiros=tamanho)
+            ) or {}
+            resultado.update(pagina)
+            if len(pagina) < tamanho:
+                return resultado
+            maior = max(instante(v) for v in pagina.values())
+            if maior <= inicio:
+                tamanho *= 2
+            inicio = max(maior, inicio)
+
+    def espelho(self) -> EspelhoColecao:
+        """
+        Espelho local da coleção, único no processo (ver dao/espelho.py),
+        gravado no cache em disco (dao/cache_disco.py) quando ligado.
+        """
+        espelho = FirebaseDAO._espelhos.get(self._collection)
+        if espelho is None:
+            with FirebaseDAO._lock_espelhos:
+                espelho = FirebaseDAO._espelhos.get(self._collection)
+                if espelho is None:
+                    espelho = FirebaseDAO._espelhos[self._collection] = EspelhoColecao(self, obter_cache_disco())
+        return espelho
+
+    def podar_exclusoes(self, antes_de: int, tamanho: int = 1000) -> int:
+        """
+        Remove as marcas de exclusão (e de arquivamento) anteriores a um
+        instante. Espelhos com marcador mais antigo que isso passam a
+        recarregar a coleção inteira.
+
+        Args:
+            antes_de: Instante em ms (exclusivo).
+            tamanho: Marcas removidas por escrita.
+
+        Returns:
+            int: Marcas de exclusão removidas.
+        """
+        if not self._sincronizavel:
+            return 0
+        limite = {f"{self._RAIZ_SINCRONIZACAO}/{self._collection}/exclusoes_podadas_ate": antes_de}
+        # O novo limite é gravado antes (e junto) da remoção das marcas
+        self._gravar(limite)
+        removidas = self._podar_marcas(f"{self._RAIZ_EXCLUIDOS}/{self._collection}", antes_de, tamanho, limite)
+        if self._arquivavel:
+            self._podar_marcas(f"{self._RAIZ_ARQUIVADOS}/{self._collection}", antes_de, tamanho, limite)
+        return removidas
+
+    def _podar_marcas(self, raiz: str, antes_de: int, tamanho: int, limite: Dict[str, Any]) -> int:
+        removidas = 0
+        while True:
+            marcas = self._resiliencia.consultar(
+                self._raiz.child(raiz).order_by_value().end_at(antes_de - 1).limit_to_first(tamanho).get
+            ) or {}
+            if not marcas:
+                return removidas
+            self._gravar({**limite, **{f"{raiz}/{id}": None for id in marcas}})
+            removidas += len(marcas)
+
+    @classmethod
+    def observar(
+        cls,
+        colecao: str,
+        callback: Callable[[str, Optional[Dict[str, Any]], Optional[Dict[str, Any]]], None]
+    ) -> None:
+        """
+        Registra uma função chamada após cada criar/atualizar/deletar bem-sucedido
+        na coleção, com (id, antigo, novo). antigo é None na criação e novo é
+        None na remoção. Usado por índices e agregados mantidos em memória.
+        """
+        if not callable(callback):
+            raise ValueError("Callback deve ser chamável")
+        observadores = cls._observadores.setdefault(colecao, [])
+        if callback not in observadores:
+            observadores.append(callback)
+
+    @classmethod
+    def deixar_de_observar(cls, colecao: str, callback) -> None:
+        """Remove um observador registrado com observar()."""
+        observadores = cls._observadores.get(colecao, [])
+        if callback in observadores:
+            observadores.remove(callback)
+
+    def _notificar(
+        self,
+        id: str,
+        antigo: Optional[Dict[str, Any]],
+        novo: Optional[Dict[str, Any]]
+    ) -> None:
+        # A escrita já foi confirmada: falhas de observadores não a desfazem
+        for callback in list(FirebaseDAO._observadores.get(self._collection, ())):
+            try:
+                callback(id, antigo, novo)
+            except Exception as e:
+                logger.error(f"[{self._collection}] Erro no observador de escrita '{id}': {e}")
+
+    async def _notificar_async(
+        self,
+        id: str,
+        antigo: Optional[Dict[str, Any]],
+        novo: Optional[Dict[str, Any]]
+    ) -> None:
+        # Observadores podem bloquear (locks de índices em memória) e chamar a
+        # API síncrona: rodam fora da thread do laço, que ficaria travada
+        if FirebaseDAO._observadores.get(self._collection):
+            await asyncio.to_thread(self._notificar, id, antigo, novo)
+
+    def registrar_indice(self, nome: str, campo: str, normalizador: Callable[[Any], Optional[str]]) -> None:
+        """
+        Registra um índice de busca exata sobre um campo do registro.
+
+        Args:
+            nome: Nome do índice (ex.: "cpf").
+            campo: Campo do registro indexado.
+            normalizador: Função que normaliza o valor (o mesmo é aplicado na busca).
+        """
+        if not nome or not isinstance(nome, str):
+            raise ValueError("Nome do índice deve ser uma string não vazia")
+        if not callable(normalizador):
+            raise ValueError("Normalizador do índice deve ser chamável")
+        self._indices[nome] = (campo, normalizador)
+
+    def possui_indice(self, nome: str) -> bool:
+        """Indica se a DAO mantém um índice com este nome."""
+        return nome in self._indices
+
+    def buscar_por_indice(self, nome: str, valor: Any) -> List[Dict[str, Any]]:
+        """
+        Busca registros pelo valor exato (normalizado) de um índice.
+        Lê apenas a entrada do índice e os registros encontrados.
+
+        Args:
+            nome: Nome do índice registrado.
+            valor: Valor procurado (é normalizado como na gravação).
+
+        Returns:
+            Lista de dicionários dos registros encontrados.
+
+        Raises:
+            CircuitoAberto, TempoEsgotado ou erro transitório: banco
+            indisponível; não vira lista vazia.
+        """
+        try:
+            if nome not in self._indices:
+                raise ValueError(f"Índice '{nome}' não registrado em {self._collection}")
+            campo, normalizador = self._indices[nome]
+            chave = normalizador(valor)
+            if not chave:
+                return []
+
+            if not self._indices_prontos():
+                # Base ainda sem índices: mantém o comportamento antigo (varredura)
+                return [r for r in FirebaseDAO._listar(self) if normalizador(r.get(campo)) == chave]
+
+            caminho = f"{self._RAIZ_INDICES}/{self._collection}/{nome}/{codificar_chave(chave)}"
+            ids = self._ler(caminho, self._raiz.child(caminho).get) or {}
+            return list(FirebaseDAO.buscar_varios(self, ids).values())
+
+        except Exception as e:
+            logger.error(f"[{self._collection}] Erro ao buscar pelo índice '{nome}': {e}")
+            if indisponivel(e):
+                raise
+            return []
+
+    def chave_indice(self, nome: str, valor: Any) -> Optional[str]:
+        """
+        Chave de um valor no índice (normalizada e codificada como na gravação),
+        ou None se o valor normalizado for vazio.
+        """
+        if nome not in self._indices:
+            raise ValueError(f"Índice '{nome}' não registrado em {self._collection}")
+        chave = self._indices[nome][1](valor)
+        return codificar_chave(chave) if chave else None
+
+    def chaves_indice(self, nome: str) -> Optional[Set[str]]:
+        """
+        Todas as chaves (normalizadas e codificadas) presentes em um índice, em
+        uma leitura rasa da raiz do índice. Sem índices construídos, calcula as
+        chaves a partir da coleção. Útil para checar duplicidade em massa.
+
+        Args:
+            nome: Nome do índice registrado.
+
+        Returns:
+            Set[str]: Chaves no formato codificar_chave(normalizador(valor)),
+            ou None se a leitura falhou (diferente de índice vazio).
+        """
+        try:
+            if nome not in self._indices:
+                raise ValueError(f"Índice '{nome}' não registrado em {self._collection}")
+            campo, normalizador = self._indices[nome]
+
+            if not self._indices_prontos():
+                chaves = (normalizador(r.get(campo)) for r in FirebaseDAO.listar_todos(self))
+                return {codificar_chave(c) for c in chaves if c}
+
+            caminho = f"{self._RAIZ_INDICES}/{self._collection}/{nome}"
+            dados = self._ler(f"{caminho}?shallow", lambda: self._raiz.child(caminho).get(shallow=True))
+            return set(dados) if isinstance(dados, dict) else set()
+
+        except Exception as e:
+            logger.error(f"[{self._collection}] Erro ao ler as chaves do índice '{nome}': {e}")
+            return None
+
+    def reconstruir_indices(self) -> int:
+        """
+        Recria todos os índices da coleção a partir dos registros (migração única).
+
+        Returns:
+            int: Quantidade de registros indexados.
+        """
+        try:
+            raiz_colecao = f"{self._RAIZ_INDICES}/{self._collection}"
+            self._gravar({raiz_colecao: None})
+            # Sem o cache de obsoletos: uma leitura antiga reconstruiria índices errados
+            dados = self._resiliencia.consultar(self._db.get) or {}
+            caminhos: Dict[str, Any] = {}
+            for id, registro in dados.items():
+                if isinstance(registro, dict):
+                    caminhos.update(self._caminhos_indices(id, None, registro))
+                if len(caminhos) >= 1000:
+                    self._gravar(caminhos)
+                    caminhos = {}
+            caminhos[f"{raiz_colecao}/_construido"] = True
+            self._gravar(caminhos)
+            self._indices_construidos = True
+            logger.info(f"[{self._collection}] Índices reconstruídos para {len(dados)} registro(s)")
+            return len(dados)
+
+        except Exception as e:
+            logger.error(f"[{self._collection}] Erro ao reconstruir índices: {e}")
+            return 0
+
+    def marcar_indices_construidos(self) -> bool:
+        """
+        Marca os índices como completos sem reconstruí-los. Só é correto quando
+        todos os registros foram gravados por esta DAO (ex.: carga inicial em
+        uma coleção vazia), pois cada escrita já mantém os índices.
+        """
+        if self.atualizar_caminhos({f"{self._RAIZ_INDICES}/{self._collection}/_construido": True}):
+            self._indices_construidos = True
+            return True
+        return False
+
+    def _indices_prontos(self) -> bool:
+        # A instância é compartilhada pelo processo (ver dao.registro): o marcador
+        # positivo vale para sempre; o negativo é reconsultado de tempos em tempos,
+        # para enxergar a migração rodada por outro processo.
+        if not self._indices_construidos and time.monotonic() >= self._reverificar_indices_em:
+            caminho = f"{self._RAIZ_INDICES}/{self._collection}/_construido"
+            marcador = self._resiliencia.consultar(self._raiz.child(caminho).get)
+            self._indices_construidos = bool(marcador)
+            if not self._indices_construidos:
+                self._reverificar_indices_em = time.monotonic() + REVERIFICAR_MARCADOR
+                logger.warning(f"[{self._collection}] Índices ainda não construídos; buscas farão varredura. "
+                               f"Execute reconstruir_indices().")
+        return bool(self._indices_construidos)
+
+    def _caminhos_lote(self, registros: Dict[str, Dict[str, Any]], extras: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        # Caminhos de criar_em_lote: os registros, seus derivados (incrementos
+        # do mesmo agregado somados) e os extras
+        if not isinstance(registros, dict):
+            raise ValueError("Registros devem ser um dicionário {id: dados}")
+        caminhos: Dict[str, Any] = {}
+        for id, data in registros.items():
+            if not id or not isinstance(id, str) or not isinstance(data, dict):
+                raise ValueError(f"Registro inválido no lote: '{id}'")
+            caminhos[f"{self._collection}/{id}"] = data
+            _somar_caminhos(caminhos, self._caminhos_derivados(id, None, data))
+        caminhos.update(extras or {})
+        return caminhos
+
+    def _caminhos_derivados(
+        self,
+        id: str,
+        antigo: Optional[Dict[str, Any]],
+        novo: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Caminhos derivados do registro (índices, agregados) gravados na mesma
+        escrita atômica. Subclasses podem estender chamando super().
+
+        Args:
+            id: ID do registro.
+            antigo: Valor anterior (None na criação).
+            novo: Valor resultante (None na remoção).
+
+        Returns:
+            Dict[caminho, valor] relativo à raiz.
+        """
+        return self._caminhos_indices(id, antigo, novo)
+
+    def _caminhos_indices(
+        self,
+        id: str,
+        antigo: Optional[Dict[str, Any]],
+        novo: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        caminhos: Dict[str, Any] = {}
+        for nome, (campo, normalizador) in self._indices.items():
+            chave_antiga = normalizador(antigo.get(campo)) if antigo else None
+            chave_nova = normalizador(novo.get(campo)) if novo else None
+            if chave_antiga == chave_nova:
+                continue
+            base = f"{self._RAIZ_INDICES}/{self._collection}/{nome}"
+            if chave_antiga:
+                caminhos[f"{base}/{codificar_chave(chave_antiga)}/{id}"] = None
+            if chave_nova:
+                caminhos[f"{base}/{codificar_chave(chave_nova)}/{id}"] = True
+        return caminhos
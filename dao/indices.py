@@ -0,0 +1,58 @@
+# dao/indices.py
+
+import re
+import unicodedata
+from typing import Any, Optional
+
+# Caracteres proibidos em chaves do RTDB (mais o próprio '%', usado no escape)
+_CARACTERES_RESERVADOS = {c: f"%{ord(c):02X}" for c in "%.$#[]/"}
+
+# Diacríticos combinantes (acentos, til, cedilha) após a decomposição NFKD
+_DIACRITICOS = re.compile("[\u0300-\u036f]")
+
+
+def normalizar_digitos(valor: Any) -> Optional[str]:
+    """
+    Mantém apenas os dígitos (CPF, telefone, CNH). Retorna None se não sobrar nada.
+    """
+    if not isinstance(valor, str):
+        return None
+    digitos = "".join(filter(str.isdigit, valor))
+    return digitos or None
+
+
+def normalizar_texto(valor: Any) -> Optional[str]:
+    """
+    Casefold e espaços colapsados (nomes, e-mails). Retorna None se vazio.
+    """
+    if not isinstance(valor, str):
+        return None
+    if not valor.isascii():
+        valor = unicodedata.normalize("NFC", valor)
+    texto = " ".join(valor.casefold().split())
+    return texto or None
+
+
+def remover_acentos(valor: str) -> str:
+    """
+    Remove acentos e cedilha ("João Conceição" -> "Joao Conceicao").
+    """
+    if valor.isascii():
+        return valor
+    return _DIACRITICOS.sub("", unicodedata.normalize("NFKD", valor))
+
+
+def dobrar_texto(valor: Any) -> Optional[str]:
+    """
+    Normalização para buscas tolerantes: casefold, sem acentos e espaços colapsados.
+    Retorna None se vazio.
+    """
+    texto = normalizar_texto(valor)
+    return remover_acentos(texto) if texto else None
+
+
+def codificar_chave(valor: str) -> str:
+    """
+    Escapa os caracteres não permitidos em chaves do RTDB.
+    """
+    return "".join(_CARACTERES_RESERVADOS.get(c, c) for c in valor)
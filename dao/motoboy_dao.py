@@ -1,13 +1,18 @@
 # dao/motoboy_dao.py
 
 import uuid
-from typing import List, Optional
-from dao.firebase_dao import FirebaseDAO
+from typing import Any, List, Optional
+import pandas as pd
+from dao.firebase_dao import FirebaseDAO, categorizar, juntar_listas, preencher_textos
+from dao.indices import normalizar_digitos, normalizar_texto
+from dao.resiliencia import indisponivel
 from models.motoboy import Motoboy
 import logging
 
 logger = logging.getLogger(__name__)
 
+_STATUS = ("Online", "Offline")
+
 
 class MotoboyDAO(FirebaseDAO):
     """
@@ -17,6 +22,11 @@ class MotoboyDAO(FirebaseDAO):
 
     def __init__(self):
         super().__init__(collection="motoboys")
+        # Índices de busca exata: CPF/telefone/CNH por dígitos, nome sem caixa
+        self.registrar_indice("cpf", "cpf", normalizar_digitos)
+        self.registrar_indice("telefone", "telefone", normalizar_digitos)
+        self.registrar_indice("nome", "nome", normalizar_texto)
+        self.registrar_indice("cnh", "cnh", normalizar_digitos)
 
     def criar(self, motoboy: Motoboy) -> Optional[str]:
         """
@@ -64,6 +74,8 @@ class MotoboyDAO(FirebaseDAO):
             return None
         except Exception as e:
             logger.error(f"[motoboys] Erro ao buscar motoboy por ID '{id}': {e}")
+            if indisponivel(e):
+                raise
             return None
 
     def buscar_por_nome(self, nome: str) -> Optional[Motoboy]:
@@ -79,13 +91,13 @@ class MotoboyDAO(FirebaseDAO):
         try:
             if not nome or not isinstance(nome, str):
                 return None
-            todos = self.listar_todos()
-            for m in todos:
-                if m.nome.lower() == nome.lower():
-                    return m
-            return None
+
+            encontrados = self.buscar_por_indice("nome", nome)
+            return encontrados[0] if encontrados else None
         except Exception as e:
             logger.error(f"[motoboys] Erro ao buscar motoboy por nome '{nome}': {e}")
+            if indisponivel(e):
+                raise
             return None
 
     def buscar_por_cpf(self, cpf: str) -> Optional[Motoboy]:
@@ -102,15 +114,12 @@ class MotoboyDAO(FirebaseDAO):
             if not cpf or not isinstance(cpf, str):
                 return None
 
-            cpf_limpo = ''.join(filter(str.isdigit, cpf))
-            todos = self.listar_todos()
-            for m in todos:
-                m_cpf_limpo = ''.join(filter(str.isdigit, m.cpf))
-                if m_cpf_limpo == cpf_limpo:
-                    return m
-            return None
+            encontrados = self.buscar_por_indice("cpf", cpf)
+            return encontrados[0] if encontrados else None
         except Exception as e:
             logger.error(f"[motoboys] Erro ao buscar motoboy por CPF '{cpf}': {e}")
+            if indisponivel(e):
+                raise
             return None
 
     def buscar_por_cnh(self, cnh: str) -> Optional[Motoboy]:
@@ -127,17 +136,33 @@ class MotoboyDAO(FirebaseDAO):
             if not cnh or not isinstance(cnh, str):
                 return None
 
-            cnh_limpa = ''.join(filter(str.isdigit, cnh))
-            todos = self.listar_todos()
-            for m in todos:
-                m_cnh_limpa = ''.join(filter(str.isdigit, m.cnh))
-                if m_cnh_limpa == cnh_limpa:
-                    return m
-            return None
+            encontrados = self.buscar_por_indice("cnh", cnh)
+            return encontrados[0] if encontrados else None
         except Exception as e:
             logger.error(f"[motoboys] Erro ao buscar motoboy por CNH '{cnh}': {e}")
+            if indisponivel(e):
+                raise
             return None
 
+    def buscar_por_indice(self, nome: str, valor: Any) -> List[Motoboy]:
+        """
+        Busca motoboys pelo valor exato de um índice (cpf, telefone, nome, cnh).
+
+        Args:
+            nome: Nome do índice.
+            valor: Valor procurado (normalizado como na gravação).
+
+        Returns:
+            List[Motoboy]: Registros encontrados.
+        """
+        try:
+            return [Motoboy.from_dict(item) for item in super().buscar_por_indice(nome, valor)]
+        except Exception as e:
+            logger.error(f"[motoboys] Erro ao buscar pelo índice '{nome}': {e}")
+            if indisponivel(e):
+                raise
+            return []
+
     def listar_todos(self) -> List[Motoboy]:
         """
         Lista todos os motoboys.
@@ -152,6 +177,30 @@ class MotoboyDAO(FirebaseDAO):
             logger.error(f"[motoboys] Erro ao listar motoboys: {e}")
             return []
 
+    def listar_dataframe(self) -> pd.DataFrame:
+        """
+        Lista motoboys em DataFrame, com status categórico e zonas/horários em texto.
+
+        Returns:
+            pd.DataFrame: id, nome, cpf, cnh, telefone, status_operacional, zonas_atuacao,
+            horarios_disponiveis, avaliacao_media, tempo_medio_entrega, data_criacao.
+        """
+        try:
+            df = super().listar_dataframe([
+                "id", "nome", "cpf", "cnh", "telefone", "status_operacional", "zonas_atuacao",
+                "horarios_disponiveis", "avaliacao_media", "tempo_medio_entrega", "data_criacao"
+            ])
+            df["status_operacional"] = categorizar(df["status_operacional"], _STATUS)
+            df["zonas_atuacao"] = juntar_listas(df["zonas_atuacao"])
+            df["horarios_disponiveis"] = juntar_listas(df["horarios_disponiveis"])
+            preencher_textos(df, ["telefone", "data_criacao"])
+            for coluna in ("avaliacao_media", "tempo_medio_entrega"):
+                df[coluna] = pd.to_numeric(df[coluna], errors="coerce").fillna(0.0)
+            return df
+        except Exception as e:
+            logger.error(f"[motoboys] Erro ao listar motoboys em DataFrame: {e}")
+            return pd.DataFrame()
+
     def listar_ativos(self) -> List[Motoboy]:
         """
         Lista apenas motoboys com status 'Online'.
@@ -254,7 +303,10 @@ class MotoboyDAO(FirebaseDAO):
         """
         try:
             return (self.buscar_por_cpf(cpf) is not None) or (self.buscar_por_cnh(cnh) is not None)
-        except Exception:
+        except Exception as e:
+            # Com o banco fora não dá para afirmar que não existe: a criação falha
+            if indisponivel(e):
+                raise
             return False
 
     def obter_estatisticas(self) -> dict:
@@ -0,0 +1,100 @@
+# dao/registro.py
+
+import atexit
+import threading
+from typing import Callable, Dict, List, Type, TypeVar
+import logging
+
+from config.firebase_config import FirebaseConfig
+from dao.firebase_dao import FirebaseDAO
+
+logger = logging.getLogger(__name__)
+
+D = TypeVar("D", bound=FirebaseDAO)
+
+# Uma instância por classe de DAO, compartilhada por todas as sessões do processo.
+# As DAOs não guardam estado por usuário (só a referência ao banco, os índices
+# registrados e marcadores de migração), então podem ser usadas por várias
+# threads do Streamlit ao mesmo tempo.
+_instancias: Dict[type, FirebaseDAO] = {}
+# RLock: o construtor de uma DAO pode pedir outra (ex.: FidelidadeDAO -> extrato)
+_lock = threading.RLock()
+
+_ao_criar: List[Callable[[FirebaseDAO], None]] = []
+_ao_encerrar: List[Callable[[FirebaseDAO], None]] = []
+
+
+def obter_dao(classe: Type[D]) -> D:
+    """
+    Retorna a instância compartilhada da DAO, criando-a na primeira chamada
+    (e executando os ganchos de criação).
+
+    Args:
+        classe: Subclasse de FirebaseDAO com construtor sem argumentos.
+
+    Returns:
+        A instância única da classe neste processo.
+    """
+    dao = _instancias.get(classe)
+    if dao is not None:
+        return dao
+
+    with _lock:
+        dao = _instancias.get(classe)
+        if dao is None:
+            dao = classe()
+            for gancho in list(_ao_criar):
+                _executar(gancho, dao, "criação")
+            _instancias[classe] = dao
+            logger.info(f"[{dao.collection}] DAO compartilhada criada")
+        return dao
+
+
+def ao_criar(gancho: Callable[[FirebaseDAO], None]) -> None:
+    """
+    Registra um gancho chamado com cada DAO recém-criada, antes de ela ser
+    entregue (ex.: aquecer marcadores, registrar observadores). Também é
+    aplicado às DAOs que já existem.
+    """
+    with _lock:
+        _ao_criar.append(gancho)
+        for dao in list(_instancias.values()):
+            _executar(gancho, dao, "criação")
+
+
+def ao_encerrar(gancho: Callable[[FirebaseDAO], None]) -> None:
+    """Registra um gancho chamado com cada DAO no encerramento do registro."""
+    with _lock:
+        _ao_encerrar.append(gancho)
+
+
+def instancias() -> Dict[str, FirebaseDAO]:
+    """Retrato das DAOs já criadas, por nome da coleção."""
+    with _lock:
+        return {dao.collection: dao for dao in _instancias.values()}
+
+
+def encerrar() -> None:
+    """
+    Executa os ganchos de encerramento, descarta as instâncias e fecha as
+    conexões com o banco. Chamado automaticamente na saída do processo; a
+    próxima obter_dao() recria tudo do zero.
+    """
+    with _lock:
+        for dao in list(_instancias.values()):
+            for gancho in list(_ao_encerrar):
+                _executar(gancho, dao, "encerramento")
+        _instancias.clear()
+        if FirebaseConfig._instance is not None:
+            FirebaseConfig._instance.fechar()
+
+
+def _executar(gancho: Callable[[FirebaseDAO], None], dao: FirebaseDAO, fase: str) -> None:
+    # Um gancho com erro não impede o uso (nem o encerramento) da DAO
+    try:
+        gancho(dao)
+    except Exception as e:
+        logger.error(f"[{dao.collection}] Erro no gancho de {fase} {getattr(gancho, '__name__', gancho)}: {e}")
+
+
+atexit.register(encerrar)
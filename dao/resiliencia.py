@@ -0,0 +1,352 @@
+# dao/resiliencia.py
+
+import asyncio
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturoEsgotado
+from typing import Any, Awaitable, Callable, Dict, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Erros de rede/serviço que valem nova tentativa e contam para o disjuntor, pelo
+# nome da classe (firebase_admin, requests e httpx só são importados sob demanda).
+# Erros de validação, permissão etc. são do pedido, não do backend.
+_TRANSITORIOS = {
+    "UnavailableError", "DeadlineExceededError", "InternalError", "UnknownError",
+    "ResourceExhaustedError", "ConnectionError", "Timeout", "ChunkedEncodingError",
+    "TimeoutError", "ConnectionResetError", "BrokenPipeError",
+    "TransportError", "BackendIndisponivel"
+}
+
+
+class CircuitoAberto(Exception):
+    """O backend falhou seguidamente e as chamadas estão sendo recusadas."""
+
+
+class TempoEsgotado(TimeoutError):
+    """A operação passou do tempo limite."""
+
+
+def transitorio(erro: BaseException) -> bool:
+    """True se o erro indica indisponibilidade do backend (rede, timeout, 5xx)."""
+    return any(classe.__name__ in _TRANSITORIOS for classe in type(erro).__mro__)
+
+
+def indisponivel(erro: BaseException) -> bool:
+    """True se o erro é do banco fora do ar (circuito aberto ou falha transitória), não do pedido."""
+    return isinstance(erro, CircuitoAberto) or transitorio(erro)
+
+
+class Disjuntor:
+    """
+    Circuit breaker do backend, compartilhado pelo processo.
+
+    fechado     -> chamadas normais; limite_falhas falhas seguidas abrem
+    aberto      -> recusa tudo (CircuitoAberto) por tempo_abertura segundos
+    meio_aberto -> deixa passar uma chamada de teste; sucesso fecha,
+                   falha reabre
+    """
+
+    FECHADO = "fechado"
+    ABERTO = "aberto"
+    MEIO_ABERTO = "meio_aberto"
+
+    def __init__(self, limite_falhas: int = 5, tempo_abertura: float = 30.0):
+        self._limite = limite_falhas
+        self._tempo_abertura = tempo_abertura
+        self._estado = self.FECHADO
+        self._falhas_seguidas = 0
+        self._aberto_em = 0.0
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+        self.aberturas = 0
+
+    @property
+    def estado(self) -> str:
+        with self._lock:
+            return self._estado
+
+    def permitir(self) -> bool:
+        """Decide se uma chamada pode ir ao backend agora."""
+        with self._lock:
+            if self._estado == self.FECHADO:
+                return True
+            if self._estado == self.ABERTO and time.monotonic() - self._aberto_em >= self._tempo_abertura:
+                self._estado = self.MEIO_ABERTO
+                self._teste_em_andamento = False
+            if self._estado == self.MEIO_ABERTO and not self._teste_em_andamento:
+                self._teste_em_andamento = True
+                return True
+            return False
+
+    def sucesso(self) -> None:
+        with self._lock:
+            if self._estado != self.FECHADO:
+                logger.info("Backend respondeu; circuito fechado")
+            self._estado = self.FECHADO
+            self._falhas_seguidas = 0
+            self._teste_em_andamento = False
+
+    def falha(self) -> None:
+        with self._lock:
+            self._falhas_seguidas += 1
+            if self._estado == self.MEIO_ABERTO or (
+                self._estado == self.FECHADO and self._falhas_seguidas >= self._limite
+            ):
+                self._estado = self.ABERTO
+                self._aberto_em = time.monotonic()
+                self._teste_em_andamento = False
+                self.aberturas += 1
+                logger.error(f"Circuito do backend aberto após {self._falhas_seguidas} falha(s) seguida(s); "
+                             f"chamadas recusadas por {self._tempo_abertura:g}s")
+
+
+class CacheObsoleto:
+    """
+    Última leitura bem-sucedida de cada chave (LRU), servida só quando o
+    backend falha ou o circuito está aberto.
+    """
+
+    def __init__(self, maximo: int = 1024):
+        self._maximo = maximo
+        self._itens: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def guardar(self, chave: str, valor: Any) -> None:
+        with self._lock:
+            self._itens[chave] = (valor, time.time())
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self._maximo:
+                self._itens.popitem(last=False)
+
+    def obter(self, chave: str) -> Optional[tuple]:
+        """(valor, quando foi lido) ou None."""
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None:
+                self._itens.move_to_end(chave)
+            return item
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+
+
+class Resiliencia:
+    """
+    Executa as chamadas ao backend com tempo limite, novas tentativas com
+    backoff exponencial (com jitter) e disjuntor. Leituras guardam o último
+    resultado e, se o backend falhar, devolvem esse valor obsoleto em vez de
+    deixar a página vazia. Escritas só são repetidas quando idempotentes.
+
+    Contadores e o último erro ficam em estado(), para o app mostrar que está
+    degradado em vez de falhar em silêncio.
+    """
+
+    def __init__(
+        self,
+        tentativas: int = 3,
+        espera_base: float = 0.2,
+        espera_maxima: float = 2.0,
+        timeout_leitura: float = 10.0,
+        timeout_escrita: float = 15.0,
+        disjuntor: Optional[Disjuntor] = None,
+        cache: Optional[CacheObsoleto] = None,
+        trabalhadores: int = 32
+    ):
+        self.tentativas = tentativas
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.timeout_leitura = timeout_leitura
+        self.timeout_escrita = timeout_escrita
+        self.disjuntor = disjuntor or Disjuntor()
+        self.cache = cache or CacheObsoleto()
+        # Leituras e escritas idempotentes rodam numa thread deste pool para poder
+        # ser abandonadas no tempo limite; o cliente HTTP tem seu próprio timeout, que as encerra
+        self._executor = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix="backend")
+        self._lock = threading.Lock()
+        self._contadores = {"falhas": 0, "novas_tentativas": 0, "recusadas": 0, "obsoletas": 0}
+        self._ultimo_erro: Optional[str] = None
+        self._ultimo_erro_em: Optional[float] = None
+        self._ultima_obsoleta_em: Optional[float] = None
+
+    def ler(self, chave: str, funcao: Callable[[], Any]) -> Any:
+        """
+        Executa uma leitura; em caso de falha do backend, devolve o último
+        valor lido para a mesma chave, se houver.
+
+        Raises:
+            CircuitoAberto, TempoEsgotado ou o erro original, quando não há
+            valor em cache para servir.
+        """
+        try:
+            valor = self._executar(funcao, self.timeout_leitura, self.tentativas)
+        except Exception as e:
+            if not (isinstance(e, CircuitoAberto) or transitorio(e)):
+                raise
+            guardado = self.cache.obter(chave)
+            if guardado is None:
+                raise
+            valor, lido_em = guardado
+            with self._lock:
+                self._contadores["obsoletas"] += 1
+                self._ultima_obsoleta_em = time.time()
+            logger.warning(f"Backend indisponível ({e}); servindo '{chave}' lido há {time.time() - lido_em:.0f}s")
+            return valor
+        self.cache.guardar(chave, valor)
+        return valor
+
+    def consultar(self, funcao: Callable[[], Any]) -> Any:
+        """
+        Leitura sem o cache de obsoletos, para decisões em que um valor antigo
+        levaria a erro (ex.: saber se um lote já foi gravado).
+        """
+        return self._executar(funcao, self.timeout_leitura, self.tentativas)
+
+    def escrever(self, funcao: Callable[[], Any], idempotente: bool = False) -> Any:
+        """
+        Executa uma escrita. Só é repetida se idempotente=True: um incremento
+        que chegou ao banco mas cuja resposta se perdeu seria aplicado duas vezes.
+
+        Uma escrita não idempotente também não é abandonada no tempo limite:
+        ela poderia chegar ao banco depois de quem chamou ter recebido a falha
+        e tentado de novo. Espera-se a resposta (limitada pelo timeout do
+        próprio cliente HTTP), então o resultado devolvido é o da escrita.
+        """
+        if idempotente:
+            return self._executar(funcao, self.timeout_escrita, self.tentativas)
+        return self._executar(funcao, None, 1)
+
+    async def ler_async(self, chave: str, funcao: Callable[[], Awaitable[Any]]) -> Any:
+        """Versão assíncrona de ler(); funcao cria a corrotina de cada tentativa."""
+        try:
+            valor = await self._executar_async(funcao, self.timeout_leitura, self.tentativas)
+        except Exception as e:
+            if not (isinstance(e, CircuitoAberto) or transitorio(e)):
+                raise
+            guardado = self.cache.obter(chave)
+            if guardado is None:
+                raise
+            valor, lido_em = guardado
+            with self._lock:
+                self._contadores["obsoletas"] += 1
+                self._ultima_obsoleta_em = time.time()
+            logger.warning(f"Backend indisponível ({e}); servindo '{chave}' lido há {time.time() - lido_em:.0f}s")
+            return valor
+        self.cache.guardar(chave, valor)
+        return valor
+
+    async def consultar_async(self, funcao: Callable[[], Awaitable[Any]]) -> Any:
+        """Versão assíncrona de consultar()."""
+        return await self._executar_async(funcao, self.timeout_leitura, self.tentativas)
+
+    async def escrever_async(self, funcao: Callable[[], Awaitable[Any]], idempotente: bool = False) -> Any:
+        """Versão assíncrona de escrever(); a não idempotente também não é cancelada no tempo limite."""
+        if idempotente:
+            return await self._executar_async(funcao, self.timeout_escrita, self.tentativas)
+        return await self._executar_async(funcao, None, 1)
+
+    def estado(self) -> Dict[str, Any]:
+        """Circuito, contadores e último erro do backend neste processo."""
+        with self._lock:
+            return {
+                "circuito": self.disjuntor.estado,
+                "aberturas": self.disjuntor.aberturas,
+                **self._contadores,
+                "ultimo_erro": self._ultimo_erro,
+                "ultimo_erro_em": self._ultimo_erro_em,
+                "ultima_obsoleta_em": self._ultima_obsoleta_em
+            }
+
+    def _executar(self, funcao: Callable[[], Any], timeout: Optional[float], tentativas: int) -> Any:
+        # timeout None: espera a chamada terminar (escritas que não podem ser abandonadas)
+        for tentativa in range(1, tentativas + 1):
+            if not self.disjuntor.permitir():
+                with self._lock:
+                    self._contadores["recusadas"] += 1
+                raise CircuitoAberto("backend indisponível; tente novamente em instantes")
+            try:
+                resultado = self._com_timeout(funcao, timeout)
+            except Exception as e:
+                if not transitorio(e):
+                    # O backend respondeu (ex.: permissão negada): não é indisponibilidade
+                    self.disjuntor.sucesso()
+                    raise
+                self.disjuntor.falha()
+                with self._lock:
+                    self._contadores["falhas"] += 1
+                    self._ultimo_erro = f"{type(e).__name__}: {e}"
+                    self._ultimo_erro_em = time.time()
+                if tentativa == tentativas:
+                    raise
+                # Backoff exponencial com jitter completo
+                espera = random.uniform(0, min(self.espera_maxima, self.espera_base * (2 ** (tentativa - 1))))
+                with self._lock:
+                    self._contadores["novas_tentativas"] += 1
+                logger.warning(f"Falha transitória no backend ({type(e).__name__}); "
+                               f"tentativa {tentativa + 1}/{tentativas} em {espera:.2f}s")
+                time.sleep(espera)
+            else:
+                self.disjuntor.sucesso()
+                return resultado
+
+    async def _executar_async(self, funcao: Callable[[], Awaitable[Any]], timeout: Optional[float], tentativas: int) -> Any:
+        # Mesmo ciclo de _executar; o tempo limite cancela a corrotina em vez de
+        # abandonar uma thread
+        for tentativa in range(1, tentativas + 1):
+            if not self.disjuntor.permitir():
+                with self._lock:
+                    self._contadores["recusadas"] += 1
+                raise CircuitoAberto("backend indisponível; tente novamente em instantes")
+            try:
+                try:
+                    resultado = await (funcao() if timeout is None else asyncio.wait_for(funcao(), timeout))
+                except asyncio.TimeoutError:
+                    raise TempoEsgotado(f"sem resposta do backend em {timeout:g}s")
+            except Exception as e:
+                if not transitorio(e):
+                    self.disjuntor.sucesso()
+                    raise
+                self.disjuntor.falha()
+                with self._lock:
+                    self._contadores["falhas"] += 1
+                    self._ultimo_erro = f"{type(e).__name__}: {e}"
+                    self._ultimo_erro_em = time.time()
+                if tentativa == tentativas:
+                    raise
+                espera = random.uniform(0, min(self.espera_maxima, self.espera_base * (2 ** (tentativa - 1))))
+                with self._lock:
+                    self._contadores["novas_tentativas"] += 1
+                logger.warning(f"Falha transitória no backend ({type(e).__name__}); "
+                               f"tentativa {tentativa + 1}/{tentativas} em {espera:.2f}s")
+                await asyncio.sleep(espera)
+            else:
+                self.disjuntor.sucesso()
+                return resultado
+
+    def _com_timeout(self, funcao: Callable[[], Any], timeout: Optional[float]) -> Any:
+        if timeout is None:
+            return funcao()
+        futuro = self._executor.submit(funcao)
+        try:
+            return futuro.result(timeout=timeout)
+        except FuturoEsgotado:
+            futuro.cancel()
+            raise TempoEsgotado(f"sem resposta do backend em {timeout:g}s")
+
+
+_resiliencia: Optional[Resiliencia] = None
+_lock_resiliencia = threading.Lock()
+
+
+def obter_resiliencia() -> Resiliencia:
+    """Instância única do processo (um backend, um disjuntor)."""
+    global _resiliencia
+    if _resiliencia is None:
+        with _lock_resiliencia:
+            if _resiliencia is None:
+                _resiliencia = Resiliencia()
+    return _resiliencia
@@ -0,0 +1,251 @@
+"""
+Acúmulo de pontos de fidelidade em lote a partir de um arquivo de pedidos.
+
+Lê o arquivo (CSV ou NDJSON) linha a linha, soma os pontos por cliente_id em
+memória e aplica os créditos em partes de vários programas, com uma transação
+por programa (nível recalculado do saldo do momento) e uma escrita atômica
+por parte para o extrato e o histograma de níveis.
+
+Cada arquivo é identificado pelo hash do conteúdo. A divisão em partes (os
+programas de cada uma) e as partes concluídas ficam em
+fidelidade_lotes/{lote_id}, e cada programa guarda a marca do lote na transação
+do crédito, então rodar de novo o mesmo arquivo não credita pontos em dobro e
+retoma de onde parou. As marcas nos programas são removidas quando o lote
+termina; daí em diante, o concluido_em do marcador faz uma nova rodada não
+aplicar nada. Uma falha ao ler os programas interrompe a rodada.
+
+Campos aceitos por pedido: cliente_id, pedido_id e pontos ou valor
+(valor em reais, convertido por --pontos-por-real).
+
+Uso:
+    python -m jobs.acumular_pontos pedidos_2026-10-19.csv
+    python -m jobs.acumular_pontos pedidos.ndjson --pontos-por-real 2 --tamanho-lote 500
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import math
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+
+from dao.fidelidade_dao import FidelidadeDAO
+
+logger = logging.getLogger(__name__)
+
+
+def ler_pedidos(caminho: str, formato: str, resumo) -> Iterator[dict]:
+    """
+    Gera os pedidos do arquivo um a um, alimentando o hash do conteúdo.
+    """
+    with open(caminho, "r", encoding="utf-8", newline="") as fp:
+        linhas = _linhas_com_hash(fp, resumo)
+        if formato == "csv":
+            yield from csv.DictReader(linhas)
+        else:
+            for numero, linha in enumerate(linhas, start=1):
+                if not linha.strip():
+                    continue
+                try:
+                    yield json.loads(linha)
+                except json.JSONDecodeError:
+                    logger.warning(f"Linha {numero} ignorada: JSON inválido")
+
+
+def _linhas_com_hash(fp, resumo) -> Iterator[str]:
+    for linha in fp:
+        resumo.update(linha.encode("utf-8"))
+        yield linha
+
+
+def pontos_do_pedido(pedido: dict, pontos_por_real: float) -> int:
+    """
+    Retorna os pontos de um pedido: campo 'pontos' ou 'valor' convertido.
+    """
+    if pedido.get("pontos") not in (None, ""):
+        return int(pedido["pontos"])
+    if pedido.get("valor") not in (None, ""):
+        return int(math.floor(float(pedido["valor"]) * pontos_por_real))
+    raise ValueError("pedido sem 'pontos' nem 'valor'")
+
+
+def agregar(caminho: str, formato: str, pontos_por_real: float) -> Tuple[Dict[str, int], str, dict]:
+    """
+    Soma os pontos por cliente em uma passada pelo arquivo.
+
+    Returns:
+        Tuple[{cliente_id: pontos}, lote_id, estatísticas da leitura]
+    """
+    resumo = hashlib.sha256()
+    por_cliente: Dict[str, int] = {}
+    estatisticas = {"pedidos": 0, "ignorados": 0}
+    for pedido in ler_pedidos(caminho, formato, resumo):
+        try:
+            cliente_id = str(pedido.get("cliente_id") or "").strip()
+            if not cliente_id:
+                raise ValueError("pedido sem cliente_id")
+            pontos = pontos_do_pedido(pedido, pontos_por_real)
+            if pontos < 0:
+                raise ValueError("pontos negativos")
+        except (ValueError, TypeError) as e:
+            estatisticas["ignorados"] += 1
+            logger.warning(f"Pedido '{pedido.get('pedido_id', '?')}' ignorado: {e}")
+            continue
+        estatisticas["pedidos"] += 1
+        if pontos:
+            por_cliente[cliente_id] = por_cliente.get(cliente_id, 0) + pontos
+    return por_cliente, resumo.hexdigest()[:32], estatisticas
+
+
+def planejar(dao: FidelidadeDAO, por_cliente: Dict[str, int], tamanho_lote: int) -> Tuple[Dict[str, Dict[str, int]], List[str]]:
+    """
+    Resolve cliente_id -> programa e divide os créditos em partes.
+
+    Returns:
+        Tuple[{número da parte: {fidelidade_id: pontos}}, clientes sem programa]
+
+    Raises:
+        Exception: Falha ao ler os programas (não pode virar "sem programa").
+    """
+    # Uma leitura paginada da coleção resolve cliente_id -> programa; erros são propagados
+    programas = {}
+    for pagina in dao.listar_paginas():
+        for registro in pagina:
+            programas[registro.get("cliente_id")] = registro.get("id")
+    sem_programa = sorted(c for c in por_cliente if not programas.get(c))
+    creditos = {programas[c]: p for c, p in por_cliente.items() if programas.get(c)}
+
+    ids = sorted(creditos)
+    plano = {
+        f"{numero:06d}": {id: creditos[id] for id in ids[i:i + tamanho_lote]}
+        for numero, i in enumerate(range(0, len(ids), tamanho_lote))
+    }
+    return plano, sem_programa
+
+
+def aplicar(
+    dao: FidelidadeDAO,
+    por_cliente: Dict[str, int],
+    lote_id: str,
+    arquivo: str,
+    tamanho_lote: int
+) -> dict:
+    """
+    Aplica os créditos agregados em partes atômicas, pulando as já gravadas.
+
+    A divisão em partes é gravada no marcador do lote na primeira rodada e
+    reaproveitada nas retomadas: um programa criado entre as rodadas não
+    muda a numeração das partes. Um lote já concluído não é reaplicado.
+
+    Raises:
+        Exception: Falha ao ler o marcador ou os programas, ou ao gravar o plano.
+    """
+    marcador = dao.obter_lote(lote_id) or {}
+    caminho_lote = dao.caminho_lote(lote_id)
+    if marcador.get("concluido_em"):
+        # As marcas nos programas já foram removidas: só o marcador impede o crédito em dobro
+        logger.info(f"Lote {lote_id} já concluído em {marcador['concluido_em']}; nada a aplicar")
+        return {
+            "lote_id": lote_id,
+            "ja_concluido": True,
+            "programas": 0,
+            "pontos": 0,
+            "sem_programa": marcador.get("sem_programa") or [],
+            "partes": 0,
+            "partes_puladas": 0,
+            "partes_com_erro": 0
+        }
+
+    plano = marcador.get("plano")
+    if plano is None:
+        # Marcadores anteriores ao plano gravado usavam a mesma divisão, com o tamanho original
+        tamanho_lote = int(marcador.get("tamanho_lote", tamanho_lote))
+        plano, sem_programa = planejar(dao, por_cliente, tamanho_lote)
+        caminhos = {f"{caminho_lote}/plano": plano, f"{caminho_lote}/sem_programa": sem_programa}
+        if not marcador:
+            caminhos = {caminho_lote: {
+                "arquivo": arquivo,
+                "tamanho_lote": tamanho_lote,
+                "iniciado_em": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "plano": plano,
+                "sem_programa": sem_programa
+            }}
+        if not dao.atualizar_caminhos(caminhos):
+            raise RuntimeError(f"plano do lote {lote_id} não gravado")
+    else:
+        sem_programa = marcador.get("sem_programa") or []
+
+    aplicadas = set((marcador.get("partes") or {}).keys())
+    ids = [id for parte in plano.values() for id in parte]
+    relatorio = {
+        "lote_id": lote_id,
+        "programas": len(ids),
+        "pontos": sum(p for parte in plano.values() for p in parte.values()),
+        "sem_programa": sem_programa,
+        "partes": len(plano),
+        "partes_puladas": 0,
+        "partes_com_erro": 0
+    }
+
+    motivo = f"Pedidos do lote {lote_id[:12]}"
+    for numero, chave_parte in enumerate(sorted(plano)):
+        if chave_parte in aplicadas:
+            relatorio["partes_puladas"] += 1
+            continue
+        parte = plano[chave_parte]
+        ok = dao.creditar_em_lote(
+            dict(parte),
+            motivo,
+            caminhos_extras={f"{caminho_lote}/partes/{chave_parte}": True},
+            lote_id=lote_id
+        )
+        if not ok:
+            relatorio["partes_com_erro"] += 1
+            logger.error(f"Parte {numero + 1}/{len(plano)} não gravada; rode novamente para retomar")
+            continue
+        logger.info(f"Parte {numero + 1}/{len(plano)} gravada ({len(parte)} programa(s))")
+
+    if relatorio["partes_com_erro"] == 0:
+        if not dao.atualizar_caminhos({f"{caminho_lote}/concluido_em": datetime.now().strftime("%Y-%m-%d %H:%M:%S")}):
+            # Sem o concluido_em as marcas nos programas continuam valendo: só não são limpas
+            relatorio["partes_com_erro"] += 1
+            logger.error(f"Conclusão do lote {lote_id} não gravada; rode novamente")
+            return relatorio
+        # Com o lote concluído, o marcador basta: as marcas nos programas saem
+        if not dao.limpar_marcas_lote(lote_id, ids):
+            logger.warning(f"Marcas do lote {lote_id} não removidas de todos os programas (inofensivo)")
+    return relatorio
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("arquivo", help="arquivo de pedidos (.csv ou .ndjson)")
+    parser.add_argument("--formato", choices=["csv", "ndjson"], help="padrão: deduzido pela extensão")
+    parser.add_argument("--pontos-por-real", type=float, default=1.0)
+    parser.add_argument("--tamanho-lote", type=int, default=500, help="programas por escrita atômica")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    formato = args.formato or ("csv" if args.arquivo.lower().endswith(".csv") else "ndjson")
+
+    inicio = time.perf_counter()
+    por_cliente, lote_id, estatisticas = agregar(args.arquivo, formato, args.pontos_por_real)
+    logger.info(f"{estatisticas['pedidos']} pedido(s) lidos, {len(por_cliente)} cliente(s), lote {lote_id}")
+
+    try:
+        relatorio = aplicar(FidelidadeDAO(), por_cliente, lote_id, args.arquivo, args.tamanho_lote)
+    except Exception as e:
+        logger.error(f"Lote {lote_id} interrompido (nada foi marcado como concluído): {e}")
+        return 1
+    relatorio.update(estatisticas)
+    relatorio["segundos"] = round(time.perf_counter() - inicio, 2)
+    print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    return 0 if relatorio["partes_com_erro"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Arquivamento das avaliações antigas (armazenamento quente/frio).
+
+Move as avaliações com mais de --dias dias do nó avaliacoes para arquivos
+NDJSON compactados por dia (ver ArquivoAvaliacoes), lendo do banco só as mais
+antigas, em lotes, pela consulta ordenada por data_hora. Cada lote é gravado e
+sincronizado em disco antes de sair do banco; os agregados de
+avaliacoes_resumo não mudam, então médias, totais e séries continuam contando
+as arquivadas. O histórico completo fica acessível por
+AvaliacaoDAO.listar_historico.
+
+Exige os agregados construídos (jobs.reconstruir_indices avaliacoes): sem
+eles, as estatísticas varrem só o banco e perderiam as arquivadas.
+
+Pensado para rodar agendado, ex.:
+    30 3 * * 0  cd /srv/crm-pizzaria && python -m jobs.arquivar_avaliacoes --dias 365
+
+Uso:
+    python -m jobs.arquivar_avaliacoes --dias 365
+    python -m jobs.arquivar_avaliacoes --dias 180 --destino /srv/arquivo/avaliacoes
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from dao.arquivo_avaliacoes import ArquivoAvaliacoes
+from dao.avaliacao_dao import AvaliacaoDAO
+
+logger = logging.getLogger(__name__)
+
+
+def arquivar(dias: int, tamanho_lote: int = 500, destino: Optional[str] = None) -> dict:
+    dao = AvaliacaoDAO(ArquivoAvaliacoes(destino))
+    if dao.obter_resumo_total() is None:
+        raise RuntimeError("agregados de avaliações não construídos; rode jobs.reconstruir_indices avaliacoes")
+
+    inicio = time.perf_counter()
+    corte = (datetime.now() - timedelta(days=dias)).strftime("%Y-%m-%d %H:%M:%S")
+    relatorio = {"corte": corte, "destino": dao.arquivo.raiz, "arquivadas": 0, "dias": set()}
+
+    # Cada lote sai do banco, então a próxima consulta já começa no seguinte
+    while True:
+        registros = dao.listar_antigas(corte, tamanho_lote)
+        if not registros:
+            break
+        if not dao.arquivar(registros):
+            raise RuntimeError(f"lote não arquivado após {relatorio['arquivadas']} avaliação(ões); rode novamente")
+        relatorio["arquivadas"] += len(registros)
+        relatorio["dias"].update(str(r.get("data_hora"))[:10] for r in registros)
+        logger.info(f"{relatorio['arquivadas']} avaliação(ões) arquivada(s), até {registros[-1].get('data_hora')}")
+
+    relatorio["dias"] = len(relatorio["dias"])
+    relatorio["segundos"] = round(time.perf_counter() - inicio, 2)
+    return relatorio
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dias", type=int, default=365, help="idade mínima (em dias) das avaliações arquivadas")
+    parser.add_argument("--tamanho-lote", type=int, default=500, help="avaliações por leitura/escrita")
+    parser.add_argument("--destino", help="diretório do arquivo (padrão: CRM_ARQUIVO_AVALIACOES ou arquivo/avaliacoes)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logging.getLogger("dao").setLevel(logging.WARNING)
+    if args.dias < 0 or args.tamanho_lote <= 0:
+        parser.error("--dias não pode ser negativo e --tamanho-lote deve ser positivo")
+
+    try:
+        relatorio = arquivar(args.dias, args.tamanho_lote, args.destino)
+    except Exception as e:
+        logger.error(f"Arquivamento interrompido: {e}")
+        return 1
+
+    print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""
+Compactação das avaliações na base colunar usada pelo painel e pelas análises.
+
+Grava analise/avaliacoes/avaliacoes-<marcador>.feather (Arrow, sem compressão),
+que os processos do servidor abrem mapeado em memória e completam com o que
+mudou depois do marcador (ArmazemAvaliacoes). Cada execução parte da base
+anterior mais as alterações desde ela; --completa relê a coleção inteira.
+Quanto mais frequente, menor a cauda que cada processo mantém em memória.
+
+Pensado para rodar agendado, ex.:
+    */10 * * * *  cd /srv/crm-pizzaria && python -m jobs.compactar_avaliacoes
+
+Uso:
+    python -m jobs.compactar_avaliacoes
+    python -m jobs.compactar_avaliacoes --completa
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from dao.avaliacao_dao import AvaliacaoDAO
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--completa", action="store_true", help="relê a coleção inteira em vez de partir da base anterior")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logging.getLogger("dao").setLevel(logging.WARNING)
+
+    try:
+        relatorio = AvaliacaoDAO().analise.compactar(completa=args.completa)
+    except Exception as e:
+        logger.error(f"Compactação interrompida: {e}")
+        return 1
+
+    logger.info(f"{relatorio['linhas']} avaliação(ões) em '{relatorio['arquivo']}'")
+    print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
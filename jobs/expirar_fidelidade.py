@@ -0,0 +1,185 @@
+"""
+Varredura de validade dos programas de fidelidade.
+
+Consulta apenas o índice fidelidade_vencimentos (por data de validade), então o
+custo depende da quantidade de programas vencendo na janela, e não do total de
+membros. Para cada dia da janela:
+
+  - vencidos (validade anterior a hoje): notifica, zera os pontos e rebaixa para
+    bronze, em transação, e retira o programa do índice;
+  - a vencer (próximos --dias-aviso dias): notifica uma única vez.
+
+Antes disso, conclui as operações de pontos que ficaram pendentes nos
+programas (saldo já alterado, extrato/histograma de níveis não gravados).
+
+Gera um relatório JSON com tudo o que mudou. Pensado para rodar agendado, ex.:
+    0 3 * * *  cd /srv/crm-pizzaria && python -m jobs.expirar_fidelidade --relatorio /var/log/crm/expiracao.json
+
+Uso:
+    python -m jobs.expirar_fidelidade --dias-atras 30 --dias-aviso 7
+    python -m jobs.expirar_fidelidade --reconstruir-indice   # migração única do índice
+"""
+
+import argparse
+import json
+import logging
+import sys
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional
+
+from dao.fidelidade_dao import FidelidadeDAO
+from models.fidelidade import Fidelidade
+
+logger = logging.getLogger(__name__)
+
+
+class NotificadorLog:
+    """
+    Notificador padrão: apenas registra no log.
+    """
+
+    def notificar(self, evento: str, fidelidade: Fidelidade, detalhes: dict) -> None:
+        logger.info(f"[{evento}] {fidelidade.cliente_nome} ({fidelidade.cliente_id}): {detalhes}")
+
+
+class NotificadorArquivo:
+    """
+    Acrescenta cada notificação como uma linha NDJSON, para consumo por outro
+    processo (envio de SMS/e-mail/WhatsApp).
+    """
+
+    def __init__(self, caminho: str):
+        self._caminho = caminho
+
+    def notificar(self, evento: str, fidelidade: Fidelidade, detalhes: dict) -> None:
+        linha = {
+            "evento": evento,
+            "data_hora": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "fidelidade_id": fidelidade.id,
+            "cliente_id": fidelidade.cliente_id,
+            "cliente_nome": fidelidade.cliente_nome,
+            **detalhes
+        }
+        with open(self._caminho, "a", encoding="utf-8") as fp:
+            fp.write(json.dumps(linha, ensure_ascii=False) + "\n")
+
+
+def dias(inicio: date, fim: date) -> Iterator[date]:
+    atual = inicio
+    while atual <= fim:
+        yield atual
+        atual += timedelta(days=1)
+
+
+def paginar_vencimentos(dao: FidelidadeDAO, dia: str, tamanho_lote: int):
+    """
+    Percorre o índice de um dia em páginas por ID.
+    """
+    apos: Optional[str] = None
+    while True:
+        pagina = dao.listar_vencimentos(dia, limite=tamanho_lote, apos=apos)
+        if not pagina:
+            return
+        yield pagina
+        if len(pagina) < tamanho_lote:
+            return
+        apos = pagina[-1][0]
+
+
+def varrer(
+    dao: FidelidadeDAO,
+    notificador,
+    hoje: date,
+    dias_atras: int,
+    dias_aviso: int,
+    tamanho_lote: int
+) -> dict:
+    relatorio = {
+        "referencia": hoje.strftime("%Y-%m-%d"),
+        "expirados": [],
+        "avisados": [],
+        "ignorados": 0,
+        "erros": 0
+    }
+
+    # 1. Vencidos: validade entre hoje - dias_atras e ontem
+    for dia in dias(hoje - timedelta(days=dias_atras), hoje - timedelta(days=1)):
+        chave_dia = dia.strftime("%Y-%m-%d")
+        for pagina in paginar_vencimentos(dao, chave_dia, tamanho_lote):
+            # Os programas da página são lidos de uma vez, com as leituras em paralelo
+            fidelidades = dao.buscar_varios(id for id, _ in pagina)
+            for id, _ in pagina:
+                fidelidade = fidelidades.get(id)
+                if not fidelidade or fidelidade.validade != chave_dia:
+                    # Entrada obsoleta (programa removido ou renovado)
+                    dao.remover_vencimento(chave_dia, id)
+                    relatorio["ignorados"] += 1
+                    continue
+                resultado = dao.expirar(id, referencia=hoje)
+                if resultado is None:
+                    relatorio["erros"] += 1
+                    continue
+                notificador.notificar("expirado", fidelidade, resultado)
+                relatorio["expirados"].append({"fidelidade_id": id, "cliente_id": fidelidade.cliente_id, **resultado})
+
+    # 2. A vencer: validade entre hoje e hoje + dias_aviso, avisados uma única vez
+    for dia in dias(hoje, hoje + timedelta(days=dias_aviso)):
+        chave_dia = dia.strftime("%Y-%m-%d")
+        for pagina in paginar_vencimentos(dao, chave_dia, tamanho_lote):
+            avisados = []
+            fidelidades = dao.buscar_varios(id for id, estado in pagina if estado != "avisado")
+            for id, estado in pagina:
+                if estado == "avisado":
+                    continue
+                fidelidade = fidelidades.get(id)
+                if not fidelidade:
+                    continue
+                detalhes = {"validade": chave_dia, "pontos": fidelidade.pontos}
+                notificador.notificar("a_vencer", fidelidade, detalhes)
+                avisados.append(id)
+                relatorio["avisados"].append({"fidelidade_id": id, "cliente_id": fidelidade.cliente_id, **detalhes})
+            if avisados:
+                dao.marcar_aviso_vencimento(chave_dia, avisados)
+
+    relatorio["total_expirados"] = len(relatorio["expirados"])
+    relatorio["total_pontos_zerados"] = sum(e["pontos_zerados"] for e in relatorio["expirados"])
+    relatorio["total_avisados"] = len(relatorio["avisados"])
+    return relatorio
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dias-atras", type=int, default=30, help="quantos dias de vencidos revisitar")
+    parser.add_argument("--dias-aviso", type=int, default=7, help="antecedência do aviso de vencimento")
+    parser.add_argument("--tamanho-lote", type=int, default=200)
+    parser.add_argument("--data", help="data de referência YYYY-MM-DD (padrão: hoje)")
+    parser.add_argument("--notificacoes", help="arquivo NDJSON para as notificações (padrão: log)")
+    parser.add_argument("--relatorio", help="arquivo JSON do relatório (padrão: saída padrão)")
+    parser.add_argument("--reconstruir-indice", action="store_true", help="recria o índice de validade e sai")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    dao = FidelidadeDAO()
+
+    if args.reconstruir_indice:
+        logger.info(f"Índice de validade reconstruído com {dao.reconstruir_indice_vencimentos()} programa(s)")
+        return 0
+
+    hoje = datetime.strptime(args.data, "%Y-%m-%d").date() if args.data else date.today()
+    notificador = NotificadorArquivo(args.notificacoes) if args.notificacoes else NotificadorLog()
+    pendentes = dao.concluir_pendentes()
+    relatorio = varrer(dao, notificador, hoje, args.dias_atras, args.dias_aviso, args.tamanho_lote)
+    relatorio["pendentes_concluidas"] = pendentes
+
+    saida = json.dumps(relatorio, ensure_ascii=False, indent=2)
+    if args.relatorio:
+        with open(args.relatorio, "w", encoding="utf-8") as fp:
+            fp.write(saida)
+    else:
+        print(saida)
+    logger.info(f"{relatorio['total_expirados']} expirado(s), {relatorio['total_avisados']} avisado(s)")
+    return 0 if relatorio["erros"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,283 @@
+"""
+Exportação de uma coleção inteira para NDJSON ou Parquet, em fluxo.
+
+Percorre a coleção em páginas ordenadas por ID (FirebaseDAO.listar_paginas),
+passa cada registro pelo modelo (from_dict -> to_dict) e grava página a página,
+então a memória usada depende do tamanho da página, e não da coleção:
+
+    ndjson   -> um objeto JSON por linha (opcionalmente gzip)
+    parquet  -> colunas tipadas (texto, inteiro, decimal, lista de texto),
+                compressão zstd, um row group por página; requer pyarrow
+
+A saída é dividida em shards: ao fim de uma página, se o arquivo atual passou
+de --tamanho-shard-mb, ele é fechado e o próximo começa. Cada shard é gravado
+com sufixo .parcial e só ganha o nome final quando fechado, e o manifesto
+(<colecao>-<AAAAMMDD>.manifesto.json) lista os shards com registros e bytes.
+Registros que o modelo rejeita são contados como ignorados e não interrompem
+a exportação; já um erro de leitura do banco interrompe (saída incompleta não
+é confundida com a coleção inteira).
+
+Pensado para extrações noturnas, ex.:
+    0 2 * * *  cd /srv/crm-pizzaria && python -m jobs.exportar_colecao avaliacoes /srv/extracoes --formato parquet
+
+Uso:
+    python -m jobs.exportar_colecao avaliacoes extracoes/ --formato parquet
+    python -m jobs.exportar_colecao fidelidade extracoes/ --gzip --tamanho-shard-mb 64
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from dao.avaliacao_dao import AvaliacaoDAO
+from dao.campanha_dao import CampanhaDAO
+from dao.cliente_dao import ClienteDAO
+from dao.fidelidade_dao import FidelidadeDAO
+from dao.motoboy_dao import MotoboyDAO
+from models.avaliacao import Avaliacao
+from models.campanha import Campanha
+from models.cliente import Cliente
+from models.fidelidade import Fidelidade
+from models.motoboy import Motoboy
+
+logger = logging.getLogger(__name__)
+
+# Tipo de cada coluna exportada: "texto", "inteiro", "decimal", "lista" (de
+# texto) ou "json" (objeto serializado como texto no Parquet)
+_USUARIO = {"id": "texto", "nome": "texto", "perfil": "texto", "cpf": "texto", "telefone": "texto"}
+
+# Coleção -> (DAO, modelo, colunas)
+COLECOES = {
+    "clientes": (ClienteDAO, Cliente, {
+        **_USUARIO,
+        "email": "texto", "endereco": "texto", "preferencias": "lista", "opt_in": "json"
+    }),
+    "motoboys": (MotoboyDAO, Motoboy, {
+        **_USUARIO,
+        "cnh": "texto", "status_operacional": "texto", "zonas_atuacao": "lista",
+        "horarios_disponiveis": "lista", "avaliacao_media": "decimal", "tempo_medio_entrega": "decimal"
+    }),
+    "avaliacoes": (AvaliacaoDAO, Avaliacao, {
+        "id": "texto", "avaliador": "texto", "avaliado": "texto", "nota": "decimal",
+        "comentario": "texto", "data_hora": "texto"
+    }),
+    "fidelidade": (FidelidadeDAO, Fidelidade, {
+        "id": "texto", "cliente_id": "texto", "cliente_nome": "texto", "pontos": "inteiro",
+        "nivel": "texto", "validade": "texto"
+    }),
+    "campanhas": (CampanhaDAO, Campanha, {
+        "id": "texto", "nome": "texto", "objetivo": "texto", "data_inicio": "texto", "data_fim": "texto",
+        "canais": "lista", "publicos_segmentados": "lista", "clientes_atingidos": "inteiro",
+        "taxa_resposta": "decimal", "conversao": "decimal", "roi": "decimal", "data_criacao": "texto"
+    })
+}
+
+
+def _ajustar(valor: Any, tipo: str) -> Any:
+    # Converte para o tipo da coluna; o que não converte vira nulo
+    if valor is None:
+        return None
+    try:
+        if tipo == "inteiro":
+            return int(valor)
+        if tipo == "decimal":
+            return float(valor)
+        if tipo == "lista":
+            return [str(v) for v in valor] if isinstance(valor, (list, tuple)) else [str(valor)]
+        if tipo == "json":
+            return json.dumps(valor, ensure_ascii=False, sort_keys=True, default=str)
+    except (TypeError, ValueError):
+        return None
+    return str(valor)
+
+
+class EscritorNDJSON:
+    """Um objeto JSON por linha, com gzip opcional."""
+
+    def __init__(self, caminho: str, colunas: Dict[str, str], compactar: bool = False):
+        self._bruto = open(caminho, "wb")
+        self._saida = gzip.GzipFile(fileobj=self._bruto, mode="wb") if compactar else self._bruto
+
+    def escrever(self, registros: List[dict]) -> None:
+        linhas = "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in registros)
+        self._saida.write(linhas.encode("utf-8"))
+
+    def tamanho(self) -> int:
+        return self._bruto.tell()
+
+    def fechar(self) -> None:
+        if self._saida is not self._bruto:
+            self._saida.close()
+        self._bruto.close()
+
+
+def _importar_pyarrow():
+    # Dependência opcional: só a exportação Parquet precisa dela
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError(f"exportação Parquet requer pyarrow ({e})")
+    return pa, pq
+
+
+class EscritorParquet:
+    """Colunas tipadas, compressão zstd, um row group por página."""
+
+    def __init__(self, caminho: str, colunas: Dict[str, str], compactar: bool = False):
+        pa, pq = _importar_pyarrow()
+        tipos = {
+            "texto": pa.string(),
+            "inteiro": pa.int64(),
+            "decimal": pa.float64(),
+            "lista": pa.list_(pa.string()),
+            "json": pa.string()
+        }
+        self._pa = pa
+        self._colunas = colunas
+        self._esquema = pa.schema([(nome, tipos[tipo]) for nome, tipo in colunas.items()])
+        self._arquivo = open(caminho, "wb")
+        self._escritor = pq.ParquetWriter(self._arquivo, self._esquema, compression="zstd")
+
+    def escrever(self, registros: List[dict]) -> None:
+        dados = {
+            nome: [_ajustar(r.get(nome), tipo) for r in registros]
+            for nome, tipo in self._colunas.items()
+        }
+        self._escritor.write_table(self._pa.Table.from_pydict(dados, schema=self._esquema))
+
+    def tamanho(self) -> int:
+        return self._arquivo.tell()
+
+    def fechar(self) -> None:
+        self._escritor.close()
+        self._arquivo.close()
+
+
+ESCRITORES = {"ndjson": EscritorNDJSON, "parquet": EscritorParquet}
+
+
+def extensao(formato: str, compactar: bool) -> str:
+    if formato == "parquet":
+        return "parquet"
+    return "ndjson.gz" if compactar else "ndjson"
+
+
+def exportar(
+    colecao: str,
+    destino: str,
+    formato: str = "ndjson",
+    tamanho_pagina: int = 1000,
+    tamanho_shard_mb: float = 256,
+    compactar: bool = False
+) -> dict:
+    classe, modelo, colunas = COLECOES[colecao]
+    escritor_classe = ESCRITORES[formato]
+    if formato == "parquet":
+        _importar_pyarrow()
+    dao = classe()
+    os.makedirs(destino, exist_ok=True)
+
+    inicio = time.perf_counter()
+    prefixo = os.path.join(destino, f"{colecao}-{datetime.now().strftime('%Y%m%d')}")
+    limite = int(tamanho_shard_mb * 1024 * 1024)
+    manifesto = {
+        "colecao": colecao,
+        "formato": formato,
+        "compactado": compactar or formato == "parquet",
+        "colunas": colunas,
+        "iniciado_em": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "registros": 0,
+        "ignorados": 0,
+        "shards": []
+    }
+
+    escritor = None
+    shard: Optional[dict] = None
+
+    def fechar_shard() -> None:
+        escritor.fechar()
+        caminho = os.path.join(destino, shard["arquivo"])
+        os.replace(f"{caminho}.parcial", caminho)
+        shard["bytes"] = os.path.getsize(caminho)
+        manifesto["shards"].append(shard)
+        logger.info(f"{shard['arquivo']}: {shard['registros']} registro(s), {shard['bytes']} bytes")
+
+    try:
+        for pagina in dao.listar_paginas(tamanho_pagina):
+            registros = []
+            for dados in pagina:
+                try:
+                    registros.append(modelo.from_dict(dados).to_dict())
+                except (ValueError, TypeError, AttributeError) as e:
+                    manifesto["ignorados"] += 1
+                    logger.warning(f"[{colecao}] registro {dados.get('id')} ignorado: {e}")
+            if not registros:
+                continue
+
+            if escritor is None:
+                nome = f"{os.path.basename(prefixo)}-{len(manifesto['shards']):05d}.{extensao(formato, compactar)}"
+                escritor = escritor_classe(os.path.join(destino, f"{nome}.parcial"), colunas, compactar)
+                shard = {"arquivo": nome, "registros": 0}
+            escritor.escrever(registros)
+            shard["registros"] += len(registros)
+            manifesto["registros"] += len(registros)
+
+            if escritor.tamanho() >= limite:
+                fechar_shard()
+                escritor = None
+        if escritor is not None:
+            fechar_shard()
+            escritor = None
+    finally:
+        # Falha no meio: o shard aberto fica como .parcial e não entra no manifesto
+        if escritor is not None:
+            escritor.fechar()
+
+    manifesto["concluido_em"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    manifesto["segundos"] = round(time.perf_counter() - inicio, 2)
+    with open(f"{prefixo}.manifesto.json", "w", encoding="utf-8") as fp:
+        json.dump(manifesto, fp, ensure_ascii=False, indent=2)
+    return manifesto
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("colecao", choices=sorted(COLECOES))
+    parser.add_argument("destino", help="diretório de saída")
+    parser.add_argument("--formato", choices=sorted(ESCRITORES), default="ndjson")
+    parser.add_argument("--tamanho-pagina", type=int, default=1000, help="registros por leitura do banco")
+    parser.add_argument("--tamanho-shard-mb", type=float, default=256, help="tamanho aproximado de cada arquivo")
+    parser.add_argument("--gzip", action="store_true", help="compacta o NDJSON (o Parquet já sai compactado)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logging.getLogger("dao").setLevel(logging.WARNING)
+    if args.tamanho_pagina <= 0 or args.tamanho_shard_mb <= 0:
+        parser.error("--tamanho-pagina e --tamanho-shard-mb devem ser positivos")
+
+    try:
+        manifesto = exportar(
+            args.colecao,
+            args.destino,
+            formato=args.formato,
+            tamanho_pagina=args.tamanho_pagina,
+            tamanho_shard_mb=args.tamanho_shard_mb,
+            compactar=args.gzip
+        )
+    except Exception as e:
+        logger.error(f"Exportação interrompida: {e}")
+        return 1
+
+    print(json.dumps({k: v for k, v in manifesto.items() if k != "colunas"}, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,318 @@
+"""
+Importação em massa de clientes ou motoboys a partir de NDJSON ou CSV.
+
+Lê o arquivo linha a linha (memória constante, exceto o conjunto de chaves
+únicas), valida cada registro pelo modelo (Cliente/Motoboy), descarta
+duplicados por CPF/e-mail (clientes) ou CPF/CNH (motoboys) e grava em escritas
+atômicas de vários registros por vez, já com os índices de busca.
+
+As chaves existentes são lidas uma única vez no início, em leituras rasas dos
+índices, e formam um conjunto em memória que também recebe as chaves do próprio
+arquivo. Após cada lote gravado, o progresso vai para um arquivo de checkpoint;
+rodar de novo retoma da linha seguinte ao último lote. Se o processo cair entre
+a gravação e o checkpoint, o lote repetido é reconhecido como duplicado.
+
+Campos:
+    clientes: nome, cpf, telefone, email, endereco, preferencias,
+              opt_in (objeto) ou opt_in_sms / opt_in_email / opt_in_whatsapp
+    motoboys: nome, cpf, telefone, cnh, status_operacional (padrão Offline),
+              zonas_atuacao, horarios_disponiveis
+Listas em CSV são separadas por vírgula dentro do campo.
+
+Uso:
+    python -m jobs.importar_cadastros clientes franquia_centro.csv
+    python -m jobs.importar_cadastros motoboys entregadores.ndjson --tamanho-lote 1000
+    python -m jobs.importar_cadastros clientes base.csv --simular --rejeitados rejeitados.ndjson
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from dao.cliente_dao import ClienteDAO
+from dao.firebase_dao import FirebaseDAO
+from dao.motoboy_dao import MotoboyDAO
+from models.cliente import Cliente
+from models.motoboy import Motoboy
+
+logger = logging.getLogger(__name__)
+
+_VERDADEIROS = {"1", "true", "t", "sim", "s", "yes", "y", "x"}
+
+
+def _texto(linha: dict, campo: str) -> str:
+    valor = linha.get(campo)
+    return "" if valor is None else str(valor).strip()
+
+
+def _lista(valor: Any) -> List[str]:
+    if isinstance(valor, list):
+        return [str(v).strip() for v in valor if str(v).strip()]
+    if not valor:
+        return []
+    return [v.strip() for v in str(valor).split(",") if v.strip()]
+
+
+def _booleano(valor: Any) -> bool:
+    if isinstance(valor, bool):
+        return valor
+    return str(valor or "").strip().lower() in _VERDADEIROS
+
+
+def montar_cliente(linha: dict) -> Cliente:
+    opt_in = linha.get("opt_in")
+    if isinstance(opt_in, str) and opt_in.strip().startswith("{"):
+        opt_in = json.loads(opt_in)
+    if not isinstance(opt_in, dict):
+        opt_in = {canal: linha.get(f"opt_in_{canal}") for canal in ("sms", "email", "whatsapp")}
+    return Cliente(
+        id=str(uuid.uuid4()),
+        nome=_texto(linha, "nome"),
+        cpf=_texto(linha, "cpf"),
+        telefone=_texto(linha, "telefone"),
+        email=_texto(linha, "email"),
+        endereco=_texto(linha, "endereco"),
+        preferencias=_lista(linha.get("preferencias")),
+        opt_in={canal: _booleano(aceito) for canal, aceito in opt_in.items()}
+    )
+
+
+def montar_motoboy(linha: dict) -> Motoboy:
+    return Motoboy(
+        id=str(uuid.uuid4()),
+        nome=_texto(linha, "nome"),
+        cpf=_texto(linha, "cpf"),
+        telefone=_texto(linha, "telefone"),
+        cnh=_texto(linha, "cnh"),
+        status_operacional=_texto(linha, "status_operacional") or "Offline",
+        zonas_atuacao=_lista(linha.get("zonas_atuacao")),
+        horarios_disponiveis=_lista(linha.get("horarios_disponiveis"))
+    )
+
+
+# Coleção -> (DAO, montagem do modelo, índices que não podem repetir)
+CADASTROS = {
+    "clientes": (ClienteDAO, montar_cliente, ("cpf", "email")),
+    "motoboys": (MotoboyDAO, montar_motoboy, ("cpf", "cnh"))
+}
+
+
+def ler_linhas(caminho: str, formato: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """
+    Gera (número da linha, registro, erro) um a um, sem carregar o arquivo.
+    """
+    with open(caminho, "r", encoding="utf-8", newline="") as fp:
+        if formato == "csv":
+            leitor = csv.DictReader(fp)
+            for linha in leitor:
+                yield leitor.line_num, linha, None
+        else:
+            for numero, linha in enumerate(fp, start=1):
+                if not linha.strip():
+                    continue
+                try:
+                    registro = json.loads(linha)
+                except json.JSONDecodeError:
+                    yield numero, None, "JSON inválido"
+                    continue
+                if isinstance(registro, dict):
+                    yield numero, registro, None
+                else:
+                    yield numero, None, "linha não é um objeto JSON"
+
+
+def identidade_arquivo(caminho: str) -> Dict[str, Any]:
+    """Tamanho e hash do início do arquivo, para só retomar o mesmo arquivo."""
+    with open(caminho, "rb") as fp:
+        inicio = hashlib.sha256(fp.read(1 << 20)).hexdigest()[:32]
+    return {"tamanho": os.path.getsize(caminho), "inicio_sha256": inicio}
+
+
+def carregar_checkpoint(caminho: str) -> Optional[dict]:
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, "r", encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+def salvar_checkpoint(caminho: str, estado: dict) -> None:
+    temporario = f"{caminho}.tmp"
+    with open(temporario, "w", encoding="utf-8") as fp:
+        json.dump(estado, fp, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+
+
+def carregar_chaves(dao: FirebaseDAO, indices: Tuple[str, ...]) -> set:
+    """
+    Conjunto "indice:chave" com tudo que já existe na coleção (uma leitura
+    rasa por índice).
+    """
+    chaves = set()
+    for nome in indices:
+        existentes = dao.chaves_indice(nome)
+        if existentes is None:
+            raise RuntimeError(f"não foi possível ler o índice '{nome}'")
+        chaves.update(f"{nome}:{c}" for c in existentes)
+    return chaves
+
+
+def importar(
+    colecao: str,
+    arquivo: str,
+    formato: str,
+    tamanho_lote: int,
+    checkpoint: str,
+    rejeitados: Optional[str] = None,
+    simular: bool = False,
+    reiniciar: bool = False
+) -> dict:
+    classe, montar, indices = CADASTROS[colecao]
+    dao = classe()
+
+    identidade = identidade_arquivo(arquivo)
+    estado = None if reiniciar else carregar_checkpoint(checkpoint)
+    if estado and (estado.get("colecao") != colecao or estado.get("arquivo") != identidade):
+        raise RuntimeError(f"checkpoint '{checkpoint}' é de outro arquivo ou coleção; use --reiniciar")
+    if not estado:
+        estado = {
+            "colecao": colecao,
+            "arquivo": identidade,
+            "linha": 0,
+            "importados": 0,
+            "duplicados": 0,
+            "invalidos": 0,
+            "iniciado_em": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        }
+    elif estado.get("concluido_em"):
+        logger.info(f"Importação já concluída em {estado['concluido_em']}")
+        return estado
+    else:
+        logger.info(f"Retomando após a linha {estado['linha']}")
+
+    inicio = time.perf_counter()
+    vistas = carregar_chaves(dao, indices)
+    # Carga inicial numa coleção vazia: ao final, todo registro terá seus índices
+    if "colecao_vazia" not in estado:
+        estado["colecao_vazia"] = not vistas and dao.contar_registros() == 0
+    logger.info(f"{len(vistas)} chave(s) existente(s) carregada(s) em {time.perf_counter() - inicio:.1f}s")
+
+    saida_rejeitados = open(rejeitados, "a" if estado["linha"] else "w", encoding="utf-8") if rejeitados else None
+    lote: Dict[str, dict] = {}
+    ultima_linha = estado["linha"]
+    lidas = 0
+
+    def gravar_lote() -> None:
+        if lote and not simular:
+            if not dao.criar_em_lote(lote):
+                raise RuntimeError(f"lote terminado na linha {ultima_linha} não gravado; rode novamente para retomar")
+        estado["importados"] += len(lote)
+        estado["linha"] = ultima_linha
+        lote.clear()
+        if not simular:
+            salvar_checkpoint(checkpoint, estado)
+        decorrido = time.perf_counter() - inicio
+        logger.info(f"linha {estado['linha']}: {estado['importados']} importado(s), "
+                    f"{estado['duplicados']} duplicado(s), {estado['invalidos']} inválido(s) "
+                    f"({lidas / decorrido if decorrido else 0:.0f} linhas/s)")
+
+    def rejeitar(numero: int, motivo: str, registro: Optional[dict], campo: str) -> None:
+        estado[campo] += 1
+        if saida_rejeitados:
+            saida_rejeitados.write(json.dumps(
+                {"linha": numero, "motivo": motivo, "registro": registro}, ensure_ascii=False, default=str
+            ) + "\n")
+
+    try:
+        for numero, linha, erro in ler_linhas(arquivo, formato):
+            if numero <= estado["linha"]:
+                continue
+            lidas += 1
+            ultima_linha = numero
+            if erro:
+                rejeitar(numero, erro, None, "invalidos")
+                continue
+            try:
+                modelo = montar(linha)
+            except (ValueError, TypeError, AttributeError) as e:
+                rejeitar(numero, str(e), linha, "invalidos")
+                continue
+
+            dados = modelo.to_dict()
+            chaves = []
+            for nome in indices:
+                chave = dao.chave_indice(nome, dados.get(nome))
+                if chave:
+                    chaves.append(f"{nome}:{chave}")
+            repetida = next((c for c in chaves if c in vistas), None)
+            if repetida:
+                rejeitar(numero, f"duplicado ({repetida.split(':', 1)[0]})", linha, "duplicados")
+                continue
+            vistas.update(chaves)
+
+            dados["data_criacao"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            lote[modelo.id] = dados
+            if len(lote) >= tamanho_lote:
+                gravar_lote()
+
+        gravar_lote()
+        if estado["colecao_vazia"] and not simular:
+            dao.marcar_indices_construidos()
+        estado["concluido_em"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if not simular:
+            salvar_checkpoint(checkpoint, estado)
+    finally:
+        if saida_rejeitados:
+            saida_rejeitados.close()
+
+    estado["segundos"] = round(time.perf_counter() - inicio, 2)
+    return estado
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("colecao", choices=sorted(CADASTROS))
+    parser.add_argument("arquivo", help="arquivo de cadastros (.csv ou .ndjson)")
+    parser.add_argument("--formato", choices=["csv", "ndjson"], help="padrão: deduzido pela extensão")
+    parser.add_argument("--tamanho-lote", type=int, default=500, help="registros por escrita atômica")
+    parser.add_argument("--checkpoint", help="arquivo de progresso (padrão: <arquivo>.importacao.json)")
+    parser.add_argument("--rejeitados", help="grava as linhas inválidas/duplicadas (NDJSON) neste arquivo")
+    parser.add_argument("--simular", action="store_true", help="valida e deduplica sem gravar")
+    parser.add_argument("--reiniciar", action="store_true", help="ignora o checkpoint existente")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    # Um log por lote já basta; o das DAOs repetiria cada escrita
+    logging.getLogger("dao").setLevel(logging.WARNING)
+    formato = args.formato or ("csv" if args.arquivo.lower().endswith(".csv") else "ndjson")
+    if args.tamanho_lote <= 0:
+        parser.error("--tamanho-lote deve ser positivo")
+
+    try:
+        relatorio = importar(
+            args.colecao,
+            args.arquivo,
+            formato,
+            args.tamanho_lote,
+            args.checkpoint or f"{args.arquivo}.importacao.json",
+            rejeitados=args.rejeitados,
+            simular=args.simular,
+            reiniciar=args.reiniciar
+        )
+    except RuntimeError as e:
+        logger.error(f"Importação interrompida: {e}")
+        return 1
+
+    print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Poda das marcas de exclusão usadas pela sincronização incremental.
+
+Cada exclusão deixa excluidos/{colecao}/{id} com o instante da remoção, para
+que os espelhos locais (FirebaseDAO.sincronizar_desde) saibam o que sumiu.
+As marcas mais antigas que --dias dias são removidas; um espelho que não
+sincroniza há mais tempo que isso recarrega a coleção inteira.
+
+Pensado para rodar agendado, ex.:
+    15 4 * * 0  cd /srv/crm-pizzaria && python -m jobs.podar_exclusoes --dias 30
+
+Uso:
+    python -m jobs.podar_exclusoes --dias 30
+    python -m jobs.podar_exclusoes --dias 7 --colecao clientes
+"""
+
+import argparse
+import json
+import logging
+import sys
+import time
+
+from dao.avaliacao_dao import AvaliacaoDAO
+from dao.campanha_dao import CampanhaDAO
+from dao.cliente_dao import ClienteDAO
+from dao.fidelidade_dao import FidelidadeDAO
+from dao.motoboy_dao import MotoboyDAO
+from dao.usuario_dao import UsuarioDAO
+
+logger = logging.getLogger(__name__)
+
+DAOS = {
+    "usuarios": UsuarioDAO,
+    "clientes": ClienteDAO,
+    "motoboys": MotoboyDAO,
+    "avaliacoes": AvaliacaoDAO,
+    "fidelidade": FidelidadeDAO,
+    "campanhas": CampanhaDAO
+}
+
+
+def podar(dias: int, colecoes=None) -> dict:
+    antes_de = int((time.time() - dias * 86400) * 1000)
+    relatorio = {"antes_de": antes_de, "removidas": {}}
+    for colecao in colecoes or DAOS:
+        relatorio["removidas"][colecao] = DAOS[colecao]().podar_exclusoes(antes_de)
+        logger.info(f"{colecao}: {relatorio['removidas'][colecao]} marca(s) removida(s)")
+    return relatorio
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dias", type=int, default=30, help="idade mínima (em dias) das marcas removidas")
+    parser.add_argument("--colecao", action="append", choices=sorted(DAOS), help="coleção (repetível; padrão: todas)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logging.getLogger("dao").setLevel(logging.WARNING)
+    if args.dias < 1:
+        parser.error("--dias deve ser ao menos 1")
+
+    try:
+        relatorio = podar(args.dias, args.colecao)
+    except Exception as e:
+        logger.error(f"Poda interrompida: {e}")
+        return 1
+
+    print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+"""
+Reconstrução dos índices de busca exata (indices/{colecao}/...) e dos
+agregados de avaliações (avaliacoes_resumo/...).
+
+Necessária uma única vez para bases criadas antes deles; depois disso as
+DAOs os mantêm na mesma escrita de cada registro. Enquanto não forem
+construídos, buscas e estatísticas continuam funcionando por varredura
+completa.
+
+Uso:
+    python -m jobs.reconstruir_indices            # clientes, motoboys e avaliacoes
+    python -m jobs.reconstruir_indices avaliacoes
+"""
+
+import argparse
+import logging
+import sys
+
+from dao.avaliacao_dao import AvaliacaoDAO
+from dao.cliente_dao import ClienteDAO
+from dao.motoboy_dao import MotoboyDAO
+
+logger = logging.getLogger(__name__)
+
+DAOS = {
+    "clientes": lambda: ClienteDAO().reconstruir_indices(),
+    "motoboys": lambda: MotoboyDAO().reconstruir_indices(),
+    "avaliacoes": lambda: AvaliacaoDAO().reconstruir_resumos(),
+}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("colecoes", nargs="*", help=f"coleções a reindexar: {', '.join(sorted(DAOS))} (padrão: todas)")
+    args = parser.parse_args(argv)
+    desconhecidas = set(args.colecoes) - set(DAOS)
+    if desconhecidas:
+        parser.error(f"coleção desconhecida: {', '.join(sorted(desconhecidas))}")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    for colecao in args.colecoes or sorted(DAOS):
+        total = DAOS[colecao]()
+        logger.info(f"[{colecao}] {total} registro(s) indexado(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
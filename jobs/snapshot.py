@@ -0,0 +1,412 @@
+"""
+Snapshot e restauração da árvore do Realtime Database.
+
+criar
+    Percorre cada nó de primeiro nível (ou os informados) em páginas ordenadas
+    por chave e grava os registros em chunks NDJSON compactados (gzip), um
+    objeto {"c": caminho, "v": valor} por linha. Nós que só agrupam outros
+    (indices, indices/<colecao>, avaliacoes_resumo...) são divididos nos
+    filhos, para que uma página nunca traga um índice inteiro. O manifesto
+    registra, por chunk, registros, bytes e SHA-256 do arquivo e, por nó, a
+    contagem e um resumo do conteúdo (soma dos hashes dos registros,
+    independente de ordem).
+
+    As páginas são lidas uma a uma, sem isolamento entre elas: para um retrato
+    exato de um instante, pare as escritas (janela de manutenção) durante a
+    cópia.
+
+verificar
+    Confere tamanho e SHA-256 de cada chunk contra o manifesto e, com --banco,
+    recalcula os resumos dos nós a partir do banco atual, ex.: depois de
+    restaurar no banco local (CRM_BANCO_LOCAL=restaurado.json).
+
+restaurar
+    Reaplica os chunks em paralelo (uma thread por chunk), em updates
+    multi-path de --tamanho-lote registros. Com --limpar, apaga antes os nós
+    do snapshot, para que nada que não estava nele sobreviva.
+
+    A restauração não deixa marcas de exclusão nem carimbos novos, então a
+    sincronização incremental não a enxergaria. Ao final (mesmo com falha), o
+    limite de poda de cada coleção restaurada
+    (sincronizacao/{colecao}/exclusoes_podadas_ate) passa para o instante do
+    servidor: os espelhos em memória e em disco de todos os servidores
+    recarregam a coleção inteira na próxima sincronização.
+
+Uso:
+    python -m jobs.snapshot criar backups/2026-10-19
+    python -m jobs.snapshot verificar backups/2026-10-19
+    python -m jobs.snapshot restaurar backups/2026-10-19 --limpar --paralelo 8
+    CRM_BANCO_LOCAL=restaurado.json python -m jobs.snapshot restaurar backups/2026-10-19
+    CRM_BANCO_LOCAL=restaurado.json python -m jobs.snapshot verificar backups/2026-10-19 --banco
+"""
+
+import argparse
+import fnmatch
+import gzip
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config.firebase_config import FirebaseConfig
+from dao.firebase_dao import CARIMBO_SERVIDOR, FirebaseDAO, paginar
+
+logger = logging.getLogger(__name__)
+
+VERSAO = 1
+MANIFESTO = "manifesto.json"
+# Nós divididos nos filhos em vez de paginados ("" é a raiz)
+AGRUPADORES = ("", "indices", "indices/*", "excluidos", "avaliacoes_resumo", "avaliacoes_resumo/global")
+_MODULO_RESUMO = 1 << 256
+# Nós de primeiro nível que não são coleções sincronizadas
+_RAIZES_INTERNAS = (
+    FirebaseDAO._RAIZ_INDICES, FirebaseDAO._RAIZ_EXCLUIDOS, FirebaseDAO._RAIZ_SINCRONIZACAO, "fila_lotes"
+)
+
+
+def _hash_registro(caminho: str, valor: Any) -> int:
+    serializado = json.dumps([caminho, valor], sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return int.from_bytes(hashlib.sha256(serializado.encode("utf-8")).digest(), "big")
+
+
+class Resumo:
+    """Contagem e soma (mod 2^256) dos hashes dos registros de um nó."""
+
+    def __init__(self):
+        self.registros = 0
+        self._soma = 0
+
+    def adicionar(self, caminho: str, valor: Any) -> None:
+        self.registros += 1
+        self._soma = (self._soma + _hash_registro(caminho, valor)) % _MODULO_RESUMO
+
+    @property
+    def hexdigest(self) -> str:
+        return f"{self._soma:064x}"
+
+
+def sha256_arquivo(caminho: str) -> str:
+    resumo = hashlib.sha256()
+    with open(caminho, "rb") as fp:
+        for bloco in iter(lambda: fp.read(1 << 20), b""):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+def _agrupador(caminho: str) -> bool:
+    # Compara segmento a segmento: "indices/*" não casa com "indices/clientes/cpf"
+    partes = caminho.split("/") if caminho else []
+    for padrao in AGRUPADORES:
+        segmentos = padrao.split("/") if padrao else []
+        if len(segmentos) == len(partes) and all(map(fnmatch.fnmatchcase, partes, segmentos)):
+            return True
+    return False
+
+
+def planejar(raiz, caminho: str = "") -> Iterator[Tuple[str, bool]]:
+    """
+    Gera (caminho, paginado) para cada nó a copiar: paginado=True para nós
+    percorridos em páginas e False para folhas (valores simples) lidas inteiras.
+    """
+    if not _agrupador(caminho):
+        yield caminho, True
+        return
+    referencia = raiz.child(caminho) if caminho else raiz
+    filhos = referencia.get(shallow=True)
+    if not isinstance(filhos, dict):
+        if filhos is not None:
+            yield caminho, False
+        return
+    for chave in sorted(filhos):
+        filho = f"{caminho}/{chave}" if caminho else chave
+        if filhos[chave] is True:
+            yield from planejar(raiz, filho)
+        else:
+            yield filho, False
+
+
+def ler_no(raiz, caminho: str, paginado: bool, tamanho_pagina: int) -> Iterator[List[Tuple[str, Any]]]:
+    """Páginas de (caminho completo, valor) de um nó do plano."""
+    if not paginado:
+        valor = raiz.child(caminho).get()
+        if valor is not None:
+            yield [(caminho, valor)]
+        return
+    vazio = True
+    for itens in paginar(raiz.child(caminho), tamanho_pagina):
+        vazio = False
+        yield [(f"{caminho}/{chave}", valor) for chave, valor in itens]
+    if vazio:
+        # A leitura rasa devolve true tanto para objetos quanto para a folha
+        # true (ex.: marcadores _construido): sem filhos, lê o valor inteiro
+        valor = raiz.child(caminho).get()
+        if valor is not None and not isinstance(valor, dict):
+            yield [(caminho, valor)]
+
+
+class _Chunk:
+    def __init__(self, diretorio: str, numero: int):
+        self.arquivo = f"chunk-{numero:06d}.ndjson.gz"
+        self._caminho = os.path.join(diretorio, self.arquivo)
+        self._bruto = open(f"{self._caminho}.parcial", "wb")
+        self._saida = gzip.GzipFile(fileobj=self._bruto, mode="wb")
+        self.registros = 0
+        self.primeiro: Optional[str] = None
+        self.ultimo: Optional[str] = None
+
+    def escrever(self, itens: List[Tuple[str, Any]]) -> None:
+        linhas = "".join(
+            json.dumps({"c": c, "v": v}, ensure_ascii=False, separators=(",", ":")) + "\n" for c, v in itens
+        )
+        self._saida.write(linhas.encode("utf-8"))
+        self.registros += len(itens)
+        self.primeiro = self.primeiro or itens[0][0]
+        self.ultimo = itens[-1][0]
+
+    def tamanho(self) -> int:
+        return self._bruto.tell()
+
+    def fechar(self) -> dict:
+        self._saida.close()
+        self._bruto.close()
+        os.replace(f"{self._caminho}.parcial", self._caminho)
+        return {
+            "arquivo": self.arquivo,
+            "registros": self.registros,
+            "primeiro": self.primeiro,
+            "ultimo": self.ultimo,
+            "bytes": os.path.getsize(self._caminho),
+            "sha256": sha256_arquivo(self._caminho)
+        }
+
+
+def criar(
+    destino: str,
+    nos: Optional[List[str]] = None,
+    tamanho_pagina: int = 500,
+    tamanho_chunk_mb: float = 64
+) -> dict:
+    raiz = FirebaseConfig.get_instance().rtdb
+    os.makedirs(destino, exist_ok=True)
+    if os.path.exists(os.path.join(destino, MANIFESTO)):
+        raise RuntimeError(f"'{destino}' já contém um snapshot")
+
+    inicio = time.perf_counter()
+    limite = int(tamanho_chunk_mb * 1024 * 1024)
+    manifesto = {
+        "versao": VERSAO,
+        "iniciado_em": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "registros": 0,
+        "nos": {},
+        "chunks": []
+    }
+
+    chunk: Optional[_Chunk] = None
+    try:
+        plano = [p for no in nos for p in planejar(raiz, no.strip("/"))] if nos else list(planejar(raiz))
+        for caminho, paginado in plano:
+            resumo = Resumo()
+            for itens in ler_no(raiz, caminho, paginado, tamanho_pagina):
+                if chunk is None:
+                    chunk = _Chunk(destino, len(manifesto["chunks"]))
+                chunk.escrever(itens)
+                for c, v in itens:
+                    resumo.adicionar(c, v)
+                if chunk.tamanho() >= limite:
+                    manifesto["chunks"].append(chunk.fechar())
+                    chunk = None
+            manifesto["nos"][caminho] = {
+                "paginado": paginado, "registros": resumo.registros, "resumo": resumo.hexdigest
+            }
+            manifesto["registros"] += resumo.registros
+            logger.info(f"{caminho}: {resumo.registros} registro(s)")
+        if chunk is not None:
+            manifesto["chunks"].append(chunk.fechar())
+            chunk = None
+    finally:
+        # Falha no meio: o chunk aberto fica como .parcial e não há manifesto
+        if chunk is not None:
+            chunk._saida.close()
+            chunk._bruto.close()
+
+    manifesto["concluido_em"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    manifesto["segundos"] = round(time.perf_counter() - inicio, 2)
+    temporario = os.path.join(destino, f"{MANIFESTO}.tmp")
+    with open(temporario, "w", encoding="utf-8") as fp:
+        json.dump(manifesto, fp, ensure_ascii=False, indent=2)
+    os.replace(temporario, os.path.join(destino, MANIFESTO))
+    return manifesto
+
+
+def carregar_manifesto(origem: str) -> dict:
+    with open(os.path.join(origem, MANIFESTO), "r", encoding="utf-8") as fp:
+        manifesto = json.load(fp)
+    if manifesto.get("versao") != VERSAO:
+        raise RuntimeError(f"versão de snapshot não suportada: {manifesto.get('versao')}")
+    return manifesto
+
+
+def ler_chunk(origem: str, arquivo: str) -> Iterator[Tuple[str, Any]]:
+    with gzip.open(os.path.join(origem, arquivo), "rt", encoding="utf-8") as fp:
+        for linha in fp:
+            registro = json.loads(linha)
+            yield registro["c"], registro["v"]
+
+
+def verificar(origem: str, banco: bool = False, tamanho_pagina: int = 500) -> dict:
+    """
+    Confere os chunks contra o manifesto e, com banco=True, o conteúdo atual
+    do banco contra os resumos de cada nó.
+
+    Returns:
+        dict com "ok" e a lista de "problemas" encontrados.
+    """
+    manifesto = carregar_manifesto(origem)
+    problemas = []
+    for chunk in manifesto["chunks"]:
+        caminho = os.path.join(origem, chunk["arquivo"])
+        if not os.path.exists(caminho):
+            problemas.append(f"{chunk['arquivo']}: ausente")
+        elif os.path.getsize(caminho) != chunk["bytes"] or sha256_arquivo(caminho) != chunk["sha256"]:
+            problemas.append(f"{chunk['arquivo']}: checksum diverge do manifesto")
+
+    if banco:
+        raiz = FirebaseConfig.get_instance().rtdb
+        for caminho, esperado in manifesto["nos"].items():
+            resumo = Resumo()
+            for itens in ler_no(raiz, caminho, esperado["paginado"], tamanho_pagina):
+                for c, v in itens:
+                    resumo.adicionar(c, v)
+            if (resumo.registros, resumo.hexdigest) != (esperado["registros"], esperado["resumo"]):
+                problemas.append(
+                    f"{caminho}: banco tem {resumo.registros} registro(s), snapshot {esperado['registros']}"
+                    + ("" if resumo.registros != esperado["registros"] else " (conteúdo diverge)")
+                )
+
+    return {"ok": not problemas, "chunks": len(manifesto["chunks"]), "nos": len(manifesto["nos"]),
+            "registros": manifesto["registros"], "problemas": problemas}
+
+
+def colecoes_restauradas(nos) -> List[str]:
+    """Coleções cujos registros ou marcas de exclusão estão entre os nós do snapshot."""
+    colecoes = set()
+    for caminho in nos:
+        partes = caminho.split("/")
+        if len(partes) == 1 and partes[0] and partes[0] not in _RAIZES_INTERNAS:
+            colecoes.add(partes[0])
+        elif len(partes) == 2 and partes[0] == FirebaseDAO._RAIZ_EXCLUIDOS:
+            colecoes.add(partes[1])
+    return sorted(colecoes)
+
+
+def forcar_recarga(raiz, colecoes: List[str]) -> None:
+    """Leva o limite de poda das coleções ao instante do servidor (ver restaurar)."""
+    if not colecoes:
+        return
+    raiz.update({
+        f"{FirebaseDAO._RAIZ_SINCRONIZACAO}/{colecao}/exclusoes_podadas_ate": CARIMBO_SERVIDOR
+        for colecao in colecoes
+    })
+    logger.info(f"Espelhos de {', '.join(colecoes)} serão recarregados por inteiro")
+
+
+def restaurar(origem: str, paralelo: int = 8, tamanho_lote: int = 500, limpar: bool = False) -> dict:
+    manifesto = carregar_manifesto(origem)
+    verificacao = verificar(origem)
+    if not verificacao["ok"]:
+        raise RuntimeError(f"snapshot corrompido: {'; '.join(verificacao['problemas'])}")
+
+    raiz = FirebaseConfig.get_instance().rtdb
+    inicio = time.perf_counter()
+    colecoes = colecoes_restauradas(manifesto["nos"])
+
+    def restaurar_chunk(chunk: dict) -> int:
+        lote: Dict[str, Any] = {}
+        gravados = 0
+        for caminho, valor in ler_chunk(origem, chunk["arquivo"]):
+            lote[caminho] = valor
+            if len(lote) >= tamanho_lote:
+                raiz.update(lote)
+                gravados += len(lote)
+                lote = {}
+        if lote:
+            raiz.update(lote)
+            gravados += len(lote)
+        logger.info(f"{chunk['arquivo']}: {gravados} registro(s) restaurado(s)")
+        return gravados
+
+    try:
+        if limpar:
+            for caminho in manifesto["nos"]:
+                raiz.child(caminho).delete()
+            logger.info(f"{len(manifesto['nos'])} nó(s) apagado(s)")
+        with ThreadPoolExecutor(max_workers=paralelo) as executor:
+            # list(): propaga a primeira falha de qualquer chunk
+            gravados = sum(list(executor.map(restaurar_chunk, manifesto["chunks"])))
+    finally:
+        # Uma restauração interrompida também pode ter mudado os dados
+        forcar_recarga(raiz, colecoes)
+
+    return {
+        "chunks": len(manifesto["chunks"]),
+        "registros": gravados,
+        "esperados": manifesto["registros"],
+        "recarregadas": colecoes,
+        "segundos": round(time.perf_counter() - inicio, 2)
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    p_criar = comandos.add_parser("criar", help="grava um snapshot no diretório")
+    p_criar.add_argument("diretorio")
+    p_criar.add_argument("nos", nargs="*", help="nós a copiar (padrão: a árvore inteira)")
+    p_criar.add_argument("--tamanho-pagina", type=int, default=500, help="filhos por leitura do banco")
+    p_criar.add_argument("--tamanho-chunk-mb", type=float, default=64, help="tamanho aproximado de cada chunk")
+
+    p_verificar = comandos.add_parser("verificar", help="confere checksums (e o banco, com --banco)")
+    p_verificar.add_argument("diretorio")
+    p_verificar.add_argument("--banco", action="store_true", help="compara também o conteúdo do banco atual")
+    p_verificar.add_argument("--tamanho-pagina", type=int, default=500)
+
+    p_restaurar = comandos.add_parser("restaurar", help="reaplica um snapshot no banco")
+    p_restaurar.add_argument("diretorio")
+    p_restaurar.add_argument("--paralelo", type=int, default=8, help="chunks restaurados ao mesmo tempo")
+    p_restaurar.add_argument("--tamanho-lote", type=int, default=500, help="registros por update multi-path")
+    p_restaurar.add_argument("--limpar", action="store_true", help="apaga os nós do snapshot antes de restaurar")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    for opcao in ("tamanho_pagina", "tamanho_chunk_mb", "paralelo", "tamanho_lote"):
+        if getattr(args, opcao, 1) <= 0:
+            parser.error(f"--{opcao.replace('_', '-')} deve ser positivo")
+
+    try:
+        if args.comando == "criar":
+            relatorio = criar(args.diretorio, args.nos, args.tamanho_pagina, args.tamanho_chunk_mb)
+            relatorio = {k: v for k, v in relatorio.items() if k not in ("nos", "chunks")}
+        elif args.comando == "verificar":
+            relatorio = verificar(args.diretorio, args.banco, args.tamanho_pagina)
+        else:
+            relatorio = restaurar(args.diretorio, args.paralelo, args.tamanho_lote, args.limpar)
+    except Exception as e:
+        logger.error(f"Snapshot: falha ao {args.comando}: {e}")
+        return 1
+
+    print(json.dumps(relatorio, ensure_ascii=False, indent=2))
+    if args.comando == "verificar" and not relatorio["ok"]:
+        return 1
+    if args.comando == "restaurar" and relatorio["registros"] != relatorio["esperados"]:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,19 @@
 from typing import Optional, List
 from datetime import datetime, date
+from models.movimentacao_pontos import MovimentacaoPontos
 
 
 class Fidelidade:
     """
     Armazena informações de programas de fidelidade dos clientes.
     Fornece métodos para adicionar pontos, resgatar e verificar status.
+    O saldo fica materializado em `pontos`; cada movimentação gera um
+    MovimentacaoPontos pendente, gravado no extrato pela FidelidadeDAO.
     """
 
     _NIVEIS_VALIDOS = {"bronze", "prata", "ouro"}
+    # Pontuação mínima de cada nível, do mais alto para o mais baixo
+    _LIMIARES_NIVEL = (("ouro", 1500), ("prata", 500), ("bronze", 0))
 
     def __init__(
         self,
@@ -17,8 +22,7 @@ class Fidelidade:
         cliente_nome: str,
         pontos: int,
         nivel: str,
-        validade: str,
-        historico: Optional[List[str]] = None
+        validade: str
     ):
         self.id = id
         self.cliente_id = cliente_id
@@ -26,7 +30,8 @@ class Fidelidade:
         self.pontos = pontos
         self.nivel = nivel
         self.validade = validade
-        self.historico = historico or []
+        self._movimentacoes_pendentes: List[MovimentacaoPontos] = []
+        self._historico_legado: List[str] = []
 
     @property
     def id(self) -> Optional[str]:
@@ -92,14 +97,35 @@ class Fidelidade:
         self._validade = value
 
     @property
-    def historico(self) -> List[str]:
-        return self._historico.copy()
+    def movimentacoes_pendentes(self) -> List[MovimentacaoPontos]:
+        return self._movimentacoes_pendentes.copy()
 
-    @historico.setter
-    def historico(self, value: List[str]):
-        if not isinstance(value, list) or any(not isinstance(item, str) for item in value):
-            raise ValueError("Histórico deve ser lista de strings")
-        self._historico = value.copy()
+    def consumir_movimentacoes_pendentes(self) -> List[MovimentacaoPontos]:
+        """
+        Retorna as movimentações ainda não aplicadas ao saldo gravado e limpa a fila.
+        """
+        pendentes = self._movimentacoes_pendentes
+        for m in pendentes:
+            m.fidelidade_id = self._id or m.fidelidade_id
+        self._movimentacoes_pendentes = []
+        return pendentes
+
+    def consumir_historico_legado(self) -> List[MovimentacaoPontos]:
+        """
+        Converte as linhas do antigo campo 'historico' em lançamentos e limpa a lista.
+        Esses lançamentos já estão refletidos no saldo; servem apenas ao extrato.
+        """
+        if not self._id:
+            return []
+        legado = [MovimentacaoPontos.from_historico_legado(self._id, texto) for texto in self._historico_legado]
+        self._historico_legado = []
+        return [m for m in legado if m]
+
+    def possui_historico_legado(self) -> bool:
+        """
+        Indica se o registro ainda carrega o antigo campo 'historico' embutido.
+        """
+        return bool(self._historico_legado)
 
     def to_dict(self) -> dict:
         """
@@ -111,8 +137,7 @@ class Fidelidade:
             "cliente_nome": self._cliente_nome,
             "pontos": self._pontos,
             "nivel": self._nivel,
-            "validade": self._validade,
-            "historico": self._historico
+            "validade": self._validade
         }
 
     @classmethod
@@ -120,40 +145,65 @@ class Fidelidade:
         """
         Cria instância de Fidelidade a partir de um dicionário.
         """
-        return cls(
+        instance = cls(
             id=data.get("id"),
             cliente_id=data.get("cliente_id", ""),
             cliente_nome=data.get("cliente_nome", ""),
             pontos=data.get("pontos", 0),
             nivel=data.get("nivel", "bronze"),
-            validade=data.get("validade", date.today().strftime("%Y-%m-%d")),
-            historico=data.get("historico", [])
+            validade=data.get("validade", date.today().strftime("%Y-%m-%d"))
         )
+        # Registros antigos ainda trazem o histórico embutido; é migrado no próximo atualizar
+        historico = data.get("historico") or []
+        instance._historico_legado = [h for h in historico if isinstance(h, str)]
+        return instance
 
-    def adicionar_pontos(self, quantidade: int, motivo: str = "") -> None:
+    def adicionar_pontos(self, quantidade: int, motivo: str = "", pedido_id: Optional[str] = None) -> MovimentacaoPontos:
         """
-        Adiciona pontos ao cliente e registra no histórico.
+        Adiciona pontos ao cliente e registra a movimentação pendente para o extrato.
         """
         if not isinstance(quantidade, int) or quantidade <= 0:
             raise ValueError("Quantidade de pontos deve ser inteiro positivo")
         self._pontos += quantidade
-        if motivo:
-            self._historico.append(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}: +{quantidade} pontos - {motivo}")
+        movimentacao = MovimentacaoPontos(
+            id=None,
+            fidelidade_id=self._id or self._cliente_id,
+            delta=quantidade,
+            motivo=motivo,
+            pedido_id=pedido_id
+        )
+        self._movimentacoes_pendentes.append(movimentacao)
+        return movimentacao
 
-    def resgatar_pontos(self, quantidade: int, motivo: str = "") -> bool:
+    def resgatar_pontos(self, quantidade: int, motivo: str = "", pedido_id: Optional[str] = None) -> bool:
         """
-        Tenta resgatar pontos. Se houver saldo suficiente, deduz e retorna True,
-        caso contrário, retorna False.
+        Tenta resgatar pontos. Se houver saldo suficiente, deduz, registra a
+        movimentação pendente e retorna True; caso contrário, retorna False.
         """
         if not isinstance(quantidade, int) or quantidade <= 0:
             raise ValueError("Quantidade de pontos deve ser inteiro positivo")
         if quantidade > self._pontos:
             return False
         self._pontos -= quantidade
-        if motivo:
-            self._historico.append(f"{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}: -{quantidade} pontos - {motivo}")
+        self._movimentacoes_pendentes.append(MovimentacaoPontos(
+            id=None,
+            fidelidade_id=self._id or self._cliente_id,
+            delta=-quantidade,
+            motivo=motivo,
+            pedido_id=pedido_id
+        ))
         return True
 
+    @staticmethod
+    def nivel_por_pontos(pontos: int) -> str:
+        """
+        Retorna o nível correspondente a um saldo de pontos.
+        """
+        for nivel, minimo in Fidelidade._LIMIARES_NIVEL:
+            if pontos >= minimo:
+                return nivel
+        return "bronze"
+
     def esta_expirado(self) -> bool:
         """
         Retorna True se a validade já passou.
@@ -0,0 +1,153 @@
+from datetime import datetime
+from typing import Optional
+import re
+
+
+class MovimentacaoPontos:
+    """
+    Representa um lançamento no extrato de pontos de um programa de fidelidade.
+    O extrato é append-only: lançamentos não são alterados depois de gravados,
+    e o saldo fica materializado no próprio registro de Fidelidade.
+    """
+
+    # Formato das strings do antigo campo Fidelidade.historico
+    _HISTORICO_LEGADO = re.compile(
+        r'^(?P<data_hora>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}): (?P<delta>[+-]\d+) pontos - (?P<motivo>.*)$'
+    )
+
+    def __init__(
+        self,
+        id: Optional[str],
+        fidelidade_id: str,
+        delta: int,
+        motivo: str = "",
+        pedido_id: Optional[str] = None,
+        data_hora: Optional[str] = None
+    ):
+        self.id = id
+        self.fidelidade_id = fidelidade_id
+        self.delta = delta
+        self.motivo = motivo
+        self.pedido_id = pedido_id
+        self.data_hora = data_hora or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    @property
+    def id(self) -> Optional[str]:
+        return self._id
+
+    @id.setter
+    def id(self, value: Optional[str]):
+        if value is not None and (not isinstance(value, str) or not value.strip()):
+            raise ValueError("ID deve ser uma string não vazia ou None")
+        self._id = None if value is None else value.strip()
+
+    @property
+    def fidelidade_id(self) -> str:
+        return self._fidelidade_id
+
+    @fidelidade_id.setter
+    def fidelidade_id(self, value: str):
+        if not value or not isinstance(value, str):
+            raise ValueError("fidelidade_id deve ser string não vazia")
+        self._fidelidade_id = value
+
+    @property
+    def delta(self) -> int:
+        return self._delta
+
+    @delta.setter
+    def delta(self, value: int):
+        if not isinstance(value, int) or isinstance(value, bool) or value == 0:
+            raise ValueError("Delta deve ser inteiro diferente de zero")
+        self._delta = value
+
+    @property
+    def motivo(self) -> str:
+        return self._motivo
+
+    @motivo.setter
+    def motivo(self, value: str):
+        if not isinstance(value, str):
+            raise ValueError("Motivo deve ser uma string")
+        self._motivo = value.strip()
+
+    @property
+    def pedido_id(self) -> Optional[str]:
+        return self._pedido_id
+
+    @pedido_id.setter
+    def pedido_id(self, value: Optional[str]):
+        if value is not None and (not isinstance(value, str) or not value.strip()):
+            raise ValueError("pedido_id deve ser string não vazia ou None")
+        self._pedido_id = None if value is None else value.strip()
+
+    @property
+    def data_hora(self) -> str:
+        return self._data_hora
+
+    @data_hora.setter
+    def data_hora(self, value: str):
+        try:
+            datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+        except Exception:
+            raise ValueError("Data/hora deve estar no formato 'YYYY-MM-DD HH:MM:SS'")
+        self._data_hora = value
+
+    def to_dict(self) -> dict:
+        """
+        Serializa o lançamento em um dicionário.
+        """
+        return {
+            "id": self._id,
+            "fidelidade_id": self._fidelidade_id,
+            "delta": self._delta,
+            "motivo": self._motivo,
+            "pedido_id": self._pedido_id,
+            "data_hora": self._data_hora
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        Cria instância de MovimentacaoPontos a partir de um dicionário.
+        """
+        return cls(
+            id=data.get("id"),
+            fidelidade_id=data.get("fidelidade_id", ""),
+            delta=data.get("delta", 0),
+            motivo=data.get("motivo", ""),
+            pedido_id=data.get("pedido_id"),
+            data_hora=data.get("data_hora")
+        )
+
+    @classmethod
+    def from_historico_legado(cls, fidelidade_id: str, texto: str):
+        """
+        Converte uma linha do antigo Fidelidade.historico em lançamento estruturado.
+        Retorna None se a linha não estiver no formato esperado.
+        """
+        if not isinstance(texto, str):
+            return None
+        match = cls._HISTORICO_LEGADO.match(texto.strip())
+        if not match or int(match.group("delta")) == 0:
+            return None
+        return cls(
+            id=None,
+            fidelidade_id=fidelidade_id,
+            delta=int(match.group("delta")),
+            motivo=match.group("motivo"),
+            data_hora=match.group("data_hora")
+        )
+
+    def eh_credito(self) -> bool:
+        """
+        Retorna True se o lançamento adiciona pontos.
+        """
+        return self._delta > 0
+
+    def __str__(self) -> str:
+        sinal = "+" if self._delta > 0 else ""
+        return f"MovimentacaoPontos(fidelidade={self._fidelidade_id}, delta={sinal}{self._delta}, motivo={self._motivo})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
@@ -0,0 +1,352 @@
+# services/anomalias.py
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Arquivo NDJSON opcional para os alertas (além do log e da memória)
+ALERTAS_ARQUIVO_ENV = "CRM_ALERTAS_ARQUIVO"
+
+# Chave usada para as estatísticas de todas as avaliações
+CHAVE_GLOBAL = "*"
+
+# Segundos entre as sincronizações do espelho das avaliações feitas pelo detector
+# (buscas e listagens no meio do caminho também entregam as novas avaliações)
+INTERVALO_SINCRONIZACAO = 30.0
+
+
+class EWMA:
+    """
+    Média e variância com decaimento exponencial, atualizadas em O(1).
+    """
+
+    __slots__ = ("alfa", "media", "variancia", "n")
+
+    def __init__(self, alfa: float):
+        if not 0 < alfa <= 1:
+            raise ValueError("Alfa deve estar em (0, 1]")
+        self.alfa = alfa
+        self.media = 0.0
+        self.variancia = 0.0
+        self.n = 0
+
+    def atualizar(self, valor: float) -> None:
+        if self.n == 0:
+            self.media = float(valor)
+        else:
+            diferenca = valor - self.media
+            incremento = self.alfa * diferenca
+            self.media += incremento
+            self.variancia = (1 - self.alfa) * (self.variancia + diferenca * incremento)
+        self.n += 1
+
+    @property
+    def desvio(self) -> float:
+        # Corrige o viés da variância, que parte de zero nas primeiras amostras
+        if self.n < 2:
+            return 0.0
+        correcao = 1 - (1 - self.alfa) ** (self.n - 1)
+        return math.sqrt(max(self.variancia, 0.0) / correcao)
+
+
+class TaxaDecaimento:
+    """
+    Taxa de eventos por hora com decaimento exponencial (constante tau, em
+    segundos), atualizada em O(1) a cada evento.
+    """
+
+    __slots__ = ("tau", "_valor", "_ultimo")
+
+    def __init__(self, tau: float):
+        self.tau = tau
+        self._valor = 0.0
+        self._ultimo: Optional[float] = None
+
+    def registrar(self, instante: float) -> None:
+        self._valor = self.valor(instante) + 1.0
+        self._ultimo = instante if self._ultimo is None else max(self._ultimo, instante)
+
+    def valor(self, instante: float) -> float:
+        if self._ultimo is None:
+            return 0.0
+        # Eventos fora de ordem não "rejuvenescem" o contador
+        decorrido = max(0.0, instante - self._ultimo)
+        return self._valor * math.exp(-decorrido / self.tau)
+
+    def por_hora(self, instante: float) -> float:
+        return self.valor(instante) * 3600.0 / self.tau
+
+
+class _EstadoChave:
+    __slots__ = ("nota_lenta", "nota_rapida", "taxa_curta", "taxa_longa", "ultimo_alerta")
+
+    def __init__(self, alfa_lento: float, alfa_rapido: float, tau_curto: float, tau_longo: float):
+        self.nota_lenta = EWMA(alfa_lento)
+        self.nota_rapida = EWMA(alfa_rapido)
+        self.taxa_curta = TaxaDecaimento(tau_curto)
+        self.taxa_longa = TaxaDecaimento(tau_longo)
+        self.ultimo_alerta: Dict[str, float] = {}
+
+
+class AlertaLog:
+    """
+    Destino padrão: registra o alerta no log como aviso.
+    """
+
+    def emitir(self, alerta: Dict[str, Any]) -> None:
+        logger.warning(f"[anomalia:{alerta['tipo']}] {alerta['mensagem']}")
+
+
+class AlertaArquivo:
+    """
+    Acrescenta cada alerta como uma linha NDJSON, para consumo por outro processo.
+    """
+
+    def __init__(self, caminho: str):
+        self._caminho = caminho
+        self._lock = threading.Lock()
+
+    def emitir(self, alerta: Dict[str, Any]) -> None:
+        with self._lock, open(self._caminho, "a", encoding="utf-8") as fp:
+            fp.write(json.dumps(alerta, ensure_ascii=False) + "\n")
+
+
+class AlertaMemoria:
+    """
+    Guarda os últimos alertas em memória (exibidos no painel de avaliações).
+    """
+
+    def __init__(self, maximo: int = 200):
+        self._alertas: Deque[Dict[str, Any]] = deque(maxlen=maximo)
+
+    def emitir(self, alerta: Dict[str, Any]) -> None:
+        self._alertas.append(alerta)
+
+    def recentes(self, limite: int = 20) -> List[Dict[str, Any]]:
+        return list(self._alertas)[-limite:][::-1]
+
+
+class DetectorAnomalias:
+    """
+    Detector de anomalias em fluxo sobre as avaliações, por avaliado e global.
+
+    - Média: gráfico de controle EWMA. Uma média rápida das notas é comparada
+      à média lenta (linha de base); alerta quando cai abaixo da base por mais
+      de `limiar_desvios` desvios padrão da própria média rápida.
+    - Taxa: contadores com decaimento de curto e longo prazo; alerta quando a
+      taxa recente passa de `fator_taxa` vezes a taxa de referência.
+
+    Cada evento custa O(1) e o estado por chave tem tamanho constante. Os
+    alertas vão para destinos plugáveis (qualquer objeto com emitir(alerta)),
+    com um intervalo mínimo entre alertas do mesmo tipo para a mesma chave.
+    """
+
+    def __init__(
+        self,
+        destinos: Optional[List[Any]] = None,
+        alfa_lento: float = 0.02,
+        alfa_rapido: float = 0.2,
+        limiar_desvios: float = 3.0,
+        minimo_eventos: int = 20,
+        tau_curto: float = 3600.0,
+        tau_longo: float = 7 * 24 * 3600.0,
+        fator_taxa: float = 4.0,
+        taxa_minima: float = 5.0,
+        intervalo_alertas: float = 3600.0
+    ):
+        self._destinos = list(destinos) if destinos else [AlertaLog()]
+        self._parametros = (alfa_lento, alfa_rapido, tau_curto, tau_longo)
+        self._alfa_rapido = alfa_rapido
+        self._limiar_desvios = limiar_desvios
+        self._minimo_eventos = minimo_eventos
+        self._fator_taxa = fator_taxa
+        self._taxa_minima = taxa_minima
+        self._intervalo_alertas = intervalo_alertas
+        self._estados: Dict[str, _EstadoChave] = {}
+        self._lock = threading.Lock()
+
+    def adicionar_destino(self, destino: Any) -> None:
+        """Inclui um destino de alertas (objeto com emitir(alerta))."""
+        if not callable(getattr(destino, "emitir", None)):
+            raise ValueError("Destino deve ter um método emitir(alerta)")
+        self._destinos.append(destino)
+
+    def processar(self, avaliado: Optional[str], nota: float, data_hora: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Processa uma avaliação nova e retorna os alertas emitidos.
+
+        Args:
+            avaliado: Quem recebeu a avaliação.
+            nota: Nota de 1 a 5.
+            data_hora: 'YYYY-MM-DD HH:MM:SS' (padrão: agora).
+        """
+        instante = _instante(data_hora)
+        alertas = []
+        with self._lock:
+            for chave in (CHAVE_GLOBAL, avaliado) if avaliado else (CHAVE_GLOBAL,):
+                alertas.extend(self._processar_chave(chave, float(nota), instante))
+
+        for alerta in alertas:
+            for destino in self._destinos:
+                try:
+                    destino.emitir(alerta)
+                except Exception as e:
+                    logger.error(f"Erro ao emitir alerta em {type(destino).__name__}: {e}")
+        return alertas
+
+    def aplicar(self, id: str, antigo: Optional[Dict[str, Any]], novo: Optional[Dict[str, Any]]) -> None:
+        """
+        Alteração (id, antigo, novo) de uma avaliação: considera apenas avaliações novas.
+        """
+        if antigo is None and novo and isinstance(novo.get("nota"), (int, float)):
+            self.processar(novo.get("avaliado"), novo["nota"], novo.get("data_hora"))
+
+    def aplicar_alteracoes(self, alteracoes: List[Any]) -> None:
+        """Assinante do espelho das avaliações (ver EspelhoColecao.assinar)."""
+        for id, antigo, novo in alteracoes:
+            self.aplicar(id, antigo, novo)
+
+    def estado(self, chave: str = CHAVE_GLOBAL) -> Optional[Dict[str, float]]:
+        """Retrato das estatísticas atuais de uma chave (None se nunca vista)."""
+        with self._lock:
+            estado = self._estados.get(chave)
+            if estado is None:
+                return None
+            agora = datetime.now().timestamp()
+            return {
+                "eventos": estado.nota_lenta.n,
+                "media_base": round(estado.nota_lenta.media, 3),
+                "desvio_base": round(estado.nota_lenta.desvio, 3),
+                "media_recente": round(estado.nota_rapida.media, 3),
+                "taxa_recente_hora": round(estado.taxa_curta.por_hora(agora), 3),
+                "taxa_base_hora": round(estado.taxa_longa.por_hora(agora), 3)
+            }
+
+    def _processar_chave(self, chave: str, nota: float, instante: float) -> List[Dict[str, Any]]:
+        estado = self._estados.get(chave)
+        if estado is None:
+            estado = self._estados[chave] = _EstadoChave(*self._parametros)
+
+        # Linha de base antes do evento, para não se contaminar com ele
+        base_media = estado.nota_lenta.media
+        base_desvio = estado.nota_lenta.desvio
+        base_taxa = estado.taxa_longa.por_hora(instante)
+        eventos = estado.nota_lenta.n
+
+        estado.nota_rapida.atualizar(nota)
+        estado.nota_lenta.atualizar(nota)
+        estado.taxa_curta.registrar(instante)
+        estado.taxa_longa.registrar(instante)
+
+        alertas = []
+        if eventos < self._minimo_eventos:
+            return alertas
+
+        # Desvio padrão da média EWMA em regime: sigma * sqrt(alfa / (2 - alfa))
+        limite = self._limiar_desvios * max(base_desvio, 0.25) * \
+            math.sqrt(self._alfa_rapido / (2 - self._alfa_rapido))
+        if base_media - estado.nota_rapida.media > limite:
+            alertas.append(self._alerta(
+                estado, chave, "media", instante,
+                valor=estado.nota_rapida.media, referencia=base_media, limite=base_media - limite,
+                mensagem=f"Média recente de '{chave}' caiu para {estado.nota_rapida.media:.2f} "
+                         f"(base {base_media:.2f})"
+            ))
+
+        taxa_recente = estado.taxa_curta.por_hora(instante)
+        if taxa_recente >= self._taxa_minima and taxa_recente > self._fator_taxa * base_taxa:
+            alertas.append(self._alerta(
+                estado, chave, "taxa", instante,
+                valor=taxa_recente, referencia=base_taxa, limite=self._fator_taxa * base_taxa,
+                mensagem=f"Volume de avaliações de '{chave}' em {taxa_recente:.1f}/h "
+                         f"(base {base_taxa:.1f}/h)"
+            ))
+        return [a for a in alertas if a]
+
+    def _alerta(self, estado: _EstadoChave, chave: str, tipo: str, instante: float, **dados) -> Optional[Dict[str, Any]]:
+        anterior = estado.ultimo_alerta.get(tipo)
+        if anterior is not None and instante - anterior < self._intervalo_alertas:
+            return None
+        estado.ultimo_alerta[tipo] = instante
+        return {
+            "tipo": tipo,
+            "chave": chave,
+            "data_hora": datetime.fromtimestamp(instante).strftime("%Y-%m-%d %H:%M:%S"),
+            "valor": round(dados["valor"], 3),
+            "referencia": round(dados["referencia"], 3),
+            "limite": round(dados["limite"], 3),
+            "mensagem": dados["mensagem"]
+        }
+
+
+def _instante(data_hora: Optional[str]) -> float:
+    if data_hora:
+        try:
+            return datetime.strptime(data_hora, "%Y-%m-%d %H:%M:%S").timestamp()
+        except ValueError:
+            pass
+    return datetime.now().timestamp()
+
+
+_detector: Optional[DetectorAnomalias] = None
+_alertas_memoria = AlertaMemoria()
+_lock_detector = threading.Lock()
+
+
+def ativar_detector() -> DetectorAnomalias:
+    """
+    Cria (uma vez por processo) o detector e o inscreve no espelho das
+    avaliações, que entrega as novas avaliações gravadas por qualquer processo
+    (telas, fila de escrita, rotinas). Uma thread em segundo plano faz a carga
+    inicial do espelho e o sincroniza a cada INTERVALO_SINCRONIZACAO segundos,
+    sem atrasar a página que ativou o detector.
+    Destinos: log, memória (painel) e, se CRM_ALERTAS_ARQUIVO estiver definido,
+    um arquivo NDJSON.
+    """
+    global _detector
+    with _lock_detector:
+        if _detector is not None:
+            return _detector
+
+        destinos: List[Any] = [AlertaLog(), _alertas_memoria]
+        arquivo = os.getenv(ALERTAS_ARQUIVO_ENV)
+        if arquivo:
+            destinos.append(AlertaArquivo(arquivo))
+        _detector = DetectorAnomalias(destinos)
+        threading.Thread(target=_acompanhar, args=(_detector,), name="detector-anomalias", daemon=True).start()
+        return _detector
+
+
+def _acompanhar(detector: DetectorAnomalias) -> None:
+    # As avaliações que já estavam no espelho (a cópia devolvida por assinar)
+    # são histórico: só as que chegam depois entram no detector
+    from dao.avaliacao_dao import AvaliacaoDAO
+    from dao.registro import obter_dao
+
+    espelho = None
+    while _detector is detector:
+        try:
+            if espelho is None:
+                candidato = obter_dao(AvaliacaoDAO).espelho()
+                candidato.assinar(detector.aplicar_alteracoes)
+                espelho = candidato
+            else:
+                espelho.sincronizar(INTERVALO_SINCRONIZACAO)
+        except Exception as e:
+            logger.warning(f"Detector de anomalias sem sincronizar as avaliações: {e}")
+        time.sleep(INTERVALO_SINCRONIZACAO)
+    if espelho is not None:
+        espelho.cancelar_assinatura(detector.aplicar_alteracoes)
+
+
+def alertas_recentes(limite: int = 20) -> List[Dict[str, Any]]:
+    """Últimos alertas emitidos neste processo, do mais novo para o mais antigo."""
+    return _alertas_memoria.recentes(limite)
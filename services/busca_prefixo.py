@@ -0,0 +1,359 @@
+# services/busca_prefixo.py
+
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from sys import intern
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+from dao.indices import dobrar_texto, normalizar_digitos
+
+logger = logging.getLogger(__name__)
+
+# Separa palavras de nomes depois da dobra de acentos
+_PALAVRAS = re.compile(r"[a-z0-9]+")
+
+# Sentinela maior que qualquer caractere usado nos tokens, para fechar o intervalo do prefixo
+_FIM_PREFIXO = "\uffff"
+
+# Segundos em que as buscas reaproveitam a última sincronização do espelho
+# (escritas deste processo aparecem já na busca seguinte)
+IDADE_MAXIMA_ESPELHO = 5.0
+
+
+def tokens_registro(registro: Dict[str, Any]) -> Tuple[str, ...]:
+    """
+    Gera os tokens pesquisáveis de um registro: palavras do nome (sem acentos),
+    telefone em dígitos (com e sem DDI/DDD) e e-mail completo.
+    """
+    tokens = set()
+
+    nome = dobrar_texto(registro.get("nome"))
+    if nome:
+        tokens.update(_PALAVRAS.findall(nome))
+
+    telefone = normalizar_digitos(registro.get("telefone"))
+    if telefone:
+        if len(telefone) >= 12 and telefone.startswith("55"):
+            telefone = telefone[2:]
+        tokens.add(telefone)
+        if len(telefone) >= 10:
+            # Permite digitar só o número, sem o DDD
+            tokens.add(telefone[2:])
+
+    email = dobrar_texto(registro.get("email"))
+    if email:
+        tokens.add(email.replace(" ", ""))
+
+    tokens.discard("")
+    return tuple(map(intern, tokens))
+
+
+def tokens_consulta(texto: str) -> List[str]:
+    """
+    Quebra o texto digitado em prefixos normalizados como os tokens do índice.
+    "(11) 9888" -> ["11", "9888"]; "João Sil" -> ["joao", "sil"];
+    "joao.si" -> ["joao.si"] (prefixo de e-mail).
+    """
+    texto = dobrar_texto(texto)
+    if not texto:
+        return []
+    prefixos = []
+    for parte in texto.split(" "):
+        parte = parte.strip(".,;:()-")
+        if "@" in parte or "." in parte:
+            prefixos.append(parte)
+            continue
+        digitos = normalizar_digitos(parte)
+        if digitos and not re.search(r"[a-z]", parte):
+            prefixos.append(digitos)
+            continue
+        prefixos.extend(_PALAVRAS.findall(parte))
+    return prefixos
+
+
+class IndicePrefixo:
+    """
+    Índice em memória para busca por prefixo (typeahead) em nomes, telefones e
+    e-mails. Os tokens ficam em uma lista ordenada com um array paralelo de
+    posições de registro, de modo que cada prefixo é localizado por bisseção
+    (O(log n)) e o custo da consulta depende apenas do tamanho do resultado.
+
+    Inserções vão para um buffer ordenado pequeno (recentes), mesclado à lista
+    principal em lote; remoções (e a versão anterior de um registro alterado)
+    apenas marcam a posição como morta, e as posições mortas são descartadas
+    quando passam de uma fração do índice.
+    Strings de tokens são internadas (nomes e sobrenomes se repetem muito) e
+    as posições ficam em array('I').
+    """
+
+    # Tamanho do buffer de inserções antes da mescla com a lista principal
+    LIMITE_RECENTES = 2048
+    # Fração de entradas mortas que dispara a compactação
+    FRACAO_COMPACTACAO = 0.25
+    # Intervalos até este tamanho são intersectados como conjuntos em consultas com vários termos
+    LIMITE_INTERSECAO = 100000
+
+    def __init__(self, campos_exibicao: Iterable[str] = ("nome", "telefone", "email")):
+        self._campos_exibicao = tuple(campos_exibicao)
+        self._chaves: List[str] = []
+        self._posicoes = array("I")
+        self._recentes_chaves: List[str] = []
+        self._recentes_posicoes: List[int] = []
+        self._ids: List[Optional[str]] = []
+        self._tokens: List[Tuple[str, ...]] = []
+        self._exibicao: List[Optional[Dict[str, Any]]] = []
+        self._posicao_por_id: Dict[str, int] = {}
+        self._entradas_mortas = 0
+        # Alterações do espelho recebidas antes da carga, aplicadas por cima dela
+        self._pendentes: Optional[List[Tuple[str, Any, Any]]] = []
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._posicao_por_id)
+
+    def carregar(self, registros: Iterable[Dict[str, Any]]) -> int:
+        """
+        Constrói o índice do zero a partir de uma listagem (ordenação única em lote).
+
+        Returns:
+            int: Quantidade de registros indexados.
+        """
+        with self._lock:
+            self._ids, self._tokens, self._exibicao, self._posicao_por_id = [], [], [], {}
+            for registro in registros:
+                if isinstance(registro, dict) and registro.get("id"):
+                    self._registrar(registro["id"], registro)
+            self._recentes_chaves, self._recentes_posicoes = [], []
+            self._reconstruir()
+            pendentes, self._pendentes = self._pendentes or [], None
+            for id, antigo, novo in pendentes:
+                self.aplicar(id, antigo, novo)
+            return len(self._posicao_por_id)
+
+    def adicionar(self, id: str, registro: Dict[str, Any]) -> None:
+        """Indexa (ou reindexa) um registro."""
+        with self._lock:
+            self.remover(id)
+            posicao = self._registrar(id, registro)
+            for token in self._tokens[posicao]:
+                i = bisect_right(self._recentes_chaves, token)
+                self._recentes_chaves.insert(i, token)
+                self._recentes_posicoes.insert(i, posicao)
+            if len(self._recentes_chaves) >= self.LIMITE_RECENTES:
+                self._mesclar()
+
+    def remover(self, id: str) -> None:
+        """Retira um registro do índice (ignora IDs desconhecidos)."""
+        with self._lock:
+            posicao = self._posicao_por_id.pop(id, None)
+            if posicao is None:
+                return
+            # As entradas ficam no índice e são ignoradas até a próxima compactação
+            self._entradas_mortas += len(self._tokens[posicao])
+            self._ids[posicao] = None
+            self._tokens[posicao] = ()
+            self._exibicao[posicao] = None
+            limite = self.FRACAO_COMPACTACAO * max(len(self._chaves), self.LIMITE_RECENTES)
+            mortas = len(self._ids) - len(self._posicao_por_id)
+            if self._entradas_mortas > limite or mortas > limite:
+                self._reconstruir()
+
+    def aplicar(self, id: str, antigo: Optional[Dict[str, Any]], novo: Optional[Dict[str, Any]]) -> None:
+        """Aplica uma alteração (id, antigo, novo) de um registro."""
+        if novo is None:
+            self.remover(id)
+        else:
+            self.adicionar(id, novo)
+
+    def aplicar_alteracoes(self, alteracoes: List[Tuple[str, Any, Any]]) -> None:
+        """
+        Assinante do espelho da coleção (ver EspelhoColecao.assinar). O que
+        chega antes da carga fica guardado e é aplicado por cima dela.
+        """
+        with self._lock:
+            if self._pendentes is not None:
+                self._pendentes.extend(alteracoes)
+                return
+            for id, antigo, novo in alteracoes:
+                self.aplicar(id, antigo, novo)
+
+    def buscar(self, texto: str, limite: int = 10, max_varredura: int = 20000) -> List[Dict[str, Any]]:
+        """
+        Retorna até `limite` registros cujos tokens começam com cada termo digitado.
+        Registros com termos completos (ex.: nome inteiro) aparecem primeiro.
+
+        Args:
+            texto: Texto digitado (nome, telefone ou e-mail, parcial).
+            limite: Quantidade máxima de resultados.
+            max_varredura: Teto de entradas percorridas (limita prefixos muito curtos).
+
+        Returns:
+            List[Dict]: {"id", campos de exibição...}.
+        """
+        prefixos = tokens_consulta(texto)
+        if not prefixos or limite <= 0:
+            return []
+
+        with self._lock:
+            intervalos = sorted((self._intervalo(p) for p in prefixos), key=len)
+            if not intervalos[0]:
+                return []
+
+            if len(intervalos) > 1 and len(intervalos[1]) <= self.LIMITE_INTERSECAO:
+                # Vários termos seletivos: interseção dos conjuntos de posições
+                posicoes = set(intervalos[0].posicoes())
+                for intervalo in intervalos[1:]:
+                    if len(intervalo) > self.LIMITE_INTERSECAO or not posicoes:
+                        break
+                    posicoes.intersection_update(intervalo.posicoes())
+                candidatas = iter(posicoes)
+            else:
+                # Percorre o intervalo do termo mais seletivo e filtra pelos demais
+                candidatas = intervalos[0].posicoes(max_varredura)
+
+            encontrados: List[Tuple[int, int]] = []
+            vistos = set()
+            alvo = limite * 4
+            for posicao in candidatas:
+                if posicao in vistos:
+                    continue
+                vistos.add(posicao)
+                tokens = self._tokens[posicao]
+                if tokens and all(any(t.startswith(p) for t in tokens) for p in prefixos):
+                    exatos = sum(1 for p in prefixos if p in tokens)
+                    encontrados.append((-exatos, posicao))
+                    if len(encontrados) >= alvo:
+                        break
+
+            encontrados.sort(key=lambda c: (c[0], dobrar_texto(self._exibicao[c[1]].get("nome")) or ""))
+            return [
+                {"id": self._ids[posicao], **self._exibicao[posicao]}
+                for _, posicao in encontrados[:limite]
+            ]
+
+    def _registrar(self, id: str, registro: Dict[str, Any]) -> int:
+        posicao = len(self._ids)
+        self._ids.append(id)
+        self._tokens.append(tokens_registro(registro))
+        self._exibicao.append({campo: registro.get(campo) for campo in self._campos_exibicao})
+        self._posicao_por_id[id] = posicao
+        return posicao
+
+    def _intervalo(self, prefixo: str) -> "_Intervalo":
+        fim_prefixo = prefixo + _FIM_PREFIXO
+        inicio = bisect_left(self._chaves, prefixo)
+        fim = bisect_left(self._chaves, fim_prefixo, inicio)
+        inicio_r = bisect_left(self._recentes_chaves, prefixo)
+        fim_r = bisect_left(self._recentes_chaves, fim_prefixo, inicio_r)
+        return _Intervalo(self, inicio, fim, inicio_r, fim_r)
+
+    def _mesclar(self) -> None:
+        # Mescla os recentes na lista principal copiando fatias (sem reordenar tudo)
+        chaves: List[str] = []
+        posicoes = array("I")
+        anterior = 0
+        for token, posicao in zip(self._recentes_chaves, self._recentes_posicoes):
+            i = bisect_right(self._chaves, token, anterior)
+            chaves.extend(self._chaves[anterior:i])
+            posicoes.extend(self._posicoes[anterior:i])
+            chaves.append(token)
+            posicoes.append(posicao)
+            anterior = i
+        chaves.extend(self._chaves[anterior:])
+        posicoes.extend(self._posicoes[anterior:])
+        self._chaves, self._posicoes = chaves, posicoes
+        self._recentes_chaves, self._recentes_posicoes = [], []
+
+    def _reconstruir(self) -> None:
+        # Ordenação completa a partir dos registros vivos (carga e compactação);
+        # as posições mortas são descartadas e as vivas renumeradas
+        vivas = [posicao for posicao, id in enumerate(self._ids) if id is not None]
+        if len(vivas) < len(self._ids):
+            self._ids = [self._ids[p] for p in vivas]
+            self._tokens = [self._tokens[p] for p in vivas]
+            self._exibicao = [self._exibicao[p] for p in vivas]
+            self._posicao_por_id = {id: posicao for posicao, id in enumerate(self._ids)}
+        entradas = sorted(
+            (token, posicao)
+            for posicao, tokens in enumerate(self._tokens)
+            for token in tokens
+        )
+        self._chaves = [t for t, _ in entradas]
+        self._posicoes = array("I", (p for _, p in entradas))
+        self._recentes_chaves, self._recentes_posicoes = [], []
+        self._entradas_mortas = 0
+
+
+class _Intervalo:
+    """
+    Faixa de entradas de um prefixo na lista principal e no buffer de recentes.
+    """
+
+    __slots__ = ("_indice", "_inicio", "_fim", "_inicio_r", "_fim_r")
+
+    def __init__(self, indice: IndicePrefixo, inicio: int, fim: int, inicio_r: int, fim_r: int):
+        self._indice = indice
+        self._inicio, self._fim = inicio, fim
+        self._inicio_r, self._fim_r = inicio_r, fim_r
+
+    def __len__(self) -> int:
+        return (self._fim - self._inicio) + (self._fim_r - self._inicio_r)
+
+    def posicoes(self, maximo: Optional[int] = None) -> Iterator[int]:
+        fim = self._fim if maximo is None else min(self._fim, self._inicio + maximo)
+        return chain(
+            self._indice._posicoes[self._inicio:fim],
+            self._indice._recentes_posicoes[self._inicio_r:self._fim_r]
+        )
+
+
+_indices: Dict[str, Tuple[IndicePrefixo, Any]] = {}
+_lock_indices = threading.Lock()
+
+
+def obter_indice(colecao: str = "clientes") -> IndicePrefixo:
+    """
+    Retorna o índice de prefixo do processo para a coleção, construído na
+    primeira chamada a partir do espelho da coleção (dao/espelho.py) e mantido
+    pelas alterações que ele sincroniza, inclusive as de outros processos e
+    rotinas em lote. Cada chamada traz o espelho em dia (no máximo a cada
+    IDADE_MAXIMA_ESPELHO segundos, ou logo após uma escrita deste processo).
+
+    Args:
+        colecao: "clientes" ou "motoboys".
+    """
+    with _lock_indices:
+        if colecao not in _indices:
+            from dao.cliente_dao import ClienteDAO
+            from dao.motoboy_dao import MotoboyDAO
+            from dao.registro import obter_dao
+
+            daos = {"clientes": ClienteDAO, "motoboys": MotoboyDAO}
+            if colecao not in daos:
+                raise ValueError(f"Coleção sem busca por prefixo: {colecao}")
+
+            indice = IndicePrefixo()
+            espelho = obter_dao(daos[colecao]).espelho()
+            # A cópia do espelho vem com a assinatura; o índice é montado sem
+            # lock do espelho, e o que sincronizar nesse meio-tempo fica no buffer
+            total = indice.carregar(espelho.assinar(indice.aplicar_alteracoes))
+            logger.info(f"[{colecao}] Índice de prefixo carregado com {total} registro(s)")
+            _indices[colecao] = (indice, espelho)
+        indice, espelho = _indices[colecao]
+
+    try:
+        espelho.sincronizar(IDADE_MAXIMA_ESPELHO)
+    except Exception as e:
+        logger.warning(f"[{colecao}] Índice de prefixo servido sem sincronizar: {e}")
+    return indice
+
+
+def buscar_prefixo(texto: str, colecao: str = "clientes", limite: int = 10) -> List[Dict[str, Any]]:
+    """
+    Atalho para obter_indice(colecao).buscar(texto, limite).
+    """
+    return obter_indice(colecao).buscar(texto, limite)
@@ -0,0 +1,347 @@
+# services/busca_texto.py
+
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from sys import intern
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from dao.indices import dobrar_texto
+
+logger = logging.getLogger(__name__)
+
+_PALAVRAS = re.compile(r"[a-z0-9]+")
+
+# Stopwords do português já sem acentos. "nao" fica de fora de propósito:
+# em avaliações ("não chegou", "não estava quente") ela carrega o sentido.
+STOPWORDS_PT = frozenset("""
+a ao aos aquela aquelas aquele aqueles aquilo as ate com como da das de dela delas dele deles
+depois do dos e ela elas ele eles em entre era eram essa essas esse esses esta estas este estes
+eu foi fomos for foram ha isso isto ja la lhe lhes mais mas me mesmo meu meus minha minhas
+muito na nas nem no nos nossa nossas nosso nossos num numa o os ou para pela pelas pelo pelos
+pra por qual quando que quem se seja sem ser seu seus so sua suas tambem te tem tinha tu tua
+tuas um uma umas uns voce voces vos estao estava estavam fui vai vou
+""".split())
+
+# Parâmetros do BM25
+_K1 = 1.2
+_B = 0.75
+
+# Segundos em que as consultas reaproveitam a última sincronização do espelho
+# (escritas deste processo aparecem já na consulta seguinte)
+IDADE_MAXIMA_ESPELHO = 5.0
+
+
+def tokenizar(texto: Any) -> List[str]:
+    """
+    Termos indexáveis de um texto: sem acentos, em minúsculas, sem stopwords
+    e com pelo menos dois caracteres.
+    """
+    texto = dobrar_texto(texto)
+    if not texto:
+        return []
+    return [t for t in _PALAVRAS.findall(texto) if len(t) > 1 and t not in STOPWORDS_PT]
+
+
+class IndiceTextual:
+    """
+    Índice invertido em memória sobre os comentários das avaliações.
+
+    Cada termo aponta para sua lista de postagens (documento -> frequência),
+    usada na busca ranqueada por BM25. Em paralelo, um contador de termos por
+    dia responde às frequências em janelas de tempo sem reler os comentários.
+    Tudo é atualizado incrementalmente a cada alteração sincronizada pelo
+    espelho da coleção (ver EspelhoColecao.assinar); as posições de documentos
+    removidos ou reindexados são recuperadas quando passam de uma fração do índice.
+
+    O índice cobre também as avaliações arquivadas: o arquivamento não chega
+    como remoção pelo espelho, e a carga inicial inclui o armazenamento frio
+    (ver obter_indice_comentarios), então buscas e contagens de termos não
+    mudam quando uma avaliação sai do banco.
+    """
+
+    # Fração de posições mortas que dispara a compactação
+    FRACAO_COMPACTACAO = 0.25
+    # Posições mortas toleradas em índices pequenos
+    MINIMO_COMPACTACAO = 1024
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Alterações do espelho recebidas antes da carga, aplicadas por cima dela
+        self._pendentes: Optional[List[Tuple[str, Any, Any]]] = []
+        self._limpar()
+
+    def _limpar(self) -> None:
+        self._postagens: Dict[str, Dict[int, int]] = {}
+        self._docs: List[Optional[Dict[str, Any]]] = []
+        self._posicao_por_id: Dict[str, int] = {}
+        self._comprimento_total = 0
+        self._termos_por_dia: Dict[str, Counter] = {}
+        self._dias: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._posicao_por_id)
+
+    def carregar(self, registros) -> int:
+        """
+        Indexa uma listagem completa de avaliações (substitui o conteúdo atual).
+
+        Returns:
+            int: Quantidade de avaliações com comentário indexadas.
+        """
+        with self._lock:
+            self._limpar()
+            for registro in registros:
+                if isinstance(registro, dict) and registro.get("id"):
+                    self.adicionar(registro["id"], registro)
+            pendentes, self._pendentes = self._pendentes or [], None
+            for id, antigo, novo in pendentes:
+                self.aplicar(id, antigo, novo)
+            return len(self._posicao_por_id)
+
+    def adicionar(self, id: str, registro: Dict[str, Any]) -> None:
+        """Indexa (ou reindexa) o comentário de uma avaliação."""
+        with self._lock:
+            self.remover(id)
+            termos = Counter(intern(t) for t in tokenizar(registro.get("comentario")))
+            if not termos:
+                return
+            dia = str(registro.get("data_hora") or "")[:10]
+            posicao = len(self._docs)
+            self._docs.append({
+                "id": id,
+                "dia": dia,
+                "avaliado": registro.get("avaliado"),
+                "nota": registro.get("nota"),
+                "comprimento": sum(termos.values()),
+                "termos": termos
+            })
+            self._posicao_por_id[id] = posicao
+            self._comprimento_total += self._docs[posicao]["comprimento"]
+            for termo, frequencia in termos.items():
+                self._postagens.setdefault(termo, {})[posicao] = frequencia
+
+            if dia not in self._termos_por_dia:
+                self._termos_por_dia[dia] = Counter()
+                insort(self._dias, dia)
+            self._termos_por_dia[dia].update(termos)
+
+    def remover(self, id: str) -> None:
+        """Retira uma avaliação do índice (ignora IDs desconhecidos)."""
+        with self._lock:
+            posicao = self._posicao_por_id.pop(id, None)
+            if posicao is None:
+                return
+            doc = self._docs[posicao]
+            self._docs[posicao] = None
+            self._comprimento_total -= doc["comprimento"]
+            for termo in doc["termos"]:
+                postagens = self._postagens.get(termo)
+                if postagens is not None:
+                    postagens.pop(posicao, None)
+                    if not postagens:
+                        del self._postagens[termo]
+
+            contador = self._termos_por_dia.get(doc["dia"])
+            if contador is not None:
+                contador.subtract(doc["termos"])
+                for termo in doc["termos"]:
+                    if contador[termo] <= 0:
+                        del contador[termo]
+                if not contador:
+                    del self._termos_por_dia[doc["dia"]]
+                    self._dias.pop(bisect_left(self._dias, doc["dia"]))
+
+            mortas = len(self._docs) - len(self._posicao_por_id)
+            if mortas > max(self.FRACAO_COMPACTACAO * len(self._posicao_por_id), self.MINIMO_COMPACTACAO):
+                self._compactar()
+
+    def aplicar(self, id: str, antigo: Optional[Dict[str, Any]], novo: Optional[Dict[str, Any]]) -> None:
+        """Aplica uma alteração (id, antigo, novo) de uma avaliação."""
+        if novo is None:
+            self.remover(id)
+        else:
+            self.adicionar(id, novo)
+
+    def aplicar_alteracoes(self, alteracoes: List[Tuple[str, Any, Any]]) -> None:
+        """
+        Assinante do espelho das avaliações (ver EspelhoColecao.assinar). O
+        que chega antes da carga fica guardado e é aplicado por cima dela.
+        """
+        with self._lock:
+            if self._pendentes is not None:
+                self._pendentes.extend(alteracoes)
+                return
+            for id, antigo, novo in alteracoes:
+                self.aplicar(id, antigo, novo)
+
+    def buscar(
+        self,
+        consulta: str,
+        limite: int = 20,
+        inicio: Optional[str] = None,
+        fim: Optional[str] = None,
+        avaliado: Optional[str] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Busca ranqueada (BM25) nos comentários. Um comentário precisa conter ao
+        menos um dos termos; quanto mais termos raros, melhor a posição.
+
+        Args:
+            consulta: Texto livre.
+            limite: Quantidade máxima de resultados.
+            inicio: Data inicial 'YYYY-MM-DD' (inclusiva), opcional.
+            fim: Data final 'YYYY-MM-DD' (inclusiva), opcional.
+            avaliado: Restringe a um avaliado, opcional.
+
+        Returns:
+            List[(id, pontuação)] da mais relevante para a menos.
+        """
+        termos = set(tokenizar(consulta))
+        if not termos or limite <= 0:
+            return []
+
+        with self._lock:
+            total_docs = len(self._posicao_por_id)
+            if total_docs == 0:
+                return []
+            media = self._comprimento_total / total_docs
+
+            # Fator de normalização por documento, calculado uma vez por consulta
+            fator = (_K1 * (1 - _B), _K1 * _B / media)
+            docs = self._docs
+            filtrar = bool(inicio or fim or avaliado)
+
+            pontuacoes: Dict[int, float] = {}
+            for termo in termos:
+                postagens = self._postagens.get(termo)
+                if not postagens:
+                    continue
+                idf = math.log(1 + (total_docs - len(postagens) + 0.5) / (len(postagens) + 0.5))
+                peso = idf * (_K1 + 1)
+                for posicao, frequencia in postagens.items():
+                    doc = docs[posicao]
+                    if filtrar and not self._na_janela(doc, inicio, fim, avaliado):
+                        continue
+                    normalizacao = fator[0] + fator[1] * doc["comprimento"]
+                    pontuacoes[posicao] = pontuacoes.get(posicao, 0.0) + peso * frequencia / (frequencia + normalizacao)
+
+            melhores = heapq.nlargest(limite, pontuacoes.items(), key=lambda item: item[1])
+            return [(self._docs[posicao]["id"], round(pontuacao, 4)) for posicao, pontuacao in melhores]
+
+    def frequencia_termos(
+        self,
+        inicio: Optional[str] = None,
+        fim: Optional[str] = None,
+        limite: int = 20
+    ) -> List[Tuple[str, int]]:
+        """
+        Termos mais frequentes nos comentários de uma janela de datas.
+
+        Args:
+            inicio: Data inicial 'YYYY-MM-DD' (inclusiva), opcional.
+            fim: Data final 'YYYY-MM-DD' (inclusiva), opcional.
+            limite: Quantidade de termos.
+
+        Returns:
+            List[(termo, ocorrências)] em ordem decrescente.
+        """
+        with self._lock:
+            total: Counter = Counter()
+            for dia in self._dias_da_janela(inicio, fim):
+                total.update(self._termos_por_dia[dia])
+            return total.most_common(limite)
+
+    def serie_termo(
+        self,
+        termo: str,
+        inicio: Optional[str] = None,
+        fim: Optional[str] = None
+    ) -> Dict[str, int]:
+        """
+        Ocorrências diárias de um termo na janela (apenas dias com ocorrência).
+
+        Returns:
+            Dict['YYYY-MM-DD', ocorrências].
+        """
+        termos = tokenizar(termo)
+        if not termos:
+            return {}
+        chave = termos[0]
+        with self._lock:
+            serie = {}
+            for dia in self._dias_da_janela(inicio, fim):
+                ocorrencias = self._termos_por_dia[dia].get(chave, 0)
+                if ocorrencias:
+                    serie[dia] = ocorrencias
+            return serie
+
+    @staticmethod
+    def _na_janela(doc: Dict[str, Any], inicio: Optional[str], fim: Optional[str], avaliado: Optional[str]) -> bool:
+        if inicio and doc["dia"] < inicio:
+            return False
+        if fim and doc["dia"] > fim:
+            return False
+        return not avaliado or doc["avaliado"] == avaliado
+
+    def _compactar(self) -> None:
+        # Descarta as posições mortas e renumera as postagens dos documentos vivos
+        self._docs = [doc for doc in self._docs if doc is not None]
+        self._posicao_por_id = {doc["id"]: posicao for posicao, doc in enumerate(self._docs)}
+        self._postagens = {}
+        for posicao, doc in enumerate(self._docs):
+            for termo, frequencia in doc["termos"].items():
+                self._postagens.setdefault(termo, {})[posicao] = frequencia
+
+    def _dias_da_janela(self, inicio: Optional[str], fim: Optional[str]) -> List[str]:
+        i = bisect_left(self._dias, inicio) if inicio else 0
+        j = bisect_right(self._dias, fim) if fim else len(self._dias)
+        return self._dias[i:j]
+
+
+_indice: Optional[IndiceTextual] = None
+_espelho = None
+_lock_indice = threading.Lock()
+
+
+def obter_indice_comentarios() -> IndiceTextual:
+    """
+    Retorna o índice textual do processo, construído na primeira chamada a
+    partir das avaliações arquivadas e do espelho das avaliações
+    (dao/espelho.py), e mantido pelas alterações que ele sincroniza, inclusive
+    as de outros processos. Cada chamada traz o espelho em dia (no máximo a
+    cada IDADE_MAXIMA_ESPELHO segundos, ou logo após uma escrita deste processo).
+    Se o arquivo não puder ser lido, o índice cobre só as avaliações no banco.
+    """
+    global _indice, _espelho
+    with _lock_indice:
+        if _indice is None:
+            from dao.avaliacao_dao import AvaliacaoDAO
+            from dao.registro import obter_dao
+
+            indice = IndiceTextual()
+            dao = obter_dao(AvaliacaoDAO)
+            espelho = dao.espelho()
+            # A cópia do espelho vem com a assinatura; o índice é montado sem
+            # lock do espelho, e o que sincronizar nesse meio-tempo fica no buffer
+            atuais = espelho.assinar(indice.aplicar_alteracoes)
+            try:
+                arquivadas = list(dao.arquivo.ler())
+            except Exception as e:
+                logger.warning(f"[avaliacoes] Índice textual sem as avaliações arquivadas: {e}")
+                arquivadas = []
+            # As do banco por último: uma avaliação nos dois lugares fica com a do banco
+            total = indice.carregar(arquivadas + atuais)
+            logger.info(f"[avaliacoes] Índice textual carregado com {total} comentário(s)")
+            _indice, _espelho = indice, espelho
+        indice, espelho = _indice, _espelho
+
+    try:
+        espelho.sincronizar(IDADE_MAXIMA_ESPELHO)
+    except Exception as e:
+        logger.warning(f"[avaliacoes] Índice textual servido sem sincronizar: {e}")
+    return indice
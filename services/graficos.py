@@ -0,0 +1,158 @@
+# services/graficos.py
+
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ("png", "svg")
+
+
+class CacheGraficos:
+    """
+    Cache LRU, compartilhado pelo processo, de gráficos já renderizados.
+
+    A chave é um hash SHA-256 da especificação do gráfico (tipo, dados
+    agregados, rótulos, cores e formato), então sessões diferentes que veem
+    os mesmos números recebem os mesmos bytes, e a reexecução de uma página
+    com dados inalterados nem chega a importar o matplotlib.
+    """
+
+    def __init__(self, maximo: int = 128):
+        self._maximo = maximo
+        self._itens: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.faltas = 0
+
+    def obter(self, chave: str) -> Optional[bytes]:
+        with self._lock:
+            conteudo = self._itens.get(chave)
+            if conteudo is None:
+                self.faltas += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.acertos += 1
+            return conteudo
+
+    def guardar(self, chave: str, conteudo: bytes) -> None:
+        with self._lock:
+            self._itens[chave] = conteudo
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self._maximo:
+                self._itens.popitem(last=False)
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+
+    def estatisticas(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "itens": len(self._itens),
+                "bytes": sum(len(v) for v in self._itens.values()),
+                "acertos": self.acertos,
+                "faltas": self.faltas
+            }
+
+
+_cache = CacheGraficos()
+# O Agg não é seguro para várias figuras renderizando ao mesmo tempo em threads
+_lock_renderizacao = threading.Lock()
+
+
+def chave_grafico(especificacao: Dict[str, Any]) -> str:
+    """Hash estável da especificação (ordem das chaves do dict não importa)."""
+    serializado = json.dumps(especificacao, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(serializado.encode("utf-8")).hexdigest()
+
+
+def grafico_barras(
+    rotulos: Sequence[Any],
+    valores: Sequence[float],
+    titulo: str = "",
+    eixo_x: str = "",
+    eixo_y: str = "",
+    cores: Optional[Sequence[str]] = None,
+    rotacionar_rotulos: bool = False,
+    formato: str = "png"
+) -> bytes:
+    """
+    Gráfico de barras renderizado (PNG ou SVG), servido do cache quando os
+    mesmos dados já foram desenhados.
+
+    Args:
+        rotulos: Categorias do eixo x.
+        valores: Altura de cada barra.
+        titulo: Título do gráfico.
+        eixo_x: Legenda do eixo x.
+        eixo_y: Legenda do eixo y.
+        cores: Cor de cada barra, opcional.
+        rotacionar_rotulos: Inclina os rótulos do eixo x (nomes longos).
+        formato: "png" ou "svg".
+
+    Returns:
+        bytes: Imagem pronta para st.image (PNG) ou para embutir (SVG).
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato deve ser um de {FORMATOS}")
+    especificacao = {
+        "tipo": "barras",
+        "rotulos": [str(r) for r in rotulos],
+        "valores": [float(v) for v in valores],
+        "titulo": titulo,
+        "eixo_x": eixo_x,
+        "eixo_y": eixo_y,
+        "cores": list(cores) if cores else None,
+        "rotacionar_rotulos": rotacionar_rotulos,
+        "formato": formato
+    }
+    chave = chave_grafico(especificacao)
+    conteudo = _cache.obter(chave)
+    if conteudo is None:
+        conteudo = _renderizar_barras(especificacao)
+        _cache.guardar(chave, conteudo)
+    return conteudo
+
+
+def _renderizar_barras(especificacao: Dict[str, Any]) -> bytes:
+    # Figure + canvas Agg direto, sem pyplot: a figura não entra no registro
+    # global do pyplot (que as mantinha vivas até um plt.close)
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    with _lock_renderizacao:
+        figura = Figure()
+        FigureCanvasAgg(figura)
+        try:
+            eixos = figura.add_subplot()
+            eixos.bar(especificacao["rotulos"], especificacao["valores"], color=especificacao["cores"])
+            eixos.set_title(especificacao["titulo"])
+            eixos.set_xlabel(especificacao["eixo_x"])
+            eixos.set_ylabel(especificacao["eixo_y"])
+            if especificacao["rotacionar_rotulos"]:
+                for rotulo in eixos.get_xticklabels():
+                    rotulo.set_rotation(45)
+                    rotulo.set_horizontalalignment("right")
+            figura.tight_layout()
+
+            buffer = io.BytesIO()
+            figura.savefig(buffer, format=especificacao["formato"])
+            return buffer.getvalue()
+        finally:
+            figura.clear()
+
+
+def estatisticas_cache() -> Dict[str, int]:
+    """Itens, bytes, acertos e faltas do cache de gráficos do processo."""
+    return _cache.estatisticas()
+
+
+def limpar_cache() -> None:
+    """Descarta todos os gráficos em cache."""
+    _cache.limpar()
@@ -0,0 +1,27 @@
+import os
+
+# Os testes rodam sobre o banco local em memória, sem cache em disco
+os.environ["CRM_BANCO_LOCAL"] = ":memoria:"
+os.environ["CRM_CACHE_COLECOES"] = "0"
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def banco():
+    """Banco local vazio e estado do processo (espelhos, observadores, DAOs) limpo."""
+    from config.firebase_config import FirebaseConfig
+    from dao import registro
+    from dao.firebase_dao import FirebaseDAO
+    from dao.resiliencia import obter_resiliencia
+
+    banco = FirebaseConfig.get_instance().banco_local
+    with banco.lock:
+        banco._dados = {}
+    FirebaseDAO._espelhos.clear()
+    FirebaseDAO._observadores.clear()
+    registro._instancias.clear()
+    resiliencia = obter_resiliencia()
+    resiliencia.cache.limpar()
+    resiliencia.disjuntor.sucesso()
+    yield banco
@@ -0,0 +1,49 @@
+import pytest
+
+from dao.analise_avaliacoes import ArmazemAvaliacoes
+from dao.arquivo_avaliacoes import ArquivoAvaliacoes
+from dao.avaliacao_dao import AvaliacaoDAO
+from models.avaliacao import Avaliacao
+
+# Sem pyarrow (ou com um pyarrow que não carrega) a análise colunar não roda
+pytest.importorskip("pyarrow", exc_type=ImportError)
+
+
+@pytest.fixture
+def dao(tmp_path):
+    dao = AvaliacaoDAO(ArquivoAvaliacoes(str(tmp_path / "arquivo")))
+    dao._analise = ArmazemAvaliacoes(dao, str(tmp_path / "analise"), intervalo=0)
+    for id, data_hora, nota in (("a1", "2020-01-10 20:00:00", 5), ("a2", "2020-01-11 21:00:00", 1),
+                                ("a3", "2099-01-01 19:00:00", 4)):
+        dao.criar(Avaliacao(id, "c1", "m1", nota, f"comentario {id}", data_hora))
+    return dao
+
+
+def _ids(tabela):
+    return sorted(tabela["id"].to_pylist())
+
+
+def test_tabela_junta_base_e_cauda(dao):
+    relatorio = dao.analise.compactar()
+    assert relatorio["linhas"] == 3 and not relatorio["incremental"]
+
+    dao.criar(Avaliacao("a4", "c2", "m1", 3, "ok", "2099-01-02 19:00:00"))
+    dao.deletar("a3")
+    assert _ids(dao.analise.tabela()) == ["a1", "a2", "a4"]
+    assert dao.calcular_media_por_avaliado("m1") == 3.0
+
+    relatorio = dao.analise.compactar()
+    assert relatorio["incremental"] and relatorio["linhas"] == 3
+
+
+def test_arquivadas_continuam_na_tabela(dao):
+    dao.analise.compactar()
+    dao.arquivar(dao.listar_antigas("2021-01-01 00:00:00"))
+    dao.deletar("a3")
+
+    # Cauda em memória, compactação incremental e completa: só a exclusão some
+    assert _ids(dao.analise.tabela()) == ["a1", "a2"]
+    assert _ids(dao.analise.tabela()) == ["a1", "a2"]
+    assert dao.analise.compactar()["linhas"] == 2
+    assert dao.analise.compactar(completa=True)["linhas"] == 2
+    assert dao.obter_estatisticas_gerais()["total"] == 2
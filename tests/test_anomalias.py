@@ -0,0 +1,49 @@
+import time
+
+from dao.avaliacao_dao import AvaliacaoDAO
+from dao.firebase_dao import CARIMBO_SERVIDOR, FirebaseDAO
+from dao.registro import obter_dao
+from services import anomalias
+from services.anomalias import CHAVE_GLOBAL, DetectorAnomalias, ativar_detector
+
+
+def _avaliacao(id, nota=5):
+    return {"id": id, "nota": nota, "avaliado": "m1", "data_hora": "2024-05-01 20:00:00", "atualizado_em": CARIMBO_SERVIDOR}
+
+
+def _eventos(detector):
+    estado = detector.estado(CHAVE_GLOBAL)
+    return estado["eventos"] if estado else 0
+
+
+def test_espelho_entrega_so_avaliacoes_novas(banco):
+    banco.referencia("avaliacoes/antiga").set(_avaliacao("antiga"))
+    detector = DetectorAnomalias()
+    espelho = obter_dao(AvaliacaoDAO).espelho()
+    espelho.assinar(detector.aplicar_alteracoes)
+    assert _eventos(detector) == 0
+
+    # Avaliação gravada por outro processo (ou pela fila de escrita)
+    banco.referencia("avaliacoes/nova").set(_avaliacao("nova", nota=1))
+    espelho.sincronizar()
+    assert _eventos(detector) == 1
+
+    # Alterações e exclusões não contam como avaliações novas
+    FirebaseDAO.atualizar(obter_dao(AvaliacaoDAO), "nova", {"nota": 2})
+    FirebaseDAO.deletar(obter_dao(AvaliacaoDAO), "antiga")
+    espelho.sincronizar()
+    assert _eventos(detector) == 1
+
+
+def test_ativar_detector_acompanha_em_segundo_plano(banco, monkeypatch):
+    monkeypatch.setattr(anomalias, "INTERVALO_SINCRONIZACAO", 0.05)
+    monkeypatch.setattr(anomalias, "_detector", None)
+    detector = ativar_detector()
+    assert ativar_detector() is detector
+
+    time.sleep(0.2)
+    banco.referencia("avaliacoes/a1").set(_avaliacao("a1"))
+    limite = time.monotonic() + 5
+    while _eventos(detector) == 0 and time.monotonic() < limite:
+        time.sleep(0.05)
+    assert _eventos(detector) == 1
@@ -0,0 +1,65 @@
+import pytest
+
+from dao.arquivo_avaliacoes import ArquivoAvaliacoes
+from dao.avaliacao_dao import AvaliacaoDAO
+from dao.resiliencia import CircuitoAberto, obter_resiliencia
+from jobs import arquivar_avaliacoes
+from models.avaliacao import Avaliacao
+
+
+@pytest.fixture
+def dao(tmp_path, monkeypatch):
+    monkeypatch.setenv("CRM_ARQUIVO_AVALIACOES", str(tmp_path / "arquivo"))
+    dao = AvaliacaoDAO(ArquivoAvaliacoes(str(tmp_path / "arquivo")))
+    dao.reconstruir_resumos()
+    for id, data_hora, nota in (("a1", "2020-01-10 20:00:00", 5), ("a2", "2020-01-11 21:00:00", 1),
+                                ("a3", "2099-01-01 19:00:00", 4)):
+        dao.criar(Avaliacao(id, "c1", "m1", nota, f"comentario {id}", data_hora))
+    return dao
+
+
+def test_arquivamento_preserva_historico_e_estatisticas(dao):
+    total = dao.obter_resumo_total()
+    antigas = dao.listar_antigas("2021-01-01 00:00:00")
+    assert [r["id"] for r in antigas] == ["a1", "a2"]
+
+    assert dao.arquivar(antigas)
+    assert [a.id for a in dao.listar_todos()] == ["a3"]
+    assert dao.buscar_por_id("a1") is None
+    assert dao.buscar_por_id("a1", incluir_arquivo=True).nota == 5
+    assert [a.id for a in dao.listar_historico("2020-01-01", "2099-12-31")] == ["a1", "a2", "a3"]
+    assert dao.obter_resumo_total() == total
+
+
+def test_arquivamento_nao_e_exclusao_para_espelhos(dao, banco):
+    espelho = dao.espelho()
+    recebidas = []
+    espelho.assinar(recebidas.extend)
+    desde = espelho.marcador
+
+    dao.arquivar(dao.listar_antigas("2020-01-10 23:59:59"))
+    dao.deletar("a2")
+    delta = dao.sincronizar_desde(desde)
+    assert set(delta["removidos"]) == {"a1", "a2"}
+    assert set(delta["arquivados"]) == {"a1"}
+
+    # As duas saem do espelho, mas só a exclusão chega aos assinantes
+    espelho.sincronizar()
+    assert [r["id"] for r in espelho.registros()] == ["a3"]
+    assert [(id, novo) for id, _, novo in recebidas] == [("a2", None)]
+
+    assert dao.podar_exclusoes(delta["marcador"] + 1) == 2
+    assert banco.referencia("arquivados/avaliacoes").get() is None
+
+
+def test_job_interrompe_com_o_banco_fora(dao):
+    disjuntor = obter_resiliencia().disjuntor
+    for _ in range(disjuntor._limite):
+        disjuntor.falha()
+    with pytest.raises(CircuitoAberto):
+        dao.listar_antigas("2021-01-01 00:00:00")
+    assert not dao.arquivar([{"id": "a1", "data_hora": "2020-01-10 20:00:00"}])
+
+    disjuntor.sucesso()
+    relatorio = arquivar_avaliacoes.arquivar(dias=365)
+    assert relatorio["arquivadas"] == 2 and relatorio["dias"] == 2
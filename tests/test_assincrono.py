@@ -0,0 +1,197 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any
+
+import pytest
+
+from config.rtdb_assincrono import ClienteRTDBAssincrono, ErroRTDB, expiracao
+from dao.assincrono import executar
+from dao.firebase_dao import FirebaseDAO
+from dao.resiliencia import Disjuntor, Resiliencia, TempoEsgotado, transitorio
+
+
+class _DAO(FirebaseDAO):
+    def __init__(self):
+        super().__init__(collection="testes")
+
+
+class _Credencial:
+    """Credencial falsa: cada token expira `validade` depois de emitido (expiry ingênuo em UTC)."""
+
+    def __init__(self, validade: timedelta):
+        self.validade = validade
+        self.emitidos = 0
+
+    def get_access_token(self):
+        self.emitidos += 1
+        return SimpleNamespace(access_token=f"token-{self.emitidos}", expiry=datetime.utcnow() + self.validade)
+
+
+@pytest.fixture
+def fuso_sao_paulo(monkeypatch):
+    monkeypatch.setenv("TZ", "America/Sao_Paulo")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_executar_dentro_do_laco_e_recusado():
+    async def dentro():
+        return executar(asyncio.sleep(0))
+
+    with pytest.raises(RuntimeError, match="_async"):
+        executar(dentro())
+
+
+def test_expiracao_le_expiry_como_utc(fuso_sao_paulo):
+    expiry = datetime.utcnow() + timedelta(minutes=10)
+    assert abs(expiracao(expiry) - (time.time() + 600)) < 5
+
+
+def test_token_reaproveitado_enquanto_valido():
+    credencial = _Credencial(timedelta(hours=1))
+    cliente = ClienteRTDBAssincrono(url="http://rtdb.invalido", credencial=credencial)
+
+    async def dois_tokens():
+        return await cliente._token_valido(), await cliente._token_valido()
+
+    assert asyncio.run(dois_tokens()) == ("token-1", "token-1")
+    assert credencial.emitidos == 1
+
+
+def test_token_renovado_perto_de_expirar_em_fuso_local(fuso_sao_paulo):
+    # Expira dentro da margem de renovação: cada chamada precisa de um token novo,
+    # mesmo com o relógio local 3h atrás de UTC
+    credencial = _Credencial(timedelta(minutes=1))
+    cliente = ClienteRTDBAssincrono(url="http://rtdb.invalido", credencial=credencial)
+
+    async def dois_tokens():
+        return await cliente._token_valido(), await cliente._token_valido()
+
+    assert asyncio.run(dois_tokens()) == ("token-1", "token-2")
+
+
+def test_tempo_limite_da_leitura_sincrona_e_assincrona():
+    resiliencia = Resiliencia(tentativas=1, timeout_leitura=0.1, disjuntor=Disjuntor())
+    with pytest.raises(TempoEsgotado):
+        resiliencia.ler("lenta", lambda: time.sleep(1))
+    with pytest.raises(TempoEsgotado):
+        asyncio.run(resiliencia.ler_async("lenta", lambda: asyncio.sleep(1)))
+
+
+class TransportError(Exception):
+    """Mesmo nome da base dos erros de rede do httpx (ReadTimeout, ConnectError...)."""
+
+
+class ReadTimeout(TransportError):
+    pass
+
+
+class _Resposta:
+    def __init__(self, status_code: int, corpo: Any = None):
+        self.status_code = status_code
+        self.content = b"" if corpo is None else json.dumps(corpo).encode("utf-8")
+        self.text = self.content.decode("utf-8")
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class _TransporteFalso:
+    """Faz o papel do httpx.AsyncClient: devolve (ou levanta) o que estiver na fila."""
+
+    def __init__(self, *respostas):
+        self.respostas = list(respostas)
+        self.pedidos = []
+
+    async def request(self, metodo, url, params=None, content=None, headers=None):
+        self.pedidos.append((metodo, url, params, content and json.loads(content)))
+        resposta = self.respostas.pop(0)
+        if isinstance(resposta, Exception):
+            raise resposta
+        return resposta
+
+    async def aclose(self):
+        pass
+
+
+def _requisitar(transporte, operacao):
+    # Sem httpx: o transporte falso ocupa o lugar do cliente HTTP do laço
+    cliente = ClienteRTDBAssincrono(url="http://rtdb.invalido", credencial=_Credencial(timedelta(hours=1)))
+
+    async def executar_no_laco():
+        cliente._por_laco[asyncio.get_running_loop()] = (transporte, asyncio.Semaphore(1))
+        return await operacao(cliente)
+
+    return asyncio.run(executar_no_laco())
+
+
+def test_cliente_rest_monta_as_requisicoes():
+    transporte = _TransporteFalso(_Resposta(200, {"a": {"id": "a"}}), _Resposta(204))
+    consulta = _requisitar(transporte, lambda c: c.get("clientes", ordem="$key", inicio="a", primeiros=2))
+    assert consulta == {"a": {"id": "a"}}
+    assert _requisitar(transporte, lambda c: c.update("", {"clientes/a/nome": "Ana"})) is None
+
+    (metodo, url, params, _), (metodo_update, _, params_update, corpo) = transporte.pedidos
+    assert (metodo, url) == ("GET", "http://rtdb.invalido/clientes.json")
+    assert params == {"orderBy": '"$key"', "startAt": '"a"', "limitToFirst": "2"}
+    assert (metodo_update, params_update, corpo) == ("PATCH", {"print": "silent"}, {"clientes/a/nome": "Ana"})
+
+
+def test_erros_do_cliente_rest_sao_classificados():
+    # Tempo limite da rede e 5xx/429 são indisponibilidade; 4xx é erro do pedido
+    for falha, esperado in ((ReadTimeout("sem resposta"), True),
+                            (_Resposta(503, {"error": "indisponível"}), True),
+                            (_Resposta(429, {"error": "limite"}), True),
+                            (_Resposta(401, {"error": "Permission denied"}), False)):
+        transporte = _TransporteFalso(falha)
+        with pytest.raises(Exception) as erro:
+            _requisitar(transporte, lambda c: c.get("clientes"))
+        assert transitorio(erro.value) is esperado
+        if not esperado:
+            assert isinstance(erro.value, ErroRTDB) and erro.value.status == 401
+
+
+def test_api_sincrona_nao_usa_o_cliente_assincrono(monkeypatch):
+    def proibido(self):
+        raise AssertionError("API síncrona passou pelo cliente REST")
+
+    monkeypatch.setattr(FirebaseDAO, "cliente_assincrono", property(proibido))
+    dao = _DAO()
+    assert dao.criar("a", {"id": "a", "nome": "Ana"})
+    assert dao.atualizar("a", {"nome": "Ana Maria"})
+    assert dao.buscar_por_id("a")["nome"] == "Ana Maria"
+    assert [r["id"] for r in dao.listar_todos()] == ["a"]
+    assert dao.contar_registros() == 1
+    assert dao.deletar("a")
+    assert dao.buscar_varios(["a"]) == {}
+
+
+def test_observador_bloqueado_nao_trava_o_laco():
+    # Um observador que espera um lock não pode segurar a thread do laço:
+    # quem tem o lock ainda precisa usar as operações assíncronas
+    trava = threading.Lock()
+    vistos = []
+
+    def observador(id, antigo, novo):
+        with trava:
+            vistos.append(id)
+
+    FirebaseDAO.observar("testes", observador)
+    dao = _DAO()
+    with trava:
+        escritor = threading.Thread(target=lambda: executar(dao.criar_async("a", {"id": "a"})), daemon=True)
+        escritor.start()
+        time.sleep(0.2)
+        leitor = threading.Thread(target=lambda: executar(dao.contar_registros_async()), daemon=True)
+        leitor.start()
+        leitor.join(timeout=5)
+        assert not leitor.is_alive(), "laço travado pelo observador"
+    escritor.join(timeout=5)
+    assert not escritor.is_alive()
+    assert vistos == ["a"]
@@ -0,0 +1,71 @@
+import pytest
+
+from dao.cliente_dao import ClienteDAO
+from dao.firebase_dao import CARIMBO_SERVIDOR, FirebaseDAO
+from dao.registro import obter_dao
+from services import busca_prefixo
+from services.busca_prefixo import IndicePrefixo, buscar_prefixo
+
+
+@pytest.fixture(autouse=True)
+def indices_limpos(monkeypatch):
+    monkeypatch.setattr(busca_prefixo, "_indices", {})
+
+
+def _ids(texto):
+    return [r["id"] for r in buscar_prefixo(texto, "clientes")]
+
+
+def test_escrita_local_aparece_na_busca_seguinte():
+    dao = obter_dao(ClienteDAO)
+    FirebaseDAO.criar(dao, "c1", {"id": "c1", "nome": "Ana Souza"})
+    assert _ids("ana") == ["c1"]
+
+    FirebaseDAO.criar(dao, "c2", {"id": "c2", "nome": "Anabela Reis"})
+    FirebaseDAO.atualizar(dao, "c1", {"nome": "Beatriz Souza"})
+    assert _ids("ana") == ["c2"]
+    assert _ids("bea") == ["c1"]
+
+
+def test_escritas_de_fora_do_processo_chegam_pelo_espelho(banco, monkeypatch):
+    monkeypatch.setattr(busca_prefixo, "IDADE_MAXIMA_ESPELHO", 0.0)
+    FirebaseDAO.criar(obter_dao(ClienteDAO), "c1", {"id": "c1", "nome": "Ana Souza"})
+    assert _ids("ana") == ["c1"]
+
+    # Outro servidor, ou a importação em lote, grava direto no banco
+    raiz = banco.referencia("/")
+    raiz.update({
+        "clientes/c2": {"id": "c2", "nome": "Anabela Reis", "atualizado_em": CARIMBO_SERVIDOR},
+        "clientes/c1": None,
+        "excluidos/clientes/c1": CARIMBO_SERVIDOR,
+    })
+    assert _ids("ana") == ["c2"]
+
+
+def test_transacao_direta_reindexa():
+    dao = obter_dao(ClienteDAO)
+    FirebaseDAO.criar(dao, "c1", {"id": "c1", "nome": "Ana Souza"})
+    assert _ids("ana") == ["c1"]
+    dao.transacao("c1", lambda atual: {**atual, "nome": "Carla Souza"})
+    assert _ids("ana") == []
+    assert _ids("carla") == ["c1"]
+
+
+def test_alteracoes_durante_a_carga_sao_aplicadas_por_cima():
+    indice = IndicePrefixo()
+    indice.aplicar_alteracoes([("c2", None, {"id": "c2", "nome": "Bruno"})])
+    assert len(indice) == 0
+    indice.carregar([{"id": "c1", "nome": "Ana"}, {"id": "c2", "nome": "Antigo"}])
+    assert [r["id"] for r in indice.buscar("bru")] == ["c2"]
+    assert indice.buscar("antigo") == []
+
+
+def test_atualizacoes_repetidas_nao_crescem_o_indice():
+    indice = IndicePrefixo()
+    indice.carregar([{"id": f"c{i}", "nome": f"Cliente {i}"} for i in range(100)])
+    for versao in range(20000):
+        indice.adicionar("c1", {"id": "c1", "nome": f"Cliente versao{versao}"})
+    assert len(indice._ids) < 100 + 2 * IndicePrefixo.LIMITE_RECENTES
+    assert len(indice._ids) == len(indice._tokens) == len(indice._exibicao)
+    assert [r["id"] for r in indice.buscar("versao19999")] == ["c1"]
+    assert len(indice.buscar("cliente", limite=200)) == 100
@@ -0,0 +1,71 @@
+import pytest
+
+from dao.arquivo_avaliacoes import ARQUIVO_ENV
+from dao.avaliacao_dao import AvaliacaoDAO
+from dao.firebase_dao import CARIMBO_SERVIDOR, FirebaseDAO
+from dao.registro import obter_dao
+from services import busca_texto
+from services.busca_texto import IndiceTextual, obter_indice_comentarios
+
+
+@pytest.fixture(autouse=True)
+def indice_limpo(monkeypatch):
+    monkeypatch.setattr(busca_texto, "_indice", None)
+    monkeypatch.setattr(busca_texto, "_espelho", None)
+
+
+def _avaliacao(id, comentario):
+    return {"id": id, "comentario": comentario, "data_hora": "2024-05-01 20:00", "avaliado": "m1", "nota": 2}
+
+
+def _ids(consulta):
+    return [id for id, _ in obter_indice_comentarios().buscar(consulta)]
+
+
+def test_escrita_local_e_exclusao_direta_chegam_ao_indice(banco, monkeypatch):
+    dao = obter_dao(AvaliacaoDAO)
+    FirebaseDAO.criar(dao, "a1", _avaliacao("a1", "pizza fria e atrasada"))
+    assert _ids("fria") == ["a1"]
+
+    FirebaseDAO.criar(dao, "a2", _avaliacao("a2", "massa fria"))
+    assert sorted(_ids("fria")) == ["a1", "a2"]
+
+    # Outros processos gravam direto no banco, sem passar pela DAO
+    monkeypatch.setattr(busca_texto, "IDADE_MAXIMA_ESPELHO", 0.0)
+    banco.referencia("/").update({"avaliacoes/a1": None, "excluidos/avaliacoes/a1": CARIMBO_SERVIDOR})
+    assert _ids("fria") == ["a2"]
+
+
+def test_alteracoes_durante_a_carga_sao_aplicadas_por_cima():
+    indice = IndiceTextual()
+    indice.aplicar_alteracoes([("a1", None, None)])
+    indice.carregar([_avaliacao("a1", "entrega atrasada"), _avaliacao("a2", "entrega rapida")])
+    assert [id for id, _ in indice.buscar("entrega")] == ["a2"]
+
+
+def test_reindexacoes_repetidas_nao_crescem_o_indice():
+    indice = IndiceTextual()
+    indice.carregar([_avaliacao(f"a{i}", f"comentario numero {i}") for i in range(100)])
+    for versao in range(10000):
+        indice.adicionar("a1", _avaliacao("a1", f"borda queimada v{versao}"))
+    assert len(indice._docs) <= 100 + IndiceTextual.MINIMO_COMPACTACAO + 1
+    assert [id for id, _ in indice.buscar("v9999")] == ["a1"]
+    assert len(indice.buscar("comentario", limite=200)) == 99
+    assert indice.frequencia_termos(limite=1)[0][0] in ("comentario", "numero")
+
+
+def test_arquivamento_nao_retira_do_indice(tmp_path, monkeypatch):
+    monkeypatch.setenv(ARQUIVO_ENV, str(tmp_path))
+    dao = obter_dao(AvaliacaoDAO)
+    FirebaseDAO.criar(dao, "a1", _avaliacao("a1", "pizza fria"))
+    FirebaseDAO.criar(dao, "a2", {**_avaliacao("a2", "borda fria"), "data_hora": "2099-01-01 20:00"})
+    frequencias = obter_indice_comentarios().frequencia_termos()
+
+    assert dao.arquivar(dao.listar_antigas("2025-01-01 00:00:00"))
+    assert sorted(_ids("fria")) == ["a1", "a2"]
+    assert obter_indice_comentarios().frequencia_termos() == frequencias
+
+    # Um processo novo monta o índice com o arquivo e o banco
+    monkeypatch.setattr(busca_texto, "_indice", None)
+    assert sorted(_ids("fria")) == ["a1", "a2"]
+    assert obter_indice_comentarios().frequencia_termos() == frequencias
@@ -0,0 +1,61 @@
+import pytest
+
+from dao.cache_disco import CacheDisco
+from dao.campanha_dao import CampanhaDAO
+from dao.espelho import EspelhoColecao
+from dao.firebase_dao import FirebaseDAO
+from dao.registro import obter_dao
+
+pytest.importorskip("msgpack")
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheDisco(str(tmp_path / "cache"), "banco-a")
+
+
+def test_grava_e_le_o_espelho(cache, tmp_path):
+    registros = {"k1": {"id": "k1", "canais": ["email"], "opt_in": {"sms": True}, "roi": 1.5}}
+    assert cache.gravar("campanhas", registros, 123) > 0
+    assert cache.ler("campanhas") == (registros, 123)
+
+    # Arquivo de outro banco, de outra coleção ou corrompido não é usado
+    assert CacheDisco(cache.diretorio, "banco-b").ler("campanhas") is None
+    (tmp_path / "cache" / "clientes.msgpack").write_bytes((tmp_path / "cache" / "campanhas.msgpack").read_bytes())
+    assert cache.ler("clientes") is None
+    (tmp_path / "cache" / "campanhas.msgpack").write_bytes(b"CRMC\xff\xff")
+    assert cache.ler("campanhas") is None
+    cache.remover("campanhas")
+    assert cache.ler("motoboys") is None and cache.ler("campanhas") is None
+
+
+def test_processo_novo_parte_do_disco_e_sincroniza_o_delta(cache):
+    dao = obter_dao(CampanhaDAO)
+    for id in ("k1", "k2"):
+        FirebaseDAO.criar(dao, id, {"id": id, "nome": id})
+    primeiro = EspelhoColecao(dao, cache)
+    primeiro.atualizar()
+    # A carga completa já é gravada
+    assert cache.ler("campanhas")[1] == primeiro.marcador
+
+    FirebaseDAO.atualizar(dao, "k1", {"nome": "Inverno"})
+    dao.deletar("k2")
+
+    # Outro processo: sem carga completa, só o que mudou desde o marcador gravado
+    segundo = EspelhoColecao(dao, cache)
+    assert [(r["id"], r["nome"]) for r in segundo.atualizar()] == [("k1", "Inverno")]
+    estado = segundo.estado()
+    assert (estado["do_disco"], estado["cargas"], estado["sincronizacoes"]) == (1, 0, 1)
+
+    # Mudanças pendentes vão para o disco
+    assert segundo.gravar()
+    registros, _ = cache.ler("campanhas")
+    assert list(registros) == ["k1"] and registros["k1"]["nome"] == "Inverno"
+
+
+def test_banco_em_memoria_nao_usa_o_cache(monkeypatch, tmp_path):
+    from dao.cache_disco import CACHE_ENV, obter_cache_disco
+
+    monkeypatch.setenv(CACHE_ENV, str(tmp_path))
+    # Sem identidade estável, um arquivo poderia ser de outro banco
+    assert obter_cache_disco() is None
@@ -0,0 +1,72 @@
+import pytest
+
+from dao.avaliacao_dao import AvaliacaoDAO
+from dao.firebase_dao import FirebaseDAO
+from dao.motoboy_dao import MotoboyDAO
+from dao.registro import obter_dao
+from models.avaliacao import Avaliacao
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+
+def _pagina():
+    from views.dashboard_page import dashboard_page
+
+    dashboard_page()
+
+
+@pytest.fixture
+def app(banco):
+    import streamlit as st
+
+    # Os carregadores do painel ficam em cache no processo, entre um teste e outro
+    st.cache_data.clear()
+    banco.referencia("clientes").set({"c1": {"id": "c1", "nome": "Ana"}})
+    banco.referencia("motoboys").set({
+        "m1": {"id": "m1", "nome": "Caio", "status_operacional": "Online"},
+        "m2": {"id": "m2", "nome": "Davi", "status_operacional": "Offline"},
+    })
+    banco.referencia("campanhas").set({"k1": {"id": "k1", "nome": "Inverno", "canais": ["email"], "clientes_atingidos": 10}})
+    obter_dao(AvaliacaoDAO).criar(Avaliacao(None, "c1", "m1", 4, "", "2026-10-01 20:00:00"))
+    yield AppTest.from_function(_pagina, default_timeout=30)
+    st.cache_data.clear()
+
+
+def _metricas(app):
+    return {m.label: m.value for m in app.metric}
+
+
+def test_secoes_renderizam_os_dados(app):
+    app.run()
+    assert not app.exception
+    metricas = _metricas(app)
+    assert metricas["Clientes Cadastrados"] == "1" and metricas["Motoboys Online"] == "1"
+    assert metricas["Total de Avaliações"] == "1" and metricas["Média das Notas"] == "4.00"
+    # Avaliações, campanhas e motoboys têm gráfico; fidelidade está vazia
+    assert len(app.get("imgs")) == 3
+    assert [i.value for i in app.info] == ["Nenhum programa de fidelidade registrado."]
+
+
+def test_atualizar_descarta_so_o_cache_da_secao(app, banco):
+    app.run()
+    banco.referencia("clientes/c2").set({"id": "c2", "nome": "Bia"})
+    # Pela DAO, que carimba a alteração para o espelho da coleção
+    FirebaseDAO.atualizar(obter_dao(MotoboyDAO), "m2", {"status_operacional": "Online"})
+
+    # Dentro do intervalo, as seções continuam com os dados em cache
+    app.run()
+    assert _metricas(app)["Clientes Cadastrados"] == "1"
+
+    botoes = [b for b in app.button if b.key == "dashboard_atualizar_visao_geral"]
+    botoes[0].click().run()
+    assert not app.exception
+    metricas = _metricas(app)
+    assert metricas["Clientes Cadastrados"] == "2"
+    # O status dos motoboys tem cache próprio, que não foi descartado
+    assert metricas["Motoboys Online"] == "1"
+
+    # Atualizar os motoboys reexecuta só aquele fragmento; o quadro da visão
+    # geral, que usa o mesmo carregador, vê o valor novo no seu próximo ciclo
+    next(b for b in app.button if b.key == "dashboard_atualizar_motoboys").click().run()
+    app.run()
+    assert _metricas(app)["Motoboys Online"] == "2"
@@ -0,0 +1,71 @@
+from datetime import date, timedelta
+
+from dao.avaliacao_dao import AvaliacaoDAO
+from dao.campanha_dao import CampanhaDAO
+from dao.cliente_dao import ClienteDAO
+from dao.fidelidade_dao import FidelidadeDAO
+from dao.motoboy_dao import MotoboyDAO
+from dao.registro import obter_dao
+
+
+def _gravar(banco, colecao, registros):
+    banco.referencia(colecao).set({r["id"]: r for r in registros})
+
+
+def test_avaliacoes_com_categoria_e_datas(banco):
+    _gravar(banco, "avaliacoes", [
+        {"id": "a1", "avaliador": "c1", "avaliado": "m1", "nota": 2, "data_hora": "2026-10-01 20:00:00"},
+        {"id": "a2", "avaliador": "c1", "avaliado": "m1", "nota": 3, "comentario": "ok", "data_hora": "2026-10-02 20:00:00"},
+        {"id": "a3", "avaliador": "c2", "avaliado": "m2", "nota": 5, "data_hora": "data inválida"},
+    ])
+    df = obter_dao(AvaliacaoDAO).listar_dataframe().set_index("id")
+    assert list(df.columns) == ["avaliador", "avaliado", "nota", "categoria", "comentario", "data_hora"]
+    assert list(df["categoria"]) == ["Ruim", "Regular", "Excelente"]
+    assert list(df["comentario"]) == ["", "ok", ""]
+    assert df.loc["a1", "data_hora"].day == 1 and df["data_hora"].isna().tolist() == [False, False, True]
+
+
+def test_clientes_abrem_o_opt_in_por_canal(banco):
+    _gravar(banco, "clientes", [
+        {"id": "c1", "nome": "Ana", "cpf": "1", "preferencias": ["calabresa", "doce"], "opt_in": {"sms": True, "email": False}},
+        {"id": "c2", "nome": "Bia", "cpf": "2"},
+    ])
+    df = obter_dao(ClienteDAO).listar_dataframe().set_index("id")
+    assert "opt_in" not in df.columns
+    assert df[["opt_in_sms", "opt_in_email", "opt_in_whatsapp"]].values.tolist() == [[True, False, False], [False, False, False]]
+    assert list(df["preferencias"]) == ["calabresa, doce", ""]
+    assert list(df["email"]) == ["", ""]
+
+
+def test_fidelidade_com_nivel_ordenado_e_status(banco):
+    futuro = (date.today() + timedelta(days=1)).strftime("%Y-%m-%d")
+    _gravar(banco, "fidelidade", [
+        {"id": "f1", "cliente_id": "c1", "cliente_nome": "Ana", "pontos": 1600, "nivel": "Ouro", "validade": futuro},
+        {"id": "f2", "cliente_id": "c2", "cliente_nome": "Bia", "pontos": 10, "nivel": "bronze", "validade": "2020-01-01"},
+    ])
+    df = obter_dao(FidelidadeDAO).listar_dataframe().set_index("id")
+    assert df["nivel"].cat.ordered and df.loc["f2", "nivel"] < df.loc["f1", "nivel"]
+    assert list(df["status"]) == ["Ativo", "Expirado"]
+    assert df["pontos"].dtype == "int64"
+
+
+def test_motoboys_e_campanhas_por_canal(banco):
+    _gravar(banco, "motoboys", [
+        {"id": "m1", "nome": "Caio", "status_operacional": "Online", "zonas_atuacao": ["Centro", "Norte"]},
+        {"id": "m2", "nome": "Davi", "status_operacional": "Pausa", "avaliacao_media": 4.5},
+    ])
+    df = obter_dao(MotoboyDAO).listar_dataframe().set_index("id")
+    assert df["status_operacional"].tolist()[0] == "Online" and df["status_operacional"].isna().tolist() == [False, True]
+    assert list(df["zonas_atuacao"]) == ["Centro, Norte", ""]
+    assert list(df["avaliacao_media"]) == [0.0, 4.5]
+
+    _gravar(banco, "campanhas", [
+        {"id": "k1", "nome": "Inverno", "canais": ["email", "sms"], "clientes_atingidos": 100},
+        {"id": "k2", "nome": "Verão", "canais": ["fax"], "clientes_atingidos": 50},
+    ])
+    dao = obter_dao(CampanhaDAO)
+    assert list(dao.listar_dataframe()["canais"]) == ["email, sms", "fax"]
+    canais = dao.listar_canais_dataframe()
+    # Canais fora do domínio não entram nas agregações
+    assert canais[["id", "canal"]].values.tolist() == [["k1", "email"], ["k1", "sms"]]
+    assert canais.groupby("canal", observed=False)["clientes_atingidos"].sum().to_dict() == {"email": 100, "sms": 100, "whatsapp": 0}
@@ -0,0 +1,64 @@
+from datetime import date, timedelta
+
+from dao.fidelidade_dao import FidelidadeDAO
+from dao.firebase_dao import FirebaseDAO
+from dao.registro import obter_dao
+from jobs.expirar_fidelidade import varrer
+from models.fidelidade import Fidelidade
+
+HOJE = date(2026, 10, 19)
+
+
+class _Notificador:
+    def __init__(self):
+        self.eventos = []
+
+    def notificar(self, evento, fidelidade, detalhes):
+        self.eventos.append((evento, fidelidade.id))
+
+
+def _dia(deslocamento: int) -> str:
+    return (HOJE + timedelta(days=deslocamento)).strftime("%Y-%m-%d")
+
+
+def _programa(dao, id, pontos, validade):
+    return dao.criar(Fidelidade(id, f"c-{id}", f"Cliente {id}", pontos, Fidelidade.nivel_por_pontos(pontos), validade))
+
+
+def test_varredura_expira_vencidos_e_avisa_uma_vez():
+    dao = obter_dao(FidelidadeDAO)
+    _programa(dao, "vencido", 1200, _dia(-3))
+    _programa(dao, "a-vencer", 300, _dia(2))
+    _programa(dao, "longe", 300, _dia(60))
+    renovado = _programa(dao, "renovado", 800, _dia(-1))
+    programa = dao.buscar_por_id(renovado)
+    programa.validade = _dia(365)
+    assert dao.atualizar(programa)
+
+    notificador = _Notificador()
+    relatorio = varrer(dao, notificador, HOJE, dias_atras=30, dias_aviso=7, tamanho_lote=1)
+    assert notificador.eventos == [("expirado", "vencido"), ("a_vencer", "a-vencer")]
+    assert relatorio["total_pontos_zerados"] == 1200 and relatorio["erros"] == 0
+
+    vencido = FirebaseDAO.buscar_por_id(dao, "vencido")
+    assert vencido["pontos"] == dao.extrato.calcular_saldo("vencido") == 0
+    assert vencido["nivel"] == "bronze"
+    assert FirebaseDAO.buscar_por_id(dao, "renovado")["pontos"] == 800
+    assert dao.listar_vencimentos(_dia(-3)) == [] and dao.listar_vencimentos(_dia(-1)) == []
+    assert dao.listar_vencimentos(_dia(2)) == [("a-vencer", "avisado")]
+
+    # Rodar de novo não repete avisos nem expirações
+    notificador = _Notificador()
+    relatorio = varrer(dao, notificador, HOJE, dias_atras=30, dias_aviso=7, tamanho_lote=1)
+    assert notificador.eventos == [] and relatorio["total_expirados"] == 0
+
+
+def test_reconstrucao_do_indice_de_validade(banco):
+    dao = obter_dao(FidelidadeDAO)
+    _programa(dao, "p1", 100, _dia(5))
+    _programa(dao, "p2", 0, _dia(-400))
+    banco.referencia("fidelidade_vencimentos").delete()
+
+    # Vencido e já zerado fica de fora: não há o que expirar
+    assert dao.reconstruir_indice_vencimentos() == 1
+    assert dao.listar_vencimentos(_dia(5)) == [("p1", True)]
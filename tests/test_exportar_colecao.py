@@ -0,0 +1,67 @@
+import gzip
+import json
+
+import pytest
+
+from dao.avaliacao_dao import AvaliacaoDAO
+from jobs import exportar_colecao
+
+
+@pytest.fixture
+def avaliacoes(banco):
+    registros = {
+        f"a{i}": {"id": f"a{i}", "avaliador": "c1", "avaliado": "m1", "nota": i % 5 + 1,
+                  "comentario": f"comentario {i}", "data_hora": f"2026-10-0{i + 1} 20:00:00"}
+        for i in range(5)
+    }
+    registros["a9"] = {"id": "a9", "avaliador": "c1", "avaliado": "m1", "nota": 9, "data_hora": "2026-10-09 20:00:00"}
+    banco.referencia("avaliacoes").set(registros)
+
+
+def _manifesto(destino):
+    (caminho,) = destino.glob("*.manifesto.json")
+    return json.loads(caminho.read_text(encoding="utf-8"))
+
+
+def test_ndjson_em_shards_com_manifesto(avaliacoes, tmp_path):
+    # Shard mínimo: cada página fecha o seu arquivo
+    manifesto = exportar_colecao.exportar("avaliacoes", str(tmp_path), tamanho_pagina=2,
+                                          tamanho_shard_mb=1e-6, compactar=True)
+    assert (manifesto["registros"], manifesto["ignorados"]) == (5, 1)
+    assert [s["registros"] for s in manifesto["shards"]] == [2, 2, 1]
+    assert _manifesto(tmp_path)["shards"] == manifesto["shards"]
+
+    linhas = []
+    for shard in manifesto["shards"]:
+        assert shard["arquivo"].endswith(".ndjson.gz")
+        with gzip.open(tmp_path / shard["arquivo"], "rt", encoding="utf-8") as fp:
+            linhas.extend(json.loads(linha) for linha in fp)
+    assert [r["id"] for r in linhas] == ["a0", "a1", "a2", "a3", "a4"]
+    assert linhas[0]["nota"] == 1 and linhas[0]["comentario"] == "comentario 0"
+    assert not list(tmp_path.glob("*.parcial"))
+
+
+def test_erro_de_leitura_interrompe_sem_manifesto(avaliacoes, tmp_path, monkeypatch):
+    original = AvaliacaoDAO.listar_paginas
+
+    def cair_na_segunda(self, tamanho=1000, apos=None):
+        paginas = original(self, tamanho, apos)
+        yield next(paginas)
+        raise TimeoutError("sem resposta")
+
+    monkeypatch.setattr(AvaliacaoDAO, "listar_paginas", cair_na_segunda)
+    assert exportar_colecao.main(["avaliacoes", str(tmp_path), "--tamanho-pagina", "2"]) == 1
+    assert not list(tmp_path.glob("*.manifesto.json"))
+    assert [p.suffix for p in tmp_path.iterdir()] == [".parcial"]
+
+
+def test_parquet_com_colunas_tipadas(avaliacoes, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet", exc_type=ImportError)
+
+    manifesto = exportar_colecao.exportar("avaliacoes", str(tmp_path), formato="parquet", tamanho_pagina=2)
+    (shard,) = manifesto["shards"]
+    arquivo = pq.ParquetFile(tmp_path / shard["arquivo"])
+    assert arquivo.metadata.num_row_groups == 3
+    tabela = arquivo.read()
+    assert str(tabela.schema.field("nota").type) == "double"
+    assert tabela.column("id").to_pylist() == ["a0", "a1", "a2", "a3", "a4"]
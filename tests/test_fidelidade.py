@@ -0,0 +1,227 @@
+from datetime import date, timedelta
+
+import pytest
+
+from dao.fidelidade_dao import FidelidadeDAO
+from dao.firebase_dao import FirebaseDAO
+from dao.registro import obter_dao
+from models.fidelidade import Fidelidade
+
+
+@pytest.fixture
+def dao():
+    return obter_dao(FidelidadeDAO)
+
+
+def _programa(dao, pontos=0, validade=None, cliente="c1"):
+    validade = validade or (date.today() + timedelta(days=30)).strftime("%Y-%m-%d")
+    return dao.criar(Fidelidade(None, cliente, f"Cliente {cliente}", pontos, Fidelidade.nivel_por_pontos(pontos), validade))
+
+
+def _registro(dao, id):
+    return FirebaseDAO.buscar_por_id(dao, id)
+
+
+def _extrato(dao, id):
+    return dao.extrato.calcular_saldo(id)
+
+
+def _histograma_confere(dao):
+    contagem = {"bronze": 0, "prata": 0, "ouro": 0}
+    for registro in FirebaseDAO.listar_todos(dao):
+        contagem[registro["nivel"]] += 1
+    assert dao.obter_distribuicao_niveis() == contagem
+
+
+def test_saldo_e_extrato_andam_juntos(dao):
+    id = _programa(dao, pontos=100)
+    assert dao.creditar_pontos(id, 450, motivo="pedido") == 550
+    assert dao.debitar_pontos(id, 50, motivo="resgate") == 500
+    assert dao.debitar_pontos(id, 10_000, motivo="resgate") is None
+
+    registro = _registro(dao, id)
+    assert registro["pontos"] == _extrato(dao, id) == 500
+    assert registro["nivel"] == "prata"
+    assert not registro.get("pendentes")
+    lancamentos, _ = dao.listar_extrato(id)
+    assert [m.delta for m in lancamentos] == [-50, 450, 100]
+    _histograma_confere(dao)
+
+
+def test_falha_ao_gravar_o_extrato_fica_pendente_e_e_concluida(dao, monkeypatch):
+    id = _programa(dao)
+    original = FidelidadeDAO.atualizar_caminhos
+    monkeypatch.setattr(FidelidadeDAO, "atualizar_caminhos", lambda self, caminhos: False)
+    assert dao.creditar_pontos(id, 600, motivo="pedido") == 600
+    monkeypatch.setattr(FidelidadeDAO, "atualizar_caminhos", original)
+
+    # O lançamento já está no programa, junto com o saldo
+    registro = _registro(dao, id)
+    assert registro["pontos"] == 600 and len(registro["pendentes"]) == 1
+    assert [m.delta for m in dao.listar_extrato(id)[0]] == [600]
+    assert dao.concluir_pendentes() == 0  # ainda dentro do prazo
+
+    assert dao.concluir_pendentes(prazo=0) == 1
+    assert not _registro(dao, id).get("pendentes")
+    assert _extrato(dao, id) == 600
+    assert [m.delta for m in dao.listar_extrato(id)[0]] == [600]
+    _histograma_confere(dao)
+
+
+def test_expiracao_zera_saldo_extrato_e_nivel(dao):
+    ontem = (date.today() - timedelta(days=1)).strftime("%Y-%m-%d")
+    id = _programa(dao, pontos=2000, validade=ontem)
+    resultado = dao.expirar(id)
+    assert resultado["pontos_zerados"] == 2000
+    assert resultado["nivel_anterior"] == "ouro" and resultado["nivel_novo"] == "bronze"
+    registro = _registro(dao, id)
+    assert registro["pontos"] == _extrato(dao, id) == 0
+    assert dao.listar_vencimentos(ontem) == []
+    _histograma_confere(dao)
+
+
+def test_excluir_com_operacao_pendente_mantem_o_histograma(dao, monkeypatch):
+    id = _programa(dao)
+    _programa(dao, pontos=700, cliente="c2")
+    original = FidelidadeDAO.atualizar_caminhos
+    monkeypatch.setattr(FidelidadeDAO, "atualizar_caminhos", lambda self, caminhos: False)
+    dao.creditar_pontos(id, 2000)
+    monkeypatch.setattr(FidelidadeDAO, "atualizar_caminhos", original)
+
+    assert dao.deletar(id)
+    _histograma_confere(dao)
+
+
+def test_nivel_vem_sempre_do_saldo(dao):
+    id = _programa(dao, pontos=100)
+    f = dao.buscar_por_id(id)
+    f.nivel = "ouro"
+    assert dao.atualizar(f)
+    assert _registro(dao, id)["nivel"] == "bronze" and f.nivel == "bronze"
+
+    f.adicionar_pontos(500, motivo="Ajuste manual")
+    f.nivel = "bronze"
+    assert dao.atualizar(f)
+    assert _registro(dao, id)["nivel"] == "prata" and f.nivel == "prata"
+    _histograma_confere(dao)
+
+
+def test_lote_usa_o_saldo_do_momento_e_nao_repete(dao, monkeypatch):
+    a = _programa(dao, pontos=400, cliente="c1")
+    b = _programa(dao, pontos=0, cliente="c2")
+    # Crédito de um caixa depois da leitura que o lote faria antes de gravar
+    dao.creditar_pontos(a, 200)
+
+    assert dao.creditar_em_lote({a: 1000, b: 100}, "Pedidos", {"fidelidade_lotes/l1/partes/000000": True}, lote_id="l1")
+    assert _registro(dao, a)["pontos"] == 1600 and _registro(dao, a)["nivel"] == "ouro"
+    assert _registro(dao, b)["nivel"] == "bronze"
+    _histograma_confere(dao)
+
+    # Repetir o lote (retomada) não credita de novo
+    assert dao.creditar_em_lote({a: 1000, b: 100}, "Pedidos", lote_id="l1")
+    assert _registro(dao, a)["pontos"] == _extrato(dao, a) == 1600
+    assert _registro(dao, b)["pontos"] == _extrato(dao, b) == 100
+    _histograma_confere(dao)
+
+    assert dao.limpar_marcas_lote("l1", [a, b])
+    assert not _registro(dao, a).get("lotes")
+
+
+def test_retomada_do_job_apos_falha_no_meio(dao, monkeypatch, tmp_path):
+    from jobs import acumular_pontos
+
+    ids = [_programa(dao, pontos=0, cliente=f"c{i}") for i in range(4)]
+    arquivo = tmp_path / "pedidos.ndjson"
+    arquivo.write_text("".join(f'{{"cliente_id": "c{i}", "pedido_id": "p{i}", "pontos": 600}}\n' for i in range(4)))
+
+    # A transação do terceiro programa falha na primeira rodada
+    original = FidelidadeDAO._operacao
+    falhar = {ids[2]}
+
+    def operacao(self, id, aplicar, lote_id=None):
+        if id in falhar:
+            return None
+        return original(self, id, aplicar, lote_id=lote_id)
+
+    monkeypatch.setattr(FidelidadeDAO, "_operacao", operacao)
+    assert acumular_pontos.main([str(arquivo), "--tamanho-lote", "10"]) == 1
+    falhar.clear()
+    assert acumular_pontos.main([str(arquivo), "--tamanho-lote", "10"]) == 0
+
+    for id in ids:
+        registro = _registro(dao, id)
+        assert registro["pontos"] == _extrato(dao, id) == 600
+        assert registro["nivel"] == "prata" and not registro.get("lotes")
+    _histograma_confere(dao)
+
+
+def test_lote_concluido_nao_e_reaplicado(dao):
+    from jobs.acumular_pontos import aplicar
+
+    c2 = _programa(dao, cliente="c2")
+    c3 = _programa(dao, cliente="c3")
+    primeiro = aplicar(dao, {"c1": 10, "c2": 10, "c3": 10}, "L1", "x", 1)
+    assert primeiro["sem_programa"] == ["c1"] and primeiro["partes"] == 2
+
+    # Um programa novo entre as rodadas não muda a divisão nem repete créditos
+    c1 = _programa(dao, cliente="c1")
+    segundo = aplicar(dao, {"c1": 10, "c2": 10, "c3": 10}, "L1", "x", 1)
+    assert segundo["ja_concluido"]
+    assert [_registro(dao, id)["pontos"] for id in (c1, c2, c3)] == [0, 10, 10]
+    assert [_extrato(dao, id) for id in (c1, c2, c3)] == [0, 10, 10]
+
+
+def test_retomada_usa_as_partes_gravadas(dao, monkeypatch):
+    from jobs.acumular_pontos import aplicar
+
+    c2 = _programa(dao, cliente="c2")
+    c3 = _programa(dao, cliente="c3")
+    original = FidelidadeDAO._operacao
+    monkeypatch.setattr(FidelidadeDAO, "_operacao", lambda self, id, aplicar, lote_id=None: None)
+    assert aplicar(dao, {"c1": 10, "c2": 10, "c3": 10}, "L1", "x", 1)["partes_com_erro"] == 2
+    monkeypatch.setattr(FidelidadeDAO, "_operacao", original)
+
+    c1 = _programa(dao, cliente="c1")
+    relatorio = aplicar(dao, {"c1": 10, "c2": 10, "c3": 10}, "L1", "x", 1)
+    assert relatorio["partes"] == 2 and relatorio["partes_com_erro"] == 0
+    assert [_registro(dao, id)["pontos"] for id in (c1, c2, c3)] == [0, 10, 10]
+
+
+def test_falha_ao_ler_os_programas_interrompe_o_job(dao, monkeypatch, tmp_path):
+    from jobs import acumular_pontos
+
+    _programa(dao, cliente="c1")
+    arquivo = tmp_path / "pedidos.ndjson"
+    arquivo.write_text('{"cliente_id": "c1", "pedido_id": "p1", "pontos": 10}\n')
+
+    def falhar(self, tamanho=1000, apos=None):
+        raise TimeoutError("sem resposta")
+        yield
+
+    monkeypatch.setattr(FidelidadeDAO, "listar_paginas", falhar)
+    assert acumular_pontos.main([str(arquivo)]) == 1
+    monkeypatch.undo()
+
+    # Nada foi marcado: a próxima rodada credita normalmente
+    assert acumular_pontos.main([str(arquivo)]) == 0
+    assert [p.pontos for p in dao.listar_todos()] == [10]
+
+
+def test_posicao_no_ranking_acompanha_as_escritas(dao, banco, monkeypatch):
+    a = _programa(dao, pontos=500, cliente="c1")
+    b = _programa(dao, pontos=900, cliente="c2")
+    c = _programa(dao, pontos=500, cliente="c3")
+    assert [dao.obter_posicao(id) for id in (a, b, c)] == [2, 1, 2]
+    assert dao.obter_posicao("inexistente") is None
+
+    dao.creditar_pontos(c, 1000)
+    dao.deletar(b)
+    assert [dao.obter_posicao(id) for id in (a, c)] == [2, 1]
+
+    # Sem escritas novas, a posição sai da memória: nenhuma leitura da coleção
+    referencia = type(banco.referencia("fidelidade"))
+    lidos = []
+    ler = referencia.get
+    monkeypatch.setattr(referencia, "get", lambda self, *args, **kwargs: lidos.append(self.path) or ler(self, *args, **kwargs))
+    assert dao.obter_posicao(a) == 2
+    assert not [caminho for caminho in lidos if caminho.startswith("/fidelidade")]
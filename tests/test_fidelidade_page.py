@@ -0,0 +1,60 @@
+import pytest
+
+from dao.cliente_dao import ClienteDAO
+from dao.fidelidade_dao import FidelidadeDAO
+from dao.firebase_dao import FirebaseDAO
+from dao.registro import obter_dao
+from models.cliente import Cliente
+
+AppTest = pytest.importorskip("streamlit.testing.v1").AppTest
+
+
+def _pagina():
+    from views.fidelidade_page import fidelidade_page
+
+    fidelidade_page()
+
+
+@pytest.fixture
+def app():
+    clientes = obter_dao(ClienteDAO)
+    clientes.reconstruir_indices()
+    clientes.criar(Cliente("c1", "Ana Souza", "529.982.247-25", "11999990000", "ana@exemplo.com", "Rua A"))
+    return AppTest.from_function(_pagina, default_timeout=30)
+
+
+def _escolher(app, acao):
+    app.run()
+    app.sidebar.selectbox[0].set_value(acao).run()
+
+
+def test_cadastrar_atualizar_e_deletar(app):
+    dao = obter_dao(FidelidadeDAO)
+
+    _escolher(app, "Cadastrar")
+    app.text_input[0].set_value("Ana Souza")
+    app.number_input[0].set_value(600)
+    app.button[0].click().run()
+    assert not app.exception
+    assert [s.value for s in app.success] == ["Programa de fidelidade cadastrado com sucesso!"]
+    (programa,) = FirebaseDAO.listar_todos(dao)
+    assert programa["pontos"] == 600 and programa["nivel"] == "prata"
+
+    # A busca e o envio do formulário de atualização acontecem em execuções diferentes
+    _escolher(app, "Atualizar")
+    app.text_input[0].set_value(programa["id"])
+    app.button[0].click().run()
+    app.number_input[0].set_value(1600)
+    app.button[1].click().run()
+    assert not app.exception
+    assert [s.value for s in app.success] == ["Programa de fidelidade atualizado com sucesso!"]
+    registro = FirebaseDAO.buscar_por_id(dao, programa["id"])
+    assert registro["pontos"] == dao.extrato.calcular_saldo(programa["id"]) == 1600
+    assert registro["nivel"] == "ouro"
+
+    _escolher(app, "Deletar")
+    app.text_input[0].set_value(programa["id"])
+    app.button[0].click().run()
+    assert not app.exception
+    assert [s.value for s in app.success] == ["Programa de fidelidade deletado com sucesso!"]
+    assert FirebaseDAO.buscar_por_id(dao, programa["id"]) is None
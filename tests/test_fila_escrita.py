@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+
+from dao.avaliacao_dao import AvaliacaoDAO
+from dao.fila_escrita import FilaEscrita
+from dao.registro import obter_dao
+from dao.resiliencia import TempoEsgotado
+from models.avaliacao import Avaliacao
+
+
+def _dados(id: str, nota: int = 5) -> dict:
+    return Avaliacao(id, "cliente", "motoboy", nota, "ok", "2026-10-19 12:00:00").to_dict()
+
+
+@pytest.fixture
+def arquivo(tmp_path):
+    return str(tmp_path / "fila.sqlite3")
+
+
+def test_pendencias_de_execucao_anterior_sao_enviadas_sem_registrar(arquivo, banco):
+    anterior = FilaEscrita(arquivo)
+    anterior.enfileirar(AvaliacaoDAO(), "a1", _dados("a1"))
+    anterior.enfileirar(AvaliacaoDAO(), "a2", _dados("a2", 3))
+
+    # Processo novo: ninguém chamou enfileirar/registrar
+    fila = FilaEscrita(arquivo)
+    assert fila.esvaziar() == 2
+    assert fila.pendentes() == 0
+    assert set(banco.referencia("avaliacoes").get()) == {"a1", "a2"}
+    assert fila._daos["avaliacoes"] is obter_dao(AvaliacaoDAO)
+
+
+def test_lote_recusado_vai_para_rejeitados_sem_travar_a_fila(arquivo, banco, monkeypatch):
+    dao = obter_dao(AvaliacaoDAO)
+    original = dao._criar_em_lote
+
+    def recusar(registros, extras=None):
+        if "ruim" in registros:
+            raise ValueError("dados recusados pelo banco")
+        original(registros, extras)
+
+    monkeypatch.setattr(dao, "_criar_em_lote", recusar)
+    fila = FilaEscrita(arquivo, tamanho_lote=1, max_tentativas=3)
+    fila.enfileirar(dao, "ruim", _dados("ruim"))
+    fila.enfileirar(dao, "boa", _dados("boa"))
+
+    for _ in range(2):
+        assert fila.esvaziar() == 0
+        assert fila.rejeitados() == []
+    assert fila.esvaziar() == 1
+
+    assert set(banco.referencia("avaliacoes").get()) == {"boa"}
+    assert fila.pendentes() == 0
+    rejeitados = fila.rejeitados()
+    assert [r["id"] for r in rejeitados] == ["ruim"]
+    assert "ValueError" in rejeitados[0]["erro"]
+    assert fila.estado()["rejeitados"] == 1
+
+    monkeypatch.setattr(dao, "_criar_em_lote", original)
+    assert fila.reprocessar_rejeitados() == 1
+    assert fila.esvaziar() == 1
+    assert fila.rejeitados() == []
+    assert set(banco.referencia("avaliacoes").get()) == {"boa", "ruim"}
+
+
+def test_indisponibilidade_nao_conta_como_rejeicao(arquivo, banco, monkeypatch):
+    dao = obter_dao(AvaliacaoDAO)
+
+    def indisponivel(registros, extras=None):
+        raise TempoEsgotado("sem resposta")
+
+    monkeypatch.setattr(dao, "_criar_em_lote", indisponivel)
+    fila = FilaEscrita(arquivo, max_tentativas=2)
+    fila.enfileirar(dao, "a1", _dados("a1"))
+    for _ in range(5):
+        assert fila.esvaziar() == 0
+
+    assert fila.pendentes() == 1
+    assert fila.rejeitados() == []
+
+
+def test_arquivo_antigo_ganha_a_coluna_de_tentativas(arquivo):
+    conexao = sqlite3.connect(arquivo)
+    conexao.execute(
+        "CREATE TABLE pendentes (seq INTEGER PRIMARY KEY AUTOINCREMENT, colecao TEXT NOT NULL, "
+        "id TEXT NOT NULL, dados TEXT NOT NULL, criado_em REAL NOT NULL, lote TEXT, reivindicado_em REAL)"
+    )
+    conexao.execute(
+        "INSERT INTO pendentes (colecao, id, dados, criado_em) VALUES ('avaliacoes', 'a1', ?, 0)",
+        ('{"avaliador": "cliente", "avaliado": "motoboy", "nota": 5}',)
+    )
+    conexao.commit()
+    conexao.close()
+
+    fila = FilaEscrita(arquivo)
+    assert fila.esvaziar() == 1
@@ -0,0 +1,49 @@
+import pytest
+
+from services import graficos
+from services.graficos import CacheGraficos, grafico_barras
+
+
+@pytest.fixture(autouse=True)
+def cache(monkeypatch):
+    cache = CacheGraficos()
+    monkeypatch.setattr(graficos, "_cache", cache)
+    return cache
+
+
+def test_mesmos_dados_renderizam_uma_vez(cache, monkeypatch):
+    png = grafico_barras(["1", "2"], [3, 4], titulo="Notas")
+    assert png.startswith(b"\x89PNG")
+
+    # Os mesmos números (mesmo que vindos como int ou float) saem do cache
+    monkeypatch.setattr(graficos, "_renderizar_barras", lambda especificacao: pytest.fail("renderizou de novo"))
+    assert grafico_barras(["1", "2"], [3.0, 4.0], titulo="Notas") is png
+    assert cache.estatisticas()["acertos"] == 1 and cache.estatisticas()["faltas"] == 1
+
+
+def test_dados_e_formato_diferentes_geram_outra_imagem(cache):
+    png = grafico_barras(["a", "b"], [1, 2])
+    assert grafico_barras(["a", "b"], [1, 3]) != png
+    svg = grafico_barras(["a", "b"], [1, 2], cores=["red", "blue"], rotacionar_rotulos=True, formato="svg")
+    assert b"<svg" in svg
+    assert cache.estatisticas()["itens"] == 3
+    with pytest.raises(ValueError):
+        grafico_barras(["a"], [1], formato="jpg")
+
+
+def test_renderizacao_nao_usa_o_pyplot():
+    import matplotlib.pyplot as plt
+
+    abertas = plt.get_fignums()
+    grafico_barras(["a"], [1])
+    assert plt.get_fignums() == abertas
+
+
+def test_cache_descarta_o_menos_usado():
+    cache = CacheGraficos(maximo=2)
+    cache.guardar("a", b"1")
+    cache.guardar("b", b"2")
+    assert cache.obter("a") == b"1"
+    cache.guardar("c", b"3")
+    assert cache.obter("b") is None
+    assert cache.estatisticas() == {"itens": 2, "bytes": 2, "acertos": 1, "faltas": 1}
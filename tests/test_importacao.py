@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PESADOS = ("pandas", "firebase_admin", "matplotlib", "dao.firebase_dao")
+
+
+def _carregados(codigo):
+    """Roda o código num interpretador novo e devolve quais módulos pesados ficaram carregados."""
+    saida = subprocess.run(
+        [sys.executable, "-c", f"import sys\n{codigo}\nprint(' '.join(m for m in {PESADOS!r} if m in sys.modules))"],
+        cwd=RAIZ, env={**os.environ, "CRM_BANCO_LOCAL": ":memoria:"},
+        capture_output=True, text=True, timeout=120, check=True
+    )
+    return saida.stdout.split()
+
+
+def test_tela_de_login_nao_importa_as_paginas():
+    assert _carregados("import app") == []
+
+
+def test_paginas_carregam_sob_demanda():
+    # O painel só traz o matplotlib quando é desenhado; o modo local nunca traz o firebase_admin
+    carregados = _carregados("import app\napp.carregar_pagina('dashboard')")
+    assert "pandas" in carregados and "dao.firebase_dao" in carregados
+    assert "matplotlib" not in carregados and "firebase_admin" not in carregados
+
+
+@pytest.mark.parametrize("nome", [
+    "dashboard", "clientes", "motoboys", "avaliacoes", "fidelidade", "ranking", "campanhas"
+])
+def test_todas_as_paginas_resolvem(nome):
+    import app
+
+    assert callable(app.carregar_pagina(nome))
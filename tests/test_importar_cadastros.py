@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from dao.cliente_dao import ClienteDAO
+from dao.motoboy_dao import MotoboyDAO
+from dao.registro import obter_dao
+from jobs import importar_cadastros
+from models.cliente import Cliente
+
+CABECALHO = "nome,cpf,telefone,email,endereco,preferencias,opt_in_sms\n"
+LINHAS = [
+    "Bia Lima,390.533.447-05,11 98888-7777,bia@exemplo.com,Rua B,\"calabresa,doce\",sim\n",
+    "Ana Outra,529.982.247-25,11 97777-0000,ana2@exemplo.com,Rua C,,\n",   # CPF já cadastrado
+    "Caio Reis,111.444.777-35,11 96666-0000,BIA@exemplo.com,Rua D,,\n",   # e-mail repetido no arquivo
+    "Davi Melo,222.333.444-05,11 95555-0000,sem-arroba,Rua E,,\n",        # e-mail inválido
+    "Eva Dias,333.444.555-05,11 94444-0000,eva@exemplo.com,Rua F,,\n",
+]
+
+
+@pytest.fixture
+def clientes():
+    dao = obter_dao(ClienteDAO)
+    dao.reconstruir_indices()
+    dao.criar(Cliente("c1", "Ana Souza", "529.982.247-25", "11999990000", "ana@exemplo.com", "Rua A"))
+    return dao
+
+
+def _importar(arquivo, tmp_path, **kwargs):
+    return importar_cadastros.importar(
+        kwargs.pop("colecao", "clientes"), str(arquivo), kwargs.pop("formato", "csv"), kwargs.pop("tamanho_lote", 1),
+        str(tmp_path / "progresso.json"), **kwargs
+    )
+
+
+def test_valida_deduplica_e_grava_com_indices(clientes, tmp_path):
+    arquivo = tmp_path / "franquia.csv"
+    arquivo.write_text(CABECALHO + "".join(LINHAS), encoding="utf-8")
+    rejeitados = tmp_path / "rejeitados.ndjson"
+
+    estado = _importar(arquivo, tmp_path, rejeitados=str(rejeitados))
+    assert (estado["importados"], estado["duplicados"], estado["invalidos"]) == (2, 2, 1)
+    assert estado["concluido_em"] and not estado["colecao_vazia"]
+
+    bia = clientes.buscar_por_cpf("39053344705")
+    assert bia.preferencias == ["calabresa", "doce"] and bia.opt_in["sms"] is True
+    assert clientes.buscar_por_email("eva@exemplo.com").nome == "Eva Dias"
+    motivos = [json.loads(linha)["motivo"] for linha in rejeitados.read_text(encoding="utf-8").splitlines()]
+    assert motivos == ["duplicado (cpf)", "duplicado (email)", "E-mail inválido"]
+
+    # Rodar de novo o mesmo arquivo não importa nada
+    assert _importar(arquivo, tmp_path)["importados"] == 2
+    assert len(clientes.listar_todos()) == 3
+
+
+def test_retoma_do_ultimo_lote_e_reconhece_lote_repetido(clientes, tmp_path, monkeypatch):
+    arquivo = tmp_path / "franquia.csv"
+    arquivo.write_text(CABECALHO + LINHAS[0] + LINHAS[4], encoding="utf-8")
+
+    # Cai entre a gravação do segundo lote e o seu checkpoint
+    salvar = importar_cadastros.salvar_checkpoint
+    chamadas = []
+
+    def salvar_e_cair(caminho, estado):
+        chamadas.append(estado["linha"])
+        if len(chamadas) == 2:
+            raise RuntimeError("processo interrompido")
+        salvar(caminho, estado)
+
+    monkeypatch.setattr(importar_cadastros, "salvar_checkpoint", salvar_e_cair)
+    with pytest.raises(RuntimeError):
+        _importar(arquivo, tmp_path)
+    monkeypatch.setattr(importar_cadastros, "salvar_checkpoint", salvar)
+
+    estado = _importar(arquivo, tmp_path)
+    assert (estado["importados"], estado["duplicados"]) == (1, 1)
+    assert sorted(c.nome for c in clientes.listar_todos()) == ["Ana Souza", "Bia Lima", "Eva Dias"]
+
+    # Checkpoint de outro arquivo não é aproveitado
+    arquivo.write_text(CABECALHO + LINHAS[4], encoding="utf-8")
+    with pytest.raises(RuntimeError):
+        _importar(arquivo, tmp_path)
+
+
+def test_motoboys_em_ndjson_simulado_e_carga_inicial(tmp_path):
+    arquivo = tmp_path / "entregadores.ndjson"
+    arquivo.write_text("\n".join([
+        json.dumps({"nome": "Caio", "cpf": "529.982.247-25", "telefone": "11999990000", "cnh": "12345678901",
+                    "zonas_atuacao": ["Centro", "Norte"]}),
+        "{quebrado",
+        json.dumps({"nome": "Davi", "cpf": "390.533.447-05", "telefone": "11988887777", "cnh": "123.456.789-01"}),
+    ]) + "\n", encoding="utf-8")
+    dao = obter_dao(MotoboyDAO)
+
+    simulado = _importar(arquivo, tmp_path, colecao="motoboys", formato="ndjson", simular=True)
+    assert (simulado["importados"], simulado["duplicados"], simulado["invalidos"]) == (1, 1, 1)
+    assert dao.contar_registros() == 0 and not (tmp_path / "progresso.json").exists()
+
+    assert importar_cadastros.main(["motoboys", str(arquivo), "--checkpoint", str(tmp_path / "progresso.json")]) == 0
+    (caio,) = dao.listar_todos()
+    assert caio.zonas_atuacao == ["Centro", "Norte"] and caio.status_operacional == "Offline"
+    # Carga numa coleção vazia deixa os índices marcados como construídos
+    assert dao._indices_prontos() and dao.buscar_por_cnh("12345678901").id == caio.id
@@ -0,0 +1,46 @@
+import pytest
+
+from dao.cliente_dao import ClienteDAO
+from dao.registro import obter_dao
+from models.cliente import Cliente
+from views.utils import buscar_por_campo_unico
+
+
+def _cliente(id, nome, cpf, telefone, email):
+    return Cliente(id, nome, cpf, telefone, email, "Rua A, São Paulo")
+
+
+@pytest.fixture(params=[True, False], ids=["com_indices", "varredura"])
+def clientes(request):
+    dao = obter_dao(ClienteDAO)
+    if request.param:
+        dao.reconstruir_indices()
+    dao.criar(_cliente("c1", "Ana Souza", "529.982.247-25", "(11) 99999-0000", "ana@exemplo.com"))
+    dao.criar(_cliente("c2", "Bia Lima", "390.533.447-05", "11 98888-7777", "bia@exemplo.com"))
+    return dao
+
+
+def test_busca_exata_normaliza_os_valores(clientes):
+    assert clientes.buscar_por_cpf("52998224725").id == "c1"
+    assert clientes.buscar_por_nome("  ana   SOUZA ").id == "c1"
+    assert clientes.buscar_por_email("BIA@exemplo.com").id == "c2"
+    assert buscar_por_campo_unico(clientes, telefone="11988887777")[0].id == "c2"
+    assert buscar_por_campo_unico(clientes, cpf="111.444.777-35") == (None, "Nenhum registro encontrado com este CPF.")
+
+
+def test_indices_acompanham_atualizacao_e_exclusao(clientes):
+    ana = clientes.buscar_por_id("c1")
+    ana.telefone = "(21) 97777-6666"
+    assert clientes.atualizar(ana)
+    assert buscar_por_campo_unico(clientes, telefone="11999990000")[1] == "Nenhum registro encontrado com este telefone."
+    assert buscar_por_campo_unico(clientes, telefone="21977776666")[0].id == "c1"
+
+    assert clientes.deletar("c2")
+    assert clientes.buscar_por_cpf("390.533.447-05") is None
+    assert clientes.chaves_indice("cpf") == {"52998224725"}
+
+
+def test_duplicidade_pelo_indice(clientes):
+    assert clientes.criar(_cliente("c3", "Outra Ana", "529.982.247-25", "11900000000", "outra@exemplo.com")) is None
+    assert clientes.criar(_cliente("c4", "Ana Souza", "111.444.777-35", "11911111111", "ana2@exemplo.com")) == "c4"
+    assert buscar_por_campo_unico(clientes, nome="ana souza") == (None, "Mais de um registro encontrado com este nome.")
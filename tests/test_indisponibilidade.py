@@ -0,0 +1,99 @@
+import asyncio
+import time
+
+import pytest
+
+from dao.avaliacao_dao import AvaliacaoDAO
+from dao.campanha_dao import CampanhaDAO
+from dao.cliente_dao import ClienteDAO
+from dao.fidelidade_dao import FidelidadeDAO
+from dao.registro import obter_dao
+from dao.resiliencia import CircuitoAberto, Resiliencia, TempoEsgotado, obter_resiliencia
+from models.avaliacao import Avaliacao
+from models.cliente import Cliente
+from views.utils import MENSAGEM_INDISPONIVEL, buscar_por_campo_unico, buscar_por_id
+
+
+def _abrir_circuito():
+    disjuntor = obter_resiliencia().disjuntor
+    for _ in range(disjuntor._limite):
+        disjuntor.falha()
+
+
+@pytest.fixture
+def clientes():
+    dao = obter_dao(ClienteDAO)
+    dao.reconstruir_indices()
+    dao.criar(Cliente("c1", "Ana Souza", "529.982.247-25", "11999990000", "ana@exemplo.com", "Rua A, São Paulo"))
+    return dao
+
+
+def test_busca_unica_distingue_banco_fora_de_nao_encontrado(clientes):
+    _, erro = buscar_por_campo_unico(clientes, cpf="111.444.777-35")
+    assert erro == "Nenhum registro encontrado com este CPF."
+
+    _abrir_circuito()
+    cliente, erro = buscar_por_campo_unico(clientes, cpf="390.533.447-05")
+    assert cliente is None
+    assert erro == MENSAGEM_INDISPONIVEL
+
+
+def test_buscas_da_dao_propagam_a_indisponibilidade(clientes):
+    _abrir_circuito()
+    with pytest.raises(CircuitoAberto):
+        clientes.buscar_por_cpf("390.533.447-05")
+    with pytest.raises(CircuitoAberto):
+        clientes.buscar_por_id("inexistente")
+    # A verificação de duplicidade não conclui "não existe" com o banco fora
+    assert clientes.criar(Cliente("c2", "Bia", "390.533.447-05", "11988887777", "bia@exemplo.com", "Rua B")) is None
+
+
+def test_busca_por_id_das_telas():
+    dao = obter_dao(CampanhaDAO)
+    assert buscar_por_id(dao, "nao-existe", "Campanha não encontrada.") == (None, "Campanha não encontrada.")
+
+    _abrir_circuito()
+    assert buscar_por_id(dao, "outra", "Campanha não encontrada.") == (None, MENSAGEM_INDISPONIVEL)
+
+
+def test_leituras_servem_o_ultimo_valor_com_o_banco_fora():
+    fidelidade = obter_dao(FidelidadeDAO)
+    fidelidade.atualizar_caminhos({"fidelidade_resumo/niveis": {"bronze": 3, "prata": 1, "ouro": 0}})
+    avaliacoes = obter_dao(AvaliacaoDAO)
+    avaliacoes.criar(Avaliacao("a1", "c1", "m1", 5, "boa", "2026-10-01 20:00:00"))
+    distribuicao = fidelidade.obter_distribuicao_niveis()
+    historico = [a.id for a in avaliacoes.listar_historico("2026-10-01", "2026-10-31")]
+
+    _abrir_circuito()
+    assert fidelidade.obter_distribuicao_niveis() == distribuicao == {"bronze": 3, "prata": 1, "ouro": 0}
+    assert [a.id for a in avaliacoes.listar_historico("2026-10-01", "2026-10-31")] == historico == ["a1"]
+
+
+def test_reconstrucao_nao_apaga_indices_com_o_banco_fora(clientes, banco):
+    _abrir_circuito()
+    assert clientes.reconstruir_indices() == 0
+    assert banco.referencia("indices/clientes/_construido").get() is True
+
+
+def test_escrita_nao_idempotente_nao_e_abandonada():
+    resiliencia = Resiliencia(timeout_escrita=0.05)
+    gravadas = []
+
+    def lenta():
+        time.sleep(0.2)
+        gravadas.append(1)
+        return "ok"
+
+    # A idempotente pode ser abandonada (e repetida); a outra espera a resposta
+    with pytest.raises(TempoEsgotado):
+        resiliencia.escrever(lenta, idempotente=True)
+    assert resiliencia.escrever(lenta) == "ok"
+    assert len(gravadas) >= 2
+
+    async def lenta_async():
+        await asyncio.sleep(0.2)
+        return "ok"
+
+    assert asyncio.run(resiliencia.escrever_async(lenta_async)) == "ok"
+    with pytest.raises(TempoEsgotado):
+        asyncio.run(resiliencia.escrever_async(lenta_async, idempotente=True))
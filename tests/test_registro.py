@@ -0,0 +1,74 @@
+import threading
+import time
+
+import pytest
+
+from dao import registro
+from dao.avaliacao_dao import AvaliacaoDAO
+from dao.cliente_dao import ClienteDAO
+from dao.extrato_fidelidade_dao import ExtratoFidelidadeDAO
+from dao.fidelidade_dao import FidelidadeDAO
+from dao.firebase_dao import REVERIFICAR_MARCADOR
+from dao.registro import obter_dao
+
+
+@pytest.fixture(autouse=True)
+def ganchos(monkeypatch):
+    # Ganchos registrados aqui não passam para os outros testes
+    monkeypatch.setattr(registro, "_ao_criar", list(registro._ao_criar))
+    monkeypatch.setattr(registro, "_ao_encerrar", list(registro._ao_encerrar))
+
+
+def test_uma_instancia_por_classe_entre_threads(monkeypatch):
+    criadas = []
+    original = ClienteDAO.__init__
+
+    def construtor(self):
+        criadas.append(self)
+        time.sleep(0.01)
+        original(self)
+
+    monkeypatch.setattr(ClienteDAO, "__init__", construtor)
+    obtidas = []
+    threads = [threading.Thread(target=lambda: obtidas.append(obter_dao(ClienteDAO))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(criadas) == 1 and all(dao is criadas[0] for dao in obtidas)
+    # O extrato da fidelidade é a mesma DAO que as páginas recebem
+    assert obter_dao(FidelidadeDAO).extrato is obter_dao(ExtratoFidelidadeDAO)
+    assert set(registro.instancias()) == {"clientes", "fidelidade", "fidelidade_extrato"}
+
+
+def test_ganchos_de_criacao_e_encerramento():
+    existente = obter_dao(ClienteDAO)
+    criadas, encerradas = [], []
+
+    def com_erro(dao):
+        raise RuntimeError("falha no gancho")
+
+    registro.ao_criar(com_erro)
+    registro.ao_criar(criadas.append)
+    registro.ao_encerrar(encerradas.append)
+    assert criadas == [existente]
+
+    nova = obter_dao(AvaliacaoDAO)
+    assert criadas == [existente, nova]
+
+    registro.encerrar()
+    assert encerradas == [existente, nova] and registro.instancias() == {}
+    assert obter_dao(ClienteDAO) is not existente
+
+
+def test_marcador_ausente_e_reconsultado(banco, monkeypatch):
+    dao = obter_dao(AvaliacaoDAO)
+    assert not dao._resumos_prontos()
+
+    # Marcador gravado por outro processo: só é notado depois do intervalo
+    banco.referencia("avaliacoes_resumo/_construido").set(True)
+    assert not dao._resumos_prontos()
+    agora = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: agora + REVERIFICAR_MARCADOR + 1)
+    assert dao._resumos_prontos()
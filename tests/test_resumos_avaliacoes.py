@@ -0,0 +1,58 @@
+from dao.avaliacao_dao import AvaliacaoDAO
+from dao.registro import obter_dao
+from models.avaliacao import Avaliacao
+
+
+def _avaliar(dao, id, nota, data_hora, avaliado="m1"):
+    return dao.criar(Avaliacao(id, "c1", avaliado, nota, "", data_hora))
+
+
+def test_agregados_acompanham_criacao_alteracao_e_exclusao():
+    dao = obter_dao(AvaliacaoDAO)
+    dao.reconstruir_resumos()
+    _avaliar(dao, "a1", 5, "2026-10-01 20:15:00")
+    _avaliar(dao, "a2", 2, "2026-10-01 21:40:00")
+    _avaliar(dao, "a3", 4, "2026-10-02 12:00:00", avaliado="m2")
+
+    assert [(d["periodo"], d["contagem"], d["media"]) for d in dao.obter_resumo("2026-10-01", "2026-10-31")] == [
+        ("2026-10-01", 2, 3.5), ("2026-10-02", 1, 4.0)
+    ]
+    assert [d["periodo"] for d in dao.obter_resumo("2026-10-01", "2026-10-01", "hora")] == [
+        "2026-10-01T20", "2026-10-01T21"
+    ]
+    assert dao.calcular_media_por_avaliado("m1") == 3.5
+
+    # A alteração retira a contribuição antiga; a exclusão retira a avaliação
+    a2 = dao.buscar_por_id("a2")
+    a2.nota = 3
+    assert dao.atualizar(a2)
+    assert dao.deletar("a3")
+    total = dao.obter_resumo_total()
+    assert (total["contagem"], total["soma"], total["positivas"], total["negativas"]) == (2, 8.0, 1, 0)
+    assert total["notas"] == {"1": 0, "2": 0, "3": 1, "4": 0, "5": 1}
+    assert dao.obter_resumo("2026-10-02", "2026-10-02") == []
+    assert dao.obter_resumo_total("m2")["contagem"] == 0
+
+    estatisticas = dao.obter_estatisticas_gerais()
+    assert (estatisticas["total"], estatisticas["media_geral"], estatisticas["percentual_positivas"]) == (2, 4.0, 50.0)
+
+
+def test_reconstrucao_confere_com_os_incrementos():
+    dao = obter_dao(AvaliacaoDAO)
+    dao.reconstruir_resumos()
+    for i, nota in enumerate((1, 3, 4, 5, 5)):
+        _avaliar(dao, f"a{i}", nota, f"2026-10-0{i + 1} 19:00:00", avaliado=f"m{i % 2}")
+    dao.deletar("a0")
+
+    def resumos():
+        return (
+            dao.obter_resumo("2026-10-01", "2026-10-31"),
+            dao.obter_resumo("2026-10-01", "2026-10-31", "hora", avaliado="m1"),
+            dao.resumir_periodo("2026-10-02", "2026-10-04", "m0"),
+            [dao.obter_resumo_total(avaliado) for avaliado in (None, "m0", "m1")],
+        )
+
+    incrementais = resumos()
+    assert incrementais[3][0]["contagem"] == 4 and incrementais[2]["contagem"] == 1
+    assert dao.reconstruir_resumos() == 4
+    assert resumos() == incrementais
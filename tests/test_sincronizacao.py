@@ -0,0 +1,107 @@
+import time
+
+from dao.campanha_dao import CampanhaDAO
+from dao.espelho import SOBREPOSICAO_MS
+from dao.firebase_dao import FirebaseDAO
+from dao.registro import obter_dao
+from jobs import podar_exclusoes
+
+
+def _criar(dao, id, **campos):
+    assert FirebaseDAO.criar(dao, id, {"id": id, "nome": id, **campos})
+
+
+def _agora():
+    return int(time.time() * 1000)
+
+
+def test_escritas_carimbam_e_exclusoes_deixam_marca(banco):
+    dao = obter_dao(CampanhaDAO)
+    antes = _agora()
+    _criar(dao, "k1")
+    assert banco.referencia("campanhas/k1/atualizado_em").get() >= antes
+
+    assert dao.atualizar_caminhos({"campanhas/k1/nome": "Inverno"})
+    carimbo = banco.referencia("campanhas/k1/atualizado_em").get()
+    assert dao.deletar("k1")
+    assert banco.referencia("excluidos/campanhas/k1").get() >= carimbo
+
+    # Recriar o registro apaga a marca de exclusão
+    _criar(dao, "k1")
+    assert banco.referencia("excluidos/campanhas/k1").get() is None
+
+
+def test_delta_traz_so_o_que_mudou_desde_o_marcador():
+    dao = obter_dao(CampanhaDAO)
+    for id in ("k1", "k2", "k3"):
+        _criar(dao, id)
+    desde = dao.sincronizar_desde(0)["marcador"] + 1
+    time.sleep(0.002)
+
+    dao.atualizar_caminhos({"campanhas/k2/nome": "Verão"})
+    dao.deletar("k3")
+    # Páginas de um registro: a paginação avança pelo próprio instante
+    delta = dao.sincronizar_desde(desde, tamanho=1)
+    assert list(delta["alterados"]) == ["k2"] and delta["alterados"]["k2"]["nome"] == "Verão"
+    assert list(delta["removidos"]) == ["k3"] and not delta["recarregar"]
+    assert delta["marcador"] >= desde
+
+
+def test_espelho_junta_deltas_e_avisa_assinantes():
+    dao = obter_dao(CampanhaDAO)
+    _criar(dao, "k1")
+    _criar(dao, "k2")
+    espelho = dao.espelho()
+    recebidas = []
+    assert len(espelho.assinar(recebidas.extend)) == 2
+
+    # Escrita de outro servidor: uma DAO fora do registro, sem passar por este espelho
+    outra = CampanhaDAO()
+    FirebaseDAO.atualizar(outra, "k1", {"nome": "Inverno"})
+    outra.deletar("k2")
+    assert sorted((r["id"], r["nome"]) for r in espelho.atualizar()) == [("k1", "Inverno")]
+    assert [(id, novo and novo["nome"]) for id, _, novo in recebidas] == [("k1", "Inverno"), ("k2", None)]
+    assert espelho.estado()["cargas"] == 1 and espelho.estado()["sincronizacoes"] == 1
+
+    # Uma exclusão anterior à última escrita conhecida não remove o registro
+    k1 = espelho.registros()[0]
+    espelho.aplicar({"alterados": {}, "removidos": {"k1": k1["atualizado_em"] - 1}, "marcador": espelho.marcador})
+    assert [r["id"] for r in espelho.registros()] == ["k1"]
+
+
+def test_falha_na_sincronizacao_mantem_o_espelho(monkeypatch):
+    dao = obter_dao(CampanhaDAO)
+    _criar(dao, "k1")
+    espelho = dao.espelho()
+    espelho.atualizar()
+    monkeypatch.setattr(CampanhaDAO, "sincronizar_desde", lambda self, desde, tamanho=1000: None)
+    assert [r["id"] for r in FirebaseDAO.listar_todos(dao)] == ["k1"]
+    assert espelho.estado()["falhas"] == 1
+
+
+def test_poda_apos_o_marcador_recarrega_uma_vez(banco):
+    dao = obter_dao(CampanhaDAO)
+    _criar(dao, "k1")
+    _criar(dao, "k2")
+    espelho = dao.espelho()
+    espelho.atualizar()
+
+    CampanhaDAO().deletar("k2")
+    limite = espelho.marcador + SOBREPOSICAO_MS + 1
+    assert dao.podar_exclusoes(max(limite, _agora() + 1)) == 1
+    assert banco.referencia("excluidos/campanhas").get() is None
+
+    # Sem a marca, só a carga completa sabe que k2 saiu
+    assert [r["id"] for r in espelho.atualizar()] == ["k1"]
+    assert espelho.estado()["cargas"] == 2
+    espelho.atualizar()
+    assert espelho.estado()["cargas"] == 2
+
+
+def test_job_de_poda():
+    dao = obter_dao(CampanhaDAO)
+    _criar(dao, "k1")
+    dao.deletar("k1")
+    # Marca recente: mais nova que o prazo, fica
+    assert podar_exclusoes.main(["--dias", "1", "--colecao", "campanhas"]) == 0
+    assert dao.sincronizar_desde(0)["removidos"].keys() == {"k1"}
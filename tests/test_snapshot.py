@@ -0,0 +1,40 @@
+from dao.campanha_dao import CampanhaDAO
+from dao.registro import obter_dao
+from jobs import snapshot
+from models.campanha import Campanha
+
+
+def _campanha(id: str, nome: str) -> Campanha:
+    return Campanha(id, nome, "Desconto", "2026-10-01", "2026-10-31", ["email"], ["todos"])
+
+
+def test_restauracao_recarrega_os_espelhos(tmp_path, banco):
+    dao = obter_dao(CampanhaDAO)
+    dao.criar(_campanha("c1", "Pizza em dobro"))
+    snapshot.criar(str(tmp_path / "backup"))
+
+    # Depois do snapshot: um registro novo e uma alteração, vistos pelo espelho
+    dao.criar(_campanha("c2", "Frete grátis"))
+    dao.atualizar(_campanha("c1", "Pizza em dobro (estendida)"))
+    espelho = dao.espelho()
+    assert {r["id"]: r["nome"] for r in espelho.atualizar()} == {
+        "c1": "Pizza em dobro (estendida)", "c2": "Frete grátis"
+    }
+
+    relatorio = snapshot.restaurar(str(tmp_path / "backup"), limpar=True)
+    assert "campanhas" in relatorio["recarregadas"]
+    # A restauração não deixa marcas de exclusão nem carimbos novos
+    assert banco.referencia("excluidos/campanhas/c2").get() is None
+
+    cargas = espelho.estado()["cargas"]
+    assert {r["id"]: r["nome"] for r in espelho.atualizar()} == {"c1": "Pizza em dobro"}
+    assert espelho.estado()["cargas"] == cargas + 1
+
+    # O mesmo limite de poda não recarrega de novo
+    espelho.atualizar()
+    assert espelho.estado()["cargas"] == cargas + 1
+
+
+def test_colecoes_restauradas():
+    nos = ["campanhas", "clientes", "excluidos/motoboys", "indices/clientes/cpf", "sincronizacao", "fila_lotes"]
+    assert snapshot.colecoes_restauradas(nos) == ["campanhas", "clientes", "motoboys"]
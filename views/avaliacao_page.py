@@ -1,10 +1,13 @@
 import streamlit as st
 from models.avaliacao import Avaliacao
 from dao.avaliacao_dao import AvaliacaoDAO
-from datetime import datetime
-from views.utils import buscar_por_campo_unico
+from datetime import datetime, timedelta
+from services.busca_texto import obter_indice_comentarios
+from services.anomalias import alertas_recentes
+from views.utils import MENSAGEM_INDISPONIVEL, buscar_por_campo_unico, buscar_por_id
 from dao.cliente_dao import ClienteDAO
 from dao.motoboy_dao import MotoboyDAO
+from dao.registro import obter_dao
 
 def avaliacao_page(perfil: str, usuario: str, modo: str = None):
     """
@@ -15,15 +18,15 @@ def avaliacao_page(perfil: str, usuario: str, modo: str = None):
       - perfil == "Cliente" e modo == "avaliar_motoboy": formulário de avaliação de motoboy
     """
     st.markdown("### ⭐ Avaliações")
-    avaliacao_dao = AvaliacaoDAO()
-    cliente_dao = ClienteDAO()
-    motoboy_dao = MotoboyDAO()
+    avaliacao_dao = obter_dao(AvaliacaoDAO)
+    cliente_dao = obter_dao(ClienteDAO)
+    motoboy_dao = obter_dao(MotoboyDAO)
 
     # ----------------------------
     # 1. PERFIL: Funcionário/Admin
     # ----------------------------
     if perfil == "Funcionário":
-        menu = ["Cadastrar", "Listar", "Dashboard", "Atualizar", "Deletar"]
+        menu = ["Cadastrar", "Listar", "Buscar Comentários", "Dashboard", "Atualizar", "Deletar"]
         escolha = st.sidebar.selectbox("Ações (Funcionário)", menu)
 
         # ===== 1.1 Cadastrar =====
@@ -56,43 +59,105 @@ def avaliacao_page(perfil: str, usuario: str, modo: str = None):
                         comentario=comentario.strip(),
                         data_hora=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                     )
-                    ok, msg = avaliacao_dao.criar(nova)
-                    if ok:
+                    id_avaliacao = avaliacao_dao.enfileirar(nova)
+                    if id_avaliacao:
                         st.success("Avaliação cadastrada com sucesso!")
                     else:
-                        st.error(f"Erro ao salvar: {msg}")
+                        st.error("Erro ao salvar a avaliação. Tente novamente.")
 
         # ===== 1.2 Listar =====
         elif escolha == "Listar":
             st.subheader("📋 Todas as Avaliações")
-            avaliacoes = avaliacao_dao.listar_todos()
-            if not avaliacoes:
+            df = avaliacao_dao.listar_dataframe()
+            if df.empty:
                 st.info("Nenhuma avaliação cadastrada.")
             else:
-                # Montar lista de dicionários para DataFrame ou st.table
-                dados = []
-                for a in avaliacoes:
-                    dados.append({
-                        "ID": a.id,
-                        "Avaliador": a.avaliador,
-                        "Avaliado": a.avaliado,
-                        "Nota": a.nota,
-                        "Comentário": a.comentario or "",
-                        "Data/Hora": a.data_hora
-                    })
-                st.table(dados)
+                st.dataframe(
+                    df.rename(columns={
+                        "id": "ID",
+                        "avaliador": "Avaliador",
+                        "avaliado": "Avaliado",
+                        "nota": "Nota",
+                        "categoria": "Categoria",
+                        "comentario": "Comentário",
+                        "data_hora": "Data/Hora"
+                    }),
+                    hide_index=True,
+                    use_container_width=True
+                )
+
+        # ===== Buscar Comentários =====
+        elif escolha == "Buscar Comentários":
+            st.subheader("🔎 Buscar nos Comentários")
+            indice = obter_indice_comentarios()
+            hoje = datetime.now().date()
+            col1, col2 = st.columns(2)
+            inicio = col1.date_input("De", value=hoje - timedelta(days=30))
+            fim = col2.date_input("Até", value=hoje)
+            janela = (inicio.strftime("%Y-%m-%d"), fim.strftime("%Y-%m-%d"))
+
+            consulta = st.text_input("Termos (ex.: fria atraso educado)", max_chars=200)
+            if consulta.strip():
+                resultados = indice.buscar(consulta, limite=20, inicio=janela[0], fim=janela[1])
+                if not resultados:
+                    st.info("Nenhum comentário encontrado.")
+                else:
+                    dados = []
+                    try:
+                        for id, pontuacao in resultados:
+                            a = avaliacao_dao.buscar_por_id(id)
+                            if a:
+                                dados.append({
+                                    "Relevância": pontuacao,
+                                    "Avaliado": a.avaliado,
+                                    "Nota": a.nota,
+                                    "Comentário": a.comentario,
+                                    "Data/Hora": a.data_hora
+                                })
+                        st.table(dados)
+                    except Exception:
+                        st.error(MENSAGEM_INDISPONIVEL)
+
+            st.markdown("**Termos mais frequentes no período**")
+            frequentes = indice.frequencia_termos(janela[0], janela[1], limite=15)
+            if frequentes:
+                st.bar_chart({"Ocorrências": dict(frequentes)})
+            else:
+                st.info("Sem comentários no período.")
 
         # ===== 1.3 Dashboard =====
         elif escolha == "Dashboard":
             st.subheader("📊 Dashboard de Avaliações")
-            avaliacoes = avaliacao_dao.listar_todos()
-            if not avaliacoes:
+            estatisticas = avaliacao_dao.obter_estatisticas_gerais()
+            if not estatisticas:
                 st.info("Nenhuma avaliação cadastrada.")
             else:
-                notas = [a.nota for a in avaliacoes]
-                media = sum(notas) / len(notas)
-                st.metric("Média das notas", f"{media:.2f}")
-                st.bar_chart(notas)
+                st.metric("Média das notas", f"{estatisticas['media_geral']:.2f}")
+                st.bar_chart({"Quantidade": estatisticas["distribuicao_notas"]})
+
+                hoje = datetime.now().date()
+                dias = st.slider("Período (dias)", min_value=7, max_value=90, value=30)
+                serie = avaliacao_dao.obter_resumo(
+                    (hoje - timedelta(days=dias - 1)).strftime("%Y-%m-%d"),
+                    hoje.strftime("%Y-%m-%d")
+                )
+                if serie:
+                    st.markdown("**Avaliações por dia**")
+                    st.bar_chart({"Avaliações": {d["periodo"]: d["contagem"] for d in serie}})
+                    st.markdown("**Média diária**")
+                    st.line_chart({"Média": {d["periodo"]: d["media"] for d in serie}})
+
+            st.markdown("**🚨 Alertas recentes**")
+            alertas = alertas_recentes()
+            if alertas:
+                st.table([{
+                    "Data/Hora": a["data_hora"],
+                    "Tipo": "Queda de nota" if a["tipo"] == "media" else "Volume anormal",
+                    "Avaliado": "Todos" if a["chave"] == "*" else a["chave"],
+                    "Detalhe": a["mensagem"]
+                } for a in alertas])
+            else:
+                st.info("Nenhuma anomalia detectada desde o início do servidor.")
 
         # ===== 1.4 Atualizar =====
         elif escolha == "Atualizar":
@@ -105,9 +170,9 @@ def avaliacao_page(perfil: str, usuario: str, modo: str = None):
                 if not id_busca.strip():
                     st.error("Informe o ID da avaliação.")
                 else:
-                    avaliacao = avaliacao_dao.buscar_por_id(id_busca.strip())
+                    avaliacao, erro = buscar_por_id(avaliacao_dao, id_busca.strip(), "Avaliação não encontrada.")
                     if not avaliacao:
-                        st.warning("Avaliação não encontrada.")
+                        st.warning(erro)
                     else:
                         # Exibe formulário de atualização já preenchido
                         with st.form(key="form_atualizar_avaliacao", clear_on_submit=False):
@@ -192,11 +257,11 @@ def avaliacao_page(perfil: str, usuario: str, modo: str = None):
                             comentario=comentario.strip(),
                             data_hora=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                         )
-                        ok, msg = avaliacao_dao.criar(avaliacao)
-                        if ok:
+                        id_avaliacao = avaliacao_dao.enfileirar(avaliacao)
+                        if id_avaliacao:
                             st.success("Avaliação do cliente cadastrada com sucesso!")
                         else:
-                            st.error(f"Erro ao salvar: {msg}")
+                            st.error("Erro ao salvar a avaliação. Tente novamente.")
 
             return  # encerra modo avaliar_cliente
 
@@ -253,11 +318,11 @@ def avaliacao_page(perfil: str, usuario: str, modo: str = None):
                         comentario=comentario.strip(),
                         data_hora=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                     )
-                    ok, msg = avaliacao_dao.criar(avaliacao)
-                    if ok:
+                    id_avaliacao = avaliacao_dao.enfileirar(avaliacao)
+                    if id_avaliacao:
                         st.success("Avaliação do motoboy cadastrada com sucesso!")
                     else:
-                        st.error(f"Erro ao salvar: {msg}")
+                        st.error("Erro ao salvar a avaliação. Tente novamente.")
         return
 
     # ----------------------------
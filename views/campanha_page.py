@@ -1,11 +1,13 @@
 import streamlit as st
 from models.campanha import Campanha
 from dao.campanha_dao import CampanhaDAO
+from dao.registro import obter_dao
+from views.utils import buscar_por_id
 from datetime import datetime, date
 
 def campanha_page():
     st.markdown("### 🎯 Gestão de Campanhas de Marketing")
-    campanha_dao = CampanhaDAO()
+    campanha_dao = obter_dao(CampanhaDAO)
 
     menu = ["Cadastrar", "Listar", "Atualizar", "Deletar"]
     escolha = st.sidebar.selectbox("Ações", menu)
@@ -71,26 +73,34 @@ def campanha_page():
     # ======================
     if escolha == "Listar":
         st.subheader("📋 Lista de Campanhas")
-        campanhas = campanha_dao.listar_todos()
-        if not campanhas:
+        df = campanha_dao.listar_dataframe()
+        if df.empty:
             st.info("Nenhuma campanha cadastrada.")
         else:
-            dados = []
-            for c in campanhas:
-                dados.append({
-                    "ID": c.id,
-                    "Nome": c.nome,
-                    "Objetivo": c.objetivo,
-                    "Período": f"{c.data_inicio} até {c.data_fim}",
-                    "Canais": ", ".join(c.canais),
-                    "Público Segmentado": ", ".join(c.publicos_segmentados),
-                    "Clientes Atingidos": c.clientes_atingidos,
-                    "Taxa de Resposta (%)": c.taxa_resposta,
-                    "Conversão (%)": c.conversao,
-                    "ROI": c.roi,
-                    "Data de Criação": c.data_criacao
-                })
-            st.table(dados)
+            df["periodo"] = df["data_inicio"] + " até " + df["data_fim"]
+            st.dataframe(
+                df.rename(columns={
+                    "id": "ID",
+                    "nome": "Nome",
+                    "objetivo": "Objetivo",
+                    "periodo": "Período",
+                    "canais": "Canais",
+                    "publicos_segmentados": "Público Segmentado",
+                    "clientes_atingidos": "Clientes Atingidos",
+                    "taxa_resposta": "Taxa de Resposta (%)",
+                    "conversao": "Conversão (%)",
+                    "roi": "ROI",
+                    "data_criacao": "Data de Criação"
+                })[["ID", "Nome", "Objetivo", "Período", "Canais", "Público Segmentado", "Clientes Atingidos",
+                    "Taxa de Resposta (%)", "Conversão (%)", "ROI", "Data de Criação"]],
+                hide_index=True,
+                use_container_width=True
+            )
+
+            canais = campanha_dao.listar_canais_dataframe()
+            if not canais.empty:
+                st.markdown("**Clientes atingidos por canal**")
+                st.bar_chart(canais.groupby("canal", observed=False)["clientes_atingidos"].sum())
 
         return
 
@@ -107,9 +117,9 @@ def campanha_page():
             if not id_busca.strip():
                 st.error("Informe o ID da campanha.")
             else:
-                campanha = campanha_dao.buscar_por_id(id_busca.strip())
+                campanha, erro = buscar_por_id(campanha_dao, id_busca.strip(), "Campanha não encontrada.")
                 if not campanha:
-                    st.warning("Campanha não encontrada.")
+                    st.warning(erro)
                 else:
                     # Exibe formulário de atualização
                     with st.form(key="form_atualizar_campanha", clear_on_submit=False):
@@ -158,9 +168,9 @@ def campanha_page():
             if not id_del.strip():
                 st.error("Informe o ID da campanha.")
             else:
-                campanha = campanha_dao.buscar_por_id(id_del.strip())
+                campanha, erro = buscar_por_id(campanha_dao, id_del.strip(), "Campanha não encontrada.")
                 if not campanha:
-                    st.warning("Campanha não encontrada.")
+                    st.warning(erro)
                 else:
                     ok, msg = campanha_dao.deletar(id_del.strip())
                     if ok:
@@ -2,15 +2,17 @@
 
 import streamlit as st
 from dao.cliente_dao import ClienteDAO
+from dao.registro import obter_dao
 from models.cliente import Cliente
 from views.utils import buscar_por_campo_unico
+from services.busca_prefixo import buscar_prefixo
 from datetime import datetime
 
 def cliente_page():
     st.markdown("### 🧑 Gestão de Clientes")
-    cliente_dao = ClienteDAO()
+    cliente_dao = obter_dao(ClienteDAO)
 
-    menu = ["Cadastrar", "Listar", "Atualizar", "Deletar"]
+    menu = ["Cadastrar", "Listar", "Buscar", "Atualizar", "Deletar"]
     escolha = st.sidebar.selectbox("Ações (Cliente)", menu)
 
     # ======================
@@ -64,26 +66,48 @@ def cliente_page():
     # ======================
     if escolha == "Listar":
         st.subheader("📋 Lista de Clientes")
-        clientes = cliente_dao.listar_todos()
-        if not clientes:
+        df = cliente_dao.listar_dataframe()
+        if df.empty:
             st.info("Nenhum cliente cadastrado.")
         else:
-            dados = []
-            for c in clientes:
-                dados.append({
-                    "ID": c.id,
-                    "Nome": c.nome,
-                    "CPF/CNPJ": c.cpf,
-                    "E-mail": c.email or "",
-                    "Telefone": c.telefone or "",
-                    "Endereço": c.endereco or "",
-                    "Opt-in SMS": "Sim" if c.opt_in.get("sms") else "Não",
-                    "Opt-in E-mail": "Sim" if c.opt_in.get("email") else "Não",
-                    "Opt-in WhatsApp": "Sim" if c.opt_in.get("whatsapp") else "Não",
-                    "Preferências": ", ".join(c.preferencias) if c.preferencias else "",
-                    "Data de Criação": c.data_criacao
-                })
-            st.table(dados)
+            st.dataframe(
+                df.rename(columns={
+                    "id": "ID",
+                    "nome": "Nome",
+                    "cpf": "CPF/CNPJ",
+                    "email": "E-mail",
+                    "telefone": "Telefone",
+                    "endereco": "Endereço",
+                    "opt_in_sms": "Opt-in SMS",
+                    "opt_in_email": "Opt-in E-mail",
+                    "opt_in_whatsapp": "Opt-in WhatsApp",
+                    "preferencias": "Preferências",
+                    "data_criacao": "Data de Criação"
+                })[["ID", "Nome", "CPF/CNPJ", "E-mail", "Telefone", "Endereço", "Opt-in SMS",
+                    "Opt-in E-mail", "Opt-in WhatsApp", "Preferências", "Data de Criação"]],
+                hide_index=True,
+                use_container_width=True
+            )
+
+        return
+
+    # ======================
+    # Buscar (por prefixo)
+    # ======================
+    if escolha == "Buscar":
+        st.subheader("🔎 Buscar Cliente")
+        termo = st.text_input("Nome, telefone ou e-mail (início)", max_chars=100)
+        if termo.strip():
+            resultados = buscar_prefixo(termo, colecao="clientes", limite=10)
+            if not resultados:
+                st.info("Nenhum cliente encontrado.")
+            else:
+                st.table([{
+                    "ID": r["id"],
+                    "Nome": r.get("nome") or "",
+                    "Telefone": r.get("telefone") or "",
+                    "E-mail": r.get("email") or ""
+                } for r in resultados])
 
         return
 
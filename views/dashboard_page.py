@@ -4,130 +4,172 @@ from dao.motoboy_dao import MotoboyDAO
 from dao.avaliacao_dao import AvaliacaoDAO
 from dao.fidelidade_dao import FidelidadeDAO
 from dao.campanha_dao import CampanhaDAO
-from datetime import datetime
-from functools import lru_cache
-import matplotlib.pyplot as plt
-
-@lru_cache(maxsize=1)
-def carregar_dados_dashboard():
-    cliente_dao = ClienteDAO()
-    motoboy_dao = MotoboyDAO()
-    avaliacao_dao = AvaliacaoDAO()
-    fidelidade_dao = FidelidadeDAO()
-    campanha_dao = CampanhaDAO()
-
-    clientes = cliente_dao.listar_todos()
-    motoboys = motoboy_dao.listar_todos()
-    avaliacoes = avaliacao_dao.listar_todos()
-    fidelidades = fidelidade_dao.listar_todos()
-    campanhas = campanha_dao.listar_todos()
-
-    return clientes, motoboys, avaliacoes, fidelidades, campanhas
+from dao.registro import obter_dao
+from services.graficos import grafico_barras
+
+# Cada seção do painel é um fragmento: tem sua própria fonte de dados em cache
+# e seu próprio intervalo de atualização (segundos), e interagir com uma seção
+# reexecuta só ela. O cache usa o mesmo intervalo da seção, então todas as
+# telas abertas compartilham uma única consulta por ciclo.
+INTERVALO_VISAO_GERAL = 60
+INTERVALO_AVALIACOES = 30
+INTERVALO_FIDELIDADE = 60
+INTERVALO_CAMPANHAS = 300
+INTERVALO_MOTOBOYS = 30
+
+
+@st.cache_data(ttl=INTERVALO_VISAO_GERAL, show_spinner=False)
+def carregar_visao_geral():
+    # Contagens por leitura rasa (só as chaves) e pelos agregados mantidos a cada escrita
+    return {
+        "clientes": obter_dao(ClienteDAO).contar_registros(),
+        "campanhas": obter_dao(CampanhaDAO).contar_registros(),
+        "avaliacoes": obter_dao(AvaliacaoDAO).obter_estatisticas_gerais().get("total", 0),
+        "fidelidade": sum(obter_dao(FidelidadeDAO).obter_distribuicao_niveis().values())
+    }
+
+
+@st.cache_data(ttl=INTERVALO_AVALIACOES, show_spinner=False)
+def carregar_avaliacoes():
+    # Agregados mantidos a cada avaliação, sem percorrer a coleção
+    return obter_dao(AvaliacaoDAO).obter_estatisticas_gerais()
+
+
+@st.cache_data(ttl=INTERVALO_FIDELIDADE, show_spinner=False)
+def carregar_fidelidade():
+    # Histograma mantido a cada mudança de pontos, sem percorrer os programas
+    return obter_dao(FidelidadeDAO).obter_distribuicao_niveis()
 
-def dashboard_page():
-    st.markdown("### 📊 Dashboard Geral da Operação")
 
-    clientes, motoboys, avaliacoes, fidelidades, campanhas = carregar_dados_dashboard()
+@st.cache_data(ttl=INTERVALO_CAMPANHAS, show_spinner=False)
+def carregar_campanhas():
+    return obter_dao(CampanhaDAO).listar_dataframe()
 
+
+@st.cache_data(ttl=INTERVALO_MOTOBOYS, show_spinner=False)
+def carregar_status_motoboys():
+    motoboys = obter_dao(MotoboyDAO).listar_dataframe()
+    online = 0 if motoboys.empty else int((motoboys["status_operacional"] == "Online").sum())
+    return {"Online": online, "Offline": len(motoboys) - online}
+
+
+def _botao_atualizar(carregar, chave: str):
+    # Descarta só o cache desta seção; o clique reexecuta apenas o fragmento
+    if st.button("🔄 Atualizar", key=f"dashboard_atualizar_{chave}"):
+        carregar.clear()
+
+
+@st.experimental_fragment(run_every=INTERVALO_VISAO_GERAL)
+def _secao_visao_geral():
     st.subheader("📌 Visão Geral")
+    _botao_atualizar(carregar_visao_geral, "visao_geral")
+    totais = carregar_visao_geral()
+    status = carregar_status_motoboys()
+
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Clientes Cadastrados", len(clientes))
+        st.metric("Clientes Cadastrados", totais["clientes"])
     with col2:
-        online = len([m for m in motoboys if getattr(m, "status_operacional", "").lower() == "online"])
-        st.metric("Motoboys Online", online)
+        st.metric("Motoboys Online", status["Online"])
     with col3:
-        st.metric("Total de Campanhas", len(campanhas))
+        st.metric("Total de Campanhas", totais["campanhas"])
 
     col4, col5 = st.columns(2)
     with col4:
-        st.metric("Total de Avaliações", len(avaliacoes))
+        st.metric("Total de Avaliações", totais["avaliacoes"])
     with col5:
-        st.metric("Clientes com Fidelidade", len(fidelidades))
+        st.metric("Clientes com Fidelidade", totais["fidelidade"])
 
-    st.markdown("---")
+
+@st.experimental_fragment(run_every=INTERVALO_AVALIACOES)
+def _secao_avaliacoes():
     st.subheader("⭐ Avaliações — Estatísticas")
-    if avaliacoes:
-        notas = [a.nota for a in avaliacoes if a.nota is not None]
-        media = sum(notas) / len(notas)
-        st.metric("Média das Notas", f"{media:.2f}")
+    _botao_atualizar(carregar_avaliacoes, "avaliacoes")
+    estatisticas_avaliacoes = carregar_avaliacoes()
+    if estatisticas_avaliacoes:
+        st.metric("Média das Notas", f"{estatisticas_avaliacoes['media_geral']:.2f}")
         # Distribuição de notas
-        freq = {str(i): notas.count(i) for i in range(1, 6)}
-        fig, ax = plt.subplots()
-        ax.bar(freq.keys(), freq.values())
-        ax.set_xlabel("Nota")
-        ax.set_ylabel("Quantidade")
-        ax.set_title("Distribuição de Notas")
-        st.pyplot(fig)
+        freq = estatisticas_avaliacoes["distribuicao_notas"]
+        st.image(grafico_barras(
+            list(freq.keys()), list(freq.values()),
+            titulo="Distribuição de Notas", eixo_x="Nota", eixo_y="Quantidade"
+        ))
     else:
         st.info("Nenhuma avaliação registrada.")
 
-    st.markdown("---")
+
+@st.experimental_fragment(run_every=INTERVALO_FIDELIDADE)
+def _secao_fidelidade():
     st.subheader("🏆 Fidelidade — Distribuição por Nível")
-    niveis = {"bronze": 0, "prata": 0, "ouro": 0}
-    for f in fidelidades:
-        nivel = getattr(f, "nivel", "").lower()
-        if nivel in niveis:
-            niveis[nivel] += 1
+    _botao_atualizar(carregar_fidelidade, "fidelidade")
+    niveis = carregar_fidelidade()
     if any(niveis.values()):
-        fig2, ax2 = plt.subplots()
-        ax2.bar(niveis.keys(), niveis.values(), color=["#cd7f32", "#c0c0c0", "#ffd700"])
-        ax2.set_title("Clientes por Nível de Fidelidade")
-        st.pyplot(fig2)
+        st.image(grafico_barras(
+            list(niveis.keys()), list(niveis.values()),
+            titulo="Clientes por Nível de Fidelidade", cores=["#cd7f32", "#c0c0c0", "#ffd700"]
+        ))
     else:
         st.info("Nenhum programa de fidelidade registrado.")
 
-    st.markdown("---")
+
+@st.experimental_fragment(run_every=INTERVALO_CAMPANHAS)
+def _secao_campanhas():
     st.subheader("📣 Desempenho das Campanhas")
-    if campanhas:
-        # Clientes atingidos por campanha
-        dados = {c.nome: c.clientes_atingidos for c in campanhas}
-        fig3, ax3 = plt.subplots()
-        ax3.bar(dados.keys(), dados.values())
-        ax3.set_xlabel("Campanha")
-        ax3.set_ylabel("Clientes Atingidos")
-        ax3.set_title("Clientes Atingidos por Campanha")
-        plt.xticks(rotation=45, ha="right")
-        st.pyplot(fig3)
-
-        col6, col7 = st.columns(2)
-        with col6:
-            medias_resposta = sum(c.taxa_resposta for c in campanhas) / len(campanhas)
-            st.metric("Média de Taxa de Resposta", f"{medias_resposta:.2f}%")
-        with col7:
-            medias_conversao = sum(c.conversao for c in campanhas) / len(campanhas)
-            st.metric("Média de Conversão", f"{medias_conversao:.2f}%")
-    else:
+    _botao_atualizar(carregar_campanhas, "campanhas")
+    campanhas = carregar_campanhas()
+    if campanhas.empty:
         st.info("Nenhuma campanha cadastrada.")
+        return
 
-    st.markdown("---")
+    # Clientes atingidos por campanha
+    st.image(grafico_barras(
+        campanhas["nome"].tolist(), campanhas["clientes_atingidos"].tolist(),
+        titulo="Clientes Atingidos por Campanha", eixo_x="Campanha", eixo_y="Clientes Atingidos",
+        rotacionar_rotulos=True
+    ))
+
+    col6, col7 = st.columns(2)
+    with col6:
+        st.metric("Média de Taxa de Resposta", f"{campanhas['taxa_resposta'].mean():.2f}%")
+    with col7:
+        st.metric("Média de Conversão", f"{campanhas['conversao'].mean():.2f}%")
+
+    with st.expander("📄 Detalhes de Campanhas"):
+        for c in campanhas.itertuples(index=False):
+            st.markdown(f"**Nome:** {c.nome}")
+            st.markdown(f"**Período:** {c.data_inicio} até {c.data_fim}")
+            st.markdown(f"**Canais:** {c.canais}")
+            st.markdown(f"**Público:** {c.publicos_segmentados}")
+            st.markdown(f"**Clientes Atingidos:** {c.clientes_atingidos}")
+            st.markdown(f"**Taxa de Resposta:** {c.taxa_resposta}%")
+            st.markdown(f"**Conversão:** {c.conversao}%")
+            st.markdown(f"**ROI:** {c.roi}")
+            st.markdown("---")
+
+
+@st.experimental_fragment(run_every=INTERVALO_MOTOBOYS)
+def _secao_motoboys():
     st.subheader("🏍️ Status dos Motoboys")
-    status = {"Online": 0, "Offline": 0}
-    for m in motoboys:
-        if getattr(m, "status_operacional", "").lower() == "online":
-            status["Online"] += 1
-        else:
-            status["Offline"] += 1
+    _botao_atualizar(carregar_status_motoboys, "motoboys")
+    status = carregar_status_motoboys()
     if any(status.values()):
-        fig4, ax4 = plt.subplots()
-        ax4.bar(status.keys(), status.values(), color=["green", "red"])
-        ax4.set_title("Status Operacional dos Motoboys")
-        st.pyplot(fig4)
+        st.image(grafico_barras(
+            list(status.keys()), list(status.values()),
+            titulo="Status Operacional dos Motoboys", cores=["green", "red"]
+        ))
     else:
         st.info("Nenhum motoboy registrado.")
 
+
+def dashboard_page():
+    st.markdown("### 📊 Dashboard Geral da Operação")
+
+    _secao_visao_geral()
     st.markdown("---")
-    with st.expander("📄 Detalhes de Campanhas"):
-        if campanhas:
-            for c in campanhas:
-                st.markdown(f"**Nome:** {c.nome}")
-                st.markdown(f"**Período:** {c.data_inicio} até {c.data_fim}")
-                st.markdown(f"**Canais:** {', '.join(c.canais)}")
-                st.markdown(f"**Público:** {', '.join(c.publicos_segmentados)}")
-                st.markdown(f"**Clientes Atingidos:** {c.clientes_atingidos}")
-                st.markdown(f"**Taxa de Resposta:** {c.taxa_resposta}%")
-                st.markdown(f"**Conversão:** {c.conversao}%")
-                st.markdown(f"**ROI:** {c.roi}")
-                st.markdown("---")
-        else:
-            st.info("Não há campanhas para detalhar.")
+    _secao_avaliacoes()
+    st.markdown("---")
+    _secao_fidelidade()
+    st.markdown("---")
+    _secao_campanhas()
+    st.markdown("---")
+    _secao_motoboys()
@@ -2,14 +2,16 @@ import streamlit as st
 from models.fidelidade import Fidelidade
 from dao.fidelidade_dao import FidelidadeDAO
 from dao.cliente_dao import ClienteDAO
+from dao.registro import obter_dao
+from views.utils import MENSAGEM_INDISPONIVEL, buscar_por_id
 from datetime import datetime, date
 
 def fidelidade_page():
     st.markdown("### 🎁 Gestão do Programa de Fidelidade")
-    fidelidade_dao = FidelidadeDAO()
-    cliente_dao = ClienteDAO()
+    fidelidade_dao = obter_dao(FidelidadeDAO)
+    cliente_dao = obter_dao(ClienteDAO)
 
-    menu = ["Cadastrar", "Listar", "Atualizar", "Deletar"]
+    menu = ["Cadastrar", "Listar", "Extrato", "Atualizar", "Deletar"]
     escolha = st.sidebar.selectbox("Ações (Fidelidade)", menu)
 
     # ======================
@@ -20,7 +22,6 @@ def fidelidade_page():
         with st.form(key="form_cadastrar_fidelidade", clear_on_submit=True):
             nome_cliente = st.text_input("Nome do Cliente*", max_chars=100)
             pontos = st.number_input("Pontos*", min_value=0, step=1)
-            nivel = st.selectbox("Nível*", ["bronze", "prata", "ouro"])
             validade = st.date_input("Data de Validade*", min_value=date.today())
             btn_salvar = st.form_submit_button("Salvar")
 
@@ -28,25 +29,26 @@ def fidelidade_page():
             if not nome_cliente.strip():
                 st.error("Informe o nome do cliente.")
             else:
-                cliente = cliente_dao.buscar_por_nome(nome_cliente.strip())
+                try:
+                    cliente = cliente_dao.buscar_por_nome(nome_cliente.strip())
+                    erro = "Cliente não encontrado."
+                except Exception:
+                    cliente, erro = None, MENSAGEM_INDISPONIVEL
                 if not cliente:
-                    st.error("Cliente não encontrado.")
+                    st.error(erro)
                 else:
                     fidelidade = Fidelidade(
                         id=None,
-                        cliente_id=cliente["id"],
-                        cliente_nome=cliente["nome"],
+                        cliente_id=cliente.id,
+                        cliente_nome=cliente.nome,
                         pontos=int(pontos),
-                        nivel=nivel,
-                        validade=validade.strftime("%Y-%m-%d"),
-                        historico=[],
-                        data_criacao=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                        nivel=Fidelidade.nivel_por_pontos(int(pontos)),
+                        validade=validade.strftime("%Y-%m-%d")
                     )
-                    ok, msg = fidelidade_dao.criar(fidelidade)
-                    if ok:
+                    if fidelidade_dao.criar(fidelidade):
                         st.success("Programa de fidelidade cadastrado com sucesso!")
                     else:
-                        st.error(f"Erro ao cadastrar fidelidade: {msg}")
+                        st.error("Erro ao cadastrar fidelidade. Tente novamente.")
 
         return
 
@@ -55,28 +57,69 @@ def fidelidade_page():
     # ======================
     if escolha == "Listar":
         st.subheader("📋 Lista de Programas de Fidelidade")
-        registros = fidelidade_dao.listar_todos()
-        if not registros:
+        df = fidelidade_dao.listar_dataframe()
+        if df.empty:
             st.info("Nenhum programa cadastrado.")
         else:
-            dados = []
-            for f in registros:
-                status = "Ativo" if datetime.strptime(f.validade, "%Y-%m-%d").date() >= date.today() else "Expirado"
-                dados.append({
-                    "ID": f.id,
-                    "Cliente": f"{f.cliente_nome} (ID: {f.cliente_id})",
-                    "Pontos": f.pontos,
-                    "Nível": f.nivel.title(),
-                    "Validade": f.validade,
-                    "Status": status,
-                    "Histórico": ", ".join(f.historico) if f.historico else ""
-                })
-            st.table(dados)
+            df["cliente"] = df["cliente_nome"] + " (ID: " + df["cliente_id"] + ")"
+            df["nivel"] = df["nivel"].cat.rename_categories(str.title)
+            st.dataframe(
+                df.rename(columns={
+                    "id": "ID",
+                    "cliente": "Cliente",
+                    "pontos": "Pontos",
+                    "nivel": "Nível",
+                    "validade": "Validade",
+                    "status": "Status"
+                })[["ID", "Cliente", "Pontos", "Nível", "Validade", "Status"]],
+                hide_index=True,
+                use_container_width=True
+            )
 
         return
 
     # ======================
-    # 3. Atualizar
+    # 3. Extrato
+    # ======================
+    if escolha == "Extrato":
+        st.subheader("🧾 Extrato de Pontos")
+        with st.form(key="form_buscar_extrato"):
+            id_busca = st.text_input("ID do Programa*", max_chars=50)
+            btn_buscar = st.form_submit_button("Buscar")
+
+        if btn_buscar:
+            # Nova busca recomeça da página mais recente
+            st.session_state["extrato_fidelidade_id"] = id_busca.strip()
+            st.session_state["extrato_cursores"] = [None]
+
+        fidelidade_id = st.session_state.get("extrato_fidelidade_id", "")
+        if fidelidade_id:
+            cursores = st.session_state.setdefault("extrato_cursores", [None])
+            lancamentos, proximo = fidelidade_dao.listar_extrato(fidelidade_id, limite=20, antes_de=cursores[-1])
+            if not lancamentos:
+                st.info("Nenhum lançamento encontrado para este programa.")
+            else:
+                st.table([{
+                    "Data/Hora": m.data_hora,
+                    "Pontos": f"+{m.delta}" if m.eh_credito() else str(m.delta),
+                    "Motivo": m.motivo,
+                    "Pedido": m.pedido_id or ""
+                } for m in lancamentos])
+
+            col_ant, col_prox = st.columns(2)
+            with col_ant:
+                if len(cursores) > 1 and st.button("⬅️ Mais recentes"):
+                    cursores.pop()
+                    st.rerun()
+            with col_prox:
+                if proximo and st.button("Mais antigos ➡️"):
+                    cursores.append(proximo)
+                    st.rerun()
+
+        return
+
+    # ======================
+    # 4. Atualizar
     # ======================
     if escolha == "Atualizar":
         st.subheader("✏️ Atualizar Programa de Fidelidade")
@@ -87,42 +130,47 @@ def fidelidade_page():
         if btn_buscar:
             if not id_busca.strip():
                 st.error("Informe o ID do programa.")
+            # O formulário de atualização vive em outra execução da página: o ID fica na sessão
+            st.session_state["fidelidade_atualizar_id"] = id_busca.strip()
+
+        fidelidade_id = st.session_state.get("fidelidade_atualizar_id", "")
+        if fidelidade_id:
+            # Relido a cada execução: o ajuste é calculado sobre o saldo atual
+            f, erro = buscar_por_id(fidelidade_dao, fidelidade_id, "Programa de fidelidade não encontrado.")
+            if not f:
+                st.warning(erro)
             else:
-                f = fidelidade_dao.buscar_por_id(id_busca.strip())
-                if not f:
-                    st.warning("Programa de fidelidade não encontrado.")
-                else:
-                    with st.form(key="form_atualizar_fidelidade", clear_on_submit=False):
-                        st.markdown(f"**ID:** {f.id}")
-                        st.markdown(f"**Cliente Atual:** {f.cliente_nome} (ID: {f.cliente_id})")
-                        novos_pontos = st.number_input("Pontos*", min_value=0, step=1, value=f.pontos)
-                        novo_nivel = st.selectbox(
-                            "Nível*",
-                            ["bronze", "prata", "ouro"],
-                            index=["bronze", "prata", "ouro"].index(f.nivel.lower())
-                        )
-                        nova_validade = st.date_input(
-                            "Data de Validade*",
-                            value=datetime.strptime(f.validade, "%Y-%m-%d").date(),
-                            min_value=date.today()
-                        )
-                        btn_atualizar = st.form_submit_button("Salvar Atualização")
-
-                    if btn_atualizar:
-                        f.pontos = int(novos_pontos)
-                        f.nivel = novo_nivel
-                        f.validade = nova_validade.strftime("%Y-%m-%d")
-                        f.data_atualizacao = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        ok, msg = fidelidade_dao.atualizar(f)
-                        if ok:
-                            st.success("Programa de fidelidade atualizado com sucesso!")
-                        else:
-                            st.error(f"Erro ao atualizar fidelidade: {msg}")
+                with st.form(key="form_atualizar_fidelidade", clear_on_submit=False):
+                    st.markdown(f"**ID:** {f.id}")
+                    st.markdown(f"**Cliente Atual:** {f.cliente_nome} (ID: {f.cliente_id})")
+                    novos_pontos = st.number_input("Pontos*", min_value=0, step=1, value=f.pontos)
+                    # O nível acompanha o saldo: não é editado à mão
+                    st.markdown(f"**Nível:** {f.nivel} (pelo saldo de pontos)")
+                    nova_validade = st.date_input(
+                        "Data de Validade*",
+                        value=datetime.strptime(f.validade, "%Y-%m-%d").date(),
+                        min_value=date.today()
+                    )
+                    btn_atualizar = st.form_submit_button("Salvar Atualização")
+
+                if btn_atualizar:
+                    # Ajustes manuais de saldo entram no extrato como lançamento
+                    diferenca = int(novos_pontos) - f.pontos
+                    if diferenca > 0:
+                        f.adicionar_pontos(diferenca, motivo="Ajuste manual")
+                    elif diferenca < 0:
+                        f.resgatar_pontos(-diferenca, motivo="Ajuste manual")
+                    f.validade = nova_validade.strftime("%Y-%m-%d")
+                    if fidelidade_dao.atualizar(f):
+                        st.session_state.pop("fidelidade_atualizar_id", None)
+                        st.success("Programa de fidelidade atualizado com sucesso!")
+                    else:
+                        st.error("Erro ao atualizar fidelidade. Tente novamente.")
 
         return
 
     # ======================
-    # 4. Deletar
+    # 5. Deletar
     # ======================
     if escolha == "Deletar":
         st.subheader("❌ Deletar Programa de Fidelidade")
@@ -134,15 +182,14 @@ def fidelidade_page():
             if not id_del.strip():
                 st.error("Informe o ID do programa.")
             else:
-                f = fidelidade_dao.buscar_por_id(id_del.strip())
+                f, erro = buscar_por_id(fidelidade_dao, id_del.strip(), "Programa de fidelidade não encontrado.")
                 if not f:
-                    st.warning("Programa de fidelidade não encontrado.")
+                    st.warning(erro)
                 else:
-                    ok, msg = fidelidade_dao.deletar(id_del.strip())
-                    if ok:
+                    if fidelidade_dao.deletar(id_del.strip()):
                         st.success("Programa de fidelidade deletado com sucesso!")
                     else:
-                        st.error(f"Erro ao deletar fidelidade: {msg}")
+                        st.error("Erro ao deletar fidelidade. Tente novamente.")
 
         return
 
@@ -1,12 +1,13 @@
 import streamlit as st
 from dao.motoboy_dao import MotoboyDAO
+from dao.registro import obter_dao
 from models.motoboy import Motoboy
 from views.utils import buscar_por_campo_unico
 from datetime import datetime
 
 def motoboy_page():
     st.markdown("### 🛵 Gestão de Entregadores")
-    motoboy_dao = MotoboyDAO()
+    motoboy_dao = obter_dao(MotoboyDAO)
 
     menu = ["Cadastrar", "Listar", "Atualizar", "Deletar"]
     escolha = st.sidebar.selectbox("Ações (Motoboy)", menu)
@@ -62,24 +63,26 @@ def motoboy_page():
     # ======================
     if escolha == "Listar":
         st.subheader("📋 Lista de Entregadores")
-        motoboys = motoboy_dao.listar_todos()
-        if not motoboys:
+        df = motoboy_dao.listar_dataframe()
+        if df.empty:
             st.info("Nenhum motoboy cadastrado.")
         else:
-            dados = []
-            for m in motoboys:
-                dados.append({
-                    "ID": m.id,
-                    "Nome": m.nome,
-                    "CPF": m.cpf,
-                    "CNH": m.cnh,
-                    "Telefone": m.telefone or "",
-                    "Status": m.status_operacional,
-                    "Zonas de Atuação": ", ".join(m.zonas_atuacao) if m.zonas_atuacao else "",
-                    "Horários Disponíveis": ", ".join(m.horarios_disponiveis) if m.horarios_disponiveis else "",
-                    "Data de Criação": m.data_criacao
-                })
-            st.table(dados)
+            st.dataframe(
+                df.rename(columns={
+                    "id": "ID",
+                    "nome": "Nome",
+                    "cpf": "CPF",
+                    "cnh": "CNH",
+                    "telefone": "Telefone",
+                    "status_operacional": "Status",
+                    "zonas_atuacao": "Zonas de Atuação",
+                    "horarios_disponiveis": "Horários Disponíveis",
+                    "data_criacao": "Data de Criação"
+                })[["ID", "Nome", "CPF", "CNH", "Telefone", "Status", "Zonas de Atuação",
+                    "Horários Disponíveis", "Data de Criação"]],
+                hide_index=True,
+                use_container_width=True
+            )
 
         return
 
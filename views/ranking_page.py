@@ -0,0 +1,54 @@
+import streamlit as st
+from dao.fidelidade_dao import FidelidadeDAO
+from dao.registro import obter_dao
+
+# Intervalo de atualização do placar (segundos). O cache usa o mesmo intervalo,
+# então todas as telas abertas compartilham uma única consulta por ciclo.
+INTERVALO_ATUALIZACAO = 5
+
+
+@st.cache_data(ttl=INTERVALO_ATUALIZACAO, show_spinner=False)
+def carregar_ranking(limite: int):
+    dao = obter_dao(FidelidadeDAO)
+    top = [(f.cliente_nome, f.pontos, f.nivel) for f in dao.listar_top(limite)]
+    return top, dao.obter_distribuicao_niveis()
+
+
+def _nome_publico(nome: str) -> str:
+    """
+    Exibe apenas o primeiro nome e a inicial do sobrenome no placar público.
+    """
+    partes = nome.split()
+    if len(partes) < 2:
+        return nome
+    return f"{partes[0]} {partes[-1][0]}."
+
+
+@st.experimental_fragment(run_every=INTERVALO_ATUALIZACAO)
+def _placar(limite: int):
+    top, niveis = carregar_ranking(limite)
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("🥉 Bronze", niveis.get("bronze", 0))
+    with col2:
+        st.metric("🥈 Prata", niveis.get("prata", 0))
+    with col3:
+        st.metric("🥇 Ouro", niveis.get("ouro", 0))
+
+    if not top:
+        st.info("Nenhum programa de fidelidade registrado.")
+        return
+
+    st.table([{
+        "Posição": posicao,
+        "Cliente": _nome_publico(nome),
+        "Pontos": pontos,
+        "Nível": nivel.title()
+    } for posicao, (nome, pontos, nivel) in enumerate(top, start=1)])
+
+
+def ranking_page():
+    st.markdown("### 🏆 Ranking do Programa de Fidelidade")
+    limite = st.sidebar.selectbox("Quantidade no ranking", [10, 20, 50], index=0)
+    _placar(limite)
@@ -1,38 +1,65 @@
+from dao.indices import normalizar_digitos, normalizar_texto
+from dao.resiliencia import indisponivel
+
+# Falha de acesso ao banco, que as telas não podem confundir com "não encontrado"
+MENSAGEM_INDISPONIVEL = "Banco de dados indisponível no momento. Tente novamente em instantes."
+
+# Campos de busca única, na ordem de prioridade, com o normalizador usado na comparação
+_CAMPOS_UNICOS = (
+    ("cpf", "CPF", normalizar_digitos),
+    ("telefone", "telefone", normalizar_digitos),
+    ("nome", "nome", normalizar_texto),
+)
+
+
 def buscar_por_campo_unico(dao, cpf=None, telefone=None, nome=None):
     """
     Busca um registro em dao por CPF (prioritário), telefone ou nome.
+    Usa os índices de busca exata da DAO quando existirem; caso contrário,
+    compara contra a listagem completa.
     Retorna (objeto, mensagem_erro).
     """
-    try:
-        registros = dao.listar_todos()
-    except Exception:
-        return None, "Erro ao acessar a base de dados."
+    valores = {"cpf": cpf, "telefone": telefone, "nome": nome}
 
-    if cpf:
-        encontrados = [r for r in registros if hasattr(r, "cpf") and r.cpf == cpf]
-        if len(encontrados) == 1:
-            return encontrados[0], None
-        elif len(encontrados) > 1:
-            return None, "Mais de um registro encontrado com este CPF."
-        else:
-            return None, "Nenhum registro encontrado com este CPF."
+    for campo, rotulo, normalizador in _CAMPOS_UNICOS:
+        valor = valores[campo]
+        if not valor:
+            continue
 
-    if telefone:
-        encontrados = [r for r in registros if hasattr(r, "telefone") and r.telefone == telefone]
-        if len(encontrados) == 1:
-            return encontrados[0], None
-        elif len(encontrados) > 1:
-            return None, "Mais de um registro encontrado com este telefone."
-        else:
-            return None, "Nenhum registro encontrado com este telefone."
+        try:
+            if hasattr(dao, "possui_indice") and dao.possui_indice(campo):
+                encontrados = dao.buscar_por_indice(campo, valor)
+            else:
+                chave = normalizador(valor)
+                encontrados = [
+                    r for r in dao.listar_todos()
+                    if hasattr(r, campo) and normalizador(getattr(r, campo)) == chave
+                ]
+        except Exception as e:
+            if indisponivel(e):
+                return None, MENSAGEM_INDISPONIVEL
+            return None, "Erro ao acessar a base de dados."
 
-    if nome:
-        encontrados = [r for r in registros if hasattr(r, "nome") and r.nome.lower() == nome.lower()]
         if len(encontrados) == 1:
             return encontrados[0], None
         elif len(encontrados) > 1:
-            return None, "Mais de um registro encontrado com este nome."
+            return None, f"Mais de um registro encontrado com este {rotulo}."
         else:
-            return None, "Nenhum registro encontrado com este nome."
+            return None, f"Nenhum registro encontrado com este {rotulo}."
 
     return None, "Informe CPF, telefone ou nome para busca."
+
+
+def buscar_por_id(dao, id, mensagem_nao_encontrado):
+    """
+    Busca um registro em dao pelo ID.
+    Retorna (objeto, mensagem_erro), com mensagem_nao_encontrado só quando o
+    registro não existe e MENSAGEM_INDISPONIVEL quando o banco está fora.
+    """
+    try:
+        objeto = dao.buscar_por_id(id)
+    except Exception:
+        return None, MENSAGEM_INDISPONIVEL
+    if not objeto:
+        return None, mensagem_nao_encontrado
+    return objeto, None